@@ -1,86 +1,169 @@
 """
 alert_motoru.py — Fiyat ve RSI uyarılarını arka planda kontrol eder.
 ✅ MİMARİ GÜNCELLEME - Sembol Gruplama (API Optimizasyonu) ve Robust Parsing.
+✅ Bellek içi uyarı indeksi — her döngüde tablo okunmaz, eşikler bisect ile bulunur.
+✅ Kripto fiyat uyarıları Binance WebSocket akışından olay tabanlı tetiklenir;
+   akış koparsa semboller otomatik olarak polling döngüsüne düşer.
+✅ Bildirimler doğrudan gönderilmez, gonderim_kuyrugu'na (öncelik: uyarı) eklenir;
+   uyarı ancak mesaj Telegram'a ulaştıktan sonra silinir.
+✅ Piyasa saatine duyarlı yoklama (piyasa_takvimi): kapalı borsalar yoklanmaz,
+   kapanıştan sonra tek son yoklama yapılır, açılışta sıklık artar.
+✅ Koşul uyarıları (tip='kosul', kosul_motoru): tüm sembollerin koşulları tek planda,
+   sembol × bar matrisi üzerinde vektörel değerlendirilir.
+✅ ALERT_SHARDING_ENABLED: semboller parçalara bölünür, süreç yalnızca kiraladığı
+   parçaları değerlendirir (parca_kiralama); ek süreçler uyari_isci.py ile başlatılır.
 """
+import html
+import time
 import asyncio
+import importlib
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set
 from decimal import Decimal
-from collections import defaultdict
 
-from db import uyarilari_getir, uyari_sil
+from prometheus_client import Counter, Histogram
+
+from config import settings
+from db import kosul_uyarilarini_getir, uyari_indeksini_yukle
+from gonderim_kuyrugu import gonderim_kuyrugu, ONCELIK_UYARI
+from parca_kiralama import ParcaKiralayici
+from piyasa_takvimi import piyasa_bul, yoklama_zamani
+from uyari_indeksi import uyari_indeksi, _parse_decimal
 from veri_motoru import get_fiyat_hiyerarsik
-from teknik_analiz import teknik_analiz_yap
+from websocket_motoru import akis_merkezi, binance_sembolu, ticker_stream
 
 log = logging.getLogger("finans_botu")
 
+UYARI_GECIKMESI = Histogram(
+    'alert_tick_to_send_seconds', 'Akış tick\'inden Telegram gönderimine kadar geçen süre',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+# Uyarı hattı gecikmeleri (duvar saati; süreçler arası karşılaştırılabilir), kaynak: akis | yoklama | kosul
+#   gözlem       fiyatın elde edildiği an (akış tick'i, fiyat çekimi; önbellekten geldiyse çekildiği an)
+#   değerlendirme uyarının tetiklendiğine karar verildiği an
+#   gönderim     mesajın Telegram'a ulaştığı an (yalnızca bu süreç gönderiyorsa; işçi süreçlerinin
+#                satırları için bot sürecindeki telegram_send_lag_seconds değerlendirme → gönderimdir)
+_GECIKME_KOVALARI = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+UYARI_GOZLEM_DEGERLENDIRME = Histogram(
+    'alert_observe_to_eval_seconds', 'Fiyat gözleminden uyarı değerlendirmesine geçen süre',
+    ['kaynak'], buckets=_GECIKME_KOVALARI,
+)
+UYARI_DEGERLENDIRME_GONDERIM = Histogram(
+    'alert_eval_to_send_seconds', 'Uyarı değerlendirmesinden Telegram gönderimine geçen süre',
+    ['kaynak'], buckets=_GECIKME_KOVALARI,
+)
+UYARI_GOZLEM_GONDERIM = Histogram(
+    'alert_observe_to_send_seconds', 'Fiyat gözleminden Telegram gönderimine geçen süre (uçtan uca)',
+    ['kaynak'], buckets=_GECIKME_KOVALARI,
+)
+UYARI_YOKLAMA = Counter(
+    'alert_poll_total', 'Uyarı döngüsünün yaptığı fiyat yoklamaları', ['piyasa']
+)
+
+# sembol → bir sonraki yoklama zamanı (epoch); yeni semboller hemen yoklanır
+_sonraki_yoklama: Dict[str, float] = {}
+# Koşul uyarıları için aynı plan (sembol → bir sonraki değerlendirme)
+_sonraki_kosul: Dict[str, float] = {}
+
+# API limitlerini korumak için semboller arası bekleme (saniye)
+SEMBOL_ARASI_BEKLEME = 1.0
+
+# Parçalama açıksa bu sürecin kiraları (None → tüm semboller bu süreçte)
+kiralayici: Optional[ParcaKiralayici] = None
+_indeks_durumu = {"surum": -1, "zaman": 0.0}
+
 # ═══════════════════════════════════════════════════════════════════
 # YARDIMCI FONKSİYONLAR
 # ═══════════════════════════════════════════════════════════════════
 
-def _parse_decimal(val: Any) -> Optional[Decimal]:
-    if val is None: return None
-    try:
-        if isinstance(val, str):
-            temiz = ''.join(c for c in val if c.isdigit() or c in '.,-')
-            if ',' in temiz and '.' in temiz:
-                if temiz.find('.') < temiz.find(','):
-                    temiz = temiz.replace('.', '').replace(',', '.')
-                else:
-                    temiz = temiz.replace(',', '')
-            elif ',' in temiz:
-                temiz = temiz.replace(',', '.')
-            return Decimal(temiz) if temiz else None
-        return Decimal(str(val))
-    except Exception as e:
-        log.debug(f"Decimal parse hatası ('{val}'): {e}")
-        return None
-
 async def _async_call(fn, *args, **kwargs) -> Any:
     loop = asyncio.get_running_loop()
     return await loop.run_in_executor(None, lambda: fn(*args, **kwargs))
 
+
+def _bizim_mi(sembol: str) -> bool:
+    """Sembol bu süreçte mi değerlendirilir? (parçalama kapalıysa hep True)"""
+    return kiralayici is None or kiralayici.sahibi_miyim(sembol)
+
+
+async def _indeksi_tazele():
+    """
+    Tek süreçte indeks db.py yazmalarıyla senkron kalır ve yalnızca ilk turda okunur.
+    Parçalamada uyarıları diğer süreçler ekleyip siler: indeks parça kümesi değişince
+    ve ALERT_INDEX_REFRESH_SECONDS'ta bir tablodan yeniden kurulur.
+    """
+    if kiralayici is None:
+        if not uyari_indeksi.hazir:
+            await uyari_indeksini_yukle()
+        return
+    simdi = time.monotonic()
+    if (not uyari_indeksi.hazir or kiralayici.surum != _indeks_durumu["surum"]
+            or simdi - _indeks_durumu["zaman"] >= settings.ALERT_INDEX_REFRESH_SECONDS):
+        _indeks_durumu["surum"] = kiralayici.surum
+        _indeks_durumu["zaman"] = simdi
+        await uyari_indeksini_yukle()
+
 # ═══════════════════════════════════════════════════════════════════
 # UYARI KONTROL DÖNGÜSÜ — ✅ SEMBOL GRUPLAMA (API OPTİMİZASYONU)
 # ═══════════════════════════════════════════════════════════════════
 
-async def uyari_kontrol_dongusu(bot):
+async def uyari_kontrol_dongusu():
     log.info("🔔 Uyarı kontrol döngüsü başlatıldı.")
     
     while True:
         try:
-            uyarilar = await uyarilari_getir()
-            if not uyarilar:
-                await asyncio.sleep(60)
-                continue
+            await _indeksi_tazele()
+            ust_sinir = 60.0 if kiralayici is None else min(60.0, kiralayici.sure / 3)
 
-            # ✅ PERFORMANS: Sembolleri grupla (100 uyarı için 100 API çağrısı yerine 1 çağrı)
-            sembol_gruplari = defaultdict(list)
-            for uyari in uyarilar:
-                sembol_gruplari[uyari['sembol']].append(uyari)
+            # ✅ PERFORMANS: Sembol başına tek fiyat çağrısı (indeks zaten sembole göre gruplu)
+            # Parçalamada yalnızca bu sürecin kiraladığı parçalardaki semboller
+            semboller = [s for s in uyari_indeksi.semboller() if _bizim_mi(s)]
+            for eski in _sonraki_yoklama.keys() - set(semboller):
+                del _sonraki_yoklama[eski]
+            if not semboller:
+                await asyncio.sleep(ust_sinir)
+                continue
 
-            for sembol, uyarilar_list in sembol_gruplari.items():
+            for sembol in semboller:
+                # Canlı akıştan beslenen kripto semboller burada yoklanmaz
+                if kripto_akisi is not None and kripto_akisi.canli_mi(sembol):
+                    continue
+                # Piyasa kapalıysa / sırası gelmediyse atla (piyasa_takvimi)
+                if _sonraki_yoklama.get(sembol, 0) > time.time():
+                    continue
+                piyasa = piyasa_bul(sembol)
+                UYARI_YOKLAMA.labels(piyasa=piyasa.ad if piyasa else "DIGER").inc()
                 try:
                     # 1. Fiyat Verisini Tek Seferde Çek
+                    gozlem = time.time()
                     fiyat_verisi = await get_fiyat_hiyerarsik(sembol)
                     mevcut_fiyat = _parse_decimal(fiyat_verisi.get("fiyat"))
+                    # Önbellekten gelen fiyatın gözlem anı, çekildiği andır
+                    gozlem = fiyat_verisi.get("zaman") or gozlem
                     
                     # 2. Teknik Veriyi Tek Seferde Çek (Eğer RSI uyarısı varsa)
                     mevcut_rsi = None
-                    if any(u['tip'].startswith('rsi') for u in uyarilar_list):
+                    if uyari_indeksi.rsi_var_mi(sembol):
+                        # pandas/yfinance sadece RSI uyarısı varsa yüklenir
+                        from teknik_analiz import teknik_analiz_yap
                         teknik = await _async_call(teknik_analiz_yap, sembol)
                         mevcut_rsi = _parse_decimal(teknik.get('RSI (14)'))
 
-                    # 3. Tüm Uyarıları Bu Verilerle Kontrol Et
-                    for uyari in uyarilar_list:
-                        await _uyari_kontrol_et(bot, uyari, mevcut_fiyat, mevcut_rsi)
+                    # 3. Yalnızca eşiği geçilen uyarılar (bisect, O(log n + k))
+                    for uyari in uyari_indeksi.tetiklenenler(sembol, mevcut_fiyat, mevcut_rsi):
+                        await _uyari_kontrol_et(uyari, mevcut_fiyat, mevcut_rsi, gozlem=gozlem)
                     
                     # API limitlerini korumak için semboller arası kısa bekleme
-                    await asyncio.sleep(1)
+                    await asyncio.sleep(SEMBOL_ARASI_BEKLEME)
                 except Exception as e:
                     log.error(f"Sembol işleme hatası ({sembol}): {e}")
+                finally:
+                    _sonraki_yoklama[sembol] = yoklama_zamani(sembol, time.time())
 
-            await asyncio.sleep(300) # 5 dakika
+            # En yakın yoklamaya kadar uyu; yeni eklenen uyarılar en geç 60 sn'de görülür
+            # (parçalamada devralınan parçalar en geç bir heartbeat turunda)
+            en_yakin = min(_sonraki_yoklama.values(), default=time.time() + ust_sinir)
+            await asyncio.sleep(max(1.0, min(en_yakin - time.time(), ust_sinir)))
             
         except asyncio.CancelledError:
             log.info("🛑 Uyarı kontrol döngüsü iptal edildi.")
@@ -89,12 +172,15 @@ async def uyari_kontrol_dongusu(bot):
             log.exception(f"💥 Uyarı döngüsünde beklenmedik hata: {e}")
             await asyncio.sleep(60)
 
-async def _uyari_kontrol_et(bot, uyari: Dict[str, Any], mevcut_fiyat: Decimal, mevcut_rsi: Decimal):
+async def _uyari_kontrol_et(uyari: Dict[str, Any], mevcut_fiyat: Decimal, mevcut_rsi: Decimal,
+                            tick_zamani: Optional[float] = None, gozlem: Optional[float] = None,
+                            kaynak: str = "yoklama"):
     sembol = uyari['sembol']
-    user_id = uyari['user_id']
     tip = uyari['tip']
-    hedef = _parse_decimal(uyari['hedef_deger'])
-    uyari_id = uyari['id']
+    # İndeks kayıtlarında hedef önceden parse edilmiştir
+    hedef = uyari.get('hedef')
+    if hedef is None:
+        hedef = _parse_decimal(uyari['hedef_deger'])
 
     if hedef is None: return
 
@@ -120,9 +206,214 @@ async def _uyari_kontrol_et(bot, uyari: Dict[str, Any], mevcut_fiyat: Decimal, m
             mesaj = f"📉 <b>RSI Uyarısı!</b>\n{sembol} RSI değeri {hedef} altına düştü.\nGüncel RSI: {mevcut_rsi:.2f}"
 
     if tetiklendi and mesaj:
+        gonderildi = None
+        if tick_zamani is not None:
+            gonderildi = lambda: UYARI_GECIKMESI.observe(time.monotonic() - tick_zamani)
+        await _bildir(uyari, mesaj, gonderildi, gozlem=gozlem, kaynak=kaynak)
+
+
+async def _bildir(uyari: Dict[str, Any], mesaj: str, gonderildi=None,
+                  gozlem: Optional[float] = None, kaynak: str = "yoklama"):
+    """
+    Tetiklenen uyarının mesajını kuyruğa ekler; uyarı gönderimden sonra kuyruk tarafından silinir.
+    gozlem: fiyatın gözlemlendiği an (time.time()); aşama gecikmeleri histogramlara yazılır.
+    """
+    degerlendirme = time.time()
+    if gozlem is not None:
+        UYARI_GOZLEM_DEGERLENDIRME.labels(kaynak=kaynak).observe(max(0.0, degerlendirme - gozlem))
+
+    def _gonderildi():
+        simdi = time.time()
+        UYARI_DEGERLENDIRME_GONDERIM.labels(kaynak=kaynak).observe(max(0.0, simdi - degerlendirme))
+        if gozlem is not None:
+            UYARI_GOZLEM_GONDERIM.labels(kaynak=kaynak).observe(max(0.0, simdi - gozlem))
+        if gonderildi is not None:
+            gonderildi()
+
+    try:
+        if await gonderim_kuyrugu.ekle(uyari['user_id'], mesaj, oncelik=ONCELIK_UYARI,
+                                       uyari_id=uyari['id'], gonderildi=_gonderildi):
+            log.info(f"✅ Uyarı tetiklendi: {uyari['sembol']} (ID: {uyari['id']})")
+    except Exception as e:
+        log.error(f"Uyarı kuyruğa eklenemedi (User: {uyari['user_id']}): {e}")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# KOŞUL UYARILARI — TOPLU VEKTÖREL DEĞERLENDİRME
+# ═══════════════════════════════════════════════════════════════════
+
+async def kosul_uyari_dongusu():
+    """
+    Sırası gelen sembollerin tüm koşul uyarılarını tek seferde değerlendirir: günlük barlar
+    tek toplu istekle çekilir, koşullar ortak alt ifadeleri paylaşan tek planda hesaplanır.
+    Yoklama zamanları fiyat uyarılarıyla aynı piyasa takvimine uyar.
+    """
+    log.info("🧮 Koşul uyarısı döngüsü başlatıldı.")
+    km = None   # kosul_motoru (numpy) ilk koşul uyarısında yüklenir
+
+    while True:
         try:
-            await bot.send_message(user_id, mesaj, parse_mode="HTML")
-            await uyari_sil(uyari_id)
-            log.info(f"✅ Uyarı tetiklendi: {sembol} (ID: {uyari_id})")
+            uyarilar = [u for u in await kosul_uyarilarini_getir() if _bizim_mi(u['sembol'])]
+            semboller = {u['sembol'] for u in uyarilar}
+            for eski in _sonraki_kosul.keys() - semboller:
+                del _sonraki_kosul[eski]
+
+            simdi = time.time()
+            sirasi_gelen = {s for s in semboller if _sonraki_kosul.get(s, 0) <= simdi}
+            if sirasi_gelen:
+                if km is None:
+                    km = await _async_call(importlib.import_module, "kosul_motoru")
+                gozlem = time.time()
+                try:
+                    tetiklenen = await _async_call(
+                        km.toplu_degerlendir, [u for u in uyarilar if u['sembol'] in sirasi_gelen]
+                    )
+                finally:
+                    for sembol in sirasi_gelen:
+                        _sonraki_kosul[sembol] = yoklama_zamani(sembol, time.time())
+                for uyari, fiyat in tetiklenen:
+                    mesaj = (f"🧮 <b>Koşul Uyarısı!</b>\n{uyari['sembol']}: "
+                             f"<code>{html.escape(uyari['hedef_deger'])}</code>")
+                    if fiyat is not None:
+                        mesaj += f"\nGüncel: {fiyat:.2f}"
+                    await _bildir(uyari, mesaj, gozlem=gozlem, kaynak="kosul")
+
+            ust_sinir = 60.0 if kiralayici is None else min(60.0, kiralayici.sure / 3)
+            en_yakin = min(_sonraki_kosul.values(), default=time.time() + ust_sinir)
+            await asyncio.sleep(max(1.0, min(en_yakin - time.time(), ust_sinir)))
+
+        except asyncio.CancelledError:
+            log.info("🛑 Koşul uyarısı döngüsü iptal edildi.")
+            break
         except Exception as e:
-            log.error(f"Mesaj gönderilemedi (User: {user_id}): {e}")
+            log.exception(f"💥 Koşul uyarısı döngüsünde beklenmedik hata: {e}")
+            await asyncio.sleep(60)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# KRİPTO UYARILARI — BİNANCE WEBSOCKET AKIŞI (OLAY TABANLI)
+# ═══════════════════════════════════════════════════════════════════
+
+class KriptoUyariAkisi:
+    """
+    İndeksteki kripto sembollerini akış merkezine abone eder; her ticker mesajı
+    uyarı indeksinde bisect ile kontrol edilir (saniye altı tespit).
+
+    - Sembol kümesi değişince yalnızca fark SUBSCRIBE/UNSUBSCRIBE edilir,
+      bağlantı yeniden kurulmaz.
+    - Debounce: bir uyarı akıştan denendikten sonra ALERT_DEBOUNCE_SECONDS
+      boyunca yeniden denenmez (gönderim sürerken / başarısız olduysa tekrar yağmuru olmaz).
+    - Yedek: bir sembolden ALERT_STREAM_STALE_SECONDS boyunca tick gelmezse
+      canli_mi() False döner ve sembol polling döngüsüne geri düşer.
+    """
+
+    def __init__(self, hub=None, debounce: Optional[float] = None,
+                 bayat_sn: Optional[float] = None, yenileme_sn: float = 5.0):
+        hub = hub or akis_merkezi
+        self.hub = hub
+        self.abone = hub.abone(self._mesaj)
+        self.debounce = settings.ALERT_DEBOUNCE_SECONDS if debounce is None else debounce
+        self.bayat_sn = settings.ALERT_STREAM_STALE_SECONDS if bayat_sn is None else bayat_sn
+        self.yenileme_sn = yenileme_sn
+        self._harita: Dict[str, str] = {}          # BTCUSDT → BTC-USD
+        self._son_deneme: Dict[int, float] = {}    # uyari_id → monotonic
+        self._gorevler: Set[asyncio.Task] = set()
+
+    def _istenen_harita(self) -> Dict[str, str]:
+        harita = {}
+        for sembol in uyari_indeksi.semboller():
+            if not _bizim_mi(sembol):
+                continue
+            b = binance_sembolu(sembol)
+            if b:
+                harita[b] = sembol
+        return harita
+
+    def canli_mi(self, sembol: str) -> bool:
+        """Sembol akıştan taze tick alıyor mu? (False → polling yoklar)"""
+        b = binance_sembolu(sembol)
+        if not b or b not in self._harita:
+            return False
+        return self.hub.taze_mi(ticker_stream(b), self.bayat_sn)
+
+    async def _mesaj(self, stream: str, veri: Dict[str, Any]):
+        """Hub callback'i: 24hr ticker verisinden sembol ('s') ve son fiyatı ('c') alır."""
+        if "s" in veri and "c" in veri:
+            await self._tick(veri["s"], veri["c"])
+
+    async def _tick(self, binance_sym: str, fiyat_str):
+        """Ticker callback'i — receive döngüsünü bloklamamak için gönderimler ayrı görevde."""
+        tick_zamani = time.monotonic()
+        gozlem = time.time()
+        sembol = self._harita.get(binance_sym)
+        fiyat = _parse_decimal(fiyat_str)
+        if sembol is None or fiyat is None:
+            return
+        for uyari in uyari_indeksi.tetiklenenler(sembol, fiyat, None):
+            son = self._son_deneme.get(uyari["id"])
+            if son is not None and tick_zamani - son < self.debounce:
+                continue
+            self._son_deneme[uyari["id"]] = tick_zamani
+            gorev = asyncio.create_task(
+                _uyari_kontrol_et(uyari, fiyat, None, tick_zamani=tick_zamani, gozlem=gozlem, kaynak="akis")
+            )
+            self._gorevler.add(gorev)
+            gorev.add_done_callback(self._gorevler.discard)
+
+    async def _abonelikleri_guncelle(self, harita: Dict[str, str]):
+        """Yalnızca eklenen/çıkan sembolleri hub'a bildirir (diğer streamler kesintisiz sürer)."""
+        eklenen = [ticker_stream(b) for b in harita.keys() - self._harita.keys()]
+        cikan = [ticker_stream(b) for b in self._harita.keys() - harita.keys()]
+        # Çıkan sembolün son tick'leri artık eşleşmesin diye harita önce güncellenir
+        self._harita = harita
+        if cikan:
+            await self.abone.cikar(*cikan)
+        if eklenen:
+            await self.abone.ekle(*eklenen)
+        log.info(f"📡 Kripto uyarı akışı: +{len(eklenen)} / -{len(cikan)} "
+                 f"({len(harita)} sembol)")
+
+    async def calistir(self):
+        """Sembol kümesini izler; değişince aboneliği yeniler. Debounce kayıtlarını temizler."""
+        try:
+            while True:
+                if uyari_indeksi.hazir:
+                    harita = self._istenen_harita()
+                    if harita.keys() != self._harita.keys():
+                        await self._abonelikleri_guncelle(harita)
+                    simdi = time.monotonic()
+                    self._son_deneme = {
+                        i: t for i, t in self._son_deneme.items()
+                        if simdi - t < self.debounce and uyari_indeksi.getir(i) is not None
+                    }
+                await asyncio.sleep(self.yenileme_sn)
+        finally:
+            self._harita = {}
+            await self.abone.kapat()
+
+
+# Polling döngüsü bu örneğe bakarak canlı sembolleri atlar
+kripto_akisi: Optional[KriptoUyariAkisi] = None
+
+
+async def kripto_uyari_akisi_baslat():
+    """main.py arka plan görevi: kripto uyarılarını WebSocket akışına bağlar."""
+    global kripto_akisi
+    if not settings.ALERT_STREAM_ENABLED:
+        log.info("ℹ️ Kripto uyarı akışı kapalı (ALERT_STREAM_ENABLED=false), polling kullanılıyor.")
+        return
+    kripto_akisi = KriptoUyariAkisi()
+    try:
+        await kripto_akisi.calistir()
+    finally:
+        kripto_akisi = None
+
+
+async def uyari_parcalama_baslat(sahip: Optional[str] = None):
+    """main.py / uyari_isci.py arka plan görevi: parça kiralarını alır ve heartbeat gönderir."""
+    global kiralayici
+    if not settings.ALERT_SHARDING_ENABLED:
+        return
+    kiralayici = ParcaKiralayici(sahip)
+    log.info(f"🧩 Uyarı parçalama açık: {kiralayici.parca_sayisi} parça, sahip {kiralayici.sahip}")
+    await kiralayici.calistir()
@@ -7,9 +7,9 @@ import json
 import logging
 import asyncio
 from typing import Optional, Dict, Any
-from anthropic import Anthropic
-from groq import Groq
-import google.generativeai as genai
+
+# Sağlayıcı SDK'ları (anthropic, groq, google.generativeai) ağırdır; her biri
+# yalnızca API anahtarı tanımlıysa ve ilk kullanımda import edilir.
 
 log = logging.getLogger("finans_botu")
 
@@ -41,6 +41,7 @@ async def ai_analiz_uret(sistem_prompt: str, kullanici_prompt: str, max_tokens:
     claude_key = os.environ.get("ANTHROPIC_API_KEY")
     if claude_key:
         try:
+            from anthropic import Anthropic
             client = Anthropic(api_key=claude_key)
             # Lambda closure: değerleri varsayılan argümanla yakala
             response = await loop.run_in_executor(
@@ -59,6 +60,7 @@ async def ai_analiz_uret(sistem_prompt: str, kullanici_prompt: str, max_tokens:
     # 2. Groq (Llama 3)
     groq_key = os.environ.get("GROQ_API_KEY")
     if groq_key:
+        from groq import Groq
         groq_models = ["llama-3.3-70b-versatile", "llama3-70b-8192", "llama3-8b-8192"]
         for groq_model in groq_models:
             try:
@@ -84,6 +86,7 @@ async def ai_analiz_uret(sistem_prompt: str, kullanici_prompt: str, max_tokens:
     # 3. Gemini — en uyumlu model önce
     gemini_key = os.environ.get("GEMINI_API_KEY")
     if gemini_key:
+        import google.generativeai as genai
         genai.configure(api_key=gemini_key)
         full_prompt = f"{sistem_prompt}\n\n{kullanici_prompt}"
         gemini_models = [
@@ -1,66 +1,270 @@
 """
-backtest_motoru.py — Teknik stratejiler için geçmişe dönük test (Backtest).
-✅ YENİ ÖZELLİK - AlphaTrend ve Supertrend stratejileri için performans raporu.
+backtest_motoru.py — Teknik stratejiler için vektörel geçmişe dönük test (Backtest).
+
+Strateji mumlardan hedef pozisyon dizisi üretir (1 uzun, 0 nakit, -1 kısa); motor gerisini
+satır döngüsü olmadan NumPy birikimli işlemleriyle hesaplar:
+
+    sinyal (t kapanışı) ─► pozisyon (t+1 açılışında dolum) ─► bar getirileri ─► özkaynak (cumprod)
+                                                            └─► işlemler (pozisyon değişim noktaları)
+
+Komisyon ve kayma her pozisyon değişiminde değişen tutar oranında düşülür.
+Stratejiler STRATEJILER kayıt defterine @strateji ile eklenir; motor onları adıyla çağırır.
+Mumlar fiyat_gecmisi düzenindedir: (n × 6) → zaman, açılış, yüksek, düşük, kapanış, hacim.
 """
+import time
 import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
 import pandas as pd
-import yfinance as yf
-from typing import Dict, Any
+
+from config import settings
+from teknik_analiz import _alphatrend, _supertrend
 
 log = logging.getLogger("finans_botu")
 
-def backtest_yap(sembol: str, strateji: str = "SMA_CROSS") -> Dict[str, Any]:
+ZAMAN, ACILIS, YUKSEK, DUSUK, KAPANIS, HACIM = range(6)
+YIL_SN = 365.25 * 86400
+BASLANGIC_SERMAYESI = 10000.0
+
+
+class BacktestHatasi(ValueError):
+    """Bilinmeyen strateji/parametre ya da yetersiz veri; mesaj kullanıcıya gösterilebilir."""
+
+
+# ═══════════════════════════════════════════════════════════════════
+# STRATEJİ KAYIT DEFTERİ
+# ═══════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class Strateji:
+    ad: str
+    aciklama: str
+    fonksiyon: Callable[..., np.ndarray]     # fonksiyon(mumlar, **parametreler) → hedef pozisyon (n,)
+    varsayilanlar: Dict[str, float]
+
+    def parametreler(self, degerler: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """Varsayılanların üzerine verilenler; bilinmeyen parametre BacktestHatasi."""
+        degerler = degerler or {}
+        bilinmeyen = sorted(set(degerler) - set(self.varsayilanlar))
+        if bilinmeyen:
+            raise BacktestHatasi(f"{self.ad} için bilinmeyen parametre: {', '.join(bilinmeyen)} "
+                                 f"(geçerli: {', '.join(self.varsayilanlar)})")
+        return {**self.varsayilanlar, **{k: float(v) for k, v in degerler.items()}}
+
+
+STRATEJILER: Dict[str, Strateji] = {}
+
+
+def strateji(ad: str, aciklama: str, **varsayilanlar: float):
+    """Sinyal fonksiyonunu STRATEJILER'e kaydeden dekoratör."""
+    def kaydet(fonksiyon):
+        STRATEJILER[ad.upper()] = Strateji(ad.upper(), aciklama, fonksiyon, dict(varsayilanlar))
+        return fonksiyon
+    return kaydet
+
+
+def strateji_getir(ad: str) -> Strateji:
+    kayit = STRATEJILER.get(ad.upper())
+    if kayit is None:
+        raise BacktestHatasi(f"Bilinmeyen strateji: {ad} (mevcut: {', '.join(STRATEJILER)})")
+    return kayit
+
+
+def _seriler(mumlar: np.ndarray):
+    return tuple(pd.Series(mumlar[:, k]) for k in (YUKSEK, DUSUK, KAPANIS, HACIM))
+
+
+def _ileri_doldur(x: np.ndarray) -> np.ndarray:
+    """NaN'ları son geçerli değerle doldurur (baştaki NaN'lar kalır)."""
+    gecerli = ~np.isnan(x)
+    idx = np.maximum.accumulate(np.where(gecerli, np.arange(len(x)), 0))
+    return np.where(gecerli[idx], x[idx], np.nan)
+
+
+@strateji("SMA_CROSS", "Hızlı SMA yavaş SMA'nın üzerindeyken uzun", hizli=20, yavas=50)
+def _sma_kesisimi(mumlar: np.ndarray, hizli: float, yavas: float) -> np.ndarray:
+    c = pd.Series(mumlar[:, KAPANIS])
+    return (c.rolling(int(hizli)).mean() > c.rolling(int(yavas)).mean()).to_numpy(dtype=float)
+
+
+@strateji("SUPERTREND", "Supertrend yükselen trendde uzun, düşen trendde kısa", factor=3.0, atr_period=10)
+def _supertrend_stratejisi(mumlar: np.ndarray, factor: float, atr_period: float) -> np.ndarray:
+    h, l, c, _ = _seriler(mumlar)
+    _, yon = _supertrend(h, l, c, factor=factor, atr_period=int(atr_period))
+    hedef = -np.nan_to_num(yon.to_numpy(dtype=float))     # teknik_analiz: -1 yükselen trend
+    hedef[:int(atr_period)] = 0.0                         # ATR oturmadan sinyal yok
+    return hedef
+
+
+@strateji("ALPHATREND", "AlphaTrend, 2 bar önceki değerini yukarı kestiğinde uzun, aşağı kestiğinde kısa",
+          coeff=1.0, ap=14)
+def _alphatrend_stratejisi(mumlar: np.ndarray, coeff: float, ap: float) -> np.ndarray:
+    h, l, c, v = _seriler(mumlar)
+    at = _alphatrend(h, l, c, v, coeff=coeff, ap=int(ap)).to_numpy(dtype=float)
+    fark = at[2:] - at[:-2]
+    # Eşitlikte (AT yatay) son kesişimin yönü korunur
+    yon = _ileri_doldur(np.where(fark == 0, np.nan, np.sign(fark)))
+    hedef = np.concatenate(([0.0, 0.0], np.nan_to_num(yon)))
+    hedef[:int(ap) + 2] = 0.0
+    return hedef
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MOTOR
+# ═══════════════════════════════════════════════════════════════════
+
+@dataclass
+class BacktestSonucu:
+    strateji: str
+    parametreler: Dict[str, float]
+    zaman: np.ndarray
+    ozkaynak: np.ndarray            # her bar kapanışındaki portföy değeri
+    pozisyon: np.ndarray            # bar boyunca tutulan pozisyon (açılışta dolmuş)
+    islem_getirileri: np.ndarray    # her işlemin maliyetler düşülmüş getirisi (son işlem açık olabilir)
+    toplam_getiri: float
+    cagr: float
+    sharpe: float
+    max_dusus: float
+    kazanma_orani: float
+    islem_sayisi: int
+    al_tut_getirisi: float
+
+
+def pozisyon_getirileri(mumlar: np.ndarray, hedef: np.ndarray,
+                        maliyet: float) -> tuple:
     """
-    Belirli bir sembol ve strateji için 1 yıllık backtest yapar.
+    Hedef pozisyonlardan bar getirileri, tutulan pozisyon ve işlem getirileri.
+    t kapanışındaki hedef t+1 açılışında dolar: boşluk (önceki kapanış → açılış) eski pozisyona,
+    gün içi hareket (açılış → kapanış) yeni pozisyona yazılır.
     """
-    try:
-        # 1. Veri Çek (1 Yıllık Günlük Veri)
-        df = yf.download(sembol, period="1y", interval="1d", progress=False, auto_adjust=True)
-        if df.empty: return {"Hata": "Veri bulunamadı."}
-
-        # ✅ FIX: yfinance >= 0.2.x MultiIndex column düzeltmesi
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
-
-        # 2. Strateji Uygula (Örnek: SMA 20/50 Kesişimi)
-        df['SMA20'] = df['Close'].rolling(window=20).mean()
-        df['SMA50'] = df['Close'].rolling(window=50).mean()
-        
-        # Sinyaller
-        df['Signal'] = 0
-        df.loc[df['SMA20'] > df['SMA50'], 'Signal'] = 1 # Al
-        df['Position'] = df['Signal'].diff()
-
-        # 3. Performans Hesapla
-        initial_capital = 10000.0
-        shares = 0
-        capital = initial_capital
-        
-        for i in range(len(df)):
-            price_val = float(df['Close'].iloc[i])
-            if df['Position'].iloc[i] == 1: # AL
-                shares = capital / price_val
-                capital = 0
-            elif df['Position'].iloc[i] == -1 and shares > 0: # SAT
-                capital = shares * price_val
-                shares = 0
-        
-        final_price = float(df['Close'].iloc[-1])
-        first_price = float(df['Close'].iloc[0])
-        final_value = capital + (shares * final_price)
-        profit_pct = ((final_value - initial_capital) / initial_capital) * 100
-        buy_hold_pct = ((final_price - first_price) / first_price) * 100
+    o, c = mumlar[:, ACILIS], mumlar[:, KAPANIS]
+    n = len(c)
+    onceki_c = np.concatenate(([c[0]], c[:-1]))
+    o = np.where(np.isfinite(o) & (o > 0), o, onceki_c)   # açılışı eksik barlar önceki kapanıştan dolar
+
+    poz = np.concatenate(([0.0], hedef[:-1]))
+    onceki = np.concatenate(([0.0], poz[:-1]))
+    getiri = ((1 + onceki * (o / onceki_c - 1)) * (1 + poz * (c / o - 1))
+              * (1 - maliyet * np.abs(poz - onceki)) - 1)
+
+    # İşlemler: pozisyonun sabit kaldığı her sıfırdan farklı dilim
+    giris = np.flatnonzero(np.diff(poz, prepend=0.0))
+    cikis = np.append(giris[1:], n)
+    yon = poz[giris]
+    acik = yon != 0
+    giris, cikis, yon = giris[acik], cikis[acik], yon[acik]
+    cikis_fiyati = np.where(cikis < n, o[np.minimum(cikis, n - 1)], c[-1])   # açık işlem son kapanıştan
+    islemler = yon * (cikis_fiyati / o[giris] - 1) - 2 * maliyet * np.abs(yon)
+    return getiri, poz, islemler
+
+
+def hedef_pozisyonlar(mumlar: np.ndarray, strateji: str = "SMA_CROSS",
+                      parametreler: Optional[Dict[str, Any]] = None,
+                      aciga_satis: bool = False) -> Tuple[Strateji, Dict[str, float], np.ndarray]:
+    """
+    Kayıtlı stratejinin hedef pozisyonları → (strateji, çözülmüş parametreler, hedef).
+    aciga_satis=False iken kısa sinyaller nakitte beklemeye (0) dönüşür.
+    """
+    kayit = strateji_getir(strateji)
+    params = kayit.parametreler(parametreler)
+    if mumlar.ndim != 2 or len(mumlar) < 3:
+        raise BacktestHatasi("Backtest için yeterli veri yok.")
+    hedef = np.nan_to_num(np.asarray(kayit.fonksiyon(mumlar, **params), dtype=np.float64))
+    return kayit, params, np.clip(hedef, -1.0 if aciga_satis else 0.0, 1.0)
+
+
+def ozkaynak_metrikleri(zaman: np.ndarray, ozkaynak: np.ndarray, sermaye: float) -> Dict[str, float]:
+    """Özkaynak eğrisinden toplam getiri, CAGR, Sharpe (rf = 0) ve maks. düşüş; yıl zaman ekseninden."""
+    yil = (zaman[-1] - zaman[0]) / YIL_SN
+    yil = yil if yil > 0 else len(ozkaynak) / 252
+    oran = ozkaynak[-1] / sermaye
+    r = np.diff(ozkaynak) / ozkaynak[:-1]
+    std = r.std(ddof=1) if len(r) > 1 else 0.0
+    egri = np.concatenate(([sermaye], ozkaynak))
+    return {
+        "toplam_getiri": float(oran - 1),
+        "cagr": float(oran ** (1 / yil) - 1) if oran > 0 else -1.0,
+        "sharpe": float(r.mean() / std * np.sqrt(len(r) / yil)) if std > 0 else 0.0,
+        "max_dusus": float((egri / np.maximum.accumulate(egri) - 1).min()),
+    }
+
+
+def sonuc_hesapla(mumlar: np.ndarray, hedef: np.ndarray, maliyet: float,
+                  strateji: str = "", parametreler: Optional[Dict[str, float]] = None,
+                  sermaye: float = BASLANGIC_SERMAYESI) -> BacktestSonucu:
+    """
+    Hedef pozisyonlardan özkaynak ve metrikler. Stratejiler nedensel olduğundan tam seride bir kez
+    üretilen hedefin herhangi bir [bas, bit) dilimi o pencerenin (nakitte başlayan) backtest'idir.
+    """
+    if len(mumlar) < 3:
+        raise BacktestHatasi("Backtest için yeterli veri yok.")
+    getiri, poz, islemler = pozisyon_getirileri(mumlar, hedef, maliyet)
+
+    ozkaynak = sermaye * np.cumprod(1 + getiri)
+    zaman, c = mumlar[:, ZAMAN], mumlar[:, KAPANIS]
+
+    return BacktestSonucu(
+        strateji=strateji,
+        parametreler=parametreler or {},
+        zaman=zaman,
+        ozkaynak=ozkaynak,
+        pozisyon=poz,
+        islem_getirileri=islemler,
+        **ozkaynak_metrikleri(zaman, ozkaynak, sermaye),
+        kazanma_orani=float((islemler > 0).mean()) if len(islemler) else 0.0,
+        islem_sayisi=int(len(islemler)),
+        al_tut_getirisi=float(c[-1] / c[0] - 1),
+    )
+
+
+def islem_maliyeti(komisyon: Optional[float] = None, kayma: Optional[float] = None) -> float:
+    """Pozisyon değişiminde tutarın oranı olarak toplam maliyet (komisyon + kayma)."""
+    return ((settings.BACKTEST_COMMISSION if komisyon is None else komisyon)
+            + (settings.BACKTEST_SLIPPAGE if kayma is None else kayma))
+
 
+def backtest_calistir(mumlar: np.ndarray, strateji: str = "SMA_CROSS",
+                      parametreler: Optional[Dict[str, Any]] = None,
+                      komisyon: Optional[float] = None, kayma: Optional[float] = None,
+                      sermaye: float = BASLANGIC_SERMAYESI, aciga_satis: bool = False) -> BacktestSonucu:
+    """(n × 6) mumlar üzerinde kayıtlı stratejiyi çalıştırır."""
+    mumlar = np.asarray(mumlar, dtype=np.float64)
+    kayit, params, hedef = hedef_pozisyonlar(mumlar, strateji, parametreler, aciga_satis)
+    return sonuc_hesapla(mumlar, hedef, islem_maliyeti(komisyon, kayma), kayit.ad, params, sermaye)
+
+
+def backtest_yap(sembol: str, strateji: str = "SMA_CROSS", yil: float = 1.0,
+                 **parametreler: float) -> Dict[str, Any]:
+    """
+    Belirli bir sembol ve strateji için geçmiş `yil` yılın günlük verisiyle backtest yapar.
+    """
+    from fiyat_gecmisi import _yfinance_gunluk_cek
+
+    try:
+        mumlar = _yfinance_gunluk_cek([sembol], int(time.time() - yil * YIL_SN)).get(sembol)
+        if mumlar is None or not len(mumlar):
+            return {"Hata": "Veri bulunamadı."}
+        s = backtest_calistir(mumlar, strateji, parametreler)
+        params = ", ".join(f"{k}={v:g}" for k, v in s.parametreler.items())
         return {
             "Sembol": sembol,
-            "Strateji": strateji,
-            "Başlangıç": f"{initial_capital:.2f}",
-            "Bitiş": f"{final_value:.2f}",
-            "Kâr/Zarar (%)": f"{profit_pct:.2f}%",
-            "Al-Tut Getirisi (%)": f"{buy_hold_pct:.2f}%",
-            "Durum": "✅ Başarılı" if profit_pct > buy_hold_pct else "⚠️ Al-Tut Daha İyi"
+            "Strateji": f"{s.strateji} ({params})",
+            "Başlangıç": f"{BASLANGIC_SERMAYESI:.2f}",
+            "Bitiş": f"{s.ozkaynak[-1]:.2f}",
+            "Kâr/Zarar (%)": f"{s.toplam_getiri * 100:.2f}%",
+            "Al-Tut Getirisi (%)": f"{s.al_tut_getirisi * 100:.2f}%",
+            "CAGR (%)": f"{s.cagr * 100:.2f}%",
+            "Sharpe": f"{s.sharpe:.2f}",
+            "Maks. Düşüş (%)": f"{s.max_dusus * 100:.2f}%",
+            "Kazanma Oranı (%)": f"{s.kazanma_orani * 100:.1f}%",
+            "İşlem Sayısı": s.islem_sayisi,
+            "Durum": "✅ Başarılı" if s.toplam_getiri > s.al_tut_getirisi else "⚠️ Al-Tut Daha İyi"
         }
 
+    except BacktestHatasi as e:
+        return {"Hata": str(e)}
     except Exception as e:
         log.error(f"Backtest hatası ({sembol}): {e}")
         return {"Hata": str(e)}
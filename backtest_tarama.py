@@ -0,0 +1,321 @@
+"""
+backtest_tarama.py — Paralel parametre taraması ve yürüyen ileri (walk-forward) analiz.
+
+    her sembolün mumları ──► tek paylaşımlı bellek bloğu (bir kez kopyalanır)
+    parametre ızgarası ────► parçalar ──► süreç havuzu (spawn) ──► sonuçlar geldikçe akış
+                                           └─ işçi bloğa bağlanır, kopyalamadan okur
+
+✅ Sinyal her parametre için tam seride bir kez üretilir (stratejiler nedensel); tüm pencerelerin
+   metrikleri bu hedefin dilimlerinden çıkar — yürüyen ileri analiz ek sinyal hesabı istemez.
+✅ Sonuçlar (veri özeti, strateji, parametreler, pencere, maliyet) anahtarıyla önbelleğe alınır:
+   aynı tarama tekrarında hiçbir iş süreçlere gönderilmez.
+"""
+import os
+import asyncio
+import hashlib
+import logging
+import itertools
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import settings
+from backtest_motoru import BacktestHatasi, hedef_pozisyonlar, islem_maliyeti, sonuc_hesapla, strateji_getir
+
+log = logging.getLogger("finans_botu")
+
+METRIKLER = ("toplam_getiri", "cagr", "sharpe", "max_dusus", "kazanma_orani", "islem_sayisi")
+Pencere = Tuple[int, int]                       # [bas, bit) bar indeksleri
+
+
+# ═══════════════════════════════════════════════════════════════════
+# IZGARA / PENCERELER
+# ═══════════════════════════════════════════════════════════════════
+
+def parametre_izgarasi(**eksenler: Sequence[float]) -> List[Dict[str, float]]:
+    """parametre_izgarasi(factor=[2, 3], atr_period=[7, 10]) → 4 kombinasyon."""
+    adlar = list(eksenler)
+    return [dict(zip(adlar, degerler)) for degerler in itertools.product(*eksenler.values())]
+
+
+def yuruyen_pencereler(n: int, egitim: int, test: int, adim: Optional[int] = None) -> List[Tuple[Pencere, Pencere]]:
+    """n barlık seride (eğitim, test) pencere çiftleri; pencere `adim` (varsayılan: test) bar kayar."""
+    if egitim < 3 or test < 3:
+        raise BacktestHatasi("Eğitim ve test pencereleri en az 3 bar olmalı.")
+    adim = adim or test
+    return [((b, b + egitim), (b + egitim, b + egitim + test))
+            for b in range(0, n - egitim - test + 1, adim)]
+
+
+def veri_ozeti(mumlar: np.ndarray) -> str:
+    """Mum dizisinin içerik özeti (önbellek anahtarı)."""
+    h = hashlib.blake2b(np.ascontiguousarray(mumlar, dtype=np.float64).tobytes(), digest_size=16)
+    h.update(repr(mumlar.shape).encode())
+    return h.hexdigest()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SONUÇ ÖNBELLEĞİ
+# ═══════════════════════════════════════════════════════════════════
+
+class SonucOnbellegi:
+    """Tarama sonuçları için LRU önbellek (OrderedDict, son kullanılan sonda)."""
+
+    def __init__(self, kapasite: Optional[int] = None):
+        self._kapasite = kapasite
+        self._kayitlar: "OrderedDict[tuple, Dict[str, float]]" = OrderedDict()
+
+    @property
+    def kapasite(self) -> int:
+        return settings.BACKTEST_CACHE_SIZE if self._kapasite is None else self._kapasite
+
+    def al(self, anahtar: tuple) -> Optional[Dict[str, float]]:
+        kayit = self._kayitlar.get(anahtar)
+        if kayit is not None:
+            self._kayitlar.move_to_end(anahtar)
+        return kayit
+
+    def koy(self, anahtar: tuple, metrikler: Dict[str, float]):
+        self._kayitlar[anahtar] = metrikler
+        self._kayitlar.move_to_end(anahtar)
+        while len(self._kayitlar) > self.kapasite:
+            self._kayitlar.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._kayitlar)
+
+    def temizle(self):
+        self._kayitlar.clear()
+
+
+onbellek = SonucOnbellegi()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# İŞÇİ (ayrı süreçte çalışır)
+# ═══════════════════════════════════════════════════════════════════
+
+_ISCI_BLOK_SINIRI = 64
+_bagli: "OrderedDict[str, Tuple[shared_memory.SharedMemory, np.ndarray]]" = OrderedDict()
+
+
+def _blok_dizisi(ad: str, sekil: Tuple[int, int]) -> np.ndarray:
+    """İşçide paylaşımlı bloğa bağlanır; bağlantı sonraki parçalar için saklanır."""
+    kayit = _bagli.get(ad)
+    if kayit is None:
+        blok = shared_memory.SharedMemory(name=ad)
+        kayit = _bagli[ad] = (blok, np.ndarray(sekil, dtype=np.float64, buffer=blok.buf))
+        while len(_bagli) > _ISCI_BLOK_SINIRI:
+            _, (eski, dizi) = _bagli.popitem(last=False)
+            del dizi                    # blok, üzerindeki görünüm yaşarken kapatılamaz
+            eski.close()
+    _bagli.move_to_end(ad)
+    return kayit[1]
+
+
+def _parca_calistir(ad: str, sekil: Tuple[int, int], strateji: str, kombinasyonlar: List[Dict[str, float]],
+                    pencereler: List[Pencere], maliyet: float,
+                    aciga_satis: bool) -> List[Tuple[Dict[str, float], List[Dict[str, float]]]]:
+    """Bir sembolün bir parametre parçası: her kombinasyon için sinyal bir kez, metrikler pencere başına."""
+    mumlar = _blok_dizisi(ad, sekil)
+    sonuc = []
+    for params in kombinasyonlar:
+        _, _, hedef = hedef_pozisyonlar(mumlar, strateji, params, aciga_satis)
+        metrikler = []
+        for bas, bit in pencereler:
+            s = sonuc_hesapla(mumlar[bas:bit], hedef[bas:bit], maliyet)
+            metrikler.append({m: float(getattr(s, m)) for m in METRIKLER})
+        sonuc.append((params, metrikler))
+    return sonuc
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SÜREÇ HAVUZU
+# ═══════════════════════════════════════════════════════════════════
+
+_havuz: Optional[ProcessPoolExecutor] = None
+
+
+def isci_sayisi() -> int:
+    return settings.BACKTEST_WORKERS or os.cpu_count() or 1
+
+
+def _havuz_al() -> ProcessPoolExecutor:
+    """Tarama süreç havuzunu ilk kullanımda oluşturur."""
+    global _havuz
+    if _havuz is None:
+        # spawn: bot süreci thread'li (asyncio + executor), fork güvenli değil
+        _havuz = ProcessPoolExecutor(max_workers=isci_sayisi(), mp_context=multiprocessing.get_context("spawn"))
+        log.info(f"🧮 Backtest tarama havuzu başlatıldı ({isci_sayisi()} süreç).")
+    return _havuz
+
+
+async def kapat():
+    """Süreç havuzunu kapatır (main.py shutdown uyumlu)."""
+    global _havuz
+    if _havuz is not None:
+        havuz, _havuz = _havuz, None
+        await asyncio.get_running_loop().run_in_executor(None, havuz.shutdown)
+        log.info("🔌 Backtest tarama havuzu kapatıldı.")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# TARAMA
+# ═══════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class TaramaSonucu:
+    sembol: str
+    parametreler: Dict[str, float]
+    metrikler: Tuple[Dict[str, float], ...]     # istenen pencerelerle aynı sırada
+    onbellekten: bool = False
+
+
+def _pencereleri_coz(mumlar: np.ndarray, pencereler: Optional[Sequence[Pencere]]) -> List[Pencere]:
+    pencereler = [(0, len(mumlar))] if pencereler is None else [(int(b), int(s)) for b, s in pencereler]
+    for bas, bit in pencereler:
+        if bas < 0 or bit > len(mumlar) or bit - bas < 3:
+            raise BacktestHatasi(f"Geçersiz pencere [{bas}, {bit}) — seri {len(mumlar)} bar.")
+    return pencereler
+
+
+async def tara(veriler: Dict[str, np.ndarray], strateji: str, izgara: Sequence[Dict[str, Any]],
+               pencereler: Optional[Sequence[Pencere]] = None,
+               komisyon: Optional[float] = None, kayma: Optional[float] = None,
+               aciga_satis: bool = False, parca: Optional[int] = None) -> AsyncIterator[TaramaSonucu]:
+    """
+    Her sembol × parametre kombinasyonunu çalıştırır; sonuçlar bittikçe (sırasız) akar.
+    pencereler verilmezse her sembolün tüm serisi tek pencere sayılır.
+    Geçersiz strateji/parametre/pencere iş başlamadan BacktestHatasi verir.
+    """
+    kayit = strateji_getir(strateji)
+    kombinasyonlar = [kayit.parametreler(p) for p in izgara]
+    maliyet = islem_maliyeti(komisyon, kayma)
+    parca = parca or max(1, -(-len(kombinasyonlar) // (isci_sayisi() * 4)))
+
+    bekleyen: List[Tuple[str, np.ndarray, List[Pencere], str, List[Dict[str, float]]]] = []
+    for sembol, mumlar in veriler.items():
+        mumlar = np.ascontiguousarray(mumlar, dtype=np.float64)
+        sembol_pencereleri = _pencereleri_coz(mumlar, pencereler)
+        ozet = veri_ozeti(mumlar)
+        eksik = []
+        for params in kombinasyonlar:
+            anahtarlar = [(ozet, kayit.ad, tuple(sorted(params.items())), p, maliyet, aciga_satis)
+                          for p in sembol_pencereleri]
+            bulunan = [onbellek.al(a) for a in anahtarlar]
+            if all(b is not None for b in bulunan):
+                yield TaramaSonucu(sembol, params, tuple(bulunan), onbellekten=True)
+            else:
+                eksik.append(params)
+        if eksik:
+            bekleyen.append((sembol, mumlar, sembol_pencereleri, ozet, eksik))
+    if not bekleyen:
+        return
+
+    # Her sembol paylaşımlı belleğe bir kez kopyalanır; işçiler parça başına yalnızca blok adını alır
+    bloklar: List[shared_memory.SharedMemory] = []
+    gorevler = {}
+    loop = asyncio.get_running_loop()
+    try:
+        for sembol, mumlar, sembol_pencereleri, ozet, eksik in bekleyen:
+            blok = shared_memory.SharedMemory(create=True, size=max(1, mumlar.nbytes))
+            bloklar.append(blok)
+            np.ndarray(mumlar.shape, dtype=np.float64, buffer=blok.buf)[:] = mumlar
+            for i in range(0, len(eksik), parca):
+                gelecek = loop.run_in_executor(
+                    _havuz_al(), _parca_calistir, blok.name, mumlar.shape, kayit.ad,
+                    eksik[i:i + parca], sembol_pencereleri, maliyet, aciga_satis)
+                gorevler[gelecek] = (sembol, ozet, sembol_pencereleri)
+        log.info(f"🧮 {kayit.ad} taraması: {len(bekleyen)} sembol, {len(gorevler)} parça "
+                 f"({len(kombinasyonlar)} kombinasyon, {len(bloklar)} paylaşımlı blok).")
+
+        kalan = set(gorevler)
+        while kalan:
+            biten, kalan = await asyncio.wait(kalan, return_when=asyncio.FIRST_COMPLETED)
+            for gelecek in biten:
+                sembol, ozet, sembol_pencereleri = gorevler[gelecek]
+                for params, metrikler in gelecek.result():
+                    for p, m in zip(sembol_pencereleri, metrikler):
+                        onbellek.koy((ozet, kayit.ad, tuple(sorted(params.items())), p, maliyet, aciga_satis), m)
+                    yield TaramaSonucu(sembol, params, tuple(metrikler))
+    finally:
+        for gelecek in gorevler:
+            gelecek.cancel()
+        for blok in bloklar:
+            blok.close()
+            blok.unlink()
+
+
+async def tara_topla(veriler: Dict[str, np.ndarray], strateji: str, izgara: Sequence[Dict[str, Any]],
+                     **secenekler) -> List[TaramaSonucu]:
+    """tara() sonuçlarının tamamı, sembol ve ızgara sırasıyla."""
+    sonuclar = [s async for s in tara(veriler, strateji, izgara, **secenekler)]
+    sira = {s: i for i, s in enumerate(veriler)}
+    return sorted(sonuclar, key=lambda s: (sira[s.sembol], tuple(sorted(s.parametreler.items()))))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# YÜRÜYEN İLERİ ANALİZ
+# ═══════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class YuruyenAdim:
+    egitim: Pencere
+    test: Pencere
+    parametreler: Dict[str, float]
+    egitim_metrikleri: Dict[str, float]
+    test_metrikleri: Dict[str, float]
+
+
+@dataclass(frozen=True)
+class YuruyenSonuc:
+    sembol: str
+    adimlar: Tuple[YuruyenAdim, ...]
+    test_getirisi: float            # test pencerelerinin zincirlenmiş getirisi (örneklem dışı)
+    egitim_olcutu: float            # seçilen parametrelerin ortalama eğitim ölçütü
+    test_olcutu: float              # aynı parametrelerin ortalama test ölçütü (aşırı uyum göstergesi)
+
+
+async def yuruyen_ileri(veriler: Dict[str, np.ndarray], strateji: str, izgara: Sequence[Dict[str, Any]],
+                        egitim: int, test: int, adim: Optional[int] = None, olcut: str = "sharpe",
+                        **secenekler) -> Dict[str, YuruyenSonuc]:
+    """
+    Her eğitim penceresinde `olcut`a göre en iyi parametreyi seçer, onu izleyen test penceresinde
+    ölçer. Tüm pencereler tek taramada hesaplanır (sinyal kombinasyon başına bir kez).
+    """
+    if olcut not in METRIKLER:
+        raise BacktestHatasi(f"Bilinmeyen ölçüt: {olcut} (geçerli: {', '.join(METRIKLER)})")
+    ciftler = {s: yuruyen_pencereler(len(m), egitim, test, adim) for s, m in veriler.items()}
+    bos = [s for s, c in ciftler.items() if not c]
+    if bos:
+        raise BacktestHatasi(f"Eğitim + test penceresi için yetersiz veri: {', '.join(bos)}")
+
+    # Tüm semboller aynı pencere listesini kullanır; kısa seriler için ayrı taranır
+    sonuclar: Dict[str, List[TaramaSonucu]] = {s: [] for s in veriler}
+    gruplar: Dict[tuple, Dict[str, np.ndarray]] = {}
+    for s, c in ciftler.items():
+        gruplar.setdefault(tuple(c), {})[s] = veriler[s]
+    for cift, grup in gruplar.items():
+        pencereler = [p for e, t in cift for p in (e, t)]
+        async for sonuc in tara(grup, strateji, izgara, pencereler=pencereler, **secenekler):
+            sonuclar[sonuc.sembol].append(sonuc)
+
+    cikti = {}
+    for sembol, liste in sonuclar.items():
+        adimlar = []
+        for k, (e, t) in enumerate(ciftler[sembol]):
+            en_iyi = max(liste, key=lambda s: s.metrikler[2 * k][olcut])
+            adimlar.append(YuruyenAdim(e, t, en_iyi.parametreler, en_iyi.metrikler[2 * k], en_iyi.metrikler[2 * k + 1]))
+        cikti[sembol] = YuruyenSonuc(
+            sembol=sembol,
+            adimlar=tuple(adimlar),
+            test_getirisi=float(np.prod([1 + a.test_metrikleri["toplam_getiri"] for a in adimlar]) - 1),
+            egitim_olcutu=float(np.mean([a.egitim_metrikleri[olcut] for a in adimlar])),
+            test_olcutu=float(np.mean([a.test_metrikleri[olcut] for a in adimlar])),
+        )
+    return cikti
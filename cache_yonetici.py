@@ -19,11 +19,15 @@ Kullanım (teknik_analiz.py ve temel_analiz.py başında):
 import os
 import re
 import time
+import sys
 import shutil
 import threading
 import logging
-import yfinance as yf
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
+
+# yfinance (pandas + numpy) ağır bir import; yalnızca ilk Ticker isteğinde yüklenir.
+if TYPE_CHECKING:
+    import yfinance as yf
 
 # ═══════════════════════════════════════════════════════════════════
 # LOGGING SETUP — ✅ EKLENDİ
@@ -49,6 +53,35 @@ _YFINANCE_CACHE_KLASORU = os.path.join(
 _kilit   = threading.Lock()
 _cache: dict[str, float] = {}   # sembol → son_cekilis_timestamp
 
+# ─────────────────────────────────────────────
+#  LAZY YFINANCE IMPORT
+# ─────────────────────────────────────────────
+
+_TZ_CACHE_KLASORU = "/tmp/yf_tz_cache"
+_yf_hazir = False
+
+
+def _tz_cache_ayarla(yf_modul) -> None:
+    """yFinance tz cache konumunu /tmp'ye yönlendir (yazma izni garantili)."""
+    try:
+        yf_modul.set_tz_cache_location(_TZ_CACHE_KLASORU)
+        log.debug(f"yFinance tz cache location ayarlandı: {_TZ_CACHE_KLASORU}")
+    except Exception as e:
+        log.warning(f"yFinance tz cache location ayarlama hatası: {e}")
+
+
+def _yf():
+    """
+    yfinance modülünü ilk kullanımda yükler (lazy import).
+    İlk yüklemede tz cache konumu da ayarlanır.
+    """
+    global _yf_hazir
+    import yfinance
+    if not _yf_hazir:
+        _tz_cache_ayarla(yfinance)
+        _yf_hazir = True
+    return yfinance
+
 
 def _ttl_gecti_mi(sembol: str) -> bool:
     """
@@ -150,7 +183,7 @@ def cache_temizle(sadece_sembol: Optional[str] = None):
 #  TAZE TICKER OLUŞTURMA — ✅ LOGGING
 # ─────────────────────────────────────────────
 
-def taze_ticker(sembol: str) -> yf.Ticker:
+def taze_ticker(sembol: str) -> "yf.Ticker":
     """
     Her zaman taze veri döndüren Ticker fabrika fonksiyonu.
 
@@ -171,7 +204,7 @@ def taze_ticker(sembol: str) -> yf.Ticker:
         log.debug(f"Cache hit (TTL aktif): {sembol_upper}")
 
     # Her seferinde yeni Ticker objesi — session-level cache'i atlatır
-    return yf.Ticker(sembol_upper)
+    return _yf().Ticker(sembol_upper)
 
 
 # ─────────────────────────────────────────────
@@ -203,12 +236,10 @@ def baslangic_temizligi():
     except Exception as e:
         log.warning(f"Timezone cache temizleme hatası: {e}")
 
-    # 3. yFinance tz cache konumunu /tmp'ye yönlendir (yazma izni garantili)
-    try:
-        yf.set_tz_cache_location("/tmp/yf_tz_cache")
-        log.debug("yFinance tz cache location ayarlandı: /tmp/yf_tz_cache")
-    except Exception as e:
-        log.warning(f"yFinance tz cache location ayarlama hatası: {e}")
+    # 3. yFinance tz cache konumu /tmp'ye yönlendirilir — yfinance henüz
+    #    yüklenmediyse _yf() ilk import'ta uygular (başlangıçta pandas yüklenmez).
+    if "yfinance" in sys.modules:
+        _yf()
 
     with _kilit:
         _cache.clear()
@@ -28,15 +28,58 @@ class Settings(BaseSettings):
     TRADINGVIEW_USERNAME: Optional[str] = None
     TRADINGVIEW_PASSWORD: Optional[str] = None
     TRADINGVIEW_CHART_URL: Optional[str] = None  # Kayıtlı layout URL (örn: https://www.tradingview.com/chart/AbCdEfGh/)
+    TV_POOL_SIZE: int = Field(2, description="Eşzamanlı grafik için izole Chrome slot sayısı")
+    TV_RECYCLE_AFTER: int = Field(50, description="Bir slot kaç çekimden sonra yeniden oluşturulsun")
+
+    # Grafik
+    CHART_MOTORU: str = Field("yerel", description="Grafik kaynağı: yerel (mplfinance) | tradingview")
+    CHART_RENDER_WORKERS: int = Field(2, description="Yerel grafik çizimi için süreç havuzu boyutu")
+    CHART_CACHE_DIR: str = Field("data/chart_cache", description="Çizilmiş grafik PNG cache klasörü")
+    CHART_CACHE_MAX: int = Field(500, description="Cache'te tutulacak en fazla PNG sayısı")
+    CHART_CACHE_TTL: int = Field(300, description="Yerel grafiğin yeniden çizilmeden paylaşıldığı süre (saniye)")
     
     # Zamanlama ve Limitler (Magic Numbers -> Constants)
     ALERT_CHECK_INTERVAL: int = Field(300, description="Uyarı kontrol döngüsü süresi (saniye)")
+    ALERT_OPEN_BOOST_MINUTES: int = Field(15, description="Seans açılışından sonra sık yoklama penceresi (dakika)")
+    ALERT_OPEN_BOOST_INTERVAL: int = Field(60, description="Açılış penceresindeki yoklama aralığı (saniye)")
+    ALERT_POST_CLOSE_DELAY: int = Field(120, description="Kapanıştan kaç saniye sonra son yoklama yapılsın")
+    ALERT_STREAM_ENABLED: bool = Field(True, description="Kripto uyarılarını Binance WebSocket akışından tetikle")
+    ALERT_DEBOUNCE_SECONDS: float = Field(30.0, description="Aynı uyarının akıştan yeniden denenmesi için en az süre")
+    ALERT_STREAM_STALE_SECONDS: float = Field(30.0, description="Bu süre tick gelmezse sembol polling'e düşer")
+    ALERT_SHARDING_ENABLED: bool = Field(False, description="Uyarı değerlendirmesini süreçler arasında parçala (SQLite kiraları)")
+    ALERT_SHARD_COUNT: int = Field(16, description="Uyarı sembollerinin bölündüğü parça sayısı")
+    ALERT_LEASE_SECONDS: float = Field(30.0, description="Parça kirasının süresi; sinyal gelmezse devralınır")
+    ALERT_INDEX_REFRESH_SECONDS: float = Field(30.0, description="Parçalama açıkken uyarı indeksinin DB'den yenilenme aralığı")
+    CANDLE_STREAM_ENABLED: bool = Field(True, description="Kripto işlemlerinden canlı 1m/5m/1h mum üret")
+    CANDLE_BUFFER_BARS: int = Field(1000, description="Sembol/aralık başına bellekte tutulacak mum sayısı")
+    CANDLE_FLUSH_SECONDS: float = Field(15.0, description="Kapanmış mumların veritabanına yazılma aralığı")
+    TELEGRAM_GLOBAL_RATE: float = Field(25.0, description="Bot geneli en fazla mesaj/sn (Telegram sınırı ~30)")
+    TELEGRAM_CHAT_RATE: float = Field(1.0, description="Sohbet başına en fazla mesaj/sn")
+    TELEGRAM_OUTBOX_POLL_SECONDS: float = Field(2.0, description="Diğer süreçlerin kuyruğa yazdığı mesajların taranma aralığı")
     CACHE_TTL_PRICE: int = Field(60, description="Fiyat verisi cache süresi")
     CACHE_TTL_PROFILE: int = Field(3600, description="Profil/Bilanço cache süresi")
     CACHE_TTL_NEWS: int = Field(600, description="Haberler cache süresi")
+    CACHE_TTL_HISTORY: int = Field(3600, description="Günlük kapanış geçmişinin bellekte tutulma süresi (fiyat_gecmisi)")
+    CACHE_TTL_FX: int = Field(300, description="Çapraz kur matrisi cache süresi (portföy para birimi çevrimi)")
+    RISK_LOOKBACK_DAYS: int = Field(365, description="Portföy risk raporunun geriye baktığı takvim günü")
+    PORTFOLIO_SNAPSHOT_ENABLED: bool = Field(True, description="Her gün sonu tüm portföylerin değerini portfoy_anliklari'na yaz")
+    PORTFOLIO_SNAPSHOT_UTC: str = Field("22:00", description="Gün sonu anlık saati (UTC, SS:DD) — BIST ve NYSE kapanışından sonra")
+    BACKTEST_COMMISSION: float = Field(0.001, description="Backtest işlem başına komisyon (işlem tutarının oranı)")
+    BACKTEST_SLIPPAGE: float = Field(0.0005, description="Backtest kayması — dolum fiyatının aleyhe sapma oranı")
+    BACKTEST_WORKERS: int = Field(0, description="Parametre taraması süreç sayısı (0: çekirdek sayısı)")
+    BACKTEST_CACHE_SIZE: int = Field(200000, description="Bellekte tutulan en fazla tarama sonucu (veri özeti, strateji, parametre, pencere)")
     
     # Veritabanı
     DB_PATH: str = Field("data/finans_bot.db", description="SQLite veritabanı yolu")
+    DB_WRITE_BATCH_MS: float = Field(2.0, description="Yazmaların tek işlemde toplandığı pencere (ms)")
+    DB_WRITE_BATCH_MAX: int = Field(256, description="Tek işlemde (commit) en fazla yazma sayısı")
+    DB_READ_POOL_SIZE: int = Field(4, description="Salt-okunur bağlantı sayısı (0: okumalar yazıcı bağlantısında)")
+    DB_SYNCHRONOUS: str = Field("NORMAL", description="PRAGMA synchronous — WAL'da NORMAL: çökmede tutarlı, elektrik kesintisinde son commit'ler kaybolabilir")
+    DB_MMAP_SIZE: int = Field(256 * 1024 * 1024, description="PRAGMA mmap_size (bayt, 0: kapalı)")
+    DB_CACHE_SIZE_KB: int = Field(16384, description="Bağlantı başına sayfa önbelleği (KiB, PRAGMA cache_size)")
+    DB_TEMP_STORE: str = Field("MEMORY", description="PRAGMA temp_store: DEFAULT | FILE | MEMORY")
+    USER_PREFS_CACHE_SIZE: int = Field(10000, description="Bellekte tutulan en fazla kullanıcı tercih satırı (LRU)")
+    USER_PREFS_PRELOAD_DAYS: float = Field(30.0, description="Başlangıçta tercihleri yüklenecek kullanıcıların son görülme penceresi (gün)")
     
     # Monitoring & Health
     HEALTH_HOST: str = Field("0.0.0.0", description="Health server host")
@@ -69,6 +112,7 @@ class Settings(BaseSettings):
         else:
             _tv_status = "⚠️  (grafik: mplfinance fallback — tv_cookie_al.py çalıştırın)"
         lines.append(f"   TradingView:  {_tv_status}")
+        lines.append(f"   Grafik:       {self.CHART_MOTORU}")
         lines.append(f"   Log Level:    {self.LOG_LEVEL}")
         lines.append(f"   Health:       http://{self.HEALTH_HOST}:{self.HEALTH_PORT}")
         return "\n".join(lines)
@@ -4,20 +4,68 @@ db.py — SQLite veritabanı yönetimi.
 ✅ DÜZELTİLDİ - asyncio import eklendi, eksik CRUD fonksiyonları tamamlandı.
 """
 import os
+import time
+import weakref
 import asyncio
+import sqlite3
 import aiosqlite
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, NamedTuple, Tuple, Sequence, Union, Callable, Awaitable
 from decimal import Decimal
 
+from prometheus_client import Histogram
+
 from config import settings
+from portfoy_defteri import Lot, Pozisyon, islem_uygula, lot_farki, metin, ondalik, DefterHatasi
+from uyari_indeksi import uyari_indeksi
 
 log = logging.getLogger("finans_botu")
 
+DB_YAZMA_GRUBU = Histogram(
+    'db_write_batch_size', 'Tek commit ile uygulanan yazma sayısı',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+
+
+_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_TEMP_STORE = {"DEFAULT", "FILE", "MEMORY"}
+
+
+def _pragmalar() -> List[str]:
+    """Her bağlantıya uygulanan ayar PRAGMA'ları (config'den, doğrulanmış)."""
+    synchronous = settings.DB_SYNCHRONOUS.upper()
+    temp_store = settings.DB_TEMP_STORE.upper()
+    if synchronous not in _SYNCHRONOUS:
+        raise ValueError(f"Geçersiz DB_SYNCHRONOUS: {settings.DB_SYNCHRONOUS}")
+    if temp_store not in _TEMP_STORE:
+        raise ValueError(f"Geçersiz DB_TEMP_STORE: {settings.DB_TEMP_STORE}")
+    return [
+        "PRAGMA busy_timeout=5000",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA mmap_size={int(settings.DB_MMAP_SIZE)}",
+        f"PRAGMA cache_size={-int(settings.DB_CACHE_SIZE_KB)}",   # Negatif: KiB cinsinden
+        f"PRAGMA temp_store={temp_store}",
+    ]
+
 
 class DBPool:
-    """Singleton Database Connection — Bağlantı sızıntılarını (leak) önler."""
+    """
+    Singleton bağlantı havuzu — bir yazıcı + DB_READ_POOL_SIZE salt-okunur bağlantı.
+
+    aiosqlite her bağlantı için tek bir iş parçacığı çalıştırır; tek bağlantıda her okuma
+    her yazmanın arkasında sıraya girer. WAL'da okuyucular yazıcıyı beklemez, bu yüzden
+    sorgular niyete göre yönlendirilir:
+
+        get_db()    yazıcı — yalnızca yazma kuyruğu (YazmaKuyrugu) ve şema göçleri
+        okuyucu()   SELECT'ler — okuyucular arasında sırayla (round-robin) dağıtılır
+
+    Okuyucular PRAGMA query_only ile açılır; yazma denemesi hata verir. Yazmalar commit
+    edildikten sonra döndüğü için ardından gelen okuma (başka bağlantıda da olsa) onu görür.
+    DB_READ_POOL_SIZE=0 → okumalar da yazıcı bağlantısında (eski tek bağlantılı düzen).
+    """
     _db: Optional[aiosqlite.Connection] = None
+    _okuyucular: List[aiosqlite.Connection] = []
+    _sira: int = 0
     _lock: Optional[asyncio.Lock] = None
 
     @classmethod
@@ -27,23 +75,63 @@ class DBPool:
             cls._lock = asyncio.Lock()
         return cls._lock
 
+    @classmethod
+    async def _baglan(cls, salt_okunur: bool = False) -> aiosqlite.Connection:
+        # Okuyucular autocommit: örtük BEGIN ile açık kalan bir işlem eski anlık görüntüde takılmasın
+        db = await aiosqlite.connect(settings.DB_PATH, **({"isolation_level": None} if salt_okunur else {}))
+        db.row_factory = aiosqlite.Row
+        try:
+            if not salt_okunur:
+                # ✅ WAL mode — concurrent read + write desteği (veritabanı dosyasında kalıcı)
+                await db.execute("PRAGMA journal_mode=WAL")
+            for pragma in _pragmalar():
+                await db.execute(pragma)
+            if salt_okunur:
+                await db.execute("PRAGMA query_only=ON")
+        except BaseException:
+            await db.close()
+            raise
+        return db
+
+    @classmethod
+    async def _yazici(cls) -> aiosqlite.Connection:
+        # Kilit altında çağrılır
+        if cls._db is None:
+            os.makedirs(os.path.dirname(settings.DB_PATH), exist_ok=True)
+            cls._db = await cls._baglan()
+            log.info(f"🗄️ Veritabanı bağlantısı açıldı: {settings.DB_PATH}")
+        return cls._db
+
     @classmethod
     async def get_db(cls) -> aiosqlite.Connection:
+        """Yazıcı bağlantısı."""
         async with cls._get_lock():
-            if cls._db is None:
-                os.makedirs(os.path.dirname(settings.DB_PATH), exist_ok=True)
-                cls._db = await aiosqlite.connect(settings.DB_PATH)
-                cls._db.row_factory = aiosqlite.Row
-                # ✅ WAL mode — concurrent read + write desteği
-                await cls._db.execute("PRAGMA journal_mode=WAL")
-                await cls._db.execute("PRAGMA busy_timeout=5000")
-                log.info(f"🗄️ Veritabanı bağlantısı açıldı: {settings.DB_PATH}")
-            return cls._db
+            return await cls._yazici()
+
+    @classmethod
+    async def okuyucu(cls) -> aiosqlite.Connection:
+        """Okuma sorguları için bağlantı (salt-okunur havuzdan sırayla)."""
+        boyut = settings.DB_READ_POOL_SIZE
+        if boyut <= 0:
+            return await cls.get_db()
+        if cls._db is None or len(cls._okuyucular) < boyut:
+            async with cls._get_lock():
+                # Yazıcı önce açılır: dosyayı ve WAL modunu o hazırlar
+                await cls._yazici()
+                while len(cls._okuyucular) < boyut:
+                    cls._okuyucular.append(await cls._baglan(salt_okunur=True))
+        cls._sira = (cls._sira + 1) % len(cls._okuyucular)
+        return cls._okuyucular[cls._sira]
 
     @classmethod
     async def close(cls):
+        # Kuyruktaki yazmalar bağlantı kapanmadan commit edilir
+        await yazma_kuyrugu.kapat()
         lock = cls._get_lock()
         async with lock:
+            okuyucular, cls._okuyucular = cls._okuyucular, []
+            for okuyucu in okuyucular:
+                await okuyucu.close()
             if cls._db:
                 await cls._db.close()
                 cls._db = None
@@ -51,50 +139,431 @@ class DBPool:
 
 
 # ═══════════════════════════════════════════════════════════════
-# VERİTABANI BAŞLATMA
+# YAZMA KUYRUĞU — GRUP COMMIT
 # ═══════════════════════════════════════════════════════════════
 
-async def db_init():
-    """Tabloları oluşturur."""
-    db = await DBPool.get_db()
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS kullanicilar (
-            user_id INTEGER PRIMARY KEY,
-            username TEXT,
-            lang TEXT DEFAULT 'tr',
-            kayit_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    # ✅ HASSASİYET: Miktar ve maliyet TEXT olarak saklanır (Decimal precision).
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS portfoy (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            sembol TEXT,
-            miktar TEXT,
-            maliyet TEXT,
-            tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS favoriler (
-            user_id INTEGER,
-            sembol TEXT,
-            PRIMARY KEY (user_id, sembol)
+class YazmaSonucu(NamedTuple):
+    lastrowid: Optional[int]
+    rowcount: int
+
+
+class YazmaKuyrugu:
+    """
+    Tüm yazmalar tek işlemde toplanır: ilk yazmadan sonra DB_WRITE_BATCH_MS boyunca (ya da
+    DB_WRITE_BATCH_MAX yazmaya kadar) gelenler aynı BEGIN IMMEDIATE ... COMMIT içinde çalışır;
+    yazma başına bir fsync yerine grup başına bir fsync.
+
+        sonuc = await yazma_kuyrugu.yaz("INSERT ...", (a, b))   # commit edildikten sonra döner
+        sonuclar = await yazma_kuyrugu.yaz_islem([(sql1, p1), (sql2, p2)])   # atomik birim
+
+    ✅ Her çağrı kendi awaitable'ını alır ve ancak grubun commit'inden sonra tamamlanır
+       (read-your-writes: dönüşten sonraki okuma yazmayı görür).
+    ✅ Hatalı ifade yalnızca kendi çağrısına istisna olarak döner, gruptaki diğer yazmalar
+       etkilenmez (çoklu yazmalar ve yaz_islem birimleri tümüyle uygulanır ya da hiç).
+    ✅ Çağıran iptal edilse de kuyruğa girmiş yazma uygulanır (write-behind).
+    """
+
+    def __init__(self, pencere_ms: Optional[float] = None, maks: Optional[int] = None):
+        self.pencere_ms = pencere_ms
+        self.maks = maks
+        self._kuyruk: Optional[asyncio.Queue] = None
+        self._gorev: Optional[asyncio.Task] = None
+        self.grup_sayisi = 0          # Yapılan commit sayısı
+        self.yazma_sayisi = 0
+
+    def _calisiyor_mu(self) -> bool:
+        return (self._gorev is not None and not self._gorev.done()
+                and self._gorev.get_loop() is asyncio.get_running_loop())
+
+    async def _ekle(self, sql: Optional[str], parametreler: Any, coklu: bool) -> Any:
+        if not self._calisiyor_mu():
+            # İlk yazma (ya da testlerde yeni event loop): dağıtıcı bu döngüde başlatılır
+            self._kuyruk = asyncio.Queue()
+            self._gorev = asyncio.create_task(self._calis(self._kuyruk))
+        gelecek = asyncio.get_running_loop().create_future()
+        self._kuyruk.put_nowait((sql, parametreler, coklu, gelecek))
+        return await asyncio.shield(gelecek)
+
+    async def yaz(self, sql: str, parametreler: Any = (), coklu: bool = False) -> YazmaSonucu:
+        """İfadeyi sıradaki gruba ekler; grup commit edilince sonucunu döndürür. coklu → executemany."""
+        return await self._ekle(sql, parametreler, coklu)
+
+    async def yaz_islem(self, ifadeler: Sequence[Tuple[str, Any]]) -> List[YazmaSonucu]:
+        """Birden çok ifadeyi tek atomik birim olarak uygular (biri hata verirse hiçbiri)."""
+        return await self._ekle(None, list(ifadeler), False)
+
+    async def _calis(self, kuyruk: asyncio.Queue):
+        pencere = (settings.DB_WRITE_BATCH_MS if self.pencere_ms is None else self.pencere_ms) / 1000
+        maks = self.maks or settings.DB_WRITE_BATCH_MAX
+        bitti = False
+        while not bitti:
+            oge = await kuyruk.get()
+            if oge is None:          # kapat(): kuyruk boşaldı
+                return
+            grup = [oge]
+            sinir = time.monotonic() + pencere
+            while len(grup) < maks:
+                if kuyruk.empty():
+                    kalan = sinir - time.monotonic()
+                    if kalan <= 0:
+                        break
+                    try:
+                        oge = await asyncio.wait_for(kuyruk.get(), kalan)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    oge = kuyruk.get_nowait()
+                if oge is None:
+                    bitti = True
+                    break
+                grup.append(oge)
+            await self._uygula(grup)
+
+    async def _uygula(self, grup: List[tuple]):
+        sonuclar: List[Any] = []
+        try:
+            db = await DBPool.get_db()
+            if not db.in_transaction:
+                await db.execute("BEGIN IMMEDIATE")
+            for sql, parametreler, coklu, _ in grup:
+                # Tek ifade hata verirse SQLite yalnızca o ifadeyi geri alır (ABORT);
+                # executemany'nin yarım kalmaması için çoklu yazmalar SAVEPOINT içinde
+                try:
+                    if coklu or sql is None:
+                        await db.execute("SAVEPOINT yazma")
+                        try:
+                            if coklu:
+                                cursor = await db.executemany(sql, parametreler)
+                                sonuc = YazmaSonucu(cursor.lastrowid, cursor.rowcount)
+                            else:
+                                sonuc = []
+                                for ifade, ifade_parametreleri in parametreler:
+                                    cursor = await db.execute(ifade, ifade_parametreleri)
+                                    sonuc.append(YazmaSonucu(cursor.lastrowid, cursor.rowcount))
+                        except sqlite3.Error:
+                            await db.execute("ROLLBACK TO yazma")
+                            raise
+                        finally:
+                            await db.execute("RELEASE yazma")
+                    else:
+                        cursor = await db.execute(sql, parametreler)
+                        sonuc = YazmaSonucu(cursor.lastrowid, cursor.rowcount)
+                    sonuclar.append(sonuc)
+                except sqlite3.Error as e:
+                    sonuclar.append(e)
+            await db.commit()
+        except (Exception, asyncio.CancelledError) as e:
+            try:
+                if DBPool._db is not None and DBPool._db.in_transaction:
+                    await DBPool._db.rollback()
+            except Exception:
+                pass
+            for *_, gelecek in grup:
+                if not gelecek.done():
+                    gelecek.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            log.error(f"Yazma grubu uygulanamadı ({len(grup)} yazma): {e}")
+            return
+
+        self.grup_sayisi += 1
+        self.yazma_sayisi += len(grup)
+        DB_YAZMA_GRUBU.observe(len(grup))
+        for (*_, gelecek), sonuc in zip(grup, sonuclar):
+            if gelecek.done():
+                continue
+            if isinstance(sonuc, Exception):
+                gelecek.set_exception(sonuc)
+            else:
+                gelecek.set_result(sonuc)
+
+    async def kapat(self):
+        """Kuyruktaki yazmaları uygular ve dağıtıcıyı durdurur."""
+        gorev, kuyruk = self._gorev, self._kuyruk
+        self._gorev = self._kuyruk = None
+        if gorev is None or gorev.done() or gorev.get_loop() is not asyncio.get_running_loop():
+            return
+        kuyruk.put_nowait(None)
+        await gorev
+
+
+yazma_kuyrugu = YazmaKuyrugu()
+
+
+async def _yaz(sql: str, parametreler: Any = (), coklu: bool = False) -> YazmaSonucu:
+    return await yazma_kuyrugu.yaz(sql, parametreler, coklu)
+
+
+async def _yaz_islem(ifadeler: Sequence[Tuple[str, Any]]) -> List[YazmaSonucu]:
+    return await yazma_kuyrugu.yaz_islem(ifadeler)
+
+
+# ═══════════════════════════════════════════════════════════════
+# VERİTABANI BAŞLATMA — SÜRÜMLÜ ŞEMA GÖÇLERİ
+# ═══════════════════════════════════════════════════════════════
+# Göçler sıralı ve yalnızca ileridir; uygulanan her sürüm schema_version tablosuna yazılır.
+# db_init yalnızca eksik sürümleri, her birini kendi işleminde (BEGIN IMMEDIATE) uygular:
+# aynı anda açılan süreçler (bot + uyari_isci) yazma kilidini sırayla alır, sürümü kilit
+# altında yeniden okur ve bir göç iki kez çalışmaz. Şema değişikliği = listenin sonuna yeni
+# sürüm; uygulanmış göçler değiştirilmez. v1 eski (göç öncesi) veritabanlarına da
+# uygulanabilsin diye IF NOT EXISTS kullanır.
+
+# Bir göç adımı SQL ifadesi ya da aynı işlemde çalışan async fonksiyondur (veri taşıma)
+GocAdimi = Union[str, Callable[[aiosqlite.Connection], Awaitable[None]]]
+
+
+async def _portfoyu_deftere_tasi(db: aiosqlite.Connection):
+    """Eski portfoy satırlarını alış işlemi olarak deftere yazar; lot ve pozisyonları kurar."""
+    async with db.execute(
+        "SELECT id, user_id, sembol, miktar, maliyet, "
+        "COALESCE(CAST(strftime('%s', tarih) AS REAL), 0) AS zaman FROM portfoy ORDER BY id"
+    ) as cursor:
+        satirlar = await cursor.fetchall()
+    pozisyonlar: Dict[Tuple[int, str], Pozisyon] = {}
+    for satir in satirlar:
+        anahtar = (satir["user_id"], satir["sembol"])
+        try:
+            miktar, fiyat = ondalik(satir["miktar"]), ondalik(satir["maliyet"])
+            poz, _ = islem_uygula(pozisyonlar.get(anahtar, Pozisyon()), [], "alis", miktar, fiyat)
+        except DefterHatasi as e:
+            log.warning(f"⚠️ Portföy satırı {satir['id']} deftere taşınamadı: {e}")
+            continue
+        pozisyonlar[anahtar] = poz
+        cursor = await db.execute(
+            "INSERT INTO portfoy_islemleri (user_id, sembol, tur, miktar, fiyat, tarih) "
+            "VALUES (?, ?, 'alis', ?, ?, ?)",
+            (*anahtar, metin(miktar), metin(fiyat), satir["zaman"])
         )
-    """)
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS uyarilar (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            sembol TEXT,
-            tip TEXT,
-            hedef_deger TEXT,
-            tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        await db.execute(
+            "INSERT INTO portfoy_lotlari (user_id, sembol, islem_id, kalan, birim_maliyet) VALUES (?, ?, ?, ?, ?)",
+            (*anahtar, cursor.lastrowid, metin(miktar), metin(fiyat))
         )
-    """)
+    for (user_id, sembol), poz in pozisyonlar.items():
+        await db.execute(*_pozisyon_ifadesi(user_id, sembol, poz))
+
+
+GOCLER: List[Tuple[int, str, Tuple[GocAdimi, ...]]] = [
+    (1, "Temel şema", (
+        """
+            CREATE TABLE IF NOT EXISTS kullanicilar (
+                user_id INTEGER PRIMARY KEY,
+                username TEXT,
+                lang TEXT DEFAULT 'tr',
+                kayit_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """,
+        # ✅ HASSASİYET: Miktar ve maliyet TEXT olarak saklanır (Decimal precision).
+        """
+            CREATE TABLE IF NOT EXISTS portfoy (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                sembol TEXT,
+                miktar TEXT,
+                maliyet TEXT,
+                tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS favoriler (
+                user_id INTEGER,
+                sembol TEXT,
+                PRIMARY KEY (user_id, sembol)
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS uyarilar (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                sembol TEXT,
+                tip TEXT,
+                hedef_deger TEXT,
+                tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """,
+        # Canlı akıştan üretilen kapanmış gün içi mumlar (mum_motoru)
+        """
+            CREATE TABLE IF NOT EXISTS mumlar (
+                sembol TEXT,
+                aralik TEXT,
+                zaman INTEGER,
+                acilis REAL,
+                yuksek REAL,
+                dusuk REAL,
+                kapanis REAL,
+                hacim REAL,
+                PRIMARY KEY (sembol, aralik, zaman)
+            ) WITHOUT ROWID
+        """,
+        # Telegram gönderim kuyruğu (gonderim_kuyrugu) — yeniden başlatmada bildirim kaybolmasın
+        """
+            CREATE TABLE IF NOT EXISTS gonderim_kuyrugu (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER,
+                metin TEXT,
+                parse_mode TEXT,
+                oncelik INTEGER,
+                uyari_id INTEGER,
+                olusturma REAL,
+                deneme INTEGER DEFAULT 0
+            )
+        """,
+        # Bir uyarı için kuyrukta en fazla bir bildirim (çok süreçli değerlendirmede çift gönderim olmaz)
+        """
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_gonderim_uyari
+            ON gonderim_kuyrugu (uyari_id) WHERE uyari_id IS NOT NULL
+        """,
+        # Uyarı değerlendirme parçalarının kiraları ve süreç sinyalleri (parca_kiralama)
+        """
+            CREATE TABLE IF NOT EXISTS uyari_kiralari (
+                parca INTEGER PRIMARY KEY,
+                sahip TEXT,
+                bitis REAL
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS uyari_iscileri (
+                sahip TEXT PRIMARY KEY,
+                son_sinyal REAL
+            )
+        """,
+    )),
+    # Sıcak sorgular: kullanıcının uyarıları/portföyü, sembol başına uyarılar, koşul uyarıları
+    (2, "uyarilar ve portfoy indeksleri", (
+        "CREATE INDEX IF NOT EXISTS ix_uyarilar_kullanici ON uyarilar (user_id, tarih)",
+        "CREATE INDEX IF NOT EXISTS ix_uyarilar_sembol ON uyarilar (sembol, tip)",
+        "CREATE INDEX IF NOT EXISTS ix_uyarilar_tip ON uyarilar (tip)",
+        "CREATE INDEX IF NOT EXISTS ix_portfoy_kullanici_sembol ON portfoy (user_id, sembol)",
+    )),
+    # Dil + tercihler kullanıcı başına tek satır (ux/user_prefs önbelleğinin kalıcı katmanı)
+    (3, "kullanici_tercihleri", (
+        """
+            CREATE TABLE kullanici_tercihleri (
+                user_id INTEGER PRIMARY KEY,
+                lang TEXT NOT NULL DEFAULT 'tr',
+                tercihler TEXT NOT NULL DEFAULT '{}',
+                son_gorulme REAL NOT NULL DEFAULT 0
+            )
+        """,
+        "CREATE INDEX ix_kullanici_tercihleri_son_gorulme ON kullanici_tercihleri (son_gorulme)",
+        """
+            INSERT INTO kullanici_tercihleri (user_id, lang, son_gorulme)
+            SELECT user_id, COALESCE(lang, 'tr'), COALESCE(CAST(strftime('%s', kayit_tarihi) AS REAL), 0)
+            FROM kullanicilar
+        """,
+    )),
+    # Portföy defteri: işlemler (alış/satış/temettü/bölünme) + açık lotlar + artımlı pozisyonlar.
+    # Eski portfoy tablosu yalnızca okunur kalır (taşınan veri kaynağı; artık yazılmaz).
+    (4, "portfoy defteri ve pozisyonlar", (
+        """
+            CREATE TABLE portfoy_islemleri (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                sembol TEXT NOT NULL,
+                tur TEXT NOT NULL CHECK (tur IN ('alis', 'satis', 'temettu', 'bolunme')),
+                miktar TEXT NOT NULL,
+                fiyat TEXT NOT NULL,
+                tarih REAL NOT NULL
+            )
+        """,
+        "CREATE INDEX ix_portfoy_islemleri_kullanici ON portfoy_islemleri (user_id, sembol, id)",
+        """
+            CREATE TABLE portfoy_lotlari (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                sembol TEXT NOT NULL,
+                islem_id INTEGER NOT NULL REFERENCES portfoy_islemleri (id),
+                kalan TEXT NOT NULL,
+                birim_maliyet TEXT NOT NULL
+            )
+        """,
+        "CREATE INDEX ix_portfoy_lotlari_kullanici ON portfoy_lotlari (user_id, sembol, id)",
+        """
+            CREATE TABLE portfoy_pozisyonlari (
+                user_id INTEGER NOT NULL,
+                sembol TEXT NOT NULL,
+                miktar TEXT NOT NULL,
+                fifo_maliyet TEXT NOT NULL,
+                ort_maliyet TEXT NOT NULL,
+                gerceklesen_fifo TEXT NOT NULL,
+                gerceklesen_ort TEXT NOT NULL,
+                temettu TEXT NOT NULL,
+                guncelleme REAL NOT NULL,
+                PRIMARY KEY (user_id, sembol)
+            ) WITHOUT ROWID
+        """,
+        _portfoyu_deftere_tasi,
+    )),
+    # Gün sonu portföy anlıkları (portfoy_gecmisi): kullanıcı/gün başına tek kompakt satır.
+    # gun: UTC gün numarası (epoch / 86400); tutarlar anlık alındığı para biriminde (REAL, raporlama amaçlı)
+    (5, "portfoy gun sonu anliklari", (
+        """
+            CREATE TABLE portfoy_anliklari (
+                user_id INTEGER NOT NULL,
+                gun INTEGER NOT NULL,
+                deger REAL NOT NULL,
+                maliyet REAL NOT NULL,
+                akis REAL NOT NULL,
+                para_birimi TEXT NOT NULL,
+                PRIMARY KEY (user_id, gun)
+            ) WITHOUT ROWID
+        """,
+        "CREATE INDEX ix_portfoy_islemleri_tarih ON portfoy_islemleri (tarih)",
+    )),
+    # Anlığın alındığı an (epoch): sonraki anlığın akış penceresi bu andan başlar; eski satırlarda
+    # NULL, gün sonu ((gun + 1) * 86400) sayılır
+    (6, "portfoy anlik zamani", (
+        "ALTER TABLE portfoy_anliklari ADD COLUMN zaman REAL",
+    )),
+]
+
+
+async def _sema_surumu(db: aiosqlite.Connection) -> int:
+    async with db.execute("SELECT COALESCE(MAX(surum), 0) FROM schema_version") as cursor:
+        row = await cursor.fetchone()
+    return row[0]
+
+
+async def goclari_uygula(db: Optional[aiosqlite.Connection] = None) -> int:
+    """Eksik göçleri sırayla uygular ve veritabanının şema sürümünü döndürür."""
+    db = db or await DBPool.get_db()
+    await db.execute(
+        "CREATE TABLE IF NOT EXISTS schema_version (surum INTEGER PRIMARY KEY, aciklama TEXT, uygulanma REAL)"
+    )
     await db.commit()
-    log.info("✅ Veritabanı tabloları hazır.")
+    surum = await _sema_surumu(db)
+    if surum > GOCLER[-1][0]:
+        log.warning(f"⚠️ Veritabanı şeması (v{surum}) bu sürümden yeni (v{GOCLER[-1][0]}).")
+
+    for no, aciklama, ifadeler in GOCLER:
+        if no <= surum:
+            continue
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            # Kilit beklenirken başka bir süreç uygulamış olabilir
+            if await _sema_surumu(db) >= no:
+                await db.rollback()
+                continue
+            for ifade in ifadeler:
+                if callable(ifade):
+                    await ifade(db)
+                else:
+                    await db.execute(ifade)
+            await db.execute(
+                "INSERT INTO schema_version (surum, aciklama, uygulanma) VALUES (?, ?, ?)",
+                (no, aciklama, time.time())
+            )
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        log.info(f"🗄️ Şema göçü uygulandı: v{no} — {aciklama}")
+    return await _sema_surumu(db)
+
+
+async def db_init():
+    """Tabloları oluşturur / şemayı son sürüme yükseltir."""
+    surum = await goclari_uygula()
+    log.info(f"✅ Veritabanı tabloları hazır (şema v{surum}).")
 
 
 async def close_db():
@@ -107,59 +576,89 @@ async def close_db():
 
 async def kullanici_kaydet(user_id: int, username: str):
     """Kullanıcıyı veritabanına kaydeder (varsa günceller)."""
-    db = await DBPool.get_db()
-    await db.execute(
+    await _yaz(
         "INSERT OR IGNORE INTO kullanicilar (user_id, username) VALUES (?, ?)",
         (user_id, username)
     )
-    await db.commit()
 
 
 async def kullanici_dil_guncelle(user_id: int, lang: str):
-    """Kullanıcının dil tercihini günceller."""
-    db = await DBPool.get_db()
-    await db.execute(
-        "UPDATE kullanicilar SET lang = ? WHERE user_id = ?",
-        (lang, user_id)
+    """Kullanıcının dil tercihini günceller (önbellekli erişim: ux.user_prefs.set_user_lang)."""
+    await _yaz(
+        "INSERT INTO kullanici_tercihleri (user_id, lang) VALUES (?, ?) "
+        "ON CONFLICT (user_id) DO UPDATE SET lang = excluded.lang",
+        (user_id, lang)
     )
-    await db.commit()
 
 
 async def kullanici_dil_getir(user_id: int) -> str:
-    """Kullanıcının dil tercihini getirir."""
-    db = await DBPool.get_db()
-    async with db.execute("SELECT lang FROM kullanicilar WHERE user_id = ?", (user_id,)) as cursor:
+    """Kullanıcının dil tercihini getirir (önbellekli erişim: ux.user_prefs.get_user_lang)."""
+    db = await DBPool.okuyucu()
+    async with db.execute("SELECT lang FROM kullanici_tercihleri WHERE user_id = ?", (user_id,)) as cursor:
         row = await cursor.fetchone()
         return row["lang"] if row else "tr"
 
 
+async def tercih_getir(user_id: int) -> Optional[Dict[str, Any]]:
+    """Kullanıcının dil + tercih satırı (yoksa None)."""
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT user_id, lang, tercihler, son_gorulme FROM kullanici_tercihleri WHERE user_id = ?",
+        (user_id,)
+    ) as cursor:
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+
+async def tercih_kaydet(user_id: int, lang: str, tercihler: str, son_gorulme: float):
+    """Kullanıcının tercih satırını tümüyle yazar (tercihler: JSON)."""
+    await _yaz(
+        "INSERT OR REPLACE INTO kullanici_tercihleri (user_id, lang, tercihler, son_gorulme) "
+        "VALUES (?, ?, ?, ?)",
+        (user_id, lang, tercihler, son_gorulme)
+    )
+
+
+async def son_gorulme_guncelle(user_id: int, son_gorulme: float):
+    await _yaz(
+        "UPDATE kullanici_tercihleri SET son_gorulme = ? WHERE user_id = ?", (son_gorulme, user_id)
+    )
+
+
+async def aktif_tercihleri_getir(sinir: float, limit: int) -> List[Dict[str, Any]]:
+    """son_gorulme >= sinir olan en yeni `limit` kullanıcının tercih satırları."""
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT user_id, lang, tercihler, son_gorulme FROM kullanici_tercihleri "
+        "WHERE son_gorulme >= ? ORDER BY son_gorulme DESC LIMIT ?",
+        (sinir, limit)
+    ) as cursor:
+        return [dict(row) for row in await cursor.fetchall()]
+
+
 # ═══════════════════════════════════════════════════════════════
 # FAVORİ İŞLEMLERİ
 # ═══════════════════════════════════════════════════════════════
 
 async def favori_ekle(user_id: int, sembol: str):
     """Favorilere sembol ekler."""
-    db = await DBPool.get_db()
-    await db.execute(
+    await _yaz(
         "INSERT OR IGNORE INTO favoriler (user_id, sembol) VALUES (?, ?)",
         (user_id, sembol.upper())
     )
-    await db.commit()
 
 
 async def favori_sil(user_id: int, sembol: str):
     """Favorilerden sembol siler."""
-    db = await DBPool.get_db()
-    await db.execute(
+    await _yaz(
         "DELETE FROM favoriler WHERE user_id = ? AND sembol = ?",
         (user_id, sembol.upper())
     )
-    await db.commit()
 
 
 async def favori_toggle(user_id: int, sembol: str) -> bool:
     """Favoriyi ekler/çıkarır. True döndürürse eklendi, False ise silindi."""
-    db = await DBPool.get_db()
+    db = await DBPool.okuyucu()
     async with db.execute(
         "SELECT 1 FROM favoriler WHERE user_id = ? AND sembol = ?",
         (user_id, sembol.upper())
@@ -176,7 +675,7 @@ async def favori_toggle(user_id: int, sembol: str) -> bool:
 
 async def favorileri_getir(user_id: int) -> List[str]:
     """Kullanıcının favori sembollerini getirir."""
-    db = await DBPool.get_db()
+    db = await DBPool.okuyucu()
     async with db.execute(
         "SELECT sembol FROM favoriler WHERE user_id = ? ORDER BY sembol",
         (user_id,)
@@ -189,19 +688,23 @@ async def favorileri_getir(user_id: int) -> List[str]:
 # UYARI İŞLEMLERİ
 # ═══════════════════════════════════════════════════════════════
 
-async def uyari_ekle(user_id: int, sembol: str, tip: str, hedef_deger: str):
-    """Yeni uyarı ekler."""
-    db = await DBPool.get_db()
-    await db.execute(
+async def uyari_ekle(user_id: int, sembol: str, tip: str, hedef_deger: str) -> int:
+    """Yeni uyarı ekler, bellek içi uyarı indeksini günceller ve uyarı id'sini döndürür."""
+    sonuc = await _yaz(
         "INSERT INTO uyarilar (user_id, sembol, tip, hedef_deger) VALUES (?, ?, ?, ?)",
         (user_id, sembol.upper(), tip, str(hedef_deger))
     )
-    await db.commit()
+    uyari_id = sonuc.lastrowid
+    uyari_indeksi.ekle({
+        "id": uyari_id, "user_id": user_id, "sembol": sembol.upper(),
+        "tip": tip, "hedef_deger": str(hedef_deger),
+    })
+    return uyari_id
 
 
 async def uyarilari_getir() -> List[Dict[str, Any]]:
     """Tüm aktif uyarıları getirir."""
-    db = await DBPool.get_db()
+    db = await DBPool.okuyucu()
     async with db.execute("SELECT * FROM uyarilar") as cursor:
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
@@ -209,7 +712,7 @@ async def uyarilari_getir() -> List[Dict[str, Any]]:
 
 async def kullanici_uyarilari_getir(user_id: int) -> List[Dict[str, Any]]:
     """Belirli kullanıcının uyarılarını getirir."""
-    db = await DBPool.get_db()
+    db = await DBPool.okuyucu()
     async with db.execute(
         "SELECT * FROM uyarilar WHERE user_id = ? ORDER BY tarih DESC",
         (user_id,)
@@ -220,41 +723,325 @@ async def kullanici_uyarilari_getir(user_id: int) -> List[Dict[str, Any]]:
 
 async def uyari_sil(uyari_id: int, user_id: int = None):
     """Uyarıyı siler. user_id verilmişse yetkilendirme kontrolü yapar."""
-    db = await DBPool.get_db()
     if user_id is not None:
         # ✅ GÜVENLİK: Sadece kendi uyarısını silebilir
-        await db.execute(
+        await _yaz(
             "DELETE FROM uyarilar WHERE id = ? AND user_id = ?",
             (uyari_id, user_id)
         )
     else:
         # Sistem tarafından çağrılıyorsa (alert_motoru) user_id kontrolü yok
-        await db.execute("DELETE FROM uyarilar WHERE id = ?", (uyari_id,))
-    await db.commit()
+        await _yaz("DELETE FROM uyarilar WHERE id = ?", (uyari_id,))
+    uyari_indeksi.sil(uyari_id, user_id)
+
+
+async def kosul_uyarilarini_getir() -> List[Dict[str, Any]]:
+    """Koşul uyarıları (tip='kosul'; hedef_deger koşul metnidir, indekste tutulmaz)."""
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT id, user_id, sembol, tip, hedef_deger FROM uyarilar WHERE tip = 'kosul'"
+    ) as cursor:
+        rows = await cursor.fetchall()
+    return [dict(row) for row in rows]
+
+
+async def uyari_indeksini_yukle():
+    """Bellek içi uyarı indeksini veritabanından baştan kurar (açılışta bir kez)."""
+    db = await DBPool.okuyucu()
+    async with db.execute("SELECT id, user_id, sembol, tip, hedef_deger FROM uyarilar") as cursor:
+        rows = await cursor.fetchall()
+    uyari_indeksi.yukle(dict(row) for row in rows)
+
+
+# ═══════════════════════════════════════════════════════════════
+# GÖNDERİM KUYRUĞU
+# ═══════════════════════════════════════════════════════════════
+
+async def gonderim_ekle(chat_id: int, metin: str, parse_mode: Optional[str], oncelik: int,
+                        uyari_id: Optional[int], olusturma: float) -> Optional[int]:
+    """
+    Bekleyen Telegram mesajını kaydeder ve satır id'sini döndürür.
+    uyari_id verilmişse tek ifadede (atomik) kontrol edilir: uyarı silinmişse ya da
+    bildirimi zaten kuyruktaysa (başka bir süreç eklemiş olabilir) None döner.
+    """
+    sonuc = await _yaz(
+        "INSERT OR IGNORE INTO gonderim_kuyrugu (chat_id, metin, parse_mode, oncelik, uyari_id, olusturma) "
+        "SELECT ?, ?, ?, ?, ?, ? WHERE ? IS NULL OR EXISTS (SELECT 1 FROM uyarilar WHERE id = ?)",
+        (chat_id, metin, parse_mode, oncelik, uyari_id, olusturma, uyari_id, uyari_id)
+    )
+    return sonuc.lastrowid if sonuc.rowcount else None
+
+
+async def gonderim_sil(gonderim_id: int, uyari_id: Optional[int] = None):
+    """
+    Bekleyen mesaj satırını siler. uyari_id verilmişse uyarı da aynı işlemde silinir:
+    satırın gidip uyarının kaldığı bir an olmaz, parçayı yeni devralan süreç
+    gonderim_ekle ile aynı bildirimi ikinci kez kuyruğa alamaz.
+    """
+    if uyari_id is None:
+        await _yaz("DELETE FROM gonderim_kuyrugu WHERE id = ?", (gonderim_id,))
+        return
+    await _yaz_islem([
+        ("DELETE FROM uyarilar WHERE id = ?", (uyari_id,)),
+        ("DELETE FROM gonderim_kuyrugu WHERE id = ?", (gonderim_id,)),
+    ])
+    uyari_indeksi.sil(uyari_id)
+
+
+async def gonderim_deneme_guncelle(gonderim_id: int, deneme: int):
+    await _yaz("UPDATE gonderim_kuyrugu SET deneme = ? WHERE id = ?", (deneme, gonderim_id))
+
+
+async def gonderimleri_getir(son_id: int = 0) -> List[Dict[str, Any]]:
+    """id'si son_id'den büyük bekleyen mesajlar (öncelik, eklenme sırasıyla)."""
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT * FROM gonderim_kuyrugu WHERE id > ? ORDER BY oncelik, id", (son_id,)
+    ) as cursor:
+        rows = await cursor.fetchall()
+    return [dict(row) for row in rows]
+
+
+# ═══════════════════════════════════════════════════════════════
+# UYARI PARÇA KİRALARI
+# ═══════════════════════════════════════════════════════════════
+# Her ifade tek başına atomiktir; aynı veritabanını kullanan süreçler arasında
+# bir parçanın aynı anda yalnızca bir geçerli sahibi olur.
+
+async def isci_sinyali(sahip: str, simdi: float, sure: float) -> int:
+    """Sürecin canlılık sinyalini yazar; son `sure` saniyede sinyal veren süreç sayısını döndürür."""
+    await asyncio.gather(
+        _yaz("INSERT OR REPLACE INTO uyari_iscileri (sahip, son_sinyal) VALUES (?, ?)", (sahip, simdi)),
+        _yaz("DELETE FROM uyari_iscileri WHERE son_sinyal < ?", (simdi - 10 * sure,)),
+    )
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT COUNT(*) FROM uyari_iscileri WHERE son_sinyal > ?", (simdi - sure,)
+    ) as cursor:
+        row = await cursor.fetchone()
+    return row[0]
+
+
+async def kira_al(parca: int, sahip: str, simdi: float, bitis: float) -> bool:
+    """Parça boşsa, süresi dolmuşsa ya da zaten bizdeyse kiralar/uzatır."""
+    sonuc = await _yaz(
+        "INSERT INTO uyari_kiralari (parca, sahip, bitis) VALUES (?, ?, ?) "
+        "ON CONFLICT (parca) DO UPDATE SET sahip = excluded.sahip, bitis = excluded.bitis "
+        "WHERE uyari_kiralari.sahip = excluded.sahip OR uyari_kiralari.bitis <= ?",
+        (parca, sahip, bitis, simdi)
+    )
+    return sonuc.rowcount > 0
+
+
+async def kiralari_yenile(sahip: str, simdi: float, bitis: float) -> List[int]:
+    """Süresi dolmamış kiraları uzatır (heartbeat) ve hâlâ bizde olan parçaları döndürür."""
+    await _yaz(
+        "UPDATE uyari_kiralari SET bitis = ? WHERE sahip = ? AND bitis > ?", (bitis, sahip, simdi)
+    )
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT parca FROM uyari_kiralari WHERE sahip = ? AND bitis > ? ORDER BY parca", (sahip, simdi)
+    ) as cursor:
+        rows = await cursor.fetchall()
+    return [row[0] for row in rows]
+
+
+async def kiralari_getir(simdi: float) -> Dict[int, str]:
+    """Geçerli kiralar: parça → sahip."""
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT parca, sahip FROM uyari_kiralari WHERE bitis > ?", (simdi,)
+    ) as cursor:
+        rows = await cursor.fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+async def kira_birak(sahip: str, parcalar: Optional[List[int]] = None):
+    """Kiraları hemen devredilebilir kılar (parcalar None → hepsi)."""
+    if parcalar is None:
+        await asyncio.gather(
+            _yaz("UPDATE uyari_kiralari SET bitis = 0 WHERE sahip = ?", (sahip,)),
+            _yaz("DELETE FROM uyari_iscileri WHERE sahip = ?", (sahip,)),
+        )
+    else:
+        await _yaz(
+            "UPDATE uyari_kiralari SET bitis = 0 WHERE sahip = ? AND parca = ?",
+            [(sahip, p) for p in parcalar], coklu=True
+        )
+
+
+# ═══════════════════════════════════════════════════════════════
+# MUM GEÇMİŞİ
+# ═══════════════════════════════════════════════════════════════
+
+async def mumlari_kaydet(satirlar: List[tuple], budama: Sequence[tuple] = ()):
+    """
+    Kapanmış mumları toplu yazar: (sembol, aralik, zaman, acilis, yuksek, dusuk, kapanis, hacim).
+    budama: (sembol, aralik, en eski tutulan zaman) — daha eski gün içi mumlar silinir
+    (fiyat_gecmisi'nin '1d' satırlarına dokunulmaz).
+    """
+    if not satirlar:
+        return
+    await _yaz(
+        "INSERT OR REPLACE INTO mumlar "
+        "(sembol, aralik, zaman, acilis, yuksek, dusuk, kapanis, hacim) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        satirlar, coklu=True
+    )
+    if budama:
+        await _yaz(
+            "DELETE FROM mumlar WHERE sembol = ? AND aralik = ? AND zaman < ? AND aralik != '1d'",
+            list(budama), coklu=True
+        )
+
+
+async def mumlari_getir(sembol: str, aralik: str, limit: int) -> List[tuple]:
+    """Sembolün son `limit` mumunu eskiden yeniye döndürür: (zaman, acilis, yuksek, dusuk, kapanis, hacim)."""
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT zaman, acilis, yuksek, dusuk, kapanis, hacim FROM mumlar "
+        "WHERE sembol = ? AND aralik = ? ORDER BY zaman DESC LIMIT ?",
+        (sembol, aralik, limit)
+    ) as cursor:
+        rows = await cursor.fetchall()
+    return [tuple(r) for r in reversed(rows)]
+
+
+async def kapanislari_getir(semboller: Sequence[str], aralik: str, baslangic: int) -> List[tuple]:
+    """Sembollerin `baslangic`tan itibaren kapanışları tek sorguda: (sembol, zaman, kapanis), sembol/zaman sıralı."""
+    if not semboller:
+        return []
+    db = await DBPool.okuyucu()
+    yer = ", ".join("?" * len(semboller))
+    async with db.execute(
+        f"SELECT sembol, zaman, kapanis FROM mumlar WHERE sembol IN ({yer}) AND aralik = ? AND zaman >= ? "
+        "ORDER BY sembol, zaman",
+        (*semboller, aralik, baslangic)
+    ) as cursor:
+        rows = await cursor.fetchall()
+    return [tuple(r) for r in rows]
 
 
 # ═══════════════════════════════════════════════════════════════
 # PORTFÖY İŞLEMLERİ
 # ═══════════════════════════════════════════════════════════════
 
+# Kullanıcı başına kilit: pozisyon oku → hesapla → yaz adımları aynı kullanıcı için sıralı
+_portfoy_kilitleri: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _portfoy_kilidi(user_id: int) -> asyncio.Lock:
+    kilit = _portfoy_kilitleri.get(user_id)
+    if kilit is None:
+        kilit = _portfoy_kilitleri[user_id] = asyncio.Lock()
+    return kilit
+
+
+def _pozisyon_ifadesi(user_id: int, sembol: str, poz: Pozisyon) -> Tuple[str, tuple]:
+    satir = poz.satira()
+    return (
+        "INSERT OR REPLACE INTO portfoy_pozisyonlari (user_id, sembol, miktar, fifo_maliyet, ort_maliyet, "
+        "gerceklesen_fifo, gerceklesen_ort, temettu, guncelleme) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (user_id, sembol, *(satir[a] for a in Pozisyon.ALANLAR), time.time())
+    )
+
+
+async def pozisyon_getir(user_id: int, sembol: str) -> Optional[Dict[str, Any]]:
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT * FROM portfoy_pozisyonlari WHERE user_id = ? AND sembol = ?", (user_id, sembol.upper())
+    ) as cursor:
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+
+async def lotlari_getir(user_id: int, sembol: str) -> List[Dict[str, Any]]:
+    """Açık lotlar, en eski önce (FIFO sırası)."""
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT * FROM portfoy_lotlari WHERE user_id = ? AND sembol = ? ORDER BY id", (user_id, sembol.upper())
+    ) as cursor:
+        return [dict(row) for row in await cursor.fetchall()]
+
+
+async def portfoy_islemleri_getir(user_id: int, sembol: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Defter satırları, eskiden yeniye."""
+    db = await DBPool.okuyucu()
+    if sembol is None:
+        sql, parametreler = "SELECT * FROM portfoy_islemleri WHERE user_id = ? ORDER BY sembol, id", (user_id,)
+    else:
+        sql = "SELECT * FROM portfoy_islemleri WHERE user_id = ? AND sembol = ? ORDER BY id"
+        parametreler = (user_id, sembol.upper())
+    async with db.execute(sql, parametreler) as cursor:
+        return [dict(row) for row in await cursor.fetchall()]
+
+
+async def portfoy_islemi_uygula(user_id: int, sembol: str, tur: str, miktar: Any, fiyat: Any,
+                                tarih: Optional[float] = None) -> Pozisyon:
+    """
+    İşlemi deftere yazar; lotları ve pozisyonu artımlı günceller (tek atomik yazma birimi).
+    Pozisyon satırı + (satış/bölünmede) açık lotlar okunur, defter yeniden oynatılmaz.
+    Geçersiz işlemde DefterHatasi; dönüş: yeni pozisyon.
+    """
+    sembol = sembol.upper()
+    miktar_d, fiyat_d = ondalik(miktar), ondalik(fiyat)
+    async with _portfoy_kilidi(user_id):
+        poz = Pozisyon.satirdan(await pozisyon_getir(user_id, sembol))
+        lotlar = []
+        if tur in ("satis", "bolunme"):
+            lotlar = [Lot(r["id"], ondalik(r["kalan"]), ondalik(r["birim_maliyet"]))
+                      for r in await lotlari_getir(user_id, sembol)]
+        if tur == "temettu":
+            miktar_d = poz.miktar            # Defterde temettü alınan adet saklanır
+        yeni_poz, yeni_lotlar = islem_uygula(poz, lotlar, tur, miktar_d, fiyat_d)
+        eklenen, guncellenen, silinen = lot_farki(lotlar, yeni_lotlar)
+
+        ifadeler: List[Tuple[str, Any]] = [(
+            "INSERT INTO portfoy_islemleri (user_id, sembol, tur, miktar, fiyat, tarih) VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, sembol, tur, metin(miktar_d), metin(fiyat_d), time.time() if tarih is None else tarih)
+        )]
+        # Yeni lot yalnızca alışta oluşur ve hemen işlem satırının ardından yazılır
+        ifadeler += [(
+            "INSERT INTO portfoy_lotlari (user_id, sembol, islem_id, kalan, birim_maliyet) "
+            "VALUES (?, ?, last_insert_rowid(), ?, ?)",
+            (user_id, sembol, metin(lot.kalan), metin(lot.birim_maliyet))
+        ) for lot in eklenen]
+        ifadeler += [(
+            "UPDATE portfoy_lotlari SET kalan = ?, birim_maliyet = ? WHERE id = ?",
+            (metin(lot.kalan), metin(lot.birim_maliyet), lot.id)
+        ) for lot in guncellenen]
+        ifadeler += [("DELETE FROM portfoy_lotlari WHERE id = ?", (lot_id,)) for lot_id in silinen]
+        ifadeler.append(_pozisyon_ifadesi(user_id, sembol, yeni_poz))
+        await _yaz_islem(ifadeler)
+        return yeni_poz
+
+
 async def portfoy_ekle(user_id: int, sembol: str, miktar: str, maliyet: str):
     """
-    Portföye varlık ekler.
+    Portföye alış işlemi ekler.
     ✅ HASSASİYET: Miktar ve maliyet TEXT olarak saklanır (Decimal precision).
     """
-    db = await DBPool.get_db()
-    await db.execute(
-        "INSERT INTO portfoy (user_id, sembol, miktar, maliyet) VALUES (?, ?, ?, ?)",
-        (user_id, sembol.upper(), str(miktar), str(maliyet))
-    )
-    await db.commit()
+    await portfoy_islemi_uygula(user_id, sembol, "alis", miktar, maliyet)
 
 
 async def portfoy_getir(user_id: int) -> List[Dict[str, Any]]:
-    """Kullanıcının portföyünü getirir."""
-    db = await DBPool.get_db()
+    """Kullanıcının açık pozisyonları (maliyet: ortalama birim maliyet)."""
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT sembol, miktar, ort_maliyet AS maliyet, fifo_maliyet, gerceklesen_fifo, gerceklesen_ort, "
+        "temettu, guncelleme FROM portfoy_pozisyonlari WHERE user_id = ? AND miktar != '0' ORDER BY sembol",
+        (user_id,)
+    ) as cursor:
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
+
+
+async def portfoy_gerceklesen_getir(user_id: int) -> List[Dict[str, Any]]:
+    """Kapanmış pozisyonlar dahil sembol başına gerçekleşen K/Z ve temettü (sıfır olanlar hariç)."""
+    db = await DBPool.okuyucu()
     async with db.execute(
-        "SELECT * FROM portfoy WHERE user_id = ? ORDER BY sembol",
+        "SELECT sembol, gerceklesen_fifo, gerceklesen_ort, temettu FROM portfoy_pozisyonlari "
+        "WHERE user_id = ? AND (gerceklesen_fifo != '0' OR gerceklesen_ort != '0' OR temettu != '0') "
+        "ORDER BY sembol",
         (user_id,)
     ) as cursor:
         rows = await cursor.fetchall()
@@ -262,20 +1049,81 @@ async def portfoy_getir(user_id: int) -> List[Dict[str, Any]]:
 
 
 async def portfoy_sil(user_id: int, sembol: str):
-    """Portföyden sembolü siler."""
-    db = await DBPool.get_db()
-    await db.execute(
-        "DELETE FROM portfoy WHERE user_id = ? AND sembol = ?",
-        (user_id, sembol.upper())
-    )
-    await db.commit()
+    """Sembolü portföyden tümüyle siler (defter, lotlar ve pozisyon)."""
+    parametreler = (user_id, sembol.upper())
+    async with _portfoy_kilidi(user_id):
+        await _yaz_islem([
+            ("DELETE FROM portfoy_lotlari WHERE user_id = ? AND sembol = ?", parametreler),
+            ("DELETE FROM portfoy_islemleri WHERE user_id = ? AND sembol = ?", parametreler),
+            ("DELETE FROM portfoy_pozisyonlari WHERE user_id = ? AND sembol = ?", parametreler),
+        ])
 
 
-async def portfoy_guncelle(portfoy_id: int, miktar: str, maliyet: str):
-    """Portföy kaydını günceller."""
-    db = await DBPool.get_db()
-    await db.execute(
-        "UPDATE portfoy SET miktar = ?, maliyet = ? WHERE id = ?",
-        (str(miktar), str(maliyet), portfoy_id)
+# ═══════════════════════════════════════════════════════════════
+# PORTFÖY ANLIKLARI (gün sonu)
+# ═══════════════════════════════════════════════════════════════
+
+async def gunsonu_pozisyonlari_getir() -> List[Dict[str, Any]]:
+    """Tüm kullanıcıların açık pozisyonları ve değerleme para birimleri (tek sorgu)."""
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT p.user_id, p.sembol, p.miktar, p.fifo_maliyet, "
+        "json_extract(t.tercihler, '$.currency') AS para_birimi "
+        "FROM portfoy_pozisyonlari p LEFT JOIN kullanici_tercihleri t ON t.user_id = p.user_id "
+        "WHERE p.miktar != '0'"
+    ) as cursor:
+        return [dict(row) for row in await cursor.fetchall()]
+
+
+async def portfoy_akislari_getir(baslangic: float, bitis: float) -> List[Dict[str, Any]]:
+    """[baslangic, bitis) aralığındaki alış/satış/temettü işlemleri, tüm kullanıcılar (bölünme nakit akışı değildir)."""
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT i.user_id, i.sembol, i.tur, i.miktar, i.fiyat, "
+        "json_extract(t.tercihler, '$.currency') AS para_birimi "
+        "FROM portfoy_islemleri i LEFT JOIN kullanici_tercihleri t ON t.user_id = i.user_id "
+        "WHERE i.tarih >= ? AND i.tarih < ? AND i.tur != 'bolunme'",
+        (baslangic, bitis)
+    ) as cursor:
+        return [dict(row) for row in await cursor.fetchall()]
+
+
+async def portfoy_anliklari_kaydet(satirlar: List[tuple], zaman: Optional[float] = None):
+    """
+    Anlıkları toplu yazar: (user_id, gun, deger, maliyet, akis, para_birimi); aynı gün yeniden yazılır.
+    zaman: anlığın alındığı an (verilmezse gün sonu sayılır).
+    """
+    if not satirlar:
+        return
+    await _yaz(
+        "INSERT OR REPLACE INTO portfoy_anliklari (user_id, gun, deger, maliyet, akis, para_birimi, zaman) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(*s, zaman) for s in satirlar], coklu=True
     )
-    await db.commit()
+
+
+async def portfoy_anliklari_getir(user_id: int, baslangic_gun: int = 0) -> List[tuple]:
+    """Kullanıcının anlıkları eskiden yeniye: (gun, deger, maliyet, akis, para_birimi)."""
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT gun, deger, maliyet, akis, para_birimi FROM portfoy_anliklari "
+        "WHERE user_id = ? AND gun >= ? ORDER BY gun",
+        (user_id, baslangic_gun)
+    ) as cursor:
+        return [tuple(r) for r in await cursor.fetchall()]
+
+
+async def son_anlik_gunu() -> Optional[int]:
+    """En son alınan gün sonu anlığının günü (hiç yoksa None)."""
+    db = await DBPool.okuyucu()
+    async with db.execute("SELECT MAX(gun) FROM portfoy_anliklari") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def son_anlik_zamani(gun: int) -> Optional[float]:
+    """`gun`den önceki en son anlığın alındığı an (zamansız eski satırlarda gün sonu; hiç yoksa None)."""
+    db = await DBPool.okuyucu()
+    async with db.execute(
+        "SELECT MAX(COALESCE(zaman, (gun + 1) * 86400)) FROM portfoy_anliklari WHERE gun < ?", (gun,)
+    ) as cursor:
+        return (await cursor.fetchone())[0]
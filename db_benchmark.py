@@ -0,0 +1,184 @@
+"""
+db_benchmark.py — Yazma yükü altında okuma gecikmesi kıyaslaması (SQLite bağlantı havuzu).
+
+Geçici bir veritabanına kullanıcı/favori/uyarı/portföy verisi doldurulur, ardından aynı anda:
+
+    yazıcılar   sürekli uyarı ekler/siler, portföy ve favori yazar, mum topluca kaydeder
+                (yazma kuyruğu üzerinden)
+    okuyucular  handler'ların yaptığı okumaları yapar (favoriler, uyarılar, portföy, dil)
+                ve her okumanın süresini ölçer
+
+Her DB_READ_POOL_SIZE değeri için okuma gecikmesi p50/p95/p99/maks ile okuma ve yazma
+verimi raporlanır. 0 = tek bağlantı (okumalar yazmaların arkasında sıraya girer).
+
+Kullanım:
+    python db_benchmark.py                          # havuz 0 ve 4, 10 sn
+    python db_benchmark.py --havuz 0 --havuz 2 --havuz 8 --sure 30 --yazici 16
+    python db_benchmark.py --synchronous FULL --json sonuc.json
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+from dataclasses import dataclass, asdict
+from typing import List, Optional, Sequence
+
+import db as db_module
+from config import settings
+
+log = logging.getLogger("finans_botu")
+
+
+@dataclass
+class Sonuc:
+    havuz: int
+    okuma: int
+    yazma: int
+    okuma_sn: float
+    yazma_sn: float
+    p50_ms: Optional[float]
+    p95_ms: Optional[float]
+    p99_ms: Optional[float]
+    maks_ms: Optional[float]
+
+
+def _yuzdelik(degerler: Sequence[float], oran: float) -> Optional[float]:
+    if not degerler:
+        return None
+    sirali = sorted(degerler)
+    return sirali[min(len(sirali) - 1, int(oran * len(sirali)))]
+
+
+async def _doldur(kullanici: int, tohum: int):
+    rng = random.Random(tohum)
+    db = await db_module.DBPool.get_db()
+    await db.executemany("INSERT INTO kullanicilar (user_id, username) VALUES (?, ?)",
+                         [(u, f"u{u}") for u in range(kullanici)])
+    await db.executemany("INSERT OR IGNORE INTO favoriler (user_id, sembol) VALUES (?, ?)",
+                         [(u, f"S{rng.randrange(500)}") for u in range(kullanici) for _ in range(10)])
+    await db.executemany("INSERT INTO uyarilar (user_id, sembol, tip, hedef_deger) VALUES (?, ?, ?, ?)",
+                         [(u, f"S{rng.randrange(500)}", "fiyat_ust", "100")
+                          for u in range(kullanici) for _ in range(10)])
+    await db.executemany(
+        "INSERT OR IGNORE INTO portfoy_pozisyonlari (user_id, sembol, miktar, fifo_maliyet, ort_maliyet, "
+        "gerceklesen_fifo, gerceklesen_ort, temettu, guncelleme) VALUES (?, ?, '10', '15', '1.5', '0', '0', '0', 0)",
+        [(u, f"S{rng.randrange(500)}") for u in range(kullanici) for _ in range(5)])
+    await db.commit()
+
+
+async def olc(havuz: int, *, sure: float = 10.0, yazici: int = 8, okuyucu: int = 32,
+              kullanici: int = 1000, mum: int = 200, tohum: int = 42) -> Sonuc:
+    """Tek havuz boyutuyla yazma yükü altında okuma gecikmelerini ölçer."""
+    eski = (settings.DB_PATH, settings.DB_READ_POOL_SIZE)
+    gecikmeler: List[float] = []
+    sayac = {"yazma": 0}
+    gorevler: List[asyncio.Task] = []
+
+    async def yaz(no: int):
+        rng = random.Random(tohum + no)
+        while True:
+            u = rng.randrange(kullanici)
+            uyari_id = await db_module.uyari_ekle(u, f"S{rng.randrange(500)}", "fiyat_alt", "1")
+            await db_module.portfoy_ekle(u, f"S{rng.randrange(500)}", "1", "2")
+            await db_module.favori_ekle(u, f"S{rng.randrange(500)}")
+            await db_module.uyari_sil(uyari_id)
+            # Mum akışının periyodik toplu yazması (uzun süren tek işlem)
+            zaman = sayac["yazma"] * 60
+            await db_module.mumlari_kaydet([(f"S{i}", "1m", zaman, 1, 1, 1, 1, 1) for i in range(mum)])
+            sayac["yazma"] += 5
+
+    async def oku(no: int):
+        rng = random.Random(-tohum - no)
+        okumalar = (db_module.favorileri_getir, db_module.kullanici_uyarilari_getir,
+                    db_module.portfoy_getir, db_module.kullanici_dil_getir)
+        while True:
+            islem = rng.choice(okumalar)
+            t0 = time.perf_counter()
+            await islem(rng.randrange(kullanici))
+            gecikmeler.append(time.perf_counter() - t0)
+
+    with tempfile.TemporaryDirectory() as klasor:
+        try:
+            await db_module.DBPool.close()
+            settings.DB_PATH = os.path.join(klasor, "benchmark.db")
+            settings.DB_READ_POOL_SIZE = havuz
+            await db_module.db_init()
+            await _doldur(kullanici, tohum)
+            await db_module.DBPool.okuyucu()      # Havuz ölçüm başlamadan açılsın
+
+            gorevler = [asyncio.create_task(yaz(i)) for i in range(yazici)]
+            gorevler += [asyncio.create_task(oku(i)) for i in range(okuyucu)]
+            baslangic = time.perf_counter()
+            await asyncio.sleep(sure)
+            gecen = time.perf_counter() - baslangic
+            okuma, yazma = len(gecikmeler), sayac["yazma"]
+        finally:
+            for g in gorevler:
+                g.cancel()
+            await asyncio.gather(*gorevler, return_exceptions=True)
+            await db_module.DBPool.close()
+            settings.DB_PATH, settings.DB_READ_POOL_SIZE = eski
+
+    ms = [g * 1000 for g in gecikmeler[:okuma]]
+    return Sonuc(
+        havuz=havuz, okuma=okuma, yazma=yazma, okuma_sn=okuma / gecen, yazma_sn=yazma / gecen,
+        p50_ms=_yuzdelik(ms, 0.50), p95_ms=_yuzdelik(ms, 0.95), p99_ms=_yuzdelik(ms, 0.99),
+        maks_ms=max(ms, default=None),
+    )
+
+
+async def kiyasla(havuzlar: Sequence[int] = (0, 4), **secenekler) -> List[Sonuc]:
+    """Havuz boyutlarını aynı yükle sırayla ölçer."""
+    return [await olc(h, **secenekler) for h in havuzlar]
+
+
+def rapor(sonuclar: Sequence[Sonuc]) -> str:
+    def ms(x):
+        return "-" if x is None else f"{x:.2f}"
+
+    basliklar = ("havuz", "okuma", "yazma", "okuma/sn", "yazma/sn", "p50 ms", "p95 ms", "p99 ms", "maks ms")
+    satirlar = [basliklar]
+    for s in sonuclar:
+        satirlar.append((
+            str(s.havuz), str(s.okuma), str(s.yazma), f"{s.okuma_sn:.0f}", f"{s.yazma_sn:.0f}",
+            ms(s.p50_ms), ms(s.p95_ms), ms(s.p99_ms), ms(s.maks_ms),
+        ))
+    genislik = [max(len(r[i]) for r in satirlar) for i in range(len(basliklar))]
+    return "\n".join("  ".join(h.rjust(g) for h, g in zip(r, genislik)) for r in satirlar)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    p = argparse.ArgumentParser(description="Yazma yükü altında okuma gecikmesi kıyaslaması")
+    p.add_argument("--havuz", type=int, action="append", help="DB_READ_POOL_SIZE (tekrarlanabilir; varsayılan 0 ve 4)")
+    p.add_argument("--sure", type=float, default=10.0, help="Havuz başına ölçüm süresi (sn)")
+    p.add_argument("--yazici", type=int, default=8, help="Eşzamanlı yazıcı görev sayısı")
+    p.add_argument("--okuyucu", type=int, default=32, help="Eşzamanlı okuyucu görev sayısı")
+    p.add_argument("--kullanici", type=int, default=1000, help="Doldurulan kullanıcı sayısı")
+    p.add_argument("--mum", type=int, default=200, help="Yazıcı döngüsü başına toplu kaydedilen mum sayısı")
+    p.add_argument("--synchronous", help=f"DB_SYNCHRONOUS (varsayılan {settings.DB_SYNCHRONOUS})")
+    p.add_argument("--tohum", type=int, default=42)
+    p.add_argument("--json", help="Sonuçları bu dosyaya JSON olarak yaz")
+    args = p.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    if args.synchronous:
+        settings.DB_SYNCHRONOUS = args.synchronous
+    print(f"{args.kullanici} kullanıcı; {args.yazici} yazıcı, {args.okuyucu} okuyucu görev; "
+          f"havuz başına {args.sure} sn; synchronous={settings.DB_SYNCHRONOUS}")
+
+    sonuclar = asyncio.run(kiyasla(
+        args.havuz or (0, 4), sure=args.sure, yazici=args.yazici, okuyucu=args.okuyucu,
+        kullanici=args.kullanici, mum=args.mum, tohum=args.tohum,
+    ))
+    print(rapor(sonuclar))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(s) for s in sonuclar], f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
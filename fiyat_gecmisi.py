@@ -0,0 +1,162 @@
+"""
+fiyat_gecmisi.py — Günlük kapanış geçmişi deposu (portföy risk analitiği, gün sonu anlıkları).
+
+Sembol başına günlük kapanışlar NumPy dizileri olarak bellekte tutulur:
+
+    bellek (CACHE_TTL_HISTORY) ──yoksa──► db.mumlar (aralik '1d') ──eski/eksikse──► yf.download
+
+✅ Bellekte olmayan semboller tek sorguyla DB'den okunur; orada da eksik/eski olanlar tek
+   yf.download çağrısıyla çekilir ve mumlar tablosuna yazılır (yeniden başlatmada tekrar indirilmez).
+✅ Eşzamanlı istekler aynı çekimi paylaşır; sıcak depoda okuma yalnızca dizi dilimlemedir.
+
+Zaman ekseni: işlem gününün UTC gece yarısı (epoch sn) — farklı saat dilimindeki borsaların
+aynı tarihli barları aynı güne düşer.
+"""
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import settings
+
+log = logging.getLogger("finans_botu")
+
+GUN = 86400
+ARALIK = "1d"
+TAZELIK_GUN = 4          # DB'deki son bar bundan eskiyse yeniden çekilir (hafta sonu + tatil payı)
+KAPSAMA_PAYI_GUN = 7     # İlk bar istenen başlangıçtan en fazla bu kadar sonra olabilir
+
+Seri = Tuple[np.ndarray, np.ndarray]          # (gün int64 epoch sn, kapanış float64)
+GecmisCekici = Callable[[List[str], int], Awaitable[Dict[str, np.ndarray]]]
+
+
+def _bugun() -> int:
+    return int(time.time() // GUN * GUN)
+
+
+def _yfinance_gunluk_cek(semboller: List[str], baslangic: int) -> Dict[str, np.ndarray]:
+    """Sembollerin günlük OHLCV'si — tek yf.download çağrısı (thread'de çalışır). Sonuç: (n × 6) diziler."""
+    import pandas as pd
+    import yfinance as yf
+
+    veri = yf.download(semboller, start=time.strftime("%Y-%m-%d", time.gmtime(baslangic)),
+                       interval="1d", group_by="ticker", auto_adjust=True, progress=False, threads=True)
+    sonuc: Dict[str, np.ndarray] = {}
+    for sembol in semboller:
+        try:
+            df = veri[sembol] if isinstance(veri.columns, pd.MultiIndex) else veri
+        except KeyError:
+            continue
+        df = df[["Open", "High", "Low", "Close", "Volume"]].dropna(subset=["Close"])
+        if df.empty:
+            continue
+        gunler = df.index.tz_localize(None) if df.index.tz is not None else df.index
+        zaman = gunler.values.astype("datetime64[D]").astype(np.int64) * GUN
+        sonuc[sembol] = np.column_stack((zaman, df.to_numpy(dtype=np.float64)))
+    return sonuc
+
+
+async def yfinance_gunluk(semboller: List[str], baslangic: int) -> Dict[str, np.ndarray]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _yfinance_gunluk_cek, semboller, baslangic)
+
+
+class GunlukGecmis:
+    """Bellek → DB → yfinance katmanlı günlük kapanış deposu."""
+
+    def __init__(self, cekici: Optional[GecmisCekici] = None, ttl: Optional[float] = None):
+        self._cekici = cekici or yfinance_gunluk
+        self._ttl = ttl
+        # sembol → (günler, kapanışlar, yüklenme zamanı, kapsanan başlangıç)
+        self._seriler: Dict[str, Tuple[np.ndarray, np.ndarray, float, int]] = {}
+        self._kilit = asyncio.Lock()
+        self.cekim = 0
+
+    @property
+    def ttl(self) -> float:
+        return settings.CACHE_TTL_HISTORY if self._ttl is None else self._ttl
+
+    def _sicak(self, sembol: str, baslangic: int, simdi: float) -> bool:
+        kayit = self._seriler.get(sembol)
+        return kayit is not None and simdi - kayit[2] < self.ttl and kayit[3] <= baslangic
+
+    def _koy(self, sembol: str, zaman: np.ndarray, kapanis: np.ndarray, baslangic: int):
+        self._seriler[sembol] = (zaman.astype(np.int64), kapanis.astype(np.float64), time.time(), baslangic)
+
+    def _dilim(self, sembol: str, baslangic: int) -> Seri:
+        zaman, kapanis = self._seriler[sembol][:2]
+        i = int(np.searchsorted(zaman, baslangic))
+        return zaman[i:], kapanis[i:]
+
+    async def getir(self, semboller: Iterable[str], gun: int, zorla: bool = False) -> Dict[str, Seri]:
+        """
+        Son `gun` takvim gününün kapanışları; verisi hiç bulunamayan semboller sonuçta yer almaz.
+        zorla=True: bellek ve DB atlanır, tüm semboller tek istekle yeniden çekilir (gün sonu kapanışları).
+        """
+        semboller = list(dict.fromkeys(semboller))
+        baslangic = _bugun() - gun * GUN
+        simdi = time.time()
+        if zorla or any(not self._sicak(s, baslangic, simdi) for s in semboller):
+            async with self._kilit:
+                soguk = [s for s in semboller if zorla or not self._sicak(s, baslangic, time.time())]
+                if soguk:
+                    await self._doldur(soguk, baslangic, zorla)
+        sonuc = {}
+        for s in semboller:
+            seri = self._dilim(s, baslangic)
+            if len(seri[0]):
+                sonuc[s] = seri
+        return sonuc
+
+    async def _doldur(self, semboller: Sequence[str], baslangic: int, zorla: bool = False):
+        from db import kapanislari_getir, mumlari_kaydet
+
+        satirlar = await kapanislari_getir(semboller, ARALIK, baslangic)
+        db_seriler: Dict[str, List[tuple]] = {}
+        for sembol, zaman, kapanis in satirlar:
+            db_seriler.setdefault(sembol, []).append((zaman, kapanis))
+
+        son_gecerli = _bugun() - TAZELIK_GUN * GUN
+        eksik = []
+        for s in semboller:
+            seri = db_seriler.get(s)
+            if (not zorla and seri and seri[-1][0] >= son_gecerli
+                    and seri[0][0] <= baslangic + KAPSAMA_PAYI_GUN * GUN):
+                dizi = np.array(seri, dtype=np.float64)
+                self._koy(s, dizi[:, 0], dizi[:, 1], baslangic)
+            else:
+                eksik.append(s)
+        if not eksik:
+            return
+
+        self.cekim += 1
+        try:
+            cekilen = await self._cekici(eksik, baslangic)
+        except Exception as e:
+            log.error(f"❌ Günlük geçmiş çekilemedi ({len(eksik)} sembol): {e}")
+            cekilen = {}
+
+        kayitlar = []
+        for s in eksik:
+            dizi = cekilen.get(s)
+            if dizi is not None and len(dizi):
+                self._koy(s, dizi[:, 0], dizi[:, 4], baslangic)
+                kayitlar += [(s, ARALIK, int(r[0]), *map(float, r[1:])) for r in dizi]
+            elif s in db_seriler:
+                # Kaynak yanıt vermedi: eski de olsa DB'deki geçmiş kullanılır
+                dizi = np.array(db_seriler[s], dtype=np.float64)
+                self._koy(s, dizi[:, 0], dizi[:, 1], baslangic)
+            else:
+                # Verisi olmayan sembol TTL boyunca tekrar sorulmaz
+                self._koy(s, np.empty(0), np.empty(0), baslangic)
+        if kayitlar:
+            await mumlari_kaydet(kayitlar)
+            log.debug(f"🗄️ {len(cekilen)} sembolün günlük geçmişi kaydedildi ({len(kayitlar)} bar).")
+
+    def temizle(self):
+        self._seriler.clear()
+
+
+gunluk_gecmis = GunlukGecmis()
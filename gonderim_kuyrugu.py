@@ -0,0 +1,411 @@
+"""
+gonderim_kuyrugu.py — Merkezi Telegram gönderim kuyruğu (flood-control farkında).
+
+Telegram sınırları: bot genelinde ~30 mesaj/sn, sohbet başına ~1 mesaj/sn. Toplu bir
+piyasa hareketinde binlerce uyarı aynı anda tetiklendiğinde doğrudan send_message
+çağrıları 429 (RetryAfter) alır ve bildirimler kaybolur. Bu modül:
+
+  ✅ Global + sohbet başına token bucket ile hız sınırına uyar
+  ✅ Öncelik sırası: uyarılar (0) > normal (5) > özetler (9); aynı öncelikte FIFO
+  ✅ RetryAfter: sohbet retry_after süresince bekletilir, global kova boşaltılır
+  ✅ Geçici hatalarda üstel geri çekilme (MAX_DENEME), kalıcı hatalarda (engellendi,
+     sohbet yok) mesaj atılır
+  ✅ SQLite'a yazılır (gonderim_kuyrugu tablosu): yeniden başlatmada kaybolmaz
+  ✅ uyari_id taşıyan mesaj başarıyla gönderilince uyarı, satırla aynı işlemde
+     silinir; aynı uyarı kuyruktayken tekrar eklenmez
+  ✅ Tablo süreçler arası giden kutusudur: ek uyarı süreçleri (uyari_isci.py,
+     gonderici=False) yalnızca satır yazar, bot süreci tabloyu periyodik tarayıp gönderir
+  ✅ Metrikler: telegram_queue_depth, telegram_send_lag_seconds, telegram_send_total
+
+Kullanım:
+    asyncio.create_task(gonderim_kuyrugu.calistir(bot))         # main.py
+    await gonderim_kuyrugu.ekle(user_id, metin, oncelik=ONCELIK_UYARI, uyari_id=5)
+"""
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramForbiddenError, TelegramNotFound, TelegramRetryAfter,
+)
+from prometheus_client import Counter, Gauge, Histogram
+
+from config import settings
+from db import gonderim_ekle, gonderim_sil, gonderim_deneme_guncelle, gonderimleri_getir, uyari_sil
+
+log = logging.getLogger("finans_botu")
+
+ONCELIK_UYARI = 0
+ONCELIK_NORMAL = 5
+ONCELIK_OZET = 9
+_ONCELIK_ADI = {ONCELIK_UYARI: "uyari", ONCELIK_NORMAL: "normal", ONCELIK_OZET: "ozet"}
+
+MAX_DENEME = 5
+ESZAMANLI_GONDERIM = 16     # Aynı anda uçuşta olabilecek en fazla istek
+
+KUYRUK_DERINLIGI = Gauge(
+    'telegram_queue_depth', 'Gönderim kuyruğunda bekleyen mesaj sayısı', ['oncelik']
+)
+GONDERIM_GECIKMESI = Histogram(
+    'telegram_send_lag_seconds', 'Kuyruğa eklenmeden Telegram\'a gönderilene kadar geçen süre',
+    buckets=(0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+GONDERIM_SONUCU = Counter(
+    'telegram_send_total', 'Telegram gönderim denemeleri', ['sonuc']
+)
+
+
+# ═══════════════════════════════════════════════════════════════
+# TOKEN BUCKET
+# ═══════════════════════════════════════════════════════════════
+
+class TokenKovasi:
+    """Saniyede `hiz` jeton dolan, en fazla `kapasite` jeton tutan kova (monotonic saat)."""
+    __slots__ = ("hiz", "kapasite", "jeton", "son", "kilit")
+
+    def __init__(self, hiz: float, kapasite: Optional[float] = None):
+        self.hiz = hiz
+        self.kapasite = kapasite if kapasite is not None else max(1.0, hiz)
+        self.jeton = self.kapasite
+        self.son = time.monotonic()
+        self.kilit = 0.0   # RetryAfter: bu ana kadar hiç gönderim yok
+
+    def _doldur(self, simdi: float):
+        if simdi > self.son:
+            self.jeton = min(self.kapasite, self.jeton + (simdi - self.son) * self.hiz)
+            self.son = simdi
+
+    def bekleme(self, simdi: float) -> float:
+        """Bir jeton için beklenecek süre (0 → hemen gönderilebilir)."""
+        self._doldur(simdi)
+        jeton_bekleme = 0.0 if self.jeton >= 1 else (1 - self.jeton) / self.hiz
+        return max(jeton_bekleme, self.kilit - simdi, 0.0)
+
+    def al(self, simdi: float):
+        self._doldur(simdi)
+        self.jeton -= 1
+
+    def bosalt(self, simdi: float):
+        self._doldur(simdi)
+        self.jeton = min(self.jeton, 0.0)
+
+    def dolu_mu(self, simdi: float) -> bool:
+        self._doldur(simdi)
+        return self.jeton >= self.kapasite and self.kilit <= simdi
+
+
+# ═══════════════════════════════════════════════════════════════
+# KUYRUK
+# ═══════════════════════════════════════════════════════════════
+
+@dataclass
+class Gonderi:
+    chat_id: int
+    metin: str
+    oncelik: int = ONCELIK_NORMAL
+    parse_mode: Optional[str] = "HTML"
+    uyari_id: Optional[int] = None
+    olusturma: float = field(default_factory=time.time)   # Duvar saati (yeniden başlatmayı aşar)
+    deneme: int = 0
+    id: Optional[int] = None                              # gonderim_kuyrugu satır id'si
+    sira: int = 0                                         # Aynı öncelikte FIFO
+    gonderildi: Optional[Callable[[], Any]] = field(default=None, repr=False)   # Yalnızca bellekte
+
+
+class GonderimKuyrugu:
+    """
+    Sohbet başına öncelik kuyrukları + hazır sohbetler yığını.
+
+        _sohbetler[chat]  → [(oncelik, sira, Gonderi)]  (heap)
+        _hazir            → [(oncelik, sira, chat)]     jetonu hazır sohbetler (tembel silme)
+        _park             → [(zaman, chat)]             jeton / RetryAfter bekleyen sohbetler
+
+    Bir sohbette aynı anda tek istek uçuştadır; sıralama böylece korunur.
+    gonderici=False iken mesajlar yalnızca veritabanına yazılır (gönderimi bot süreci yapar).
+    """
+
+    def __init__(self, global_hiz: Optional[float] = None, sohbet_hiz: Optional[float] = None,
+                 eszamanli: int = ESZAMANLI_GONDERIM, kalici: bool = True, gonderici: bool = True):
+        self.global_hiz = global_hiz or settings.TELEGRAM_GLOBAL_RATE
+        self.sohbet_hiz = sohbet_hiz or settings.TELEGRAM_CHAT_RATE
+        self.eszamanli = eszamanli
+        self.kalici = kalici
+        self.gonderici = gonderici
+        self._global = TokenKovasi(self.global_hiz)        # 1 sn'lik patlamaya izin verir
+        self._kovalar: Dict[int, TokenKovasi] = {}
+        self._sohbetler: Dict[int, List[Tuple[int, int, Gonderi]]] = {}
+        self._durum: Dict[int, str] = {}    # chat → "hazir" | "park" | "mesgul"
+        self._hazir: List[Tuple[int, int, int]] = []
+        self._park: List[Tuple[float, int]] = []
+        self._uyari_idleri: Set[int] = set()
+        self._idler: Set[int] = set()       # Bellekte / uçuşta olan satır id'leri
+        self._bitenler: Set[int] = set()    # Biten ama henüz taranmamış satırlar (eski okumayla geri gelmesin)
+        self._son_id = 0                    # Taranan en büyük satır id'si
+        self._derinlik: Dict[int, int] = {}
+        self._sayac = itertools.count()
+        self._olay = asyncio.Event()
+        self._gorevler: Set[asyncio.Task] = set()
+        self._yuklendi = False
+        self.bot = None
+
+    def __len__(self):
+        return sum(self._derinlik.values())
+
+    # ── Ekleme ────────────────────────────────────────────────────
+
+    async def ekle(self, chat_id: int, metin: str, oncelik: int = ONCELIK_NORMAL,
+                   parse_mode: Optional[str] = "HTML", uyari_id: Optional[int] = None,
+                   gonderildi: Optional[Callable[[], Any]] = None) -> bool:
+        """Mesajı kuyruğa (ve veritabanına) ekler. Aynı uyarı zaten kuyruktaysa False."""
+        if uyari_id is not None and uyari_id in self._uyari_idleri:
+            return False
+        g = Gonderi(chat_id, metin, oncelik, parse_mode, uyari_id, gonderildi=gonderildi)
+        if uyari_id is not None:
+            self._uyari_idleri.add(uyari_id)   # await öncesi: eşzamanlı tetiklemeler çift eklemesin
+        if self.kalici:
+            try:
+                g.id = await gonderim_ekle(g.chat_id, g.metin, g.parse_mode, g.oncelik, g.uyari_id, g.olusturma)
+            except Exception:
+                self._uyari_idleri.discard(uyari_id)
+                raise
+            if g.id is None or not self.gonderici:
+                # Uyarı silinmiş / başka süreç kuyruğa almış ya da gönderim bot sürecinde
+                self._uyari_idleri.discard(uyari_id)
+                return g.id is not None
+        self._kuyruga_al(g)
+        return True
+
+    async def yukle(self):
+        """
+        Veritabanındaki yeni satırları kuyruğa alır: açılışta önceki çalışmadan kalanlar,
+        sonrasında diğer süreçlerin eklediği mesajlar (calistir periyodik çağırır).
+        """
+        satirlar = await gonderimleri_getir(self._son_id)
+        yeni = 0
+        for s in satirlar:
+            self._son_id = max(self._son_id, s["id"])
+            if s["id"] in self._idler or s["id"] in self._bitenler:
+                continue   # Bu sürecin ekle() ile aldığı satır
+            g = Gonderi(s["chat_id"], s["metin"], s["oncelik"], s["parse_mode"], s["uyari_id"],
+                        s["olusturma"], s["deneme"], s["id"])
+            if g.uyari_id is not None:
+                self._uyari_idleri.add(g.uyari_id)
+            self._kuyruga_al(g)
+            yeni += 1
+        self._bitenler = {i for i in self._bitenler if i > self._son_id}
+        if yeni:
+            kaynak = "diğer süreçlerden" if self._yuklendi else "önceki çalışmadan"
+            (log.debug if self._yuklendi else log.info)(
+                f"📨 Gönderim kuyruğu: {kaynak} {yeni} mesaj yüklendi.")
+        self._yuklendi = True
+
+    def _kuyruga_al(self, g: Gonderi):
+        if g.id is not None:
+            if g.id in self._idler:
+                return   # ekle() ile yukle() aynı satırı yakaladı
+            self._idler.add(g.id)
+        g.sira = next(self._sayac)
+        heapq.heappush(self._sohbetler.setdefault(g.chat_id, []), (g.oncelik, g.sira, g))
+        self._derinlik_degis(g.oncelik, +1)
+        durum = self._durum.get(g.chat_id)
+        if durum is None:
+            self._sohbet_planla(g.chat_id, time.monotonic())
+        elif durum == "hazir":
+            # Baştaki mesaj değişmiş olabilir (daha yüksek öncelik); eski girdi tembel silinir
+            bas = self._sohbetler[g.chat_id][0]
+            heapq.heappush(self._hazir, (bas[0], bas[1], g.chat_id))
+        self._olay.set()
+
+    def _derinlik_degis(self, oncelik: int, fark: int):
+        self._derinlik[oncelik] = self._derinlik.get(oncelik, 0) + fark
+        KUYRUK_DERINLIGI.labels(oncelik=_ONCELIK_ADI.get(oncelik, str(oncelik))).set(self._derinlik[oncelik])
+
+    # ── Planlama ──────────────────────────────────────────────────
+
+    def _kova(self, chat_id: int) -> TokenKovasi:
+        kova = self._kovalar.get(chat_id)
+        if kova is None:
+            # Sohbet başına patlama yok: ardışık mesajlar en az 1/sohbet_hiz arayla
+            kova = self._kovalar[chat_id] = TokenKovasi(self.sohbet_hiz, kapasite=1.0)
+        return kova
+
+    def _sohbet_planla(self, chat_id: int, simdi: float):
+        """Sohbeti hazır yığınına ya da jeton zamanına kadar park yığınına koyar."""
+        heap = self._sohbetler.get(chat_id)
+        if not heap:
+            self._sohbetler.pop(chat_id, None)
+            self._durum.pop(chat_id, None)
+            kova = self._kovalar.get(chat_id)
+            if kova is not None and kova.dolu_mu(simdi):
+                del self._kovalar[chat_id]
+            return
+        bekleme = self._kova(chat_id).bekleme(simdi)
+        if bekleme > 0:
+            heapq.heappush(self._park, (simdi + bekleme, chat_id))
+            self._durum[chat_id] = "park"
+        else:
+            heapq.heappush(self._hazir, (heap[0][0], heap[0][1], chat_id))
+            self._durum[chat_id] = "hazir"
+
+    def _hazir_bas(self) -> Optional[int]:
+        """Geçerli en öncelikli hazır sohbet (eskimiş girdileri atar)."""
+        while self._hazir:
+            oncelik, sira, chat_id = self._hazir[0]
+            heap = self._sohbetler.get(chat_id)
+            if self._durum.get(chat_id) == "hazir" and heap and heap[0][1] == sira:
+                return chat_id
+            heapq.heappop(self._hazir)
+        return None
+
+    def _parktan_cikar(self, simdi: float):
+        while self._park and self._park[0][0] <= simdi:
+            _, chat_id = heapq.heappop(self._park)
+            if self._durum.get(chat_id) == "park":
+                self._sohbet_planla(chat_id, simdi)
+
+    def _kovalari_temizle(self, simdi: float):
+        for chat_id in [c for c, k in self._kovalar.items()
+                        if c not in self._durum and k.dolu_mu(simdi)]:
+            del self._kovalar[chat_id]
+
+    # ── Çalıştırma ────────────────────────────────────────────────
+
+    async def calistir(self, bot):
+        """Dağıtıcı döngü (main.py arka plan görevi)."""
+        self.bot = bot
+        if self.kalici and not self._yuklendi:
+            await self.yukle()
+        sinir = asyncio.Semaphore(self.eszamanli)
+        son_temizlik = son_tarama = time.monotonic()
+        tarama_sn = settings.TELEGRAM_OUTBOX_POLL_SECONDS
+        log.info("📨 Telegram gönderim kuyruğu başlatıldı.")
+        while True:
+            simdi = time.monotonic()
+            if self.kalici and simdi - son_tarama >= tarama_sn:
+                son_tarama = simdi
+                try:
+                    await self.yukle()
+                except Exception as e:
+                    log.error(f"Gönderim kuyruğu taranamadı: {e}")
+                simdi = time.monotonic()
+            self._parktan_cikar(simdi)
+            if simdi - son_temizlik > 60:
+                self._kovalari_temizle(simdi)
+                son_temizlik = simdi
+
+            chat_id = self._hazir_bas()
+            if chat_id is None:
+                zaman_asimi = self._park[0][0] - simdi if self._park else None
+                if self.kalici:
+                    kalan = max(0.0, son_tarama + tarama_sn - simdi)
+                    zaman_asimi = kalan if zaman_asimi is None else min(zaman_asimi, kalan)
+                self._olay.clear()
+                try:
+                    await asyncio.wait_for(self._olay.wait(), zaman_asimi)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            bekleme = self._global.bekleme(simdi)
+            if bekleme > 0:
+                await asyncio.sleep(bekleme)
+                continue
+
+            await sinir.acquire()
+            # acquire sırasında durum değişmiş olabilir
+            if self._hazir_bas() != chat_id:
+                sinir.release()
+                continue
+            heapq.heappop(self._hazir)
+            _, _, g = heapq.heappop(self._sohbetler[chat_id])
+            self._derinlik_degis(g.oncelik, -1)
+            self._durum[chat_id] = "mesgul"
+            simdi = time.monotonic()
+            self._global.al(simdi)
+            self._kova(chat_id).al(simdi)
+            gorev = asyncio.create_task(self._gonder(g, sinir))
+            self._gorevler.add(gorev)
+            gorev.add_done_callback(self._gorevler.discard)
+
+    async def _gonder(self, g: Gonderi, sinir: asyncio.Semaphore):
+        try:
+            await self.bot.send_message(g.chat_id, g.metin, parse_mode=g.parse_mode)
+        except TelegramRetryAfter as e:
+            simdi = time.monotonic()
+            self._kova(g.chat_id).kilit = simdi + e.retry_after
+            self._global.bosalt(simdi)
+            GONDERIM_SONUCU.labels(sonuc="retry_after").inc()
+            log.warning(f"Telegram flood control: chat {g.chat_id}, {e.retry_after}s bekleniyor.")
+            self._geri_koy(g)
+        except (TelegramForbiddenError, TelegramBadRequest, TelegramNotFound) as e:
+            # Kalıcı hata: kullanıcı botu engelledi / sohbet yok / mesaj geçersiz — tekrar denemek anlamsız
+            GONDERIM_SONUCU.labels(sonuc="kalici_hata").inc()
+            log.warning(f"Mesaj atıldı (chat {g.chat_id}): {e}")
+            await self._bitir(g, uyariyi_sil=True)
+        except asyncio.CancelledError:
+            raise   # Satır veritabanında kalır, sonraki açılışta yeniden denenir
+        except Exception as e:
+            g.deneme += 1
+            if g.deneme >= MAX_DENEME:
+                GONDERIM_SONUCU.labels(sonuc="dusuruldu").inc()
+                log.error(f"Mesaj {g.deneme} denemede gönderilemedi (chat {g.chat_id}): {e}")
+                await self._bitir(g, uyariyi_sil=False)
+            else:
+                GONDERIM_SONUCU.labels(sonuc="hata").inc()
+                log.warning(f"Gönderim hatası (chat {g.chat_id}, deneme {g.deneme}): {e}")
+                self._kova(g.chat_id).kilit = time.monotonic() + min(2 ** g.deneme, 60)
+                if self.kalici and g.id is not None:
+                    await gonderim_deneme_guncelle(g.id, g.deneme)
+                self._geri_koy(g)
+        else:
+            GONDERIM_SONUCU.labels(sonuc="ok").inc()
+            GONDERIM_GECIKMESI.observe(max(0.0, time.time() - g.olusturma))
+            if g.gonderildi is not None:
+                g.gonderildi()
+            await self._bitir(g, uyariyi_sil=True)
+        finally:
+            sinir.release()
+            if self._durum.get(g.chat_id) == "mesgul":
+                self._sohbet_planla(g.chat_id, time.monotonic())
+            self._olay.set()
+
+    def _geri_koy(self, g: Gonderi):
+        """Mesajı aynı sırasıyla sohbet kuyruğunun başına geri koyar."""
+        heapq.heappush(self._sohbetler.setdefault(g.chat_id, []), (g.oncelik, g.sira, g))
+        self._derinlik_degis(g.oncelik, +1)
+
+    async def _bitir(self, g: Gonderi, uyariyi_sil: bool):
+        uyari_id = g.uyari_id if uyariyi_sil else None
+        try:
+            if self.kalici and g.id is not None:
+                await gonderim_sil(g.id, uyari_id)   # Satır + uyarı tek işlemde
+            elif uyari_id is not None:
+                await uyari_sil(uyari_id)
+        finally:
+            if g.id is not None:
+                self._idler.discard(g.id)
+                if g.id > self._son_id:
+                    self._bitenler.add(g.id)
+            if g.uyari_id is not None:
+                self._uyari_idleri.discard(g.uyari_id)
+
+    async def bosalt(self, bot, zaman_asimi: float = 10.0):
+        """Kuyruk ve uçuştaki istekler bitene kadar çalıştırır (testler / toplu gönderimler)."""
+        gorev = asyncio.create_task(self.calistir(bot))
+        try:
+            sinir = time.monotonic() + zaman_asimi
+            while len(self) or self._gorevler:
+                if time.monotonic() > sinir:
+                    raise asyncio.TimeoutError(f"Gönderim kuyruğu boşalmadı ({len(self)} mesaj)")
+                await asyncio.sleep(0.01)
+        finally:
+            gorev.cancel()
+            await asyncio.gather(gorev, return_exceptions=True)
+
+
+# Global kuyruk (alert_motoru ve diğer bildirimler bunu kullanır)
+gonderim_kuyrugu = GonderimKuyrugu()
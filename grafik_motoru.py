@@ -0,0 +1,389 @@
+"""
+grafik_motoru.py — Tarayıcısız yerel mum grafiği (mplfinance).
+
+AKIŞ:
+  1. Cache anahtarı: (sembol, zaman dilimi, CHART_CACHE_TTL zaman dilimi, overlay kümesi).
+     Aynı anahtar daha önce çizildiyse PNG, veri hiç çekilmeden diskten döner.
+     PNG dosya adı anahtarın kendisidir (anahtar_yoldan).
+  2. Cache'te yoksa OHLCV verisi taze_ticker() ile çekilir (thread executor — ağ I/O).
+  3. Çizim ayrı bir süreç havuzunda yapılır: matplotlib + indikatör döngüleri
+     GIL'i tutar, event loop'u asla bloklamaz.
+  4. Aynı anahtar için eşzamanlı istekler tek veri çekimini ve tek çizimi paylaşır.
+
+✅ Overlay'ler teknik_analiz ile birebir aynı fonksiyonlardan gelir:
+   Supertrend (3, 10), AlphaTrend (1, 14), Bollinger (20, 2), Ichimoku (9, 26, 52).
+✅ Selenium/Chrome gerekmez; TradingView motoru başarısız olursa yedek olarak da kullanılır.
+✅ Telegram file_id cache: aynı grafik ikinci kez yüklenmez, file_id ile gönderilir.
+"""
+import io
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import tempfile
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Iterable, Tuple, Dict
+
+from prometheus_client import Counter, Histogram
+
+from config import settings
+from cache_yonetici import taze_ticker
+
+log = logging.getLogger("finans_botu")
+
+# ═══════════════════════════════════════════════════════════════
+# AYARLAR
+# ═══════════════════════════════════════════════════════════════
+
+OVERLAYLER = ("supertrend", "alphatrend", "bollinger", "ichimoku")
+VARSAYILAN_OVERLAYLER = frozenset({"supertrend", "bollinger"})
+
+ZAMAN_DILIMI = "1d"      # Yerel grafiğin bar aralığı (cache anahtarına girer)
+VERI_PERIYODU = "1y"     # İndikatörlerin ısınması için çizilenden uzun geçmiş
+BAR_SAYISI = 120         # Grafikte gösterilecek son bar sayısı
+MIN_BAR = 60
+
+CHART_RENDER_SURESI = Histogram('chart_render_seconds', 'Yerel grafik çizim süresi')
+CHART_CACHE = Counter('chart_cache_total', 'Yerel grafik PNG cache erişimleri', ['sonuc'])
+
+
+# ═══════════════════════════════════════════════════════════════
+# ÇİZİM (süreç havuzunda çalışır)
+# ═══════════════════════════════════════════════════════════════
+
+def _ciz_png(df, overlaylar: Tuple[str, ...], baslik: str, bar_sayisi: int = BAR_SAYISI) -> bytes:
+    """
+    (Worker süreci) OHLCV DataFrame'inden overlay'li mum grafiği çizer, PNG byte döner.
+    İndikatörler tüm geçmiş üzerinde hesaplanır, yalnızca son `bar_sayisi` bar çizilir.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import mplfinance as mpf
+    from teknik_analiz import _supertrend, _alphatrend, _bollinger, _ichimoku
+
+    h, l, c, v = df["High"], df["Low"], df["Close"], df["Volume"]
+    pencere = df.iloc[-bar_sayisi:]
+    ekler = []
+    dolgular = []
+
+    def _ekle(seri, **kw):
+        seri = seri.iloc[-bar_sayisi:]
+        if seri.notna().any():   # mplfinance tamamen NaN seriyi çizemez
+            ekler.append(mpf.make_addplot(seri, **kw))
+
+    if "bollinger" in overlaylar:
+        orta, ust, alt = _bollinger(c)
+        _ekle(ust, color="#2962ff", width=0.8)
+        _ekle(orta, color="#ff6d00", width=0.8)
+        _ekle(alt, color="#2962ff", width=0.8)
+
+    if "ichimoku" in overlaylar:
+        tenkan, kijun, sa, sb = _ichimoku(h, l)
+        _ekle(tenkan, color="#2962ff", width=0.8)
+        _ekle(kijun, color="#b71c1c", width=0.8)
+        sa_p, sb_p = sa.iloc[-bar_sayisi:], sb.iloc[-bar_sayisi:]
+        if sa_p.notna().any() and sb_p.notna().any():
+            y1, y2 = sa_p.to_numpy(), sb_p.to_numpy()
+            dolgular.append(dict(y1=y1, y2=y2, where=y1 >= y2, color="#26a69a", alpha=0.15))
+            dolgular.append(dict(y1=y1, y2=y2, where=y1 < y2, color="#ef5350", alpha=0.15))
+
+    if "supertrend" in overlaylar:
+        st, yon = _supertrend(h, l, c)
+        _ekle(st.where(yon == -1), color="#26a69a", width=1.2)   # yükselen trend (destek)
+        _ekle(st.where(yon == 1), color="#ef5350", width=1.2)    # düşen trend (direnç)
+
+    if "alphatrend" in overlaylar:
+        at = _alphatrend(h, l, c, v)
+        _ekle(at.where(at != 0), color="#0022fc", width=1.2)
+        _ekle(at.shift(2).where(at.shift(2) != 0), color="#fc0400", width=1.2)
+
+    stil = mpf.make_marketcolors(up="#26a69a", down="#ef5350", inherit=True)
+    tampon = io.BytesIO()
+    kw = dict(
+        type="candle", volume=bool(pencere["Volume"].fillna(0).any()),
+        style=mpf.make_mpf_style(base_mpf_style="yahoo", marketcolors=stil),
+        title=baslik, figsize=(12, 7), tight_layout=True,
+        savefig=dict(fname=tampon, dpi=100, format="png"),
+    )
+    if ekler:
+        kw["addplot"] = ekler
+    if dolgular:
+        kw["fill_between"] = dolgular
+    try:
+        mpf.plot(pencere, **kw)
+    finally:
+        plt.close("all")
+    return tampon.getvalue()
+
+
+def _performans_png(gunler, deger, maliyet, twr, baslik: str) -> bytes:
+    """
+    (Worker süreci) Portföy performans grafiği: üstte değer ve maliyet, altta kümülatif
+    zaman ağırlıklı getiri (%). gunler: UTC gün numaraları.
+    """
+    import numpy as np
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    tarih = np.asarray(gunler, dtype="datetime64[D]")
+    yuzde = np.asarray(twr) * 100
+    fig, (ust, alt) = plt.subplots(2, 1, figsize=(12, 7), sharex=True, height_ratios=(3, 2))
+    try:
+        ust.plot(tarih, deger, color="#2962ff", linewidth=1.6, label="Değer")
+        ust.plot(tarih, maliyet, color="#787b86", linewidth=1.0, linestyle="--", label="Maliyet")
+        ust.set_title(baslik)
+        ust.legend(loc="upper left")
+        ust.grid(alpha=0.3)
+
+        alt.plot(tarih, yuzde, color="#26a69a", linewidth=1.2)
+        alt.fill_between(tarih, yuzde, 0, where=yuzde >= 0, color="#26a69a", alpha=0.2)
+        alt.fill_between(tarih, yuzde, 0, where=yuzde < 0, color="#ef5350", alpha=0.2)
+        alt.axhline(0, color="#787b86", linewidth=0.8)
+        alt.set_ylabel("Getiri (TWR) %")
+        alt.grid(alpha=0.3)
+        fig.autofmt_xdate()
+        fig.tight_layout()
+
+        tampon = io.BytesIO()
+        fig.savefig(tampon, dpi=100, format="png")
+    finally:
+        plt.close(fig)
+    return tampon.getvalue()
+
+
+# ═══════════════════════════════════════════════════════════════
+# VERİ + CACHE
+# ═══════════════════════════════════════════════════════════════
+
+def _ohlcv_cek(sembol: str, periyot: str = VERI_PERIYODU):
+    """(Thread executor) Sembolün OHLCV geçmişini döndürür."""
+    df = taze_ticker(sembol).history(period=periyot)
+    if df is None or df.empty:
+        return None
+    return df[["Open", "High", "Low", "Close", "Volume"]].dropna(subset=["Open", "High", "Low", "Close"])
+
+
+def overlay_normalize(overlaylar: Optional[Iterable[str]]) -> frozenset:
+    """Overlay adlarını küçük harfe çevirir, bilinmeyenleri atar."""
+    if overlaylar is None:
+        return VARSAYILAN_OVERLAYLER
+    return frozenset(o.lower().strip() for o in overlaylar if o.lower().strip() in OVERLAYLER)
+
+
+def cache_anahtari(sembol: str, zaman_dilimi: str, surum, overlaylar: Iterable[str]) -> str:
+    """(sembol, zaman dilimi, sürüm, overlay kümesi) → dosya adı güvenli kısa hash."""
+    ham = f"{sembol.upper()}|{zaman_dilimi}|{surum}|{','.join(sorted(overlaylar))}"
+    return hashlib.sha1(ham.encode("utf-8")).hexdigest()[:24]
+
+
+def yerel_anahtari(sembol: str, overlaylar: Iterable[str], simdi: Optional[float] = None) -> str:
+    """
+    Yerel grafik anahtarı. Günlük son bar seans boyunca değiştiği için sürüm
+    olarak CHART_CACHE_TTL'lik zaman dilimi kullanılır: anahtar veri çekilmeden
+    hesaplanır, fiyat hareket ettikçe grafik en geç bu süre sonra yenilenir.
+    """
+    ttl = max(1, settings.CHART_CACHE_TTL)
+    dilim = int((time.time() if simdi is None else simdi) // ttl)
+    return cache_anahtari(sembol, ZAMAN_DILIMI, f"t{dilim}", overlaylar)
+
+
+def tv_anahtari(sembol: str, zaman_dilimi: str = "1D", simdi: Optional[float] = None) -> str:
+    """
+    TradingView ekran görüntüsü için anahtar. Bar zamanı bilinmediğinden
+    dakika dilimi kullanılır: aynı dakikadaki istekler aynı görüntüyü paylaşır.
+    """
+    dakika = int((time.time() if simdi is None else simdi) // 60)
+    return cache_anahtari(sembol, f"tv:{zaman_dilimi}", dakika, ())
+
+
+def cache_yolu(anahtar: str) -> str:
+    """Anahtarın paylaşılan PNG yolu."""
+    return os.path.join(settings.CHART_CACHE_DIR, f"{anahtar}.png")
+
+
+def anahtar_yoldan(yol: str) -> str:
+    """cache_yolu()'nun tersi."""
+    return os.path.splitext(os.path.basename(yol))[0]
+
+
+_GECICI_ONEK = "istek_"
+
+
+def gecici_yol() -> str:
+    """
+    İsteğe özel geçici PNG yolu (eşzamanlı istekler birbirinin dosyasını ezmez).
+    Çağıran, dosyayı cache_yolu()'na taşımak veya silmekle yükümlüdür.
+    """
+    os.makedirs(settings.CHART_CACHE_DIR, exist_ok=True)
+    fd, yol = tempfile.mkstemp(prefix=_GECICI_ONEK, suffix=".png", dir=settings.CHART_CACHE_DIR)
+    os.close(fd)
+    return yol
+
+
+def _cache_yaz(yol: str, png: bytes):
+    """(Thread executor) PNG'yi atomik yazar, cache sınırını aşan en eski dosyaları siler."""
+    os.makedirs(os.path.dirname(yol), exist_ok=True)
+    gecici = f"{yol}.{os.getpid()}.tmp"
+    with open(gecici, "wb") as f:
+        f.write(png)
+    os.replace(gecici, yol)
+    _cache_buda(yol)
+
+
+def cache_tasi(kaynak: str, yol: str):
+    """(Thread executor) Hazır PNG'yi (ör. TradingView çekimi) cache'e taşır, sınırı uygular."""
+    os.replace(kaynak, yol)
+    _cache_buda(yol)
+
+
+def _cache_buda(yol: str):
+    """CHART_CACHE_MAX'ı aşan en eski PNG'leri siler; yeni yazılan `yol` korunur."""
+    try:
+        dosyalar = [e for e in os.scandir(os.path.dirname(yol))
+                    if e.name.endswith(".png") and not e.name.startswith(_GECICI_ONEK)]
+        fazla = len(dosyalar) - settings.CHART_CACHE_MAX
+        if fazla > 0:
+            adaylar = sorted((e for e in dosyalar if e.path != yol), key=lambda e: e.stat().st_mtime)
+            for e in adaylar[:fazla]:
+                os.remove(e.path)
+    except OSError as e:
+        log.debug(f"Grafik cache temizliği başarısız: {e}")
+
+
+# ═══════════════════════════════════════════════════════════════
+# TELEGRAM file_id CACHE
+# ═══════════════════════════════════════════════════════════════
+# Telegram bir fotoğrafı ilk yüklemede file_id ile döndürür; aynı file_id ile
+# yapılan gönderimler dosyayı yeniden yüklemez. Anahtar: yukarıdaki grafik anahtarı.
+
+FILE_ID_MAX = 2000
+_file_idler: "OrderedDict[str, str]" = OrderedDict()
+
+
+def file_id_al(anahtar: str) -> Optional[str]:
+    file_id = _file_idler.get(anahtar)
+    if file_id is not None:
+        _file_idler.move_to_end(anahtar)
+        CHART_CACHE.labels(sonuc="file_id").inc()
+    return file_id
+
+
+def file_id_kaydet(anahtar: str, file_id: str):
+    _file_idler[anahtar] = file_id
+    _file_idler.move_to_end(anahtar)
+    while len(_file_idler) > FILE_ID_MAX:
+        _file_idler.popitem(last=False)
+
+
+def file_id_sil(anahtar: str):
+    """Telegram file_id'yi reddederse (süresi dolmuş vb.) çağrılır."""
+    _file_idler.pop(anahtar, None)
+
+
+# ═══════════════════════════════════════════════════════════════
+# SÜREÇ HAVUZU
+# ═══════════════════════════════════════════════════════════════
+
+_havuz: Optional[ProcessPoolExecutor] = None
+_ucustaki: Dict[str, asyncio.Task] = {}
+
+
+def _havuz_al() -> ProcessPoolExecutor:
+    """Çizim süreç havuzunu ilk kullanımda oluşturur."""
+    global _havuz
+    if _havuz is None:
+        # spawn: bot süreci thread'li (asyncio + executor), fork güvenli değil
+        _havuz = ProcessPoolExecutor(
+            max_workers=max(1, settings.CHART_RENDER_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        log.info(f"🎨 Grafik çizim havuzu başlatıldı ({settings.CHART_RENDER_WORKERS} süreç).")
+    return _havuz
+
+
+async def kapat():
+    """Süreç havuzunu kapatır (main.py shutdown uyumlu)."""
+    global _havuz
+    if _havuz is not None:
+        havuz, _havuz = _havuz, None
+        await asyncio.get_running_loop().run_in_executor(None, havuz.shutdown)
+        log.info("🔌 Grafik çizim havuzu kapatıldı.")
+
+
+# ═══════════════════════════════════════════════════════════════
+# ANA FONKSİYON
+# ═══════════════════════════════════════════════════════════════
+
+async def _getir_ve_ciz(sembol: str, overlaylar: frozenset, yol: str) -> Optional[str]:
+    """OHLCV verisini çeker, grafiği çizip cache yoluna yazar."""
+    loop = asyncio.get_running_loop()
+    try:
+        df = await loop.run_in_executor(None, _ohlcv_cek, sembol)
+    except Exception as e:
+        log.error(f"❌ Grafik verisi alınamadı ({sembol}): {e}")
+        return None
+    if df is None or len(df) < MIN_BAR:
+        log.warning(f"Grafik için yetersiz veri: {sembol} ({0 if df is None else len(df)} bar)")
+        return None
+
+    etiket = ", ".join(o.capitalize() for o in sorted(overlaylar))
+    baslik = f"{sembol.upper()} — {etiket}" if etiket else sembol.upper()
+    t0 = time.perf_counter()
+    try:
+        png = await loop.run_in_executor(
+            _havuz_al(), _ciz_png, df, tuple(sorted(overlaylar)), baslik, BAR_SAYISI
+        )
+        await loop.run_in_executor(None, _cache_yaz, yol, png)
+    except Exception as e:
+        log.error(f"❌ Yerel grafik çizilemedi ({baslik}): {e}")
+        return None
+    sure = time.perf_counter() - t0
+    CHART_RENDER_SURESI.observe(sure)
+    log.info(f"🎨 Grafik çizildi: {baslik} ({sure * 1000:.0f} ms)")
+    return yol
+
+
+async def grafik_ciz(sembol: str, overlaylar: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Sembolün overlay'li mum grafiğini çizer ve cache'teki PNG yolunu döndürür.
+
+    Args:
+        sembol: yfinance sembolü (örn: "THYAO.IS", "BTC-USD")
+        overlaylar: OVERLAYLER alt kümesi; None → VARSAYILAN_OVERLAYLER
+
+    Returns:
+        PNG dosya yolu (paylaşılan cache dosyası — üzerine yazmayın) veya None
+    """
+    secili = overlay_normalize(overlaylar)
+    anahtar = yerel_anahtari(sembol, secili)
+    yol = cache_yolu(anahtar)
+    if os.path.exists(yol):
+        CHART_CACHE.labels(sonuc="hit").inc()
+        return yol
+    CHART_CACHE.labels(sonuc="miss").inc()
+
+    # Aynı anahtar zaten hazırlanıyorsa o çekim + çizimi bekle
+    gorev = _ucustaki.get(anahtar)
+    if gorev is None:
+        gorev = asyncio.create_task(_getir_ve_ciz(sembol, secili, yol))
+        _ucustaki[anahtar] = gorev
+        gorev.add_done_callback(lambda _: _ucustaki.pop(anahtar, None))
+    return await asyncio.shield(gorev)
+
+
+async def performans_grafigi(gunler, deger, maliyet, twr, baslik: str) -> Optional[bytes]:
+    """Portföy performans grafiğini süreç havuzunda çizer; PNG byte (cache'lenmez — kullanıcıya özel)."""
+    loop = asyncio.get_running_loop()
+    t0 = time.perf_counter()
+    try:
+        png = await loop.run_in_executor(_havuz_al(), _performans_png, gunler, deger, maliyet, twr, baslik)
+    except Exception as e:
+        log.error(f"❌ Performans grafiği çizilemedi ({baslik}): {e}")
+        return None
+    CHART_RENDER_SURESI.observe(time.perf_counter() - t0)
+    return png
@@ -0,0 +1,580 @@
+"""
+kosul_motoru.py — Koşul uyarıları: mini dil, derleyici ve toplu (vektörel) değerlendirme.
+
+Kullanıcı bir koşul yazar:
+
+    /uyari THYAO kosul kapanis yukari_keser sma(50)
+    /uyari AAPL  kosul hacim > 3 * sma(hacim, 20) ve rsi(14) < 70
+    /uyari BTC-USD kosul supertrend(10, 3) yukari_keser 0
+
+Koşul ağaç olarak derlenir; tüm aktif koşul uyarılarının ağaçları tek bir Plan'da
+birleştirilir. Aynı alt ifade (ör. sma(kapanis, 50)) kaç uyarıda geçerse geçsin bir kez
+hesaplanır ve her düğüm sembol × bar matrisinin tamamı üzerinde tek NumPy geçişiyle
+çalışır: maliyet uyarı sayısıyla değil farklı ifade sayısıyla ölçeklenir.
+
+Dil (Türkçe karakterler ve İngilizce eşdeğerler kabul edilir):
+    seriler      kapanis acilis yuksek dusuk hacim   (close open high low volume)
+    fonksiyonlar sma(seri, n) ema(seri, n) rsi(n) atr(n) enyuksek(seri, n) endusuk(seri, n)
+                 onceki(seri, n) degisim(seri, n) supertrend(n, carpan)
+                 (seri verilmezse kapanis; supertrend yönü: 1 yükselen, -1 düşen)
+    aritmetik    + - * /   karşılaştırma  > < >= <=
+    kesişim      a yukari_keser b / a asagi_keser b   (crosses_above / crosses_below)
+    mantık       ve veya degil                        (and or not)
+
+Değerlendirme her sembolün son barına göre yapılır; kesişimler son iki barı kullanır.
+"""
+import re
+import math
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+log = logging.getLogger("finans_botu")
+
+MAKS_UZUNLUK = 200       # Koşul metni en fazla karakter
+MAKS_PENCERE = 500       # Fonksiyon periyodu üst sınırı
+MAKS_DUGUM = 40          # Tek koşulda en fazla düğüm (kötü niyetli/çok büyük ifadeler)
+
+SERILER = ("kapanis", "acilis", "yuksek", "dusuk", "hacim")
+_ESANLAMLI = {
+    "close": "kapanis", "open": "acilis", "high": "yuksek", "low": "dusuk", "volume": "hacim",
+    "and": "ve", "or": "veya", "not": "degil",
+    "crosses_above": "yukari_keser", "crosses_below": "asagi_keser",
+    "highest": "enyuksek", "lowest": "endusuk", "prev": "onceki", "change": "degisim",
+}
+_TR_ASCII = str.maketrans("ıİşŞğĞüÜöÖçÇ", "iIsSgGuUoOcC")
+
+# fonksiyon → (seri argümanı alır mı, periyot argümanlarının varsayılanları)
+FONKSIYONLAR: Dict[str, Tuple[bool, Tuple[float, ...]]] = {
+    "sma": (True, (20,)),
+    "ema": (True, (20,)),
+    "rsi": (True, (14,)),
+    "atr": (False, (14,)),
+    "enyuksek": (True, (20,)),
+    "endusuk": (True, (20,)),
+    "onceki": (True, (1,)),
+    "degisim": (True, (1,)),
+    "supertrend": (False, (10, 3.0)),
+}
+KARSILASTIRMA = (">", "<", ">=", "<=", "yukari_keser", "asagi_keser")
+
+
+class KosulHatasi(ValueError):
+    """Koşul metni ayrıştırılamadı / geçersiz (mesajı kullanıcıya gösterilebilir)."""
+
+
+# ═══════════════════════════════════════════════════════════════
+# AYRIŞTIRICI
+# ═══════════════════════════════════════════════════════════════
+# Düğümler hashlenebilir tuple'lardır; aynı ifade her uyarıda aynı düğüme dönüşür:
+#   ("seri", ad)  ("sayi", x)  ("fn", ad, seri|None, p1, ...)  ("aritmetik", op, a, b)
+#   ("neg", a)  ("kiyas", op, a, b)  ("ve", a, b)  ("veya", a, b)  ("degil", a)
+
+_JETON = re.compile(r"\s*(?:(\d+(?:\.\d+)?)|([a-z_][a-z0-9_]*)|(>=|<=|[-+*/()<>,]))")
+
+
+def _jetonlar(metin: str) -> List[str]:
+    # Virgül yalnızca argüman ayırıcıdır ("3,5" gibi ondalık virgül desteklenmez)
+    metin = metin.translate(_TR_ASCII).lower().strip()
+    jetonlar, i = [], 0
+    while i < len(metin):
+        m = _JETON.match(metin, i)
+        if not m:
+            raise KosulHatasi(f"Anlaşılamayan karakter: '{metin[i:].strip()[:10]}'")
+        sayi, ad, isaret = m.groups()
+        jetonlar.append(_ESANLAMLI.get(ad, ad) if ad is not None else (sayi or isaret))
+        i = m.end()
+    return jetonlar
+
+
+class _Ayristirici:
+    """Özyinelemeli iniş: veya > ve > degil > karşılaştırma > toplam > çarpım > tekli > birincil."""
+
+    def __init__(self, jetonlar: List[str]):
+        self.j = jetonlar
+        self.i = 0
+
+    def _bak(self) -> Optional[str]:
+        return self.j[self.i] if self.i < len(self.j) else None
+
+    def _al(self, beklenen: Optional[str] = None) -> str:
+        jeton = self._bak()
+        if jeton is None:
+            raise KosulHatasi("Koşul yarım kaldı.")
+        if beklenen is not None and jeton != beklenen:
+            raise KosulHatasi(f"'{beklenen}' bekleniyordu, '{jeton}' bulundu.")
+        self.i += 1
+        return jeton
+
+    def ayristir(self):
+        dugum = self._veya()
+        if self._bak() is not None:
+            raise KosulHatasi(f"Beklenmeyen ifade: '{self._bak()}'")
+        return dugum
+
+    def _veya(self):
+        sol = self._ve()
+        while self._bak() == "veya":
+            self._al()
+            sol = ("veya", sol, self._ve())
+        return sol
+
+    def _ve(self):
+        sol = self._degil()
+        while self._bak() == "ve":
+            self._al()
+            sol = ("ve", sol, self._degil())
+        return sol
+
+    def _degil(self):
+        if self._bak() == "degil":
+            self._al()
+            return ("degil", self._degil())
+        return self._kiyas()
+
+    def _kiyas(self):
+        sol = self._toplam()
+        if self._bak() in KARSILASTIRMA:
+            op = self._al()
+            return ("kiyas", op, sol, self._toplam())
+        return sol
+
+    def _toplam(self):
+        sol = self._carpim()
+        while self._bak() in ("+", "-"):
+            op = self._al()
+            sol = ("aritmetik", op, sol, self._carpim())
+        return sol
+
+    def _carpim(self):
+        sol = self._tekli()
+        while self._bak() in ("*", "/"):
+            op = self._al()
+            sol = ("aritmetik", op, sol, self._tekli())
+        return sol
+
+    def _tekli(self):
+        if self._bak() == "-":
+            self._al()
+            ic = self._tekli()
+            return ("sayi", -ic[1]) if ic[0] == "sayi" else ("neg", ic)
+        return self._birincil()
+
+    def _birincil(self):
+        jeton = self._al()
+        if jeton == "(":
+            dugum = self._veya()
+            self._al(")")
+            return dugum
+        if re.fullmatch(r"\d+(?:\.\d+)?", jeton):
+            return ("sayi", float(jeton))
+        if jeton in SERILER:
+            return ("seri", jeton)
+        if jeton in FONKSIYONLAR:
+            return self._fonksiyon(jeton)
+        raise KosulHatasi(f"Bilinmeyen ifade: '{jeton}'")
+
+    def _fonksiyon(self, ad: str):
+        seri_alir, varsayilan = FONKSIYONLAR[ad]
+        argumanlar = []
+        if self._bak() == "(":
+            self._al("(")
+            if self._bak() != ")":
+                argumanlar.append(self._toplam())
+                while self._bak() == ",":
+                    self._al(",")
+                    argumanlar.append(self._toplam())
+            self._al(")")
+
+        seri = ("seri", "kapanis") if seri_alir else None
+        if seri_alir and argumanlar and argumanlar[0][0] != "sayi":
+            seri = argumanlar.pop(0)
+        if len(argumanlar) > len(varsayilan) or any(a[0] != "sayi" for a in argumanlar):
+            raise KosulHatasi(f"{ad}(): periyot argümanları sayı olmalı.")
+        parametreler = [a[1] for a in argumanlar] + list(varsayilan[len(argumanlar):])
+        periyot = parametreler[0]
+        if periyot != int(periyot) or not 1 <= periyot <= MAKS_PENCERE:
+            raise KosulHatasi(f"{ad}(): periyot 1–{MAKS_PENCERE} arası tam sayı olmalı.")
+        parametreler[0] = int(periyot)
+        return ("fn", ad, seri, *parametreler)
+
+
+def _tur(dugum) -> str:
+    """'sayisal' | 'mantiksal' — tip hatalarını derlemede yakalar."""
+    tip = dugum[0]
+    if tip in ("seri", "sayi", "fn"):
+        if tip == "fn" and dugum[2] is not None and _tur(dugum[2]) != "sayisal":
+            raise KosulHatasi(f"{dugum[1]}(): argüman sayısal bir seri olmalı.")
+        return "sayisal"
+    if tip in ("aritmetik", "neg"):
+        if any(_tur(c) != "sayisal" for c in _cocuklar(dugum)):
+            raise KosulHatasi("Aritmetik işlemler yalnızca sayısal ifadelerle yapılabilir.")
+        return "sayisal"
+    if tip == "kiyas":
+        if any(_tur(c) != "sayisal" for c in _cocuklar(dugum)):
+            raise KosulHatasi(f"'{dugum[1]}' iki sayısal ifadeyi karşılaştırır.")
+        return "mantiksal"
+    if any(_tur(c) != "mantiksal" for c in _cocuklar(dugum)):
+        raise KosulHatasi(f"'{tip}' yalnızca koşulları birleştirir.")
+    return "mantiksal"
+
+
+def _cocuklar(dugum) -> Tuple:
+    tip = dugum[0]
+    if tip == "fn":
+        return (dugum[2],) if dugum[2] is not None else ()
+    if tip in ("aritmetik", "kiyas"):
+        return dugum[2], dugum[3]
+    if tip in ("ve", "veya"):
+        return dugum[1], dugum[2]
+    if tip in ("neg", "degil"):
+        return (dugum[1],)
+    return ()
+
+
+def _geriye_bakis(dugum) -> int:
+    """Düğümün anlamlı değer üretmesi için gereken bar sayısı (EMA/RMA için ısınma payıyla)."""
+    tip = dugum[0]
+    ic = max((_geriye_bakis(c) for c in _cocuklar(dugum)), default=1)
+    if tip == "fn":
+        ad, n = dugum[1], dugum[3]
+        if ad in ("ema", "rsi", "atr", "supertrend"):
+            return ic + 3 * n           # Üstel ortalama ~3n barda oturur
+        return ic + n
+    if tip == "kiyas" and dugum[1] in ("yukari_keser", "asagi_keser"):
+        return ic + 1
+    return ic
+
+
+def _dugum_sayisi(dugum) -> int:
+    return 1 + sum(_dugum_sayisi(c) for c in _cocuklar(dugum))
+
+
+@dataclass(frozen=True)
+class Kosul:
+    metin: str
+    kok: tuple
+    geriye_bakis: int
+
+
+@lru_cache(maxsize=4096)
+def derle(metin: str) -> Kosul:
+    """Koşul metnini doğrular ve derler. Geçersizse KosulHatasi."""
+    metin = " ".join(metin.split())
+    if not metin:
+        raise KosulHatasi("Koşul boş.")
+    if len(metin) > MAKS_UZUNLUK:
+        raise KosulHatasi(f"Koşul en fazla {MAKS_UZUNLUK} karakter olabilir.")
+    kok = _Ayristirici(_jetonlar(metin)).ayristir()
+    if _dugum_sayisi(kok) > MAKS_DUGUM:
+        raise KosulHatasi("Koşul çok karmaşık.")
+    if _tur(kok) != "mantiksal":
+        raise KosulHatasi("Koşul bir karşılaştırma içermeli (ör. kapanis > sma(50)).")
+    return Kosul(metin, kok, _geriye_bakis(kok))
+
+
+# ═══════════════════════════════════════════════════════════════
+# VEKTÖREL ÇEKİRDEKLER — (sembol × bar) matrisleri, eksen 1 zaman
+# ═══════════════════════════════════════════════════════════════
+# Geçmişi kısa semboller başta NaN ile doldurulur; NaN içeren pencereler NaN üretir.
+
+def _kaydir(x: np.ndarray, n: int) -> np.ndarray:
+    y = np.full_like(x, np.nan)
+    if n < x.shape[1]:
+        y[:, n:] = x[:, :-n]
+    return y
+
+
+def _sma(x: np.ndarray, n: int) -> np.ndarray:
+    gecerli = ~np.isnan(x)
+    toplam = np.concatenate((np.zeros((x.shape[0], 1)), np.cumsum(np.where(gecerli, x, 0.0), axis=1)), axis=1)
+    sayi = np.concatenate((np.zeros((x.shape[0], 1)), np.cumsum(gecerli, axis=1)), axis=1)
+    y = np.full_like(x, np.nan)
+    if n <= x.shape[1]:
+        pencere_toplam = toplam[:, n:] - toplam[:, :-n]
+        tam = (sayi[:, n:] - sayi[:, :-n]) == n
+        y[:, n - 1:] = np.where(tam, pencere_toplam / n, np.nan)
+    return y
+
+
+def _ustel(x: np.ndarray, alfa: float) -> np.ndarray:
+    """pandas ewm(alpha=alfa, adjust=False): ilk geçerli değerden başlar, NaN'lar önceki değeri korur."""
+    y = np.empty_like(x)
+    onceki = np.full(x.shape[0], np.nan)
+    for t in range(x.shape[1]):
+        xt = x[:, t]
+        yeni = onceki + alfa * (xt - onceki)
+        yeni = np.where(np.isnan(onceki), xt, yeni)
+        onceki = np.where(np.isnan(xt), onceki, yeni)
+        y[:, t] = onceki
+    return y
+
+
+def _ema(x: np.ndarray, n: int) -> np.ndarray:
+    return _ustel(x, 2.0 / (n + 1))
+
+
+def _rma(x: np.ndarray, n: int) -> np.ndarray:
+    return _ustel(x, 1.0 / n)
+
+
+def _rsi(x: np.ndarray, n: int) -> np.ndarray:
+    """teknik_analiz.py RSI'ı ile aynı formül (Wilder RMA)."""
+    fark = x - _kaydir(x, 1)
+    yukari = _rma(np.where(np.isnan(fark), np.nan, np.clip(fark, 0, None)), n)
+    asagi = _rma(np.where(np.isnan(fark), np.nan, np.clip(-fark, 0, None)), n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(asagi == 0, 100.0,
+                       np.where(yukari == 0, 0.0, 100 - 100 / (1 + yukari / asagi)))
+    return np.where(np.isnan(yukari) | np.isnan(asagi), np.nan, rsi)
+
+
+def _gercek_aralik(h: np.ndarray, l: np.ndarray, c: np.ndarray) -> np.ndarray:
+    onceki = _kaydir(c, 1)
+    # fmax NaN'ı atlar: ilk barda TR = yuksek - dusuk (pandas max(axis=1) gibi)
+    return np.fmax(h - l, np.fmax(np.abs(h - onceki), np.abs(l - onceki)))
+
+
+def _atr(h, l, c, n: int) -> np.ndarray:
+    return _rma(_gercek_aralik(h, l, c), n)
+
+
+def _supertrend(h, l, c, n: int, carpan: float) -> np.ndarray:
+    """Pine ta.supertrend yönü, kullanıcıya dönük işaretle: 1 yükselen, -1 düşen (NaN: veri yok)."""
+    atr = _atr(h, l, c, n)
+    orta = (h + l) / 2
+    ust, alt = orta + carpan * atr, orta - carpan * atr
+    S, T = c.shape
+    yon = np.full((S, T), np.nan)
+    son_ust, son_alt = np.zeros(S), np.zeros(S)        # Pine nz(önceki bant) = 0
+    onceki_st_ust = np.zeros(S, dtype=bool)            # önceki supertrend üst bantta mıydı
+    onceki_atr = np.full(S, np.nan)
+    for t in range(T):
+        onceki_c = c[:, t - 1] if t else np.full(S, np.nan)
+        yeni_alt = np.where((alt[:, t] > son_alt) | (onceki_c < son_alt), alt[:, t], son_alt)
+        yeni_ust = np.where((ust[:, t] < son_ust) | (onceki_c > son_ust), ust[:, t], son_ust)
+        pine_yon = np.where(np.isnan(onceki_atr), 1.0,
+                            np.where(onceki_st_ust,
+                                     np.where(c[:, t] > yeni_ust, -1.0, 1.0),
+                                     np.where(c[:, t] < yeni_alt, 1.0, -1.0)))
+        gecerli = ~np.isnan(atr[:, t])
+        yon[:, t] = np.where(gecerli & ~np.isnan(onceki_atr), -pine_yon, np.nan)
+        # Veri başlamadan önceki barlar durumu değiştirmez
+        son_alt = np.where(gecerli, yeni_alt, son_alt)
+        son_ust = np.where(gecerli, yeni_ust, son_ust)
+        onceki_st_ust = np.where(gecerli, pine_yon == 1.0, onceki_st_ust)
+        onceki_atr = np.where(gecerli, atr[:, t], onceki_atr)
+    return yon
+
+
+def _kayan(x: np.ndarray, n: int, fonksiyon) -> np.ndarray:
+    y = np.full_like(x, np.nan)
+    if n <= x.shape[1]:
+        pencere = np.lib.stride_tricks.sliding_window_view(x, n, axis=1)
+        y[:, n - 1:] = fonksiyon(pencere, axis=-1)   # NaN içeren pencere NaN
+    return y
+
+
+# ═══════════════════════════════════════════════════════════════
+# PLAN
+# ═══════════════════════════════════════════════════════════════
+
+class Plan:
+    """
+    Koşulların ortak alt ifadeleri birleştirilmiş, çocuklar önce gelecek şekilde
+    sıralanmış düğüm listesi.
+
+        plan = Plan([derle("kapanis > sma(50)"), derle("rsi(14) < 30")])
+        sonuc = plan.degerlendir({"kapanis": K, "yuksek": H, ...})   # K: (S, T)
+        sonuc["kapanis > sma(50)"]  → (S,) bool
+    """
+
+    def __init__(self, kosullar: Iterable[Kosul]):
+        self.kosullar: Dict[str, Kosul] = {}
+        self.dugumler: List[tuple] = []
+        gorulen = set()
+        for kosul in kosullar:
+            if kosul.metin in self.kosullar:
+                continue
+            self.kosullar[kosul.metin] = kosul
+            self._ekle(kosul.kok, gorulen)
+        self.bar_sayisi = max((k.geriye_bakis for k in self.kosullar.values()), default=1)
+
+    def _ekle(self, dugum, gorulen: set):
+        if dugum in gorulen:
+            return
+        for cocuk in _cocuklar(dugum):
+            self._ekle(cocuk, gorulen)
+        gorulen.add(dugum)
+        self.dugumler.append(dugum)
+
+    def degerlendir(self, veri: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Her koşul için son barda doğru/yanlış (S,) vektörü. Mantıksal değerler üç değerlidir
+        (1 / 0 / NaN = veri yetersiz); yalnızca kesin 1 tetikler — "degil" eksik veriyi doğruya çevirmez.
+        """
+        S = veri["kapanis"].shape[0]
+        deger: Dict[tuple, Any] = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for dugum in self.dugumler:
+                deger[dugum] = self._hesapla(dugum, deger, veri)
+        return {metin: np.broadcast_to(np.asarray(deger[k.kok]) == 1.0, (S,))
+                for metin, k in self.kosullar.items()}
+
+    @staticmethod
+    def _hesapla(dugum, deger: Dict[tuple, Any], veri: Dict[str, np.ndarray]):
+        tip = dugum[0]
+        if tip == "seri":
+            return veri[dugum[1]]
+        if tip == "sayi":
+            return dugum[1]
+        if tip == "neg":
+            return -deger[dugum[1]]
+        if tip == "aritmetik":
+            a, b = deger[dugum[2]], deger[dugum[3]]
+            return {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}[dugum[1]](a, b)
+        if tip == "fn":
+            ad, x = dugum[1], deger.get(dugum[2]) if dugum[2] is not None else None
+            if x is not None and np.ndim(x) == 0:
+                x = np.full_like(veri["kapanis"], x)
+            n = dugum[3]
+            if ad == "sma":
+                return _sma(x, n)
+            if ad == "ema":
+                return _ema(x, n)
+            if ad == "rsi":
+                return _rsi(x, n)
+            if ad == "atr":
+                return _atr(veri["yuksek"], veri["dusuk"], veri["kapanis"], n)
+            if ad == "supertrend":
+                return _supertrend(veri["yuksek"], veri["dusuk"], veri["kapanis"], n, dugum[4])
+            if ad == "enyuksek":
+                return _kayan(x, n, np.max)
+            if ad == "endusuk":
+                return _kayan(x, n, np.min)
+            if ad == "onceki":
+                return _kaydir(x, n)
+            if ad == "degisim":
+                onceki = _kaydir(x, n)
+                return (x - onceki) / onceki * 100
+        if tip == "kiyas":
+            op, a, b = dugum[1], deger[dugum[2]], deger[dugum[3]]
+            son_a, son_b = _son(a, 1), _son(b, 1)
+            eksik = np.isnan(son_a) | np.isnan(son_b)
+            if op == ">":
+                sonuc = son_a > son_b
+            elif op == "<":
+                sonuc = son_a < son_b
+            elif op == ">=":
+                sonuc = son_a >= son_b
+            elif op == "<=":
+                sonuc = son_a <= son_b
+            else:
+                once_a, once_b = _son(a, 2), _son(b, 2)
+                eksik = eksik | np.isnan(once_a) | np.isnan(once_b)
+                if op == "yukari_keser":
+                    sonuc = (once_a <= once_b) & (son_a > son_b)
+                else:
+                    sonuc = (once_a >= once_b) & (son_a < son_b)
+            return np.where(eksik, np.nan, np.asarray(sonuc, dtype=np.float64))
+        # Kleene mantığı: kesin 0 ve'yi, kesin 1 veya'yı belirler; aksi halde NaN bulaşır
+        if tip == "ve":
+            a, b = deger[dugum[1]], deger[dugum[2]]
+            return np.where((a == 0) | (b == 0), 0.0, np.where(np.isnan(a) | np.isnan(b), np.nan, 1.0))
+        if tip == "veya":
+            a, b = deger[dugum[1]], deger[dugum[2]]
+            return np.where((a == 1) | (b == 1), 1.0, np.where(np.isnan(a) | np.isnan(b), np.nan, 0.0))
+        if tip == "degil":
+            return 1.0 - deger[dugum[1]]
+        raise KosulHatasi(f"Bilinmeyen düğüm: {tip}")
+
+
+def _son(x, k: int):
+    """Sondan k. bar (S,) — sabit sayılar olduğu gibi; veri yoksa NaN."""
+    if np.ndim(x) == 0:
+        return x
+    if x.shape[1] < k:
+        return np.full(x.shape[0], np.nan)
+    return x[:, -k]
+
+
+# ═══════════════════════════════════════════════════════════════
+# VERİ — yfinance toplu günlük bar indirme
+# ═══════════════════════════════════════════════════════════════
+
+_YF_ALANLAR = {"kapanis": "Close", "acilis": "Open", "yuksek": "High", "dusuk": "Low", "hacim": "Volume"}
+
+
+def _periyot(bar_sayisi: int) -> str:
+    """Gereken işlem günü için yfinance period'u (yılda ~250 bar, tatil payıyla)."""
+    for yil in (1, 2, 5, 10):
+        if bar_sayisi <= yil * 230:
+            return f"{yil}y"
+    return "max"
+
+
+def saga_hizala(matrisler: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Farklı borsaların tatilleri ortak tarih ekseninde boşluk bırakır. Her sembolün geçerli
+    barları (kapanış NaN değil) sırası korunarak sağa kaydırılır: son sütun her sembolün
+    kendi son barıdır, boşluklar başa toplanır.
+    """
+    gecerli = ~np.isnan(matrisler["kapanis"])
+    sira = np.argsort(gecerli, axis=1, kind="stable")
+    return {ad: np.where(np.take_along_axis(gecerli, sira, axis=1),
+                         np.take_along_axis(m, sira, axis=1), np.nan)
+            for ad, m in matrisler.items()}
+
+
+def matris_getir(semboller: Sequence[str], bar_sayisi: int) -> Dict[str, np.ndarray]:
+    """Tüm semboller için tek toplu istekle günlük barlar → {seri: (S, T)} (sağa hizalı)."""
+    from cache_yonetici import _yf
+    df = _yf().download(list(semboller), period=_periyot(bar_sayisi), interval="1d",
+                        group_by="column", auto_adjust=True, progress=False, threads=True)
+    matrisler = {}
+    for ad, sutun in _YF_ALANLAR.items():
+        if df is None or df.empty or sutun not in df.columns.get_level_values(0):
+            matrisler[ad] = np.full((len(semboller), 0), np.nan)
+            continue
+        tablo = df[sutun]
+        if not hasattr(tablo, "columns"):          # Tek sembol, düz sütun
+            tablo = tablo.to_frame(semboller[0])
+        matrisler[ad] = tablo.reindex(columns=list(semboller)).to_numpy(dtype=np.float64).T
+    matrisler = saga_hizala(matrisler)
+    return {ad: m[:, -bar_sayisi - 1:] for ad, m in matrisler.items()}
+
+
+def toplu_degerlendir(uyarilar: Sequence[Dict[str, Any]],
+                      veri_getir=matris_getir) -> List[Tuple[Dict[str, Any], Optional[float]]]:
+    """
+    Koşul uyarılarını (tip='kosul', hedef_deger=koşul metni) tek planda değerlendirir.
+    Tetiklenen (uyarı, son kapanış) çiftlerini döndürür.
+    """
+    kosullar: Dict[int, Kosul] = {}
+    for u in uyarilar:
+        try:
+            kosullar[u["id"]] = derle(u["hedef_deger"])
+        except KosulHatasi as e:
+            log.warning(f"Geçersiz koşul uyarısı #{u['id']}: {e}")
+    if not kosullar:
+        return []
+
+    semboller = sorted({u["sembol"] for u in uyarilar if u["id"] in kosullar})
+    satir = {s: i for i, s in enumerate(semboller)}
+    plan = Plan(kosullar.values())
+    veri = veri_getir(semboller, plan.bar_sayisi)
+    sonuc = plan.degerlendir(veri)
+    kapanis = veri["kapanis"][:, -1] if veri["kapanis"].shape[1] else np.full(len(semboller), np.nan)
+    log.debug(f"🧮 Koşul planı: {len(uyarilar)} uyarı, {len(plan.kosullar)} koşul, "
+              f"{len(plan.dugumler)} düğüm, {len(semboller)} sembol × {veri['kapanis'].shape[1]} bar")
+
+    tetiklenen = []
+    for u in uyarilar:
+        kosul = kosullar.get(u["id"])
+        if kosul is not None and sonuc[kosul.metin][satir[u["sembol"]]]:
+            son = kapanis[satir[u["sembol"]]]
+            tetiklenen.append((u, None if math.isnan(son) else float(son)))
+    return tetiklenen
@@ -0,0 +1,209 @@
+"""
+kur_matrisi.py — Çapraz kur matrisi: varlık değerlerinin kullanıcının para birimine çevrilmesi.
+
+DOVIZ_MAP'teki pariteler (USDTRY=X, EURUSD=X, ...) tek toplu istekle çekilir. Ters kurlar
+ve listede olmayan çaprazlar (ör. GBPJPY = GBPUSD × USDJPY, CADTRY = USDTRY / USDCAD)
+aradaki paritelerden türetilir; en az aracı kur kullanan yol seçilir.
+
+Matris CACHE_TTL_FX süresince bellekte kalır ve eşzamanlı yenilemeler tek isteği paylaşır:
+portföydeki varlık sayısından bağımsız olarak yenileme başına en fazla bir kur çekimi yapılır.
+"""
+import re
+import time
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from config import settings
+from security.circuit_breaker import cb_yfinance
+
+log = logging.getLogger("finans_botu")
+
+VARSAYILAN_PARA_BIRIMI = "USD"     # Sonek taşımayan (ABD) semboller
+
+_PARITE = re.compile(r"^([A-Z]{3})([A-Z]{3})=X$")
+
+# yfinance'in alt birimle fiyatladığı borsalar (Londra pence, Tel Aviv agora, Johannesburg cent)
+_ALT_BIRIMLER = {
+    "GBp": ("GBP", Decimal("0.01")), "GBX": ("GBP", Decimal("0.01")),
+    "ILA": ("ILS", Decimal("0.01")), "ZAc": ("ZAR", Decimal("0.01")),
+}
+
+# Borsa soneki → kotasyon birimi (fiyat kaynağı birim bildirmediğinde; Finnhub/CoinGecko yedekleri)
+_SONEK_BIRIMLERI = {
+    "IS": "TRY", "L": "GBp", "IL": "GBp", "TA": "ILA", "JO": "ZAc",
+    "DE": "EUR", "F": "EUR", "PA": "EUR", "AS": "EUR", "MI": "EUR", "MC": "EUR",
+    "BR": "EUR", "LS": "EUR", "VI": "EUR", "HE": "EUR", "IR": "EUR", "AT": "EUR",
+    "SW": "CHF", "ST": "SEK", "OL": "NOK", "CO": "DKK", "WA": "PLN", "PR": "CZK",
+    "T": "JPY", "HK": "HKD", "SS": "CNY", "SZ": "CNY", "KS": "KRW", "KQ": "KRW",
+    "TW": "TWD", "SI": "SGD", "NS": "INR", "BO": "INR", "AX": "AUD", "NZ": "NZD",
+    "TO": "CAD", "V": "CAD", "NE": "CAD", "SA": "BRL", "MX": "MXN",
+}
+
+# Fiyat kaynağının sembol için en son bildirdiği birim: fiyat çekmeyen hesaplar
+# (risk raporu, gün sonu anlığı) /portfoy ile aynı birimi kullansın
+_kaynak_birimleri: Dict[str, str] = {}
+
+KurCekici = Callable[[], Awaitable[Dict[str, float]]]
+
+
+# ═══════════════════════════════════════════════════════════════════
+# VARLIK PARA BİRİMİ
+# ═══════════════════════════════════════════════════════════════════
+
+def sembolden_para_birimi(sembol: str) -> Optional[str]:
+    """
+    Sembolden kotasyon birimi: THYAO.IS → TRY, VOD.L → GBp, BTC-USD → USD, EURUSD=X → USD.
+    Tanınmayan borsa soneki için None (birim tahmin edilmez).
+    """
+    s = sembol.upper().strip()
+    m = _PARITE.match(s)
+    if m:
+        return m.group(2)
+    if "." in s:
+        return _SONEK_BIRIMLERI.get(s.rsplit(".", 1)[1])
+    if "-" in s:
+        son = s.rsplit("-", 1)[1]
+        if len(son) == 3 and son.isalpha():
+            return son
+    return VARSAYILAN_PARA_BIRIMI
+
+
+def para_birimi_coz(sembol: str, kod: Optional[str] = None) -> Tuple[Optional[str], Decimal]:
+    """
+    Fiyatın para birimi ve ana birime çarpanı; birim bilinmiyorsa (None, 1).
+    `kod` fiyat kaynağının bildirdiği birimdir (yfinance info["currency"]) ve sembol için
+    hatırlanır; yoksa en son bildirilen, o da yoksa sembolden çıkarılan birim kullanılır.
+    """
+    anahtar = sembol.upper().strip()
+    if kod:
+        _kaynak_birimleri[anahtar] = kod
+    else:
+        kod = _kaynak_birimleri.get(anahtar) or sembolden_para_birimi(anahtar)
+    if kod is None:
+        return None, Decimal("1")
+    if kod in _ALT_BIRIMLER:
+        return _ALT_BIRIMLER[kod]
+    return kod.upper(), Decimal("1")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MATRİS
+# ═══════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class Kurlar:
+    """Kur matrisinin bir anlık görüntüsü: oranlar[kaynak][hedef] = 1 kaynak kaç hedef eder."""
+    oranlar: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    zaman: float = 0.0
+
+    def kur(self, kaynak: str, hedef: str) -> Optional[Decimal]:
+        if kaynak == hedef:
+            return Decimal("1")
+        oran = self.oranlar.get(kaynak, {}).get(hedef)
+        return None if oran is None else Decimal(str(oran))
+
+    def cevir(self, tutar: Decimal, kaynak: str, hedef: str) -> Optional[Decimal]:
+        kur = self.kur(kaynak, hedef)
+        return None if kur is None else tutar * kur
+
+
+def matris_olustur(pariteler: Dict[str, float]) -> Dict[str, Dict[str, float]]:
+    """
+    {"USDTRY=X": 32.5, ...} → tam çapraz kur matrisi.
+    Doğrudan pariteler ve tersleri kenardır; eksik çaprazlar her para biriminden genişlik öncelikli
+    aramayla (en az aracı) kenar oranları çarpılarak bulunur.
+    """
+    kenarlar: Dict[str, Dict[str, float]] = {}
+    for ticker, oran in pariteler.items():
+        m = _PARITE.match(ticker)
+        if not m or not oran or oran <= 0:
+            continue
+        taban, karsit = m.groups()
+        kenarlar.setdefault(taban, {})[karsit] = float(oran)
+        # Ters yön yalnızca doğrudan kotasyonu yoksa türetilir
+        kenarlar.setdefault(karsit, {}).setdefault(taban, 1.0 / float(oran))
+
+    matris: Dict[str, Dict[str, float]] = {}
+    for kaynak in kenarlar:
+        oranlar = {kaynak: 1.0}
+        kuyruk = deque([kaynak])
+        while kuyruk:
+            ara = kuyruk.popleft()
+            for hedef, oran in kenarlar[ara].items():
+                if hedef not in oranlar:
+                    oranlar[hedef] = oranlar[ara] * oran
+                    kuyruk.append(hedef)
+        del oranlar[kaynak]
+        matris[kaynak] = oranlar
+    return matris
+
+
+def _yfinance_pariteleri_cek() -> Dict[str, float]:
+    """DOVIZ_MAP paritelerinin son kapanışları — tek yf.download çağrısı (thread'de çalışır)."""
+    import yfinance as yf
+    from piyasa_analiz import DOVIZ_MAP
+
+    tickerlar = sorted({t for t in DOVIZ_MAP.values() if _PARITE.match(t)})
+    veri = yf.download(tickerlar, period="5d", interval="1d", progress=False,
+                       auto_adjust=False, threads=True)
+    kapanis = veri["Close"]
+    pariteler: Dict[str, float] = {}
+    for ticker in tickerlar:
+        if ticker in kapanis:
+            seri = kapanis[ticker].dropna()
+            if len(seri):
+                pariteler[ticker] = float(seri.iloc[-1])
+    return pariteler
+
+
+async def yfinance_pariteleri() -> Dict[str, float]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _yfinance_pariteleri_cek)
+
+
+class KurMatrisi:
+    """TTL'li, tek uçuşlu (single-flight) kur matrisi önbelleği."""
+
+    def __init__(self, cekici: Optional[KurCekici] = None, ttl: Optional[float] = None):
+        self._cekici = cekici or yfinance_pariteleri
+        self._ttl = ttl
+        self._kurlar = Kurlar()
+        self._kilit = asyncio.Lock()
+        self.cekim = 0
+
+    @property
+    def ttl(self) -> float:
+        return settings.CACHE_TTL_FX if self._ttl is None else self._ttl
+
+    def _taze(self) -> bool:
+        return bool(self._kurlar.oranlar) and time.time() - self._kurlar.zaman < self.ttl
+
+    async def guncel(self) -> Kurlar:
+        """Taze matris; süresi dolmuşsa tek istekle yenilenir (bekleyen çağrılar aynı sonucu alır)."""
+        if self._taze():
+            return self._kurlar
+        async with self._kilit:
+            if self._taze():
+                return self._kurlar
+            self.cekim += 1
+            try:
+                pariteler = await cb_yfinance.call(self._cekici)
+            except Exception as e:
+                log.error(f"❌ Kur matrisi çekilemedi: {e}")
+                pariteler = None
+            if pariteler:
+                self._kurlar = Kurlar(matris_olustur(pariteler), time.time())
+                log.debug(f"💱 Kur matrisi yenilendi ({len(pariteler)} parite, {len(self._kurlar.oranlar)} para birimi).")
+            elif self._kurlar.oranlar:
+                log.warning("⚠️ Kur matrisi yenilenemedi, önceki kurlar kullanılıyor.")
+            return self._kurlar
+
+    def temizle(self):
+        self._kurlar = Kurlar()
+
+
+kur_matrisi = KurMatrisi()
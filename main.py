@@ -5,6 +5,8 @@ main.py — Finans Botu Ana Giriş Noktası
 """
 import os
 import asyncio
+import html
+import importlib
 import logging
 import signal
 import sys
@@ -18,8 +20,9 @@ load_dotenv(override=True)
 from aiogram import Bot, Dispatcher, F
 from aiogram.enums import ParseMode
 from aiogram.filters import Command, CommandStart
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery, FSInputFile, BufferedInputFile
 from aiogram.client.default import DefaultBotProperties
+from aiogram.exceptions import TelegramBadRequest
 
 # ═══════════════════════════════════════════════════════════════
 # IMPORTLAR
@@ -30,19 +33,22 @@ from security.rate_limiter import limiter
 from security.audit_logger import setup_audit_logging, log_query, log_security_event
 from ux.inline_menus import build_analiz_menu, build_close_button
 from ux.i18n import get_text
+from ux.user_prefs import get_user_lang, preload_user_prefs
 
-from temel_analiz import temel_analiz_yap
-from teknik_analiz import teknik_analiz_yap
 from analist_motoru import ai_analist_yorumu, ai_tahmin_yap, ai_nlp_sorgu
 from db import (
     db_init, kullanici_kaydet, close_db,
     favori_ekle, favori_sil, favori_toggle, favorileri_getir,
     uyari_ekle, kullanici_uyarilari_getir, uyari_sil,
-    kullanici_dil_getir
 )
-from alert_motoru import uyari_kontrol_dongusu
-from tradingview_motoru import tv_grafik_cek, TVBrowser, manuel_giris_yap
-from portfoy_motoru import portfoy_ozeti_hazirla, portfoy_varlik_ekle, portfoy_varlik_sil
+from alert_motoru import (
+    uyari_kontrol_dongusu, kosul_uyari_dongusu, kripto_uyari_akisi_baslat, uyari_parcalama_baslat,
+)
+from gonderim_kuyrugu import gonderim_kuyrugu
+from portfoy_motoru import (
+    portfoy_ozeti_hazirla, portfoy_varlik_ekle, portfoy_varlik_sil, portfoy_islem_kaydet,
+    portfoy_para_birimi_ayarla,
+)
 from cache_yonetici import baslangic_temizligi
 
 # ═══════════════════════════════════════════════════════════════
@@ -103,7 +109,13 @@ async def shutdown(loop, sig=None):
 
     log.info("🔌 Kaynaklar serbest bırakılıyor...")
     await close_db()
-    await TVBrowser.close()
+    # Tarayıcı hiç açılmadıysa selenium'u sırf kapatmak için yükleme
+    if "tradingview_motoru" in sys.modules:
+        await sys.modules["tradingview_motoru"].tv_havuzu.kapat()
+    if "grafik_motoru" in sys.modules:
+        await sys.modules["grafik_motoru"].kapat()
+    if "websocket_motoru" in sys.modules:
+        await sys.modules["websocket_motoru"].akis_merkezi.kapat()
 
     log.info("✅ Bot başarıyla kapatıldı.")
     loop.stop()
@@ -120,6 +132,156 @@ async def _async(func, *args, **kwargs):
     return await loop.run_in_executor(None, partial(func, *args, **kwargs))
 
 
+# ═══════════════════════════════════════════════════════════════
+# LAZY IMPORT — Ağır alt sistemler ilk kullanımda yüklenir
+# temel_analiz / teknik_analiz → pandas, numpy, yfinance
+# tradingview_motoru          → selenium, undetected_chromedriver
+# grafik_motoru               → pandas, mplfinance (çizim ayrı süreçte)
+# portfoy_risk                → numpy (+ temel_analiz)
+# portfoy_gecmisi             → numpy (+ grafik_motoru)
+# Başlangıç bütçesi: tests/test_startup.py (-X importtime)
+# ═══════════════════════════════════════════════════════════════
+
+def _lazy(modul: str, fonksiyon: str):
+    """
+    Modülü ilk çağrıda import eden senkron proxy döndürür.
+    _async() ile çağrıldığından import maliyeti event loop'u değil executor thread'ini bloklar.
+    """
+    def _cagir(*args, **kwargs):
+        return getattr(importlib.import_module(modul), fonksiyon)(*args, **kwargs)
+    _cagir.__name__ = fonksiyon
+    return _cagir
+
+
+temel_analiz_yap = _lazy("temel_analiz", "temel_analiz_yap")
+teknik_analiz_yap = _lazy("teknik_analiz", "teknik_analiz_yap")
+
+
+async def tv_grafik_cek(sembol: str, output_path: str, sira_bildir=None) -> bool:
+    """tradingview_motoru.tv_grafik_cek — selenium ilk grafik isteğinde (executor'da) yüklenir."""
+    tv = await _async(importlib.import_module, "tradingview_motoru")
+    return await tv.tv_grafik_cek(sembol, output_path, sira_bildir=sira_bildir)
+
+
+async def _mum_akisi_baslat():
+    """mum_motoru.mum_akisi_baslat — numpy arka plan görevi içinde (executor'da) yüklenir."""
+    mm = await _async(importlib.import_module, "mum_motoru")
+    await mm.mum_akisi_baslat()
+
+
+async def _portfoy_gunsonu_baslat():
+    """portfoy_gecmisi.gunsonu_dongusu — numpy arka plan görevi içinde (executor'da) yüklenir."""
+    pg = await _async(importlib.import_module, "portfoy_gecmisi")
+    await pg.gunsonu_dongusu()
+
+
+async def _tv_havuzu_isit():
+    """Cookie dosyası varsa tarayıcı havuzunu arka planda önceden ısıtır."""
+    try:
+        tv = await _async(importlib.import_module, "tradingview_motoru")
+        await tv.tv_havuzu_isit()
+    except Exception as e:
+        log.warning(f"TradingView havuzu ısıtılamadı (ilk istekte denenecek): {e}")
+
+
+async def _grafik_hazirla(gm, sembol: str, sira_bildir=None):
+    """
+    CHART_MOTORU'na göre grafiği hazırlar → (anahtar, png yolu, kaynak adı).
+    Anahtar (sembol, zaman dilimi, sürüm) tüm kullanıcılar arasında paylaşılır;
+    TradingView seçiliyse ve çekim başarısızsa yerel çizime düşülür.
+    """
+    if settings.CHART_MOTORU == "tradingview":
+        anahtar = gm.tv_anahtari(sembol)
+        yol = gm.cache_yolu(anahtar)
+        if os.path.exists(yol):
+            return anahtar, yol, "TradingView"
+        # İsteğe özel geçici dosya: eşzamanlı istekler birbirinin görüntüsünü ezmez
+        gecici = gm.gecici_yol()
+        try:
+            if await tv_grafik_cek(sembol, gecici, sira_bildir=sira_bildir) and os.path.getsize(gecici):
+                await _async(gm.cache_tasi, gecici, yol)
+                return anahtar, yol, "TradingView"
+        finally:
+            if os.path.exists(gecici):
+                os.remove(gecici)
+        log.info(f"TradingView grafiği alınamadı, yerel çizime geçiliyor: {sembol}")
+
+    yol = await gm.grafik_ciz(sembol)
+    if not yol:
+        return None, None, ""
+    return gm.anahtar_yoldan(yol), yol, "Teknik"
+
+
+def _grafik_basligi(sembol: str, kaynak: str) -> str:
+    return f"📈 <b>{sembol}</b> {kaynak} Grafiği"
+
+
+async def _grafik_yukle(gm, hedef: Message, sembol: str, sira_bildir=None):
+    """Grafiği hazırlayıp dosya olarak yükler → (anahtar, file_id, kaynak) veya None."""
+    anahtar, yol, kaynak = await _grafik_hazirla(gm, sembol, sira_bildir)
+    if anahtar is None:
+        return None
+    gonderilen = await hedef.answer_photo(FSInputFile(yol), caption=_grafik_basligi(sembol, kaynak))
+    file_id = gonderilen.photo[-1].file_id if gonderilen.photo else None
+    if file_id:
+        gm.file_id_kaydet(anahtar, file_id)
+    return anahtar, file_id, kaynak
+
+
+# Hazırlanıp yüklenmekte olan grafikler: anahtar → (anahtar, file_id, kaynak) future'ı.
+# Aynı anahtarlı eşzamanlı istekler ilk yüklemenin file_id'sini bekler.
+_grafik_ucustaki: dict = {}
+
+
+async def _grafik_gonder(hedef: Message, sembol: str, sira_bildir=None) -> bool:
+    """
+    Grafiği hazırlayıp hedef sohbete gönderir.
+    Aynı grafik daha önce yüklendiyse (veya şu an yükleniyorsa) Telegram file_id'si
+    kullanılır — dosya yeniden yüklenmez, TradingView çekimi tekrarlanmaz.
+    """
+    gm = await _async(importlib.import_module, "grafik_motoru")
+    if settings.CHART_MOTORU == "tradingview":
+        anahtar, kaynak = gm.tv_anahtari(sembol), "TradingView"
+    else:
+        anahtar, kaynak = gm.yerel_anahtari(sembol, gm.VARSAYILAN_OVERLAYLER), "Teknik"
+    istek_anahtari = anahtar
+
+    file_id = gm.file_id_al(anahtar)
+    ucus = _grafik_ucustaki.get(istek_anahtari)
+    if file_id is None and ucus is not None:
+        sonuc = await asyncio.shield(ucus)
+        if sonuc and sonuc[1]:
+            anahtar, file_id, kaynak = sonuc
+
+    if file_id:
+        try:
+            await hedef.answer_photo(file_id, caption=_grafik_basligi(sembol, kaynak))
+            return True
+        except TelegramBadRequest as e:
+            log.info(f"Grafik file_id reddedildi, dosya yeniden yüklenecek: {e}")
+            gm.file_id_sil(anahtar)
+
+    lider = istek_anahtari not in _grafik_ucustaki
+    if lider:
+        ucus = asyncio.get_running_loop().create_future()
+        _grafik_ucustaki[istek_anahtari] = ucus
+    sonuc = None
+    try:
+        sonuc = await _grafik_yukle(gm, hedef, sembol, sira_bildir)
+        return sonuc is not None
+    finally:
+        if lider:
+            _grafik_ucustaki.pop(istek_anahtari, None)
+            ucus.set_result(sonuc)
+
+
+def _sira_bildirici(msg: Message):
+    """Havuz doluyken kullanıcıya kuyruk sırasını gösteren callback üretir."""
+    async def _bildir(sira: int):
+        await msg.edit_text(f"⏳ Grafik kuyruğundasınız — sıra: <b>{sira}</b>")
+    return _bildir
+
+
 async def _rate_limit_check(message: Message) -> bool:
     """Rate limit kontrolü yapar. True ise devam et, False ise engelle."""
     allowed, wait_time = await limiter.check(message.from_user.id)
@@ -145,7 +307,7 @@ async def _rate_limit_check(message: Message) -> bool:
 async def komut_start(message: Message):
     """Bot başlangıç komutu."""
     await kullanici_kaydet(message.from_user.id, message.from_user.username or "")
-    lang = await kullanici_dil_getir(message.from_user.id)
+    lang = await get_user_lang(message.from_user.id)
     welcome = get_text('welcome', lang)
     await message.reply(welcome)
 
@@ -159,17 +321,24 @@ async def komut_yardim(message: Message):
         "<b>📊 Analiz Komutları:</b>\n"
         "• <code>/analiz THYAO</code> — Kapsamlı analiz\n"
         "• <code>/temel AAPL</code> — Temel analiz\n"
-        "• <code>/teknik BTCUSD</code> — Teknik analiz\n"
+        "• <code>/teknik BTCUSD</code> — Teknik analiz (<code>/teknik BTCUSD 5m</code>: gün içi)\n"
         "• <code>/tahmin MSFT</code> — AI fiyat tahmini\n"
-        "• <code>/grafik THYAO</code> — TradingView grafiği\n\n"
+        "• <code>/grafik THYAO</code> — Mum grafiği (Supertrend, Bollinger)\n\n"
         "<b>🔔 Uyarı Komutları:</b>\n"
         "• <code>/uyari THYAO fiyat_ust 50</code> — Fiyat uyarısı\n"
         "• <code>/uyari THYAO rsi_alt 30</code> — RSI uyarısı\n"
+        "• <code>/uyari THYAO kosul kapanis yukari_keser sma(50)</code> — Koşul uyarısı\n"
         "• <code>/uyarilarim</code> — Aktif uyarılarınız\n\n"
         "<b>💼 Portföy Komutları:</b>\n"
         "• <code>/portfoy</code> — Portföy özeti\n"
-        "• <code>/portfoy_ekle THYAO 100 45.50</code> — Varlık ekle\n"
-        "• <code>/portfoy_sil THYAO</code> — Varlık sil\n\n"
+        "• <code>/portfoy_ekle THYAO 100 45.50</code> — Alış ekle\n"
+        "• <code>/portfoy_sat THYAO 40 52.10</code> — Satış (FIFO + ort. maliyet K/Z)\n"
+        "• <code>/portfoy_temettu THYAO 1.25</code> — Hisse başı temettü\n"
+        "• <code>/portfoy_bolunme THYAO 2</code> — Bölünme (1 → 2)\n"
+        "• <code>/portfoy_sil THYAO</code> — Varlık sil\n"
+        "• <code>/portfoy_para_birimi USD</code> — Değerleme para birimi\n"
+        "• <code>/portfoy_risk</code> — Volatilite, beta, korelasyon, VaR/CVaR\n"
+        "• <code>/portfoy_gecmis 90</code> — Zaman ağırlıklı getiri ve performans grafiği\n\n"
         "<b>⭐ Favori Komutları:</b>\n"
         "• <code>/favoriler</code> — Favori listeniz\n"
         "• <code>/favori_ekle THYAO</code> — Favoriye ekle\n"
@@ -288,7 +457,7 @@ async def komut_teknik(message: Message):
 
     parcalar = message.text.split()
     if len(parcalar) < 2:
-        await message.reply("⚠️ Örnek: <code>/teknik THYAO</code>")
+        await message.reply("⚠️ Örnek: <code>/teknik THYAO</code> veya <code>/teknik BTCUSD 5m</code>")
         return
 
     girdi = sanitize_text(parcalar[1])
@@ -298,17 +467,29 @@ async def komut_teknik(message: Message):
         await message.reply("❌ Geçersiz sembol formatı.")
         return
 
+    aralik = parcalar[2].lower() if len(parcalar) > 2 else "1d"
+    if aralik not in ("1d", "1h", "5m", "1m"):
+        await message.reply("❌ Geçersiz zaman aralığı. Kullanılabilir: 1m, 5m, 1h, 1d")
+        return
+
     log_query(message.from_user.id, message.from_user.username or "", sembol, "teknik")
     bekle_msg = await message.reply(f"⏳ <b>{sembol}</b> teknik analiz yapılıyor...")
 
     try:
-        teknik_v = await _async(teknik_analiz_yap, sembol)
+        teknik_v = await _async(teknik_analiz_yap, sembol, interval=aralik)
 
         if "Hata" in teknik_v or not teknik_v:
+            if aralik != "1d":
+                await bekle_msg.edit_text(
+                    f"⏳ <b>{sembol}</b> için yeterli {aralik} mum birikmedi. "
+                    f"Gün içi mumlar yalnızca kripto semboller için canlı akıştan üretilir."
+                )
+                return
             await bekle_msg.edit_text(f"❌ Teknik analiz verisi bulunamadı: <b>{sembol}</b>")
             return
 
-        satirlar = [f"📉 <b>{sembol} Teknik Analiz</b>\n"]
+        baslik = f"{sembol} Teknik Analiz" + (f" ({aralik})" if aralik != "1d" else "")
+        satirlar = [f"📉 <b>{baslik}</b>\n"]
         for k, v in teknik_v.items():
             if not k.startswith("_"):
                 satirlar.append(f"• <b>{k}:</b> {v}")
@@ -326,7 +507,7 @@ async def komut_teknik(message: Message):
 
 @dp.message(Command("grafik"))
 async def komut_grafik(message: Message):
-    """TradingView grafik komutu."""
+    """Grafik komutu (yerel mum grafiği veya TradingView)."""
     if not await _rate_limit_check(message):
         return
 
@@ -343,16 +524,9 @@ async def komut_grafik(message: Message):
         return
 
     log_query(message.from_user.id, message.from_user.username or "", sembol, "grafik")
-    await message.answer(f"📊 <b>{sembol}</b> grafiği hazırlanıyor, lütfen bekleyin...")
-
-    path = os.path.join(LOG_DIR, f"chart_{message.from_user.id}.png")
-    success = await tv_grafik_cek(sembol, path)
-    if success and os.path.exists(path):
-        await message.answer_photo(
-            FSInputFile(path),
-            caption=f"📈 <b>{sembol}</b> TradingView Grafiği"
-        )
-    else:
+    bekle_msg = await message.answer(f"📊 <b>{sembol}</b> grafiği hazırlanıyor, lütfen bekleyin...")
+
+    if not await _grafik_gonder(message, sembol, sira_bildir=_sira_bildirici(bekle_msg)):
         await message.answer(f"❌ <b>{sembol}</b> grafiği çekilemedi. Sembolü kontrol edin.")
 
 
@@ -425,10 +599,11 @@ async def komut_trend(message: Message):
 @dp.message(Command("uyari"))
 async def komut_uyari(message: Message):
     """
-    Fiyat veya RSI uyarısı kurar.
+    Fiyat, RSI veya koşul uyarısı kurar.
     Kullanım: /uyari SEMBOL TIP HEDEF
-    Tipler: fiyat_ust, fiyat_alt, rsi_ust, rsi_alt
+    Tipler: fiyat_ust, fiyat_alt, rsi_ust, rsi_alt, kosul
     Örnek: /uyari THYAO fiyat_ust 50
+           /uyari THYAO kosul kapanis yukari_keser sma(50) ve rsi(14) < 70
     """
     if not await _rate_limit_check(message):
         return
@@ -441,8 +616,10 @@ async def komut_uyari(message: Message):
             "• <code>fiyat_ust</code> — Fiyat bu değerin üzerine çıkınca\n"
             "• <code>fiyat_alt</code> — Fiyat bu değerin altına düşünce\n"
             "• <code>rsi_ust</code> — RSI bu değerin üzerine çıkınca\n"
-            "• <code>rsi_alt</code> — RSI bu değerin altına düşünce\n\n"
-            "<b>Örnek:</b> <code>/uyari THYAO fiyat_ust 50</code>"
+            "• <code>rsi_alt</code> — RSI bu değerin altına düşünce\n"
+            "• <code>kosul</code> — Günlük barlarda koşul sağlanınca\n\n"
+            "<b>Örnek:</b> <code>/uyari THYAO fiyat_ust 50</code>\n"
+            "<code>/uyari THYAO kosul kapanis yukari_keser sma(50) ve rsi(14) &lt; 70</code>"
         )
         return
 
@@ -453,13 +630,34 @@ async def komut_uyari(message: Message):
         return
 
     tip = parcalar[2].lower()
-    gecerli_tipler = ["fiyat_ust", "fiyat_alt", "rsi_ust", "rsi_alt"]
+    gecerli_tipler = ["fiyat_ust", "fiyat_alt", "rsi_ust", "rsi_alt", "kosul"]
     if tip not in gecerli_tipler:
         await message.reply(
             f"❌ Geçersiz uyarı tipi. Geçerli tipler: {', '.join(gecerli_tipler)}"
         )
         return
 
+    if tip == "kosul":
+        # Koşul boşluk içerebilir: komutun geri kalanı olduğu gibi alınır
+        ifade = message.text.split(maxsplit=3)[3]
+        kosul_motoru = await _async(importlib.import_module, "kosul_motoru")
+        try:
+            kosul = kosul_motoru.derle(ifade)
+        except kosul_motoru.KosulHatasi as e:
+            await message.reply(f"❌ Geçersiz koşul: {html.escape(str(e))}")
+            return
+        try:
+            await uyari_ekle(message.from_user.id, sembol, tip, kosul.metin)
+            await message.reply(
+                f"✅ <b>Uyarı kuruldu!</b>\n"
+                f"📌 <b>{sembol}</b> günlük barlarda "
+                f"<code>{html.escape(kosul.metin)}</code> sağlanınca bildirim alacaksınız."
+            )
+        except Exception as e:
+            log.exception("Uyarı ekleme hatası")
+            await message.reply(f"❌ Uyarı kurulamadı: {str(e)}")
+        return
+
     hedef = validate_numeric(parcalar[3], min_val=0)
     if hedef is None:
         await message.reply("❌ Geçersiz hedef değer. Pozitif sayı giriniz.")
@@ -497,7 +695,7 @@ async def komut_uyarilarim(message: Message):
     satirlar = [f"🔔 <b>Aktif Uyarılarınız ({len(uyarilar)} adet)</b>\n"]
     for u in uyarilar:
         satirlar.append(
-            f"• <b>#{u['id']}</b> {u['sembol']} — {u['tip']} @ {u['hedef_deger']}"
+            f"• <b>#{u['id']}</b> {u['sembol']} — {u['tip']} @ {html.escape(str(u['hedef_deger']))}"
         )
 
     satirlar.append("\n<i>Uyarı silmek için: /uyari_sil ID</i>")
@@ -541,6 +739,54 @@ async def komut_portfoy(message: Message):
         await bekle_msg.edit_text(f"❌ Portföy yüklenemedi: {str(e)}")
 
 
+@dp.message(Command("portfoy_risk"))
+async def komut_portfoy_risk(message: Message):
+    """Portföy risk raporu (volatilite, beta, korelasyon, VaR/CVaR, maks. düşüş)."""
+    if not await _rate_limit_check(message):
+        return
+
+    bekle_msg = await message.reply("⏳ Risk metrikleri hesaplanıyor...")
+    try:
+        pr = await _async(importlib.import_module, "portfoy_risk")
+        rapor = await pr.portfoy_risk_raporu(message.from_user.id)
+        await bekle_msg.edit_text(rapor, reply_markup=build_close_button())
+    except Exception as e:
+        log.exception("Portföy risk hatası")
+        await bekle_msg.edit_text(f"❌ Risk raporu hazırlanamadı: {str(e)}")
+
+
+@dp.message(Command("portfoy_gecmis"))
+async def komut_portfoy_gecmis(message: Message):
+    """
+    Gün sonu anlıklarından portföy performansı.
+    Kullanım: /portfoy_gecmis [GÜN]  (varsayılan 365)
+    """
+    if not await _rate_limit_check(message):
+        return
+
+    parcalar = message.text.split()
+    try:
+        gun = int(parcalar[1]) if len(parcalar) > 1 else 365
+        if gun < 2:
+            raise ValueError
+    except ValueError:
+        await message.reply("❌ Gün sayısı 2 veya daha büyük bir tam sayı olmalı.\nÖrnek: <code>/portfoy_gecmis 90</code>")
+        return
+
+    bekle_msg = await message.reply("⏳ Portföy geçmişi hazırlanıyor...")
+    try:
+        pg = await _async(importlib.import_module, "portfoy_gecmisi")
+        metin, png = await pg.portfoy_gecmisi_raporu(message.from_user.id, gun)
+        if png is None:
+            await bekle_msg.edit_text(metin, reply_markup=build_close_button())
+            return
+        await message.answer_photo(BufferedInputFile(png, "portfoy_gecmisi.png"), caption=metin)
+        await bekle_msg.delete()
+    except Exception as e:
+        log.exception("Portföy geçmişi hatası")
+        await bekle_msg.edit_text(f"❌ Portföy geçmişi hazırlanamadı: {str(e)}")
+
+
 @dp.message(Command("portfoy_ekle"))
 async def komut_portfoy_ekle(message: Message):
     """
@@ -568,6 +814,46 @@ async def komut_portfoy_ekle(message: Message):
     await message.reply(sonuc)
 
 
+# Komut → (defter işlem türü, kullanım, değer sayısı)
+_PORTFOY_ISLEM_KOMUTLARI = {
+    "portfoy_sat": ("satis", "/portfoy_sat SEMBOL MIKTAR FIYAT", 2),
+    "portfoy_temettu": ("temettu", "/portfoy_temettu SEMBOL HISSE_BASI_TEMETTU", 1),
+    "portfoy_bolunme": ("bolunme", "/portfoy_bolunme SEMBOL ORAN", 1),
+}
+
+
+@dp.message(Command(*_PORTFOY_ISLEM_KOMUTLARI))
+async def komut_portfoy_islem(message: Message):
+    """Portföy defterine satış / temettü / bölünme yazar."""
+    parcalar = message.text.split()
+    komut = parcalar[0].lstrip("/").split("@")[0].lower()
+    tur, kullanim, deger_sayisi = _PORTFOY_ISLEM_KOMUTLARI[komut]
+    if len(parcalar) < 2 + deger_sayisi:
+        await message.reply(f"⚠️ <b>Kullanım:</b> <code>{kullanim}</code>")
+        return
+
+    girdi = sanitize_text(parcalar[1])
+    valid, sembol, _ = validate_symbol(girdi)
+    if not valid:
+        await message.reply("❌ Geçersiz sembol formatı.")
+        return
+
+    miktar, fiyat = (parcalar[2], parcalar[3]) if deger_sayisi == 2 else (None, parcalar[2])
+    sonuc = await portfoy_islem_kaydet(message.from_user.id, sembol, tur, miktar, fiyat)
+    await message.reply(sonuc)
+
+
+@dp.message(Command("portfoy_para_birimi"))
+async def komut_portfoy_para_birimi(message: Message):
+    """Portföyün değerlendiği para birimini değiştirir."""
+    parcalar = message.text.split()
+    if len(parcalar) < 2:
+        await message.reply("⚠️ Kullanım: <code>/portfoy_para_birimi USD</code>")
+        return
+    sonuc = await portfoy_para_birimi_ayarla(message.from_user.id, sanitize_text(parcalar[1]))
+    await message.reply(sonuc)
+
+
 @dp.message(Command("portfoy_sil"))
 async def komut_portfoy_sil(message: Message):
     """Portföyden varlık siler."""
@@ -767,15 +1053,10 @@ async def callback_grafik(callback: CallbackQuery):
         return
     await callback.answer("📊 Grafik hazırlanıyor...")
 
-    path = os.path.join(LOG_DIR, f"chart_{callback.from_user.id}.png")
-    success = await tv_grafik_cek(sembol, path)
+    async def _sira(sira: int):
+        await callback.message.answer(f"⏳ Grafik kuyruğundasınız — sıra: <b>{sira}</b>")
 
-    if success and os.path.exists(path):
-        await callback.message.answer_photo(
-            FSInputFile(path),
-            caption=f"📈 <b>{sembol}</b> TradingView Grafiği"
-        )
-    else:
+    if not await _grafik_gonder(callback.message, sembol, sira_bildir=_sira):
         await callback.message.answer(
             f"❌ <b>{sembol}</b> grafiği çekilemedi."
         )
@@ -844,6 +1125,7 @@ async def main():
 
     # Veritabanı başlatma
     await db_init()
+    await preload_user_prefs()
 
     # Monitoring (Health Check)
     try:
@@ -858,7 +1140,17 @@ async def main():
         log.error(f"Health server başlatılamadı: {e}")
 
     # Arka Plan Görevleri
-    asyncio.create_task(uyari_kontrol_dongusu(bot))
+    asyncio.create_task(gonderim_kuyrugu.calistir(bot))
+    # Parçalama açıksa kiralayıcı döngüden önce kurulur (ilk tur yalnızca kiralı parçalar)
+    asyncio.create_task(uyari_parcalama_baslat())
+    asyncio.create_task(uyari_kontrol_dongusu())
+    asyncio.create_task(kosul_uyari_dongusu())
+    asyncio.create_task(kripto_uyari_akisi_baslat())
+    asyncio.create_task(_mum_akisi_baslat())
+    if settings.PORTFOLIO_SNAPSHOT_ENABLED:
+        asyncio.create_task(_portfoy_gunsonu_baslat())
+    if settings.CHART_MOTORU == "tradingview":
+        asyncio.create_task(_tv_havuzu_isit())
 
     # Sinyal Yakalayıcılar
     loop = asyncio.get_running_loop()
@@ -870,6 +1162,7 @@ async def main():
     # Manuel Giriş Modu Kontrolü (Komut satırı argümanı ile)
     if "--login" in sys.argv:
         log.info("🔑 Manuel giriş modu başlatılıyor...")
+        from tradingview_motoru import manuel_giris_yap
         manuel_giris_yap()
         return
 
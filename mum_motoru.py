@@ -0,0 +1,275 @@
+"""
+mum_motoru.py — Canlı işlem akışından gün içi mum (OHLCV) üretimi.
+
+Akış merkezindeki <sembol>@aggTrade mesajları 1m / 5m / 1h mumlarına birleştirilir:
+
+    tick ──► açık mum (aralık başına)  ──kapanınca──► HalkaTampon (NumPy, sabit kapasite)
+                                                 └──► db.mumlar (toplu, CANDLE_FLUSH_SECONDS)
+
+✅ teknik_analiz_yap(sembol, interval="5m") mumları doğrudan bellekten okur — HTTP çağrısı yok.
+✅ Açılışta tamponlar db.mumlar tablosundan ısıtılır; yeniden başlatma geçmişi silmez.
+✅ İzlenen semboller: uyarı indeksindeki kripto semboller + teknik analizde istenenler.
+"""
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config import settings
+
+log = logging.getLogger("finans_botu")
+
+ARALIKLAR: Dict[str, int] = {"1m": 60, "5m": 300, "1h": 3600}
+SUTUNLAR = ("zaman", "acilis", "yuksek", "dusuk", "kapanis", "hacim")
+
+
+# ═══════════════════════════════════════════════════════════════
+# HALKA TAMPON
+# ═══════════════════════════════════════════════════════════════
+
+class HalkaTampon:
+    """Sabit kapasiteli (kapasite × 6) float64 dizi; dolunca en eski mumun üzerine yazılır."""
+
+    def __init__(self, kapasite: int):
+        self.kapasite = max(1, kapasite)
+        self._v = np.empty((self.kapasite, len(SUTUNLAR)), dtype=np.float64)
+        self._bas = 0     # Sıradaki yazma konumu
+        self.sayi = 0
+
+    def __len__(self):
+        return self.sayi
+
+    def ekle(self, satir) -> None:
+        self._v[self._bas] = satir
+        self._bas = (self._bas + 1) % self.kapasite
+        self.sayi = min(self.sayi + 1, self.kapasite)
+
+    def son_zaman(self) -> Optional[float]:
+        return float(self._v[self._bas - 1, 0]) if self.sayi else None
+
+    def dizi(self) -> np.ndarray:
+        """Eskiden yeniye sıralı kopya (sayi × 6)."""
+        if self.sayi < self.kapasite:
+            return self._v[:self.sayi].copy()
+        return np.concatenate((self._v[self._bas:], self._v[:self._bas]))
+
+
+# ═══════════════════════════════════════════════════════════════
+# MUM BİRLEŞTİRİCİ
+# ═══════════════════════════════════════════════════════════════
+
+class MumAgregatoru:
+    """
+    Tick'lerden çok aralıklı mum üretir. Yazma event loop'ta, okuma (teknik_analiz)
+    executor thread'inde yapıldığından paylaşılan durum threading.Lock ile korunur.
+    """
+
+    def __init__(self, kapasite: Optional[int] = None, araliklar: Optional[Dict[str, int]] = None):
+        self.kapasite = kapasite or settings.CANDLE_BUFFER_BARS
+        self.araliklar = dict(araliklar or ARALIKLAR)
+        self._tamponlar: Dict[Tuple[str, str], HalkaTampon] = {}
+        self._acik: Dict[Tuple[str, str], List[float]] = {}    # [zaman, o, h, l, c, v]
+        self._kapanan: List[tuple] = []                       # DB'ye yazılacaklar
+        self._talep: Set[str] = set()                         # teknik analizde istenen semboller
+        self._kilit = threading.Lock()
+        self.gec_tick = 0                                     # Açık mumdan eski (atılan) tick'ler
+
+    # ── Yazma (event loop) ────────────────────────────────────────
+
+    def tick(self, sembol: str, fiyat: float, miktar: float, zaman: float) -> None:
+        """Tek işlemi tüm aralıklardaki açık mumlara işler; aralık değiştiyse mumu kapatır."""
+        with self._kilit:
+            for aralik, sn in self.araliklar.items():
+                anahtar = (sembol, aralik)
+                bas = zaman - zaman % sn
+                acik = self._acik.get(anahtar)
+                if acik is None:
+                    # Süresi dolup kapatılmış bir mumun gecikmiş tick'i yeni mum açmasın
+                    tampon = self._tamponlar.get(anahtar)
+                    if tampon is not None and tampon.sayi and bas <= tampon.son_zaman():
+                        self.gec_tick += 1
+                        continue
+                if acik is None or bas > acik[0]:
+                    if acik is not None:
+                        self._kapat(anahtar, acik)
+                    self._acik[anahtar] = [bas, fiyat, fiyat, fiyat, fiyat, miktar]
+                elif bas == acik[0]:
+                    if fiyat > acik[2]: acik[2] = fiyat
+                    if fiyat < acik[3]: acik[3] = fiyat
+                    acik[4] = fiyat
+                    acik[5] += miktar
+                else:
+                    self.gec_tick += 1
+
+    def _kapat(self, anahtar: Tuple[str, str], acik: List[float]) -> None:
+        tampon = self._tamponlar.get(anahtar)
+        if tampon is None:
+            tampon = self._tamponlar[anahtar] = HalkaTampon(self.kapasite)
+        tampon.ekle(acik)
+        self._kapanan.append((anahtar[0], anahtar[1], int(acik[0]), *acik[1:]))
+
+    def suresi_dolanlari_kapat(self, simdi: Optional[float] = None) -> int:
+        """İşlem gelmeyen sembollerde süresi biten açık mumları kapatır."""
+        simdi = time.time() if simdi is None else simdi
+        kapanan = 0
+        with self._kilit:
+            for anahtar, acik in list(self._acik.items()):
+                if acik[0] + self.araliklar[anahtar[1]] <= simdi:
+                    self._kapat(anahtar, acik)
+                    del self._acik[anahtar]
+                    kapanan += 1
+        return kapanan
+
+    def isit(self, sembol: str, aralik: str, satirlar: List[tuple]) -> None:
+        """Veritabanındaki geçmiş mumları (eskiden yeniye) boş tampona yükler."""
+        with self._kilit:
+            anahtar = (sembol, aralik)
+            if anahtar in self._tamponlar or not satirlar:
+                return
+            tampon = self._tamponlar[anahtar] = HalkaTampon(self.kapasite)
+            for satir in satirlar[-self.kapasite:]:
+                tampon.ekle(satir)
+
+    def kapananlari_al(self) -> List[tuple]:
+        with self._kilit:
+            kapanan, self._kapanan = self._kapanan, []
+        return kapanan
+
+    def talep_et(self, sembol: str) -> None:
+        """(Herhangi bir thread) Sembolün akışa alınmasını ister."""
+        with self._kilit:
+            self._talep.add(sembol.upper())
+
+    def talepler(self) -> Set[str]:
+        with self._kilit:
+            return set(self._talep)
+
+    # ── Okuma (herhangi bir thread) ───────────────────────────────
+
+    def mumlar(self, sembol: str, aralik: str, acik_dahil: bool = True) -> np.ndarray:
+        """(n × 6) dizi: zaman, acilis, yuksek, dusuk, kapanis, hacim — eskiden yeniye."""
+        with self._kilit:
+            tampon = self._tamponlar.get((sembol.upper(), aralik))
+            dizi = tampon.dizi() if tampon else np.empty((0, len(SUTUNLAR)))
+            acik = self._acik.get((sembol.upper(), aralik))
+            if acik_dahil and acik is not None:
+                dizi = np.vstack((dizi, acik))
+        return dizi
+
+    def mumlar_df(self, sembol: str, aralik: str, acik_dahil: bool = True):
+        """yfinance history() ile aynı sütunlara sahip DataFrame (UTC DatetimeIndex)."""
+        import pandas as pd
+        dizi = self.mumlar(sembol, aralik, acik_dahil)
+        return pd.DataFrame(
+            dizi[:, 1:], columns=["Open", "High", "Low", "Close", "Volume"],
+            index=pd.to_datetime(dizi[:, 0], unit="s", utc=True),
+        )
+
+
+# Global birleştirici (teknik_analiz okur, MumAkisi yazar)
+mum_agregatoru = MumAgregatoru()
+
+
+# ═══════════════════════════════════════════════════════════════
+# AKIŞ BAĞLANTISI
+# ═══════════════════════════════════════════════════════════════
+
+class MumAkisi:
+    """
+    İzlenecek sembol kümesini akış merkezine abone eder, aggTrade mesajlarını
+    birleştiriciye verir ve kapanmış mumları periyodik olarak veritabanına yazar.
+    Mumlar için her işlem gerektiğinden abone birleştirmesiz (FIFO) kuyruk kullanır.
+    """
+
+    def __init__(self, agregator: Optional[MumAgregatoru] = None, hub=None,
+                 yazma_sn: Optional[float] = None):
+        if hub is None:
+            from websocket_motoru import akis_merkezi as hub
+        self.agregator = agregator or mum_agregatoru
+        self.hub = hub
+        self.abone = hub.abone(self._mesaj, kuyruk_boyutu=10_000, birlestir=False)
+        self.yazma_sn = settings.CANDLE_FLUSH_SECONDS if yazma_sn is None else yazma_sn
+        self._harita: Dict[str, str] = {}     # BTCUSDT → BTC-USD
+
+    async def _mesaj(self, stream: str, veri: Dict[str, Any]):
+        sembol = self._harita.get(veri.get("s", ""))
+        if sembol is None:
+            return
+        try:
+            fiyat, miktar = float(veri["p"]), float(veri["q"])
+        except (KeyError, TypeError, ValueError):
+            return
+        self.agregator.tick(sembol, fiyat, miktar, veri.get("T", time.time() * 1000) / 1000)
+
+    def _istenen_harita(self) -> Dict[str, str]:
+        from uyari_indeksi import uyari_indeksi
+        from websocket_motoru import binance_sembolu
+        harita = {}
+        for sembol in set(uyari_indeksi.semboller()) | self.agregator.talepler():
+            b = binance_sembolu(sembol)
+            if b:
+                harita[b] = sembol
+        return harita
+
+    async def _abonelikleri_guncelle(self, harita: Dict[str, str]):
+        from db import mumlari_getir
+        from websocket_motoru import islem_stream
+        yeni = harita.keys() - self._harita.keys()
+        eski = self._harita.keys() - harita.keys()
+        for b in yeni:
+            for aralik in self.agregator.araliklar:
+                self.agregator.isit(harita[b], aralik,
+                                    await mumlari_getir(harita[b], aralik, self.agregator.kapasite))
+        self._harita = harita
+        if eski:
+            await self.abone.cikar(*[islem_stream(b) for b in eski])
+        if yeni:
+            await self.abone.ekle(*[islem_stream(b) for b in yeni])
+            log.info(f"🕯️ Mum akışı: {', '.join(sorted(harita[b] for b in yeni))} eklendi.")
+
+    async def yaz(self):
+        """
+        Süresi dolan mumları kapatır ve kapananları tek işlemde veritabanına yazar.
+        Tamponu ısıtmaya yetenden (kapasite kadar mum) eski satırlar aynı yazımda silinir.
+        """
+        from db import mumlari_kaydet
+        self.agregator.suresi_dolanlari_kapat()
+        kapanan = self.agregator.kapananlari_al()
+        if kapanan:
+            son: Dict[Tuple[str, str], int] = {}
+            for sembol, aralik, zaman, *_ in kapanan:
+                son[(sembol, aralik)] = max(zaman, son.get((sembol, aralik), zaman))
+            budama = [(sembol, aralik, zaman - (self.agregator.kapasite - 1) * self.agregator.araliklar[aralik])
+                      for (sembol, aralik), zaman in son.items()]
+            await mumlari_kaydet(kapanan, budama)
+            log.debug(f"🕯️ {len(kapanan)} mum kaydedildi.")
+
+    async def calistir(self):
+        try:
+            while True:
+                try:
+                    harita = self._istenen_harita()
+                    if harita.keys() != self._harita.keys():
+                        await self._abonelikleri_guncelle(harita)
+                    await self.yaz()
+                except Exception as e:
+                    log.error(f"Mum akışı hatası: {e}")
+                await asyncio.sleep(self.yazma_sn)
+        finally:
+            # Kapanışta (task iptali) bekleyen mumlar kaybolmasın
+            await self.abone.kapat()
+            try:
+                await self.yaz()
+            except Exception as e:
+                log.error(f"Mumlar kaydedilemedi: {e}")
+
+
+async def mum_akisi_baslat():
+    """main.py arka plan görevi."""
+    if not settings.CANDLE_STREAM_ENABLED:
+        log.info("ℹ️ Canlı mum akışı kapalı (CANDLE_STREAM_ENABLED=false).")
+        return
+    await MumAkisi().calistir()
@@ -0,0 +1,128 @@
+"""
+parca_kiralama.py — Uyarı değerlendirmesini süreçler arasında parçalama (SQLite kiraları).
+
+Semboller kararlı bir özetle (CRC32) ALERT_SHARD_COUNT parçaya bölünür. Her süreç
+parçaları uyari_kiralari tablosundaki satırlarla kiralar:
+
+    kira_al        parça boşsa / süresi dolmuşsa / zaten bizdeyse  → sahip = biz, bitis = şimdi + süre
+    kiralari_yenile heartbeat: süresi dolmamış kiralar uzatılır
+    kira_birak     kapanışta (veya adil payın üstündeyken) parça hemen devredilir
+
+✅ Her süreç adil payını (⌈parça / canlı süreç⌉) alır; yeni süreç katılınca fazlalar bırakılır.
+✅ Ölen sürecin parçaları kira süresi dolunca diğerlerince devralınır.
+✅ Süreç kirayı yerel monotonic saate göre süre dolmadan (güvenlik payıyla) bırakmış sayar;
+   böylece devralan süreçle aynı anda değerlendirme yapmaz.
+✅ Kiralar iş bölümünü sağlar; tek bildirim garantisi ayrıca db.gonderim_ekle'dedir
+   (uyari_id başına tek satır, silinmiş uyarı kuyruğa giremez).
+"""
+import os
+import math
+import time
+import zlib
+import socket
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+from config import settings
+from db import isci_sinyali, kira_al, kira_birak, kiralari_getir, kiralari_yenile
+
+log = logging.getLogger("finans_botu")
+
+
+def parca_no(sembol: str, parca_sayisi: int) -> int:
+    """Sembolün parçası — Python hash()'inin aksine süreçten sürece değişmez."""
+    return zlib.crc32(sembol.upper().encode()) % parca_sayisi
+
+
+def varsayilan_sahip() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ParcaKiralayici:
+    """
+    Bu sürecin sahip olduğu parçaları yönetir.
+
+        kiralayici = ParcaKiralayici()
+        asyncio.create_task(kiralayici.calistir())
+        if kiralayici.sahibi_miyim("THYAO.IS"): ...
+    """
+
+    def __init__(self, sahip: Optional[str] = None, parca_sayisi: Optional[int] = None,
+                 sure: Optional[float] = None):
+        self.sahip = sahip or varsayilan_sahip()
+        self.parca_sayisi = max(1, parca_sayisi or settings.ALERT_SHARD_COUNT)
+        self.sure = sure or settings.ALERT_LEASE_SECONDS
+        self.parcalar: Set[int] = set()
+        self.surum = 0                     # Parça kümesi her değiştiğinde artar
+        self._yerel_bitis = 0.0            # monotonic; bu andan sonra hiçbir parçaya sahip sayılmayız
+        # Sahip sembol kararı sık sorulur; parça hesabı önbelleklenir
+        self._parca_onbellek: Dict[str, int] = {}
+
+    def parca(self, sembol: str) -> int:
+        p = self._parca_onbellek.get(sembol)
+        if p is None:
+            p = self._parca_onbellek[sembol] = parca_no(sembol, self.parca_sayisi)
+        return p
+
+    def sahibi_miyim(self, sembol: str) -> bool:
+        return self.parca(sembol) in self.parcalar and time.monotonic() < self._yerel_bitis
+
+    async def yenile(self) -> bool:
+        """Tek heartbeat turu. Parça kümesi değiştiyse True."""
+        yerel = time.monotonic()
+        simdi = time.time()
+        bitis = simdi + self.sure
+
+        canli = max(1, await isci_sinyali(self.sahip, simdi, self.sure))
+        hedef = math.ceil(self.parca_sayisi / canli)
+        sahip_olunan = await kiralari_yenile(self.sahip, simdi, bitis)
+
+        # Fazlalar: yeni katılan süreçler alabilsin diye en büyük numaralılar bırakılır
+        if len(sahip_olunan) > hedef:
+            fazla = sahip_olunan[hedef:]
+            await kira_birak(self.sahip, fazla)
+            sahip_olunan = sahip_olunan[:hedef]
+
+        if len(sahip_olunan) < hedef:
+            dolu = await kiralari_getir(simdi)
+            # Süreçler aynı boş parçalar için yarışmasın: aramaya sahibe özgü bir yerden başla
+            bas = zlib.crc32(self.sahip.encode()) % self.parca_sayisi
+            for i in range(self.parca_sayisi):
+                if len(sahip_olunan) >= hedef:
+                    break
+                p = (bas + i) % self.parca_sayisi
+                if p not in dolu and await kira_al(p, self.sahip, simdi, bitis):
+                    sahip_olunan.append(p)
+
+        yeni = set(sahip_olunan)
+        # Kiralar veritabanında `bitis`te dolar; yerelde bir tur (sure/3) erken bırakılmış sayılır
+        self._yerel_bitis = yerel + self.sure * 2 / 3
+        if yeni != self.parcalar:
+            log.info(f"🧩 Uyarı parçaları ({self.sahip}): {len(yeni)}/{self.parca_sayisi} "
+                     f"(+{len(yeni - self.parcalar)} / -{len(self.parcalar - yeni)})")
+            self.parcalar = yeni
+            self.surum += 1
+            return True
+        return False
+
+    async def birak(self):
+        self.parcalar = set()
+        self._yerel_bitis = 0.0
+        self.surum += 1
+        await kira_birak(self.sahip)
+
+    async def calistir(self):
+        """Kira süresinin üçte birinde bir heartbeat; kapanışta tüm parçaları bırakır."""
+        try:
+            while True:
+                try:
+                    await self.yenile()
+                except Exception as e:
+                    log.error(f"Parça kiraları yenilenemedi: {e}")
+                await asyncio.sleep(self.sure / 3)
+        finally:
+            try:
+                await self.birak()
+            except Exception as e:
+                log.error(f"Parça kiraları bırakılamadı: {e}")
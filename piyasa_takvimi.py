@@ -0,0 +1,220 @@
+"""
+piyasa_takvimi.py — Borsa seans takvimi ve piyasa saatine duyarlı yoklama planı.
+
+Desteklenen piyasalar:
+  BIST     Pzt–Cum 10:00–18:10 (Europe/Istanbul), resmi/dini tatiller, arife yarım günleri
+  NYSE     Pzt–Cum 09:30–16:00 (America/New_York) — NASDAQ ile aynı takvim
+  FOREX    Pazar 17:00 → Cuma 17:00 (New York) kesintisiz
+  VADELI   CME Globex emtia: Paz–Per 18:00 → ertesi gün 17:00 (New York)
+  KRIPTO   7/24
+
+Uyarı döngüsü (alert_motoru) her yoklamadan sonra `yoklama_zamani()` ile bir sonraki
+zamanı sorar: seans içinde normal aralık (açılışın ilk dakikalarında daha sık),
+kapanıştan sonra tek bir son yoklama, sonra bir sonraki açılışa kadar sessizlik.
+
+⚠️ Tatil listeleri yıllık güncellenmelidir (dini bayramlar her yıl kayar).
+   Listede olmayan bir tatil yalnızca gereksiz bir yoklamaya yol açar, tetik kaçırmaz;
+   listeler bittiğinde yoklama_zamani() her piyasa için yılda bir kez uyarı loglar.
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, FrozenSet, Iterator, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from config import settings
+from security.input_validator import _KRIPTO_QUOTE_CURRENCIES
+
+log = logging.getLogger("finans_botu")
+
+HAFTA_ICI = frozenset(range(5))   # Pazartesi=0 ... Cuma=4
+
+
+@dataclass(frozen=True)
+class Piyasa:
+    """
+    Haftalık seans tanımı. Her seans `gunler`deki bir yerel günde `acilis`ta başlar,
+    `kapanis_ofseti` gün sonra `kapanis`ta biter (FOREX: Pazar → Cuma = 5 gün).
+    """
+    ad: str
+    tz: str
+    acilis: time = time(0, 0)
+    kapanis: time = time(0, 0)
+    gunler: FrozenSet[int] = HAFTA_ICI
+    kapanis_ofseti: int = 0
+    tatiller: FrozenSet[date] = frozenset()
+    erken_kapanis: Dict[date, time] = field(default_factory=dict)
+    surekli: bool = False
+
+    @property
+    def bolge(self) -> ZoneInfo:
+        return ZoneInfo(self.tz)
+
+    @property
+    def takvim_sonu(self) -> Optional[int]:
+        """Tatil listesinin kapsadığı son yıl (tatil tanımlı değilse None)."""
+        return max((g.year for g in self.tatiller), default=None)
+
+    def seanslar(self, baslangic: date, gun_sayisi: int) -> Iterator[Tuple[datetime, datetime]]:
+        """baslangic gününden itibaren başlayan seanslar (aware datetime çiftleri)."""
+        bolge = self.bolge
+        for i in range(gun_sayisi):
+            gun = baslangic + timedelta(days=i)
+            if gun.weekday() not in self.gunler or gun in self.tatiller:
+                continue
+            kapanis = self.erken_kapanis.get(gun, self.kapanis)
+            yield (datetime.combine(gun, self.acilis, bolge),
+                   datetime.combine(gun + timedelta(days=self.kapanis_ofseti), kapanis, bolge))
+
+
+# ═══════════════════════════════════════════════════════════════
+# TATİL TAKVİMLERİ (2025–2026)
+# ═══════════════════════════════════════════════════════════════
+
+_BIST_TATIL = frozenset(date.fromisoformat(g) for g in (
+    "2025-01-01", "2025-03-31", "2025-04-01", "2025-04-23", "2025-05-01", "2025-05-19",
+    "2025-06-06", "2025-06-09", "2025-07-15", "2025-10-29",
+    "2026-01-01", "2026-03-20", "2026-04-23", "2026-05-01", "2026-05-19",
+    "2026-05-27", "2026-05-28", "2026-05-29", "2026-07-15", "2026-10-29",
+))
+_BIST_YARIM_GUN = {date.fromisoformat(g): time(12, 40) for g in (
+    "2025-06-05", "2025-10-28",
+    "2026-03-19", "2026-05-26", "2026-10-28",
+)}
+
+_NYSE_TATIL = frozenset(date.fromisoformat(g) for g in (
+    "2025-01-01", "2025-01-09", "2025-01-20", "2025-02-17", "2025-04-18", "2025-05-26",
+    "2025-06-19", "2025-07-04", "2025-09-01", "2025-11-27", "2025-12-25",
+    "2026-01-01", "2026-01-19", "2026-02-16", "2026-04-03", "2026-05-25",
+    "2026-06-19", "2026-07-03", "2026-09-07", "2026-11-26", "2026-12-25",
+))
+_NYSE_ERKEN = {date.fromisoformat(g): time(13, 0) for g in (
+    "2025-07-03", "2025-11-28", "2025-12-24",
+    "2026-11-27", "2026-12-24",
+)}
+
+
+PIYASALAR: Dict[str, Piyasa] = {
+    "BIST": Piyasa("BIST", "Europe/Istanbul", time(10, 0), time(18, 10),
+                   tatiller=_BIST_TATIL, erken_kapanis=_BIST_YARIM_GUN),
+    "NYSE": Piyasa("NYSE", "America/New_York", time(9, 30), time(16, 0),
+                   tatiller=_NYSE_TATIL, erken_kapanis=_NYSE_ERKEN),
+    "FOREX": Piyasa("FOREX", "America/New_York", time(17, 0), time(17, 0),
+                    gunler=frozenset({6}), kapanis_ofseti=5),
+    "VADELI": Piyasa("VADELI", "America/New_York", time(18, 0), time(17, 0),
+                     gunler=frozenset({6, 0, 1, 2, 3}), kapanis_ofseti=1),
+    "KRIPTO": Piyasa("KRIPTO", "UTC", surekli=True),
+}
+
+
+def piyasa_bul(sembol: str) -> Optional[Piyasa]:
+    """
+    yfinance sembolünden piyasa: THYAO.IS / ^XU100 → BIST, EURUSD=X → FOREX,
+    GC=F → VADELI, BTC-USD → KRIPTO, AAPL / ^GSPC → NYSE.
+    Bilinmeyen borsa son ekleri (.L, .DE ...) için None — her zaman açık sayılır.
+    """
+    s = sembol.upper()
+    if s.endswith(".IS") or s.startswith("^XU"):
+        return PIYASALAR["BIST"]
+    if s.endswith("=X"):
+        return PIYASALAR["FOREX"]
+    if s.endswith("=F"):
+        return PIYASALAR["VADELI"]
+    if "-" in s and s.rsplit("-", 1)[1] in _KRIPTO_QUOTE_CURRENCIES:
+        return PIYASALAR["KRIPTO"]
+    if "." in s:
+        return None
+    return PIYASALAR["NYSE"]
+
+
+# ═══════════════════════════════════════════════════════════════
+# SEANS SORGULARI
+# ═══════════════════════════════════════════════════════════════
+
+def _yerel_gun(piyasa: Piyasa, an: datetime) -> date:
+    return an.astimezone(piyasa.bolge).date()
+
+
+def aktif_seans(piyasa: Piyasa, an: datetime) -> Optional[Tuple[datetime, datetime]]:
+    """`an` anında süren seans (başlangıç, bitiş) veya None."""
+    gun = _yerel_gun(piyasa, an)
+    geri = piyasa.kapanis_ofseti + 1
+    for bas, bit in piyasa.seanslar(gun - timedelta(days=geri), geri + 1):
+        if bas <= an < bit:
+            return bas, bit
+    return None
+
+
+def acik_mi(sembol: str, an: Optional[datetime] = None) -> bool:
+    piyasa = piyasa_bul(sembol)
+    if piyasa is None or piyasa.surekli:
+        return True
+    return aktif_seans(piyasa, an or datetime.now(tz=piyasa.bolge)) is not None
+
+
+def sonraki_acilis(piyasa: Piyasa, an: datetime) -> datetime:
+    """`an`dan sonraki ilk seans başlangıcı (en fazla 3 hafta ileriye bakar)."""
+    for bas, _ in piyasa.seanslar(_yerel_gun(piyasa, an), 21):
+        if bas > an:
+            return bas
+    return an + timedelta(days=1)   # Takvim boşsa günde bir yokla
+
+
+def son_kapanis(piyasa: Piyasa, an: datetime) -> Optional[datetime]:
+    """`an`dan önce biten son seansın bitişi."""
+    gun = _yerel_gun(piyasa, an)
+    geri = piyasa.kapanis_ofseti + 14
+    son = None
+    for _, bit in piyasa.seanslar(gun - timedelta(days=geri), geri + 1):
+        if bit <= an:
+            son = bit
+    return son
+
+
+# ═══════════════════════════════════════════════════════════════
+# YOKLAMA PLANI
+# ═══════════════════════════════════════════════════════════════
+
+_takvim_uyarilari: set = set()   # (piyasa adı, yıl) — uyarı yılda bir kez
+
+
+def _takvim_kontrol(piyasa: Piyasa, an: datetime):
+    """Tatil listesi `an`ın yılını kapsamıyorsa (piyasa/yıl başına bir kez) uyarır."""
+    son = piyasa.takvim_sonu
+    if son is None or an.year <= son or (piyasa.ad, an.year) in _takvim_uyarilari:
+        return
+    _takvim_uyarilari.add((piyasa.ad, an.year))
+    log.warning(f"⚠️ {piyasa.ad} tatil takvimi {son} yılında bitiyor: {an.year} tatilleri işlem günü "
+                f"sayılıyor. piyasa_takvimi.py tatil listelerini güncelleyin.")
+
+def yoklama_zamani(sembol: str, simdi: float) -> float:
+    """
+    `simdi` (epoch) anında yoklanan sembolün bir sonraki yoklama zamanı (epoch).
+
+      seans açık     → simdi + ALERT_CHECK_INTERVAL
+                       (açılıştan sonraki ALERT_OPEN_BOOST_MINUTES boyunca ALERT_OPEN_BOOST_INTERVAL)
+                       (sıradaki yoklama seans dışına taşıyorsa kapanış + ALERT_POST_CLOSE_DELAY)
+      kapanış sonrası → son yoklama henüz yapılmadıysa kapanış + ALERT_POST_CLOSE_DELAY
+      kapalı         → bir sonraki açılış anı
+    """
+    aralik = settings.ALERT_CHECK_INTERVAL
+    piyasa = piyasa_bul(sembol)
+    if piyasa is None or piyasa.surekli:
+        return simdi + aralik
+
+    an = datetime.fromtimestamp(simdi, tz=piyasa.bolge)
+    _takvim_kontrol(piyasa, an)
+    gecikme = timedelta(seconds=settings.ALERT_POST_CLOSE_DELAY)
+    seans = aktif_seans(piyasa, an)
+    if seans is not None:
+        bas, bit = seans
+        if an < bas + timedelta(minutes=settings.ALERT_OPEN_BOOST_MINUTES):
+            aralik = min(aralik, settings.ALERT_OPEN_BOOST_INTERVAL)
+        sonraki = simdi + aralik
+        # Seans içindeki son yoklamadan sonra doğrudan kapanış sonrası son yoklamaya geç
+        return sonraki if sonraki < bit.timestamp() else (bit + gecikme).timestamp()
+
+    kapanis = son_kapanis(piyasa, an)
+    if kapanis is not None and an < kapanis + gecikme:
+        return (kapanis + gecikme).timestamp()
+    return sonraki_acilis(piyasa, an).timestamp()
@@ -0,0 +1,275 @@
+"""
+portfoy_backtest.py — Çok sembollü portföy backtest'i (ortak takvim, yeniden dengeleme kuralları).
+
+    N sembolün mumları ──► ortak takvim (T × N kapanış; listelenmeden önce NaN)
+    yeniden dengeleme günleri (K) ──► ağırlık kuralı ──► K × N hedef ağırlık
+    → özkaynak: dönem içi ağırlıklar fiyatla kayar, dengelemede devir × maliyet düşülür
+
+Tüm hesap T × N birikimli getiri matrisi üzerinde vektöreldir; sembol ya da gün döngüsü yoktur
+(sinyal ağırlıklı kuralda yalnızca sembol başına strateji sinyali üretilir).
+Ağırlıklar dengeleme gününün kapanışındaki bilgiyle belirlenir ve o kapanıştan itibaren tutulur.
+
+Takvim: tüm sembollerin işlem günlerinin birleşimi. BIST ve ABD tatilleri farklı olduğundan tatildeki
+piyasanın fiyatı önceki kapanışta kalır; listelenmiş varlıkların yarısından azının işlem gördüğü
+günler (ör. hisse evreninde yalnızca kripto barı olan hafta sonları) atılır.
+"""
+import os
+import json
+import time
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from backtest_motoru import (
+    BASLANGIC_SERMAYESI, KAPANIS, YIL_SN, ZAMAN, BacktestHatasi,
+    hedef_pozisyonlar, islem_maliyeti, ozkaynak_metrikleri,
+)
+from fiyat_gecmisi import GUN
+from portfoy_risk import ortak_takvim
+
+log = logging.getLogger("finans_botu")
+
+_SEKTOR_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sektor_listesi.json")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# AĞIRLIK KURALLARI
+# ═══════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class AgirlikKurali:
+    ad: str
+    aciklama: str
+    # fonksiyon(kapanis T×N, satirlar K, sinyal T×N | None, **parametreler) → K × N ağırlık
+    fonksiyon: Callable[..., np.ndarray]
+    varsayilanlar: Dict[str, float]
+    sinyal_gerekir: bool = False
+
+    def parametreler(self, degerler: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        degerler = degerler or {}
+        bilinmeyen = sorted(set(degerler) - set(self.varsayilanlar))
+        if bilinmeyen:
+            raise BacktestHatasi(f"{self.ad} için bilinmeyen parametre: {', '.join(bilinmeyen)} "
+                                 f"(geçerli: {', '.join(self.varsayilanlar) or '—'})")
+        return {**self.varsayilanlar, **{k: float(v) for k, v in degerler.items()}}
+
+
+AGIRLIK_KURALLARI: Dict[str, AgirlikKurali] = {}
+
+
+def agirlik_kurali(ad: str, aciklama: str, sinyal_gerekir: bool = False, **varsayilanlar: float):
+    """Ağırlık fonksiyonunu AGIRLIK_KURALLARI'na kaydeden dekoratör."""
+    def kaydet(fonksiyon):
+        AGIRLIK_KURALLARI[ad.upper()] = AgirlikKurali(ad.upper(), aciklama, fonksiyon, dict(varsayilanlar),
+                                                      sinyal_gerekir)
+        return fonksiyon
+    return kaydet
+
+
+def _normalize(maske: np.ndarray) -> np.ndarray:
+    """Satır başına toplamı 1 olacak şekilde ölçekler; boş satır nakitte (0) kalır."""
+    toplam = maske.sum(axis=1, keepdims=True)
+    return np.divide(maske, toplam, out=np.zeros_like(maske, dtype=np.float64), where=toplam > 0)
+
+
+@agirlik_kurali("ESIT", "Listelenmiş tüm varlıklara eşit ağırlık")
+def _esit(kapanis: np.ndarray, satirlar: np.ndarray, sinyal) -> np.ndarray:
+    return _normalize(np.isfinite(kapanis[satirlar]).astype(np.float64))
+
+
+@agirlik_kurali("SINYAL", "Strateji sinyali (0–1) oranında ağırlık; sinyal yoksa nakit", sinyal_gerekir=True)
+def _sinyal_agirlikli(kapanis: np.ndarray, satirlar: np.ndarray, sinyal: np.ndarray) -> np.ndarray:
+    return _normalize(np.nan_to_num(np.clip(sinyal[satirlar], 0.0, None)))
+
+
+@agirlik_kurali("MOMENTUM", "Son `pencere` barın (son `atla` bar hariç) getirisi en yüksek k varlığa eşit ağırlık",
+                k=10, pencere=126, atla=0)
+def _momentum(kapanis: np.ndarray, satirlar: np.ndarray, sinyal, k: float, pencere: float,
+              atla: float) -> np.ndarray:
+    k, pencere, atla = int(k), int(pencere), int(atla)
+    if k < 1 or pencere <= atla:
+        raise BacktestHatasi("MOMENTUM: k ≥ 1 ve pencere > atla olmalı.")
+    son = kapanis[np.maximum(satirlar - atla, 0)]
+    ilk = np.where((satirlar >= pencere)[:, None], kapanis[np.maximum(satirlar - pencere, 0)], np.nan)
+    momentum = np.where(np.isfinite(kapanis[satirlar]), son / ilk - 1, np.nan)
+    gecerli = np.isfinite(momentum)
+    puan = np.where(gecerli, momentum, -np.inf)
+    k = min(k, kapanis.shape[1])
+    secilen = np.argpartition(-puan, k - 1, axis=1)[:, :k]
+    maske = np.zeros_like(puan)
+    np.put_along_axis(maske, secilen, 1.0, axis=1)
+    return _normalize(maske * gecerli)
+
+
+def kural_getir(ad: str) -> AgirlikKurali:
+    kayit = AGIRLIK_KURALLARI.get(ad.upper())
+    if kayit is None:
+        raise BacktestHatasi(f"Bilinmeyen ağırlık kuralı: {ad} (mevcut: {', '.join(AGIRLIK_KURALLARI)})")
+    return kayit
+
+
+# ═══════════════════════════════════════════════════════════════════
+# TAKVİM
+# ═══════════════════════════════════════════════════════════════════
+
+def evren_takvimi(mumlar: Dict[str, np.ndarray]):
+    """
+    Sembollerin kapanışlarını ortak takvime dizer → (günler, T × N kapanış, sembol başına takvim satırları).
+    Satırlar, her sembolün kendi barlarının takvimdeki yeridir (atılan günler -1).
+    """
+    seriler = [(m[:, ZAMAN], m[:, KAPANIS]) for m in mumlar.values()]
+    gunler, kapanis, gozlem = ortak_takvim(seriler)
+    listelenmis = np.isfinite(kapanis)
+    tut = gozlem.sum(axis=1) * 2 >= listelenmis.sum(axis=1)
+    yeni_satir = np.where(tut, np.cumsum(tut) - 1, -1)
+    satirlar = [yeni_satir[np.searchsorted(gunler, z)] for z, _ in seriler]
+    return gunler[tut], kapanis[tut], satirlar
+
+
+def dengeleme_satirlari(gunler: np.ndarray, siklik: Union[str, int]) -> np.ndarray:
+    """Yeniden dengeleme satırları: 'aylik' / 'haftalik' (dönemin ilk işlem günü) ya da her `siklik` bar."""
+    if isinstance(siklik, str):
+        gun_no = (gunler // GUN).astype(np.int64)
+        if siklik == "aylik":
+            donem = gun_no.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        elif siklik == "haftalik":
+            donem = (gun_no + 3) // 7                  # 1970-01-01 Perşembe → Pazartesi başlangıçlı haftalar
+        else:
+            raise BacktestHatasi(f"Bilinmeyen dengeleme sıklığı: {siklik} (aylik, haftalik ya da bar sayısı)")
+        return np.flatnonzero(np.concatenate(([True], donem[1:] != donem[:-1])))
+    if int(siklik) < 1:
+        raise BacktestHatasi("Dengeleme sıklığı en az 1 bar olmalı.")
+    return np.arange(0, len(gunler), int(siklik))
+
+
+def strateji_sinyalleri(mumlar: Dict[str, np.ndarray], satirlar: List[np.ndarray], T: int, strateji: str,
+                        parametreler: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    """Sembol başına uzun-only strateji hedefleri → T × N sinyal matrisi (takvim dışı günler ileri doldurulur)."""
+    sinyal = np.full((T, len(mumlar)), np.nan)
+    for j, (m, satir) in enumerate(zip(mumlar.values(), satirlar)):
+        if len(m) < 3:
+            continue
+        _, _, hedef = hedef_pozisyonlar(m, strateji, parametreler)
+        tut = satir >= 0
+        sinyal[satir[tut], j] = hedef[tut]
+    indeks = np.where(np.isfinite(sinyal), np.arange(T)[:, None], 0)
+    np.maximum.accumulate(indeks, axis=0, out=indeks)
+    return sinyal[indeks, np.arange(sinyal.shape[1])]
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MOTOR
+# ═══════════════════════════════════════════════════════════════════
+
+@dataclass
+class PortfoyBacktestSonucu:
+    kural: str
+    parametreler: Dict[str, float]
+    semboller: List[str]
+    zaman: np.ndarray                 # takvim günleri (epoch sn)
+    ozkaynak: np.ndarray              # (T,)
+    dengeleme_satirlari: np.ndarray   # (K,)
+    agirliklar: np.ndarray            # (K × N) dengelemede hedeflenen ağırlıklar
+    devir: np.ndarray                 # (K,) dengeleme başına alınıp satılan tutar / özkaynak
+    toplam_getiri: float
+    cagr: float
+    sharpe: float
+    max_dusus: float
+    ortalama_devir: float
+
+
+def portfoy_ozkaynagi(kapanis: np.ndarray, satirlar: np.ndarray, agirliklar: np.ndarray,
+                      maliyet: float, sermaye: float = BASLANGIC_SERMAYESI):
+    """
+    K dengeleme satırında hedeflenen ağırlıklarla özkaynak eğrisi ve devir → (ozkaynak (T,), devir (K,)).
+
+    G = birikimli büyüme (T × N). k. dönemde t anındaki değer oranı Σ w_k · G_t / G_{s_k} + nakit_k;
+    dengeleme öncesi kaymış ağırlıklarla hedef arasındaki fark devirdir. Dönem sonu oranları ve
+    maliyet çarpanları K boyunca tek cumprod ile zincirlenir.
+    """
+    T = len(kapanis)
+    onceki = np.vstack((kapanis[:1], kapanis[:-1]))
+    getiri = np.nan_to_num(kapanis / onceki - 1)        # listelenmeden önce / ilk gün: 0
+    G = np.cumprod(1 + getiri, axis=0)
+    nakit = 1 - agirliklar.sum(axis=1)
+
+    # Her satırın bağlı olduğu dönem (ilk dengelemeden önce -1: tamamen nakit)
+    donem = np.searchsorted(satirlar, np.arange(T), side="right") - 1
+    aktif = donem >= 0
+    d = np.maximum(donem, 0)
+    oran = (agirliklar[d] * G / G[satirlar[d]]).sum(axis=1) + nakit[d]
+
+    # Dengeleme anında önceki dönemin kaymış ağırlıkları → devir
+    kaymis = np.zeros_like(agirliklar)
+    donem_sonu = np.ones(len(satirlar))
+    if len(satirlar) > 1:
+        onceki_w = agirliklar[:-1] * G[satirlar[1:]] / G[satirlar[:-1]]
+        donem_sonu[1:] = onceki_w.sum(axis=1) + nakit[:-1]
+        kaymis[1:] = onceki_w / donem_sonu[1:, None]
+    devir = np.abs(agirliklar - kaymis).sum(axis=1)
+
+    dengeleme_degeri = sermaye * np.cumprod(donem_sonu * (1 - maliyet * devir))
+    ozkaynak = np.where(aktif, dengeleme_degeri[d] * oran, sermaye)
+    return ozkaynak, devir
+
+
+def portfoy_backtest(mumlar: Dict[str, np.ndarray], kural: str = "ESIT",
+                     parametreler: Optional[Dict[str, Any]] = None,
+                     siklik: Union[str, int] = "aylik",
+                     strateji: str = "SUPERTREND", strateji_parametreleri: Optional[Dict[str, Any]] = None,
+                     komisyon: Optional[float] = None, kayma: Optional[float] = None,
+                     sermaye: float = BASLANGIC_SERMAYESI) -> PortfoyBacktestSonucu:
+    """
+    Sembol → (n × 6) mumlar üzerinde portföy backtest'i.
+    strateji yalnızca sinyal gerektiren kurallarda (SINYAL) kullanılır; kısa sinyaller nakit sayılır.
+    """
+    kayit = kural_getir(kural)
+    params = kayit.parametreler(parametreler)
+    mumlar = {s: np.asarray(m, dtype=np.float64) for s, m in mumlar.items() if len(m)}
+    if not mumlar:
+        raise BacktestHatasi("Portföy backtest'i için veri yok.")
+
+    gunler, kapanis, sembol_satirlari = evren_takvimi(mumlar)
+    if len(gunler) < 3:
+        raise BacktestHatasi("Portföy backtest'i için yeterli ortak gün yok.")
+    satirlar = dengeleme_satirlari(gunler, siklik)
+    sinyal = (strateji_sinyalleri(mumlar, sembol_satirlari, len(gunler), strateji, strateji_parametreleri)
+              if kayit.sinyal_gerekir else None)
+
+    agirliklar = kayit.fonksiyon(kapanis, satirlar, sinyal, **params)
+    agirliklar = np.where(np.isfinite(kapanis[satirlar]), agirliklar, 0.0)    # listelenmemiş varlık alınamaz
+    ozkaynak, devir = portfoy_ozkaynagi(kapanis, satirlar, agirliklar, islem_maliyeti(komisyon, kayma), sermaye)
+
+    return PortfoyBacktestSonucu(
+        kural=kayit.ad,
+        parametreler=params,
+        semboller=list(mumlar),
+        zaman=gunler,
+        ozkaynak=ozkaynak,
+        dengeleme_satirlari=satirlar,
+        agirliklar=agirliklar,
+        devir=devir,
+        **ozkaynak_metrikleri(gunler, ozkaynak, sermaye),
+        ortalama_devir=float(devir[1:].mean()) if len(devir) > 1 else 0.0,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════
+# EVREN
+# ═══════════════════════════════════════════════════════════════════
+
+def bist_evreni() -> List[str]:
+    """sektor_listesi.json'daki tüm BIST hisseleri (yfinance sembolleri)."""
+    with open(_SEKTOR_JSON, "r", encoding="utf-8") as f:
+        return [f"{kod}.IS" for kod in json.load(f)]
+
+
+async def evren_mumlari(semboller: Sequence[str], yil: float = 10.0) -> Dict[str, np.ndarray]:
+    """Evrenin günlük OHLCV'si — tek yf.download çağrısı (fiyat_gecmisi düzeni)."""
+    from fiyat_gecmisi import yfinance_gunluk
+
+    mumlar = await yfinance_gunluk(list(semboller), int(time.time() - yil * YIL_SN))
+    log.info(f"📚 Portföy backtest evreni: {len(mumlar)}/{len(semboller)} sembolün verisi alındı.")
+    return mumlar
@@ -0,0 +1,150 @@
+"""
+portfoy_defteri.py — Lot bazlı portföy defteri: işlem → pozisyon/lot hesapları (saf fonksiyonlar).
+
+Her işlem (alış, satış, temettü, bölünme) deftere bir satır olarak yazılır; pozisyon
+(portfoy_pozisyonlari) ve açık lotlar (portfoy_lotlari) her işlemde artımlı güncellenir.
+Bu modül yalnızca hesaplar; okuma/yazma db.py'dedir (portfoy_islemi_uygula).
+
+İki maliyet yöntemi birlikte tutulur:
+    FIFO        satış en eski açık lottan düşer; fifo_maliyet = açık lotların toplam maliyeti
+    Ortalama    ort_maliyet = ağırlıklı ortalama birim maliyet; satış ortalamayı değiştirmez
+
+Tutarlar Decimal'dir ve TEXT olarak saklanır (bkz. metin()).
+"""
+from dataclasses import dataclass, replace
+from decimal import Decimal, InvalidOperation
+from typing import Any, Iterable, List, Optional, Tuple
+
+ISLEM_TURLERI = ("alis", "satis", "temettu", "bolunme")
+SIFIR = Decimal("0")
+
+
+class DefterHatasi(ValueError):
+    """Geçersiz işlem (ör. elde olandan fazla satış)."""
+
+
+def ondalik(deger: Any) -> Decimal:
+    """Saklanan TEXT değeri Decimal'e çevirir."""
+    try:
+        return Decimal(str(deger))
+    except (InvalidOperation, ValueError):
+        raise DefterHatasi(f"Geçersiz sayı: {deger!r}")
+
+
+def metin(deger: Decimal) -> str:
+    """Decimal → TEXT; gereksiz sıfırlar atılır, üslü gösterim kullanılmaz ('1000000', '0.00001')."""
+    if deger == 0:
+        return "0"
+    return format(deger.normalize(), "f")
+
+
+@dataclass(frozen=True)
+class Lot:
+    id: Optional[int]            # None: henüz yazılmamış (yeni alış)
+    kalan: Decimal
+    birim_maliyet: Decimal
+
+
+@dataclass(frozen=True)
+class Pozisyon:
+    miktar: Decimal = SIFIR
+    fifo_maliyet: Decimal = SIFIR        # Açık lotların toplam maliyeti
+    ort_maliyet: Decimal = SIFIR         # Ortalama maliyet yöntemine göre birim maliyet
+    gerceklesen_fifo: Decimal = SIFIR
+    gerceklesen_ort: Decimal = SIFIR
+    temettu: Decimal = SIFIR
+
+    ALANLAR = ("miktar", "fifo_maliyet", "ort_maliyet", "gerceklesen_fifo", "gerceklesen_ort", "temettu")
+
+    @classmethod
+    def satirdan(cls, satir: Optional[dict]) -> "Pozisyon":
+        if satir is None:
+            return cls()
+        return cls(**{a: ondalik(satir[a]) for a in cls.ALANLAR})
+
+    def satira(self) -> dict:
+        return {a: metin(getattr(self, a)) for a in self.ALANLAR}
+
+
+def islem_uygula(poz: Pozisyon, lotlar: List[Lot], tur: str, miktar: Decimal,
+                 fiyat: Decimal) -> Tuple[Pozisyon, List[Lot]]:
+    """
+    Tek işlemi uygular; yeni pozisyonu ve açık lotların yeni listesini döndürür (girdiler değişmez).
+
+        alis     miktar adet, fiyat birim maliyet        → yeni lot
+        satis    miktar adet, fiyat birim satış fiyatı   → FIFO lotlardan düşer
+        temettu  fiyat hisse başı temettü (miktar yok sayılır, eldeki adet kullanılır)
+        bolunme  fiyat oran (2 → 1 hisse 2 olur, 0.1 → 10 hisse 1 olur)
+
+    satis/bolunme için `lotlar` pozisyonun tüm açık lotları olmalıdır (en eski önce).
+    """
+    if tur not in ISLEM_TURLERI:
+        raise DefterHatasi(f"Bilinmeyen işlem türü: {tur}")
+
+    if tur == "alis":
+        if miktar <= 0 or fiyat < 0:
+            raise DefterHatasi("Alış miktarı pozitif, fiyatı negatif olmayan olmalı.")
+        yeni_miktar = poz.miktar + miktar
+        ort = fiyat if poz.miktar == 0 else (poz.miktar * poz.ort_maliyet + miktar * fiyat) / yeni_miktar
+        return (replace(poz, miktar=yeni_miktar, fifo_maliyet=poz.fifo_maliyet + miktar * fiyat,
+                        ort_maliyet=ort),
+                lotlar + [Lot(None, miktar, fiyat)])
+
+    if tur == "satis":
+        if miktar <= 0 or fiyat < 0:
+            raise DefterHatasi("Satış miktarı pozitif, fiyatı negatif olmayan olmalı.")
+        if miktar > poz.miktar:
+            raise DefterHatasi(f"Eldeki miktardan ({metin(poz.miktar)}) fazla satılamaz.")
+        kalan_satis, dusulen, yeni_lotlar = miktar, SIFIR, []
+        for lot in lotlar:
+            if kalan_satis <= 0:
+                yeni_lotlar.append(lot)
+                continue
+            al = min(lot.kalan, kalan_satis)
+            dusulen += al * lot.birim_maliyet
+            kalan_satis -= al
+            if al < lot.kalan:
+                yeni_lotlar.append(replace(lot, kalan=lot.kalan - al))
+        yeni_miktar = poz.miktar - miktar
+        return (replace(
+            poz, miktar=yeni_miktar,
+            # Pozisyon kapanınca bölünme yuvarlamalarından kalan kırıntı sıfırlanır
+            fifo_maliyet=poz.fifo_maliyet - dusulen if yeni_miktar > 0 else SIFIR,
+            ort_maliyet=poz.ort_maliyet if yeni_miktar > 0 else SIFIR,
+            gerceklesen_fifo=poz.gerceklesen_fifo + miktar * fiyat - dusulen,
+            gerceklesen_ort=poz.gerceklesen_ort + miktar * (fiyat - poz.ort_maliyet),
+        ), yeni_lotlar)
+
+    if tur == "temettu":
+        if fiyat <= 0:
+            raise DefterHatasi("Hisse başı temettü pozitif olmalı.")
+        if poz.miktar == 0:
+            raise DefterHatasi("Açık pozisyon yokken temettü kaydedilemez.")
+        return replace(poz, temettu=poz.temettu + poz.miktar * fiyat), list(lotlar)
+
+    # bolunme
+    if fiyat <= 0:
+        raise DefterHatasi("Bölünme oranı pozitif olmalı.")
+    if poz.miktar == 0:
+        raise DefterHatasi("Açık pozisyon yokken bölünme kaydedilemez.")
+    return (replace(poz, miktar=poz.miktar * fiyat, ort_maliyet=poz.ort_maliyet / fiyat),
+            [replace(lot, kalan=lot.kalan * fiyat, birim_maliyet=lot.birim_maliyet / fiyat)
+             for lot in lotlar])
+
+
+def lot_farki(eski: List[Lot], yeni: List[Lot]) -> Tuple[List[Lot], List[Lot], List[int]]:
+    """islem_uygula sonrası yazılacaklar: (eklenen, güncellenen, silinen id'ler)."""
+    yeni_idler = {lot.id for lot in yeni if lot.id is not None}
+    eski_lotlar = {lot.id: lot for lot in eski}
+    eklenen = [lot for lot in yeni if lot.id is None]
+    guncellenen = [lot for lot in yeni if lot.id is not None and eski_lotlar.get(lot.id) != lot]
+    silinen = [lot.id for lot in eski if lot.id not in yeni_idler]
+    return eklenen, guncellenen, silinen
+
+
+def defteri_oynat(islemler: Iterable[Tuple[str, Decimal, Decimal]]) -> Tuple[Pozisyon, List[Lot]]:
+    """(tur, miktar, fiyat) işlemlerini baştan uygular — artımlı pozisyonun doğrulaması / onarımı."""
+    poz, lotlar = Pozisyon(), []
+    for tur, miktar, fiyat in islemler:
+        poz, lotlar = islem_uygula(poz, lotlar, tur, miktar, fiyat)
+    return poz, lotlar
@@ -0,0 +1,191 @@
+"""
+portfoy_gecmisi.py — Gün sonu portföy anlıkları ve zaman ağırlıklı getiri (/portfoy_gecmis).
+
+Her gün PORTFOLIO_SNAPSHOT_UTC'de tüm portföyler tek seferde değerlenir:
+
+    açık pozisyonlar (tek sorgu) ─┐
+    günün işlemleri (tek sorgu) ──┼─► kapanışlar: tek yf.download (fiyat_gecmisi, zorla)
+                                  └─► kurlar: tek kur matrisi (kur_matrisi)
+    → portfoy_anliklari (user_id, gun, deger, maliyet, akis, para_birimi, zaman) — tek toplu yazma
+
+akis, [önceki anlığın alındığı an, bu anlığın alındığı an) aralığında dışarıdan giren net
+tutardır (alış +, satış ve temettü −); anlık saatinden sonra girilen işlem sonraki anlığa düşer.
+getiri hesabı yatırılan/çekilen parayı performanstan ayırmak için bunu kullanır.
+/portfoy_gecmis yalnızca anlıkları okur; geçmiş yeniden hesaplanmaz.
+"""
+import time
+import asyncio
+import logging
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+import db
+import grafik_motoru
+from config import settings
+from fiyat_gecmisi import GUN, TAZELIK_GUN, gunluk_gecmis
+from kur_matrisi import Kurlar, kur_matrisi, para_birimi_coz
+from ux.user_prefs import DEFAULT_PREFS
+
+log = logging.getLogger("finans_botu")
+
+_AKIS_YONU = {"alis": 1, "satis": -1, "temettu": -1}
+
+
+# ═══════════════════════════════════════════════════════════════════
+# GÜN SONU ANLIĞI
+# ═══════════════════════════════════════════════════════════════════
+
+def _kapanis(seri, gun: int) -> Optional[float]:
+    """Serinin `gun` sonundaki (ya da öncesindeki son) kapanışı; çok eskiyse None."""
+    zaman, kapanis = seri
+    i = int(np.searchsorted(zaman, gun * GUN, side="right")) - 1
+    if i < 0 or zaman[i] < (gun - TAZELIK_GUN) * GUN:
+        return None
+    return float(kapanis[i])
+
+
+async def gunsonu_anlik_al(zaman: Optional[float] = None, onceki_zaman: Optional[float] = None) -> int:
+    """
+    Tüm portföylerin `zaman` anındaki değerini o UTC günün anlığı olarak yazar; yazılan anlık
+    sayısını döndürür. Akışlar [önceki anlığın alındığı an, zaman) aralığındaki işlemlerdir
+    (kaçırılan günler sonraki anlığa eklenir).
+    """
+    zaman = time.time() if zaman is None else zaman
+    gun = int(zaman // GUN)
+    if onceki_zaman is None:
+        onceki_zaman = await db.son_anlik_zamani(gun)
+        if onceki_zaman is None:
+            onceki_zaman = zaman - GUN
+
+    pozisyonlar = await db.gunsonu_pozisyonlari_getir()
+    akislar = await db.portfoy_akislari_getir(onceki_zaman, zaman)
+    if not pozisyonlar and not akislar:
+        return 0
+
+    semboller = {p["sembol"] for p in pozisyonlar} | {a["sembol"] for a in akislar}
+    birimler = {s: para_birimi_coz(s) for s in semboller}
+    bazlar = {r["user_id"]: (r["para_birimi"] or DEFAULT_PREFS["currency"]).upper() for r in pozisyonlar + akislar}
+
+    # Tek toplu kapanış çekimi + (gerekirse) tek kur matrisi
+    seriler = await gunluk_gecmis.getir(sorted(semboller), 2 * TAZELIK_GUN, zorla=True)
+    kur_gerekli = any(birimler[r["sembol"]][0] not in (None, bazlar[r["user_id"]]) for r in pozisyonlar + akislar)
+    kurlar = await kur_matrisi.guncel() if kur_gerekli else Kurlar()
+
+    deger: Dict[int, float] = dict.fromkeys(bazlar, 0.0)
+    maliyet: Dict[int, float] = dict.fromkeys(bazlar, 0.0)
+    akis: Dict[int, float] = dict.fromkeys(bazlar, 0.0)
+    eksik: Dict[int, str] = {}
+
+    for p in pozisyonlar:
+        uid, sembol = p["user_id"], p["sembol"]
+        pb, carpan = birimler[sembol]
+        kur = kurlar.kur(pb, bazlar[uid]) if pb else None
+        fiyat = _kapanis(seriler[sembol], gun) if sembol in seriler else None
+        if kur is None or fiyat is None:
+            eksik[uid] = sembol
+            continue
+        deger[uid] += float(Decimal(p["miktar"]) * Decimal(str(fiyat)) * carpan * kur)
+        maliyet[uid] += float(Decimal(p["fifo_maliyet"]) * carpan * kur)
+
+    for a in akislar:
+        uid = a["user_id"]
+        pb, carpan = birimler[a["sembol"]]
+        kur = kurlar.kur(pb, bazlar[uid]) if pb else None
+        if kur is None:
+            eksik[uid] = a["sembol"]
+            continue
+        akis[uid] += _AKIS_YONU[a["tur"]] * float(Decimal(a["miktar"]) * Decimal(a["fiyat"]) * carpan * kur)
+
+    # Eksik fiyatlı portföyün yanlış değeri yazılmaz: o gün boşluk kalır
+    satirlar = [(uid, gun, deger[uid], maliyet[uid], akis[uid], bazlar[uid])
+                for uid in bazlar if uid not in eksik]
+    await db.portfoy_anliklari_kaydet(satirlar, zaman)
+    if eksik:
+        log.warning(f"⚠️ {len(eksik)} portföyün gün sonu anlığı atlandı (fiyat/kur yok, ör. {next(iter(eksik.values()))}).")
+    log.info(f"📸 Gün sonu: {len(satirlar)} portföy anlığı kaydedildi ({len(semboller)} sembol).")
+    return len(satirlar)
+
+
+def _anlik_saniyesi() -> int:
+    saat, dakika = settings.PORTFOLIO_SNAPSHOT_UTC.split(":")
+    return int(saat) * 3600 + int(dakika) * 60
+
+
+async def gunsonu_dongusu():
+    """Her gün PORTFOLIO_SNAPSHOT_UTC'de anlık alır; saat geçmişken başlanırsa günün anlığı hemen alınır."""
+    if not settings.PORTFOLIO_SNAPSHOT_ENABLED:
+        return
+    saniye = _anlik_saniyesi()
+    son = await db.son_anlik_gunu()
+    alinan = -1 if son is None else son
+    log.info(f"📸 Gün sonu portföy anlıkları her gün {settings.PORTFOLIO_SNAPSHOT_UTC} UTC'de.")
+    while True:
+        simdi = time.time()
+        bugun = int(simdi // GUN)
+        if simdi >= bugun * GUN + saniye and alinan < bugun:
+            try:
+                await gunsonu_anlik_al(simdi)
+                alinan = bugun
+            except Exception as e:
+                log.error(f"Gün sonu anlığı alınamadı: {e}")
+                await asyncio.sleep(300)
+                continue
+        hedef = bugun * GUN + saniye
+        if simdi >= hedef:
+            hedef += GUN
+        await asyncio.sleep(max(1.0, hedef - time.time()))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PERFORMANS
+# ═══════════════════════════════════════════════════════════════════
+
+def zaman_agirlikli_getiri(deger: np.ndarray, akis: np.ndarray) -> np.ndarray:
+    """
+    Kümülatif zaman ağırlıklı getiri (ilk anlıkta 0). Günlük alt dönem getirisi Modified
+    Dietz ile (akış dönemin ortasında): r = (V₁ − V₀ − F) / (V₀ + F/2); paydası pozitif
+    olmayan günler (boş portföy) 0 sayılır.
+    """
+    onceki = deger[:-1]
+    pay = deger[1:] - onceki - akis[1:]
+    payda = onceki + 0.5 * akis[1:]
+    r = np.divide(pay, payda, out=np.zeros_like(pay), where=payda > 0)
+    return np.concatenate(([0.0], np.cumprod(1 + r) - 1))
+
+
+async def portfoy_gecmisi_raporu(user_id: int, gun: int = 365) -> Tuple[str, Optional[bytes]]:
+    """/portfoy_gecmis: son `gun` günün anlıklarından TWR özeti ve performans grafiği."""
+    satirlar = await db.portfoy_anliklari_getir(user_id, int(time.time() // GUN) - gun)
+    # Para birimi değiştiyse yalnızca son birimdeki kesintisiz dönem karşılaştırılabilir
+    if satirlar:
+        birim = satirlar[-1][4]
+        while satirlar[0][4] != birim:
+            satirlar = satirlar[1:]
+    if len(satirlar) < 2:
+        return ("📭 <b>Henüz yeterli gün sonu kaydı yok.</b>\n"
+                "Portföyünüzün değeri her gün sonunda kaydedilir; performans iki günlük kayıttan sonra görünür."), None
+
+    gunler = np.array([r[0] for r in satirlar], dtype=np.int64)
+    deger, maliyet, akis = (np.array([r[i] for r in satirlar], dtype=np.float64) for i in (1, 2, 3))
+    twr = zaman_agirlikli_getiri(deger, akis)
+    sure = int(gunler[-1] - gunler[0])
+    egri = 1 + twr
+    max_dusus = float((egri / np.maximum.accumulate(egri) - 1).min())
+    baslangic = np.datetime64(int(gunler[0]), "D")
+    bitis = np.datetime64(int(gunler[-1]), "D")
+
+    mesaj = f"📈 <b>Portföy Geçmişi</b> ({baslangic} → {bitis}, {birim})\n"
+    mesaj += "┄" * 22 + "\n"
+    mesaj += f"💰 Değer: {deger[0]:,.2f} → {deger[-1]:,.2f}\n"
+    mesaj += f"🧾 Maliyet: {maliyet[-1]:,.2f} | Açık K/Z: {deger[-1] - maliyet[-1]:+,.2f}\n"
+    mesaj += f"💸 Net yatırım: {akis[1:].sum():+,.2f}\n"
+    mesaj += f"⏱️ <b>Zaman ağırlıklı getiri:</b> %{twr[-1] * 100:+.2f}"
+    if sure >= 365:
+        mesaj += f" (yıllık %{((1 + twr[-1]) ** (365 / sure) - 1) * 100:+.2f})"
+    mesaj += f"\n🔻 Maks. düşüş: %{max_dusus * 100:.2f}"
+
+    png = await grafik_motoru.performans_grafigi(
+        gunler, deger, maliyet, twr, f"Portföy Performansı ({birim})")
+    return mesaj, png
@@ -1,13 +1,18 @@
 """
 portfoy_motoru.py — Kullanıcı portföy takibi ve kar/zarar hesaplama.
 ✅ MİMARİ GÜNCELLEME - Decimal hassasiyeti, get_fiyat_hiyerarsik entegrasyonu.
+✅ Lot bazlı defter (portfoy_defteri): alış/satış/temettü/bölünme, FIFO + ortalama maliyet.
+✅ Çoklu para birimi: pozisyonlar kullanıcının para biriminde değerlenir (kur_matrisi).
 """
 import asyncio
 import logging
 from decimal import Decimal, InvalidOperation
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
-from db import portfoy_getir, portfoy_ekle, portfoy_sil
+from db import portfoy_getir, portfoy_gerceklesen_getir, portfoy_islemi_uygula, portfoy_sil
+from kur_matrisi import Kurlar, kur_matrisi, para_birimi_coz
+from portfoy_defteri import DefterHatasi
+from ux.user_prefs import get_user_currency, set_user_pref
 from veri_motoru import get_fiyat_hiyerarsik
 
 log = logging.getLogger("finans_botu")
@@ -27,36 +32,82 @@ def _parse_decimal(val: Any) -> Optional[Decimal]:
         return None
 
 
+async def _fiyatlari_getir(semboller: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Sembol fiyatlarını paralel çeker (get_fiyat_hiyerarsik cache'li)."""
+    sonuclar = await asyncio.gather(*(get_fiyat_hiyerarsik(s) for s in semboller), return_exceptions=True)
+    fiyatlar: Dict[str, Dict[str, Any]] = {}
+    for sembol, sonuc in zip(semboller, sonuclar):
+        if isinstance(sonuc, Exception):
+            log.error(f"Portföy fiyat çekme hatası ({sembol}): {sonuc}")
+            sonuc = {}
+        fiyatlar[sembol] = sonuc or {}
+    return fiyatlar
+
+
+def _gerceklesen_toplami(gerceklesen: List[Dict[str, Any]], birimler: Dict[str, Tuple[Optional[str], Decimal]],
+                         baz: str, kurlar: Kurlar) -> Tuple[Dict[str, Decimal], List[str]]:
+    """
+    Sembol başına gerçekleşen K/Z ve temettüyü baz para biriminde toplar; kuru bulunmayanları döndürür.
+    Defter tutarları kotasyon biriminde (ör. pence) olduğundan önce ana birime çevrilir.
+    """
+    toplam = {alan: Decimal("0") for alan in ("gerceklesen_fifo", "gerceklesen_ort", "temettu")}
+    kursuz = []
+    for satir in gerceklesen:
+        pb, carpan = birimler[satir["sembol"]]
+        kur = kurlar.kur(pb, baz) if pb else None
+        if kur is None:
+            kursuz.append(satir["sembol"])
+            continue
+        for alan in toplam:
+            toplam[alan] += Decimal(satir[alan]) * carpan * kur
+    return toplam, kursuz
+
+
 async def portfoy_ozeti_hazirla(user_id: int) -> str:
     """
     Kullanıcının portföy özetini hazırlar.
-    ✅ Decimal hassasiyeti, asenkron fiyat çekimi.
+    ✅ Pozisyon başına tek satır (portfoy_pozisyonlari) + cache'li fiyatlar; defter yeniden oynatılmaz.
+    ✅ Çoklu para birimi: her pozisyon kendi biriminde gösterilir, toplamlar kullanıcının para
+       biriminde (tercih 'currency'); kurlar tek çekimli kur matrisinden (kur_matrisi).
     """
+    baz = await get_user_currency(user_id)
     portfoy = await portfoy_getir(user_id)
+    gerceklesen = await portfoy_gerceklesen_getir(user_id)
+    fiyat_sonuclari = await _fiyatlari_getir([v['sembol'] for v in portfoy]) if portfoy else {}
+
+    # Fiyatın birimi kaynaktan (yoksa sembolden); kapanmış pozisyonlar için fiyat çekilmez
+    birimler = {sembol: para_birimi_coz(sembol, fiyat_sonuclari.get(sembol, {}).get("para_birimi"))
+                for sembol in {v['sembol'] for v in portfoy} | {g['sembol'] for g in gerceklesen}}
+    # Tüm varlıklar baz birimdeyse kur çekilmez; aksi halde yenileme başına en fazla bir çekim
+    kur_gerekli = any(pb is not None and pb != baz for pb, _ in birimler.values())
+    kurlar = await kur_matrisi.guncel() if kur_gerekli else Kurlar()
+    gerceklesen_toplam, kursuz = _gerceklesen_toplami(gerceklesen, birimler, baz, kurlar)
+
+    def _gerceklesen_satiri() -> str:
+        satir = (f"✅ <b>Gerçekleşen K/Z:</b> {gerceklesen_toplam['gerceklesen_ort']:+.2f} {baz} "
+                 f"(FIFO: {gerceklesen_toplam['gerceklesen_fifo']:+.2f})")
+        if gerceklesen_toplam["temettu"]:
+            satir += f"\n💵 <b>Temettü:</b> {gerceklesen_toplam['temettu']:.2f} {baz}"
+        if kursuz:
+            satir += f"\n⚠️ Kuru bulunamayan gerçekleşen tutarlar toplama katılmadı: {', '.join(kursuz)}"
+        return satir
+
     if not portfoy:
-        return (
+        mesaj = (
             "📭 <b>Portföyünüz henüz boş.</b>\n\n"
             "Varlık eklemek için:\n"
             "<code>/portfoy_ekle THYAO 100 45.50</code>\n"
             "(Sembol, Miktar, Alış Maliyeti)"
         )
+        if gerceklesen:
+            mesaj += "\n\n" + _gerceklesen_satiri()
+        return mesaj
 
     toplam_maliyet = Decimal("0")
     toplam_deger = Decimal("0")
-    mesaj = "📊 <b>Portföy Özetiniz</b>\n"
+    mesaj = f"📊 <b>Portföy Özetiniz</b> ({baz})\n"
     mesaj += "┄" * 22 + "\n"
 
-    # Tüm sembollerin fiyatlarını paralel çek
-    semboller = list({v['sembol'] for v in portfoy})
-    fiyat_gorevleri = {s: get_fiyat_hiyerarsik(s) for s in semboller}
-    fiyat_sonuclari: Dict[str, Dict[str, Any]] = {}
-    for sembol, gorev in fiyat_gorevleri.items():
-        try:
-            fiyat_sonuclari[sembol] = await gorev
-        except Exception as e:
-            log.error(f"Portföy fiyat çekme hatası ({sembol}): {e}")
-            fiyat_sonuclari[sembol] = {}
-
     for varlik in portfoy:
         sembol = varlik['sembol']
         miktar = _parse_decimal(varlik['miktar'])
@@ -66,25 +117,37 @@ async def portfoy_ozeti_hazirla(user_id: int) -> str:
             mesaj += f"⚠️ <b>{sembol}</b>: Geçersiz veri.\n\n"
             continue
 
-        fiyat_verisi = fiyat_sonuclari.get(sembol, {})
-        guncel_fiyat_raw = fiyat_verisi.get("fiyat")
-        guncel_fiyat = _parse_decimal(guncel_fiyat_raw)
+        guncel_fiyat = _parse_decimal(fiyat_sonuclari.get(sembol, {}).get("fiyat"))
+        if guncel_fiyat is None:
+            mesaj += f"⚠️ <b>{sembol}</b>: Fiyat verisi alınamadı.\n\n"
+            continue
+
+        pb, carpan = birimler[sembol]
+        if pb is None:
+            mesaj += f"⚠️ <b>{sembol}</b>: Para birimi bilinmiyor.\n\n"
+            continue
+        kur = kurlar.kur(pb, baz)
+        if kur is None:
+            mesaj += f"⚠️ <b>{sembol}</b>: {pb}/{baz} kuru alınamadı.\n\n"
+            continue
 
-        if guncel_fiyat is not None:
-            guncel_deger = miktar * guncel_fiyat
-            maliyet_toplam = miktar * maliyet
-            kar_zarar = guncel_deger - maliyet_toplam
-            kar_zarar_yuzde = (kar_zarar / maliyet_toplam * 100) if maliyet_toplam > 0 else Decimal("0")
+        # Fiyat ve maliyet kotasyon biriminde (ör. pence); ikisi de ana birime, sonra güncel kurla çevrilir
+        guncel_fiyat *= carpan
+        maliyet *= carpan
+        guncel_deger = miktar * guncel_fiyat * kur
+        maliyet_toplam = miktar * maliyet * kur
+        kar_zarar = guncel_deger - maliyet_toplam
+        kar_zarar_yuzde = (kar_zarar / maliyet_toplam * 100) if maliyet_toplam > 0 else Decimal("0")
 
-            emoji = "🟢" if kar_zarar >= 0 else "🔴"
-            mesaj += f"{emoji} <b>{sembol}</b>: {miktar:f} adet\n"
-            mesaj += f"   Maliyet: {maliyet:.2f} | Güncel: {guncel_fiyat:.2f}\n"
-            mesaj += f"   K/Z: {kar_zarar:+.2f} (%{kar_zarar_yuzde:+.2f})\n\n"
+        emoji = "🟢" if kar_zarar >= 0 else "🔴"
+        mesaj += f"{emoji} <b>{sembol}</b>: {miktar:f} adet\n"
+        mesaj += f"   Ort. Maliyet: {maliyet:.2f} | Güncel: {guncel_fiyat:.2f} {pb}\n"
+        if pb != baz:
+            mesaj += f"   Değer: {guncel_deger:.2f} {baz} (1 {pb} = {kur:.4f} {baz})\n"
+        mesaj += f"   K/Z: {kar_zarar:+.2f} {baz} (%{kar_zarar_yuzde:+.2f})\n\n"
 
-            toplam_maliyet += maliyet_toplam
-            toplam_deger += guncel_deger
-        else:
-            mesaj += f"⚠️ <b>{sembol}</b>: Fiyat verisi alınamadı.\n\n"
+        toplam_maliyet += maliyet_toplam
+        toplam_deger += guncel_deger
 
     toplam_kar_zarar = toplam_deger - toplam_maliyet
     toplam_kar_zarar_yuzde = (
@@ -92,15 +155,59 @@ async def portfoy_ozeti_hazirla(user_id: int) -> str:
     )
 
     mesaj += "┄" * 22 + "\n"
-    mesaj += f"💰 <b>Toplam Değer:</b> {toplam_deger:.2f}\n"
-    mesaj += f"📈 <b>Toplam K/Z:</b> {toplam_kar_zarar:+.2f} (%{toplam_kar_zarar_yuzde:+.2f})"
+    mesaj += f"💰 <b>Toplam Değer:</b> {toplam_deger:.2f} {baz}\n"
+    mesaj += f"📈 <b>Açık K/Z:</b> {toplam_kar_zarar:+.2f} {baz} (%{toplam_kar_zarar_yuzde:+.2f})\n"
+    mesaj += _gerceklesen_satiri()
 
     return mesaj
 
 
+_ORNEKLER = {
+    "alis": "/portfoy_ekle THYAO 100 45.50",
+    "satis": "/portfoy_sat THYAO 40 52.10",
+    "temettu": "/portfoy_temettu THYAO 1.25",
+    "bolunme": "/portfoy_bolunme THYAO 2",
+}
+
+
+async def portfoy_islem_kaydet(user_id: int, sembol: str, tur: str, miktar: Optional[str],
+                               fiyat: str) -> str:
+    """
+    Deftere satış / temettü / bölünme (ve alış) işlemi yazar.
+    Döndürür: Kullanıcıya gösterilecek mesaj.
+    """
+    ornek = f"Örnek: <code>{_ORNEKLER[tur]}</code>"
+    miktar_d = _parse_decimal(miktar) if miktar is not None else Decimal("0")
+    fiyat_d = _parse_decimal(fiyat)
+    if miktar_d is None or (tur in ("alis", "satis") and miktar_d <= 0):
+        return f"❌ Geçersiz miktar. {ornek}"
+    if fiyat_d is None or fiyat_d <= 0:
+        return f"❌ Geçersiz değer. {ornek}"
+
+    try:
+        poz = await portfoy_islemi_uygula(user_id, sembol, tur, str(miktar_d), str(fiyat_d))
+    except DefterHatasi as e:
+        return f"❌ {e}"
+    except Exception as e:
+        log.error(f"Portföy işlem hatası ({sembol}, {tur}): {e}")
+        return f"❌ Portföy güncellenemedi: {str(e)}"
+
+    sembol = sembol.upper()
+    if tur == "alis":
+        return (f"✅ <b>{sembol}</b> portföye eklendi.\n"
+                f"Miktar: {miktar_d:f} | Maliyet: {fiyat_d:.2f} | Ort. Maliyet: {poz.ort_maliyet:.2f}")
+    if tur == "satis":
+        return (f"✅ <b>{sembol}</b> {miktar_d:f} adet satıldı. Kalan: {poz.miktar:f}\n"
+                f"Gerçekleşen K/Z: {poz.gerceklesen_ort:+.2f} (FIFO: {poz.gerceklesen_fifo:+.2f})")
+    if tur == "temettu":
+        return f"✅ <b>{sembol}</b> temettüsü kaydedildi. Toplam temettü: {poz.temettu:.2f}"
+    return (f"✅ <b>{sembol}</b> bölünmesi ({fiyat_d:f}x) kaydedildi.\n"
+            f"Yeni miktar: {poz.miktar:f} | Ort. Maliyet: {poz.ort_maliyet:.2f}")
+
+
 async def portfoy_varlik_ekle(user_id: int, sembol: str, miktar: str, maliyet: str) -> str:
     """
-    Portföye yeni varlık ekler veya mevcut kaydı günceller.
+    Portföye alış işlemi ekler (aynı sembolde ortalama maliyet güncellenir).
     Döndürür: Kullanıcıya gösterilecek mesaj.
     """
     # Değerleri doğrula
@@ -112,22 +219,27 @@ async def portfoy_varlik_ekle(user_id: int, sembol: str, miktar: str, maliyet: s
     if maliyet_d is None or maliyet_d <= 0:
         return "❌ Geçersiz maliyet. Örnek: <code>/portfoy_ekle THYAO 100 45.50</code>"
 
-    try:
-        await portfoy_ekle(user_id, sembol, str(miktar_d), str(maliyet_d))
-        return (
-            f"✅ <b>{sembol.upper()}</b> portföye eklendi.\n"
-            f"Miktar: {miktar_d:f} | Maliyet: {maliyet_d:.2f}"
-        )
-    except Exception as e:
-        log.error(f"Portföy ekleme hatası ({sembol}): {e}")
-        return f"❌ Portföy güncellenemedi: {str(e)}"
+    return await portfoy_islem_kaydet(user_id, sembol, "alis", str(miktar_d), str(maliyet_d))
 
 
 async def portfoy_varlik_sil(user_id: int, sembol: str) -> str:
-    """Portföyden varlık siler."""
+    """Portföyden varlığı (tüm işlem geçmişiyle) siler."""
     try:
         await portfoy_sil(user_id, sembol)
         return f"✅ <b>{sembol.upper()}</b> portföyden silindi."
     except Exception as e:
         log.error(f"Portföy silme hatası ({sembol}): {e}")
         return f"❌ Portföy güncellenemedi: {str(e)}"
+
+
+async def portfoy_para_birimi_ayarla(user_id: int, kod: str) -> str:
+    """Portföy değerleme para birimini (tercih 'currency') değiştirir."""
+    kod = kod.strip().upper()
+    if len(kod) != 3 or not kod.isalpha():
+        return "❌ Geçersiz para birimi. Örnek: <code>/portfoy_para_birimi USD</code>"
+    kurlar = await kur_matrisi.guncel()
+    # Kurlar alınamıyorsa (kaynak kapalı) tercih yine kaydedilir; özet kuru olmayanları ayrıca belirtir
+    if kod != "TRY" and kurlar.oranlar and kurlar.kur(kod, "TRY") is None:
+        return f"❌ <b>{kod}</b> için kur bulunamadı."
+    await set_user_pref(user_id, "currency", kod)
+    return f"✅ Portföy değerleri artık <b>{kod}</b> cinsinden gösterilecek."
@@ -0,0 +1,260 @@
+"""
+portfoy_risk.py — Portföy risk analitiği: volatilite, beta, korelasyon, VaR/CVaR, maksimum düşüş.
+
+Tüm pozisyonların ve piyasa endekslerinin günlük kapanışları (fiyat_gecmisi) tek bir
+(gün × varlık) matrisine hizalanır; metrikler bu matris üzerinde NumPy matris işlemleriyle
+bir kerede hesaplanır — sembol başına döngü yoktur. Geçmiş sıcakken 100 pozisyonluk rapor
+milisaniyeler içinde hazırlanır.
+
+    ağırlıklar   güncel değer / toplam değer (kullanıcının para biriminde, kur_matrisi)
+    getiriler    varlığın kendi para biriminde basit günlük getiri
+    beta         temel_analiz.beta_katsayilari (calc_beta ile aynı hesap): XU100 ve S&P 500
+    VaR / CVaR   1 günlük; tarihsel (ampirik dağılım) ve parametrik (normal), %95 ve %99
+"""
+import math
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from config import settings
+from db import portfoy_getir
+from fiyat_gecmisi import GUN, Seri, gunluk_gecmis
+from kur_matrisi import Kurlar, kur_matrisi, para_birimi_coz
+from temel_analiz import beta_benchmark, beta_katsayilari
+from ux.user_prefs import get_user_currency
+
+log = logging.getLogger("finans_botu")
+
+BENCHMARKLAR = {"XU100.IS": "BIST 100", "^GSPC": "S&amp;P 500"}     # HTML mesajda kaçışlı
+GUVEN_DUZEYLERI = np.array([0.95, 0.99])
+_Z = np.array([1.6448536269514722, 2.3263478740408408])      # Standart normal, tek kuyruk
+MIN_GETIRI = 30                                              # calc_beta ile aynı alt sınır
+
+
+# ═══════════════════════════════════════════════════════════════════
+# HİZALAMA
+# ═══════════════════════════════════════════════════════════════════
+
+def ortak_takvim(seriler: Sequence[Seri]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Serileri tüm günlerin birleşimine yerleştirir → (günler, T × N kapanış, T × N gözlem maskesi).
+    Eksik günler önceki kapanışla doldurulur; bir serinin ilk gözleminden önceki hücreler NaN kalır.
+    """
+    n = len(seriler)
+    zaman = np.concatenate([z for z, _ in seriler])
+    kapanis = np.concatenate([k for _, k in seriler])
+    sutun = np.repeat(np.arange(n), [len(z) for z, _ in seriler])
+    gunler, satir = np.unique(zaman, return_inverse=True)
+
+    matris = np.full((len(gunler), n), np.nan)
+    matris[satir, sutun] = kapanis
+    gozlem = np.isfinite(matris)
+
+    # İleri doldurma: her hücre için son gözlenen satırın indeksi
+    indeks = np.where(gozlem, np.arange(len(gunler))[:, None], 0)
+    np.maximum.accumulate(indeks, axis=0, out=indeks)
+    return gunler, matris[indeks, np.arange(n)], gozlem
+
+
+def hizala(seriler: Sequence[Seri]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Serileri ortak gün eksenine yerleştirir → (günler, T × N kapanış matrisi).
+
+    Eksik günler önceki kapanışla doldurulur; yalnızca varlıkların en az yarısının işlem
+    gördüğü günler tutulur (kripto hafta sonu barları hisselere sıfır getiri eklemesin).
+    Tüm sütunların verisi başlamadan önceki günler atılır.
+    """
+    gunler, matris, gozlem = ortak_takvim(seriler)
+    tut = gozlem.sum(axis=1) * 2 >= len(seriler)
+    gunler, matris = gunler[tut], matris[tut]
+    tam = np.isfinite(matris).all(axis=1)
+    ilk = int(np.argmax(tam)) if tam.any() else len(tam)
+    return gunler[ilk:], matris[ilk:]
+
+
+# ═══════════════════════════════════════════════════════════════════
+# METRİKLER
+# ═══════════════════════════════════════════════════════════════════
+
+@dataclass
+class RiskSonucu:
+    gun_sayisi: int                       # Getiri sayısı
+    yillik_carpan: float                  # Yılda ortalama gözlem (volatilite yıllıklandırma)
+    agirliklar: np.ndarray                # (N,)
+    volatilite: np.ndarray                # (N,) yıllık
+    max_dusus: np.ndarray                 # (N,)
+    betalar: np.ndarray                   # (N × K) her piyasa endeksine karşı
+    korelasyon: np.ndarray                # (N × N)
+    portfoy_volatilite: float
+    portfoy_beta: np.ndarray              # (K,)
+    portfoy_max_dusus: float
+    tarihsel_var: np.ndarray              # (2,) %95, %99 — pozitif kayıp oranı
+    tarihsel_cvar: np.ndarray
+    parametrik_var: np.ndarray
+    parametrik_cvar: np.ndarray
+
+
+def _max_dusus(kapanislar: np.ndarray) -> np.ndarray:
+    """Sütun başına en derin tepe → dip düşüşü (negatif oran)."""
+    return (kapanislar / np.maximum.accumulate(kapanislar, axis=0) - 1).min(axis=0)
+
+
+def risk_metrikleri(kapanislar: np.ndarray, agirliklar: np.ndarray, piyasa: np.ndarray,
+                    yillik_carpan: float = 252.0) -> RiskSonucu:
+    """
+    Hizalı kapanışlardan (T × N) ve piyasa kapanışlarından (T × K) tüm metrikler.
+    Ağırlıklar normalize edilir; portföy getirisi güncel ağırlıklarla R @ w'dir.
+    """
+    w = agirliklar / agirliklar.sum()
+    getiri = kapanislar[1:] / kapanislar[:-1] - 1                     # (T-1 × N)
+    piyasa_getiri = piyasa[1:] / piyasa[:-1] - 1                      # (T-1 × K)
+    rp = getiri @ w
+    kok_yil = math.sqrt(yillik_carpan)
+
+    kovaryans = np.atleast_2d(np.cov(getiri, rowvar=False))
+    std = np.sqrt(np.diag(kovaryans))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        korelasyon = kovaryans / np.outer(std, std)
+
+    # Tarihsel: ampirik kuyruk; CVaR kuyruktaki getirilerin ortalaması
+    esik = np.quantile(rp, 1 - GUVEN_DUZEYLERI)
+    kuyruk = rp[:, None] <= esik[None, :]
+    tarihsel_cvar = -(rp[:, None] * kuyruk).sum(axis=0) / kuyruk.sum(axis=0)
+
+    # Parametrik (normal): VaR = −(μ − zσ), CVaR = −(μ − σ φ(z) / (1 − α))
+    mu, sigma = rp.mean(), rp.std(ddof=1)
+    phi = np.exp(-_Z ** 2 / 2) / math.sqrt(2 * math.pi)
+
+    portfoy_egrisi = np.cumprod(1 + rp)
+    return RiskSonucu(
+        gun_sayisi=len(getiri),
+        yillik_carpan=yillik_carpan,
+        agirliklar=w,
+        volatilite=std * kok_yil,
+        max_dusus=_max_dusus(kapanislar),
+        betalar=beta_katsayilari(getiri, piyasa_getiri),
+        korelasyon=korelasyon,
+        portfoy_volatilite=float(math.sqrt(w @ kovaryans @ w) * kok_yil),
+        portfoy_beta=beta_katsayilari(rp[:, None], piyasa_getiri)[0],
+        portfoy_max_dusus=float(_max_dusus(np.concatenate(([1.0], portfoy_egrisi))[:, None])[0]),
+        tarihsel_var=-esik,
+        tarihsel_cvar=tarihsel_cvar,
+        parametrik_var=-(mu - _Z * sigma),
+        parametrik_cvar=-(mu - sigma * phi / (1 - GUVEN_DUZEYLERI)),
+    )
+
+
+def yillik_gozlem(gunler: np.ndarray) -> float:
+    """Takvim aralığından yılda ortalama gözlem sayısı (hisse ≈ 252, yalnız kripto ≈ 365)."""
+    yil = (gunler[-1] - gunler[0]) / GUN / 365.25
+    return (len(gunler) - 1) / yil if yil > 0 else 252.0
+
+
+# ═══════════════════════════════════════════════════════════════════
+# RAPOR
+# ═══════════════════════════════════════════════════════════════════
+
+def _yuzde(x: float) -> str:
+    return "-" if not np.isfinite(x) else f"%{x * 100:.2f}"
+
+
+def _korelasyon_metni(semboller: List[str], korelasyon: np.ndarray) -> str:
+    n = len(semboller)
+    if n < 2:
+        return ""
+    if n <= 6:
+        etiket = [s[:6] for s in semboller]
+        satirlar = ["       " + " ".join(f"{e:>6}" for e in etiket)]
+        satirlar += [f"{etiket[i]:<6} " + " ".join(f"{c:>6.2f}" for c in korelasyon[i]) for i in range(n)]
+        return "🔗 <b>Korelasyon:</b>\n<pre>" + "\n".join(satirlar) + "</pre>"
+    # Büyük portföyde matris yerine en yüksek korelasyonlu çiftler
+    i, j = np.triu_indices(n, k=1)
+    degerler = np.nan_to_num(korelasyon[i, j], nan=-np.inf)
+    en_yuksek = np.argsort(degerler)[::-1][:5]
+    cift = "\n".join(f"   {semboller[i[k]]} ↔ {semboller[j[k]]}: {korelasyon[i[k], j[k]]:.2f}" for k in en_yuksek)
+    return "🔗 <b>En yüksek korelasyonlar:</b>\n" + cift
+
+
+def rapor_metni(semboller: List[str], sonuc: RiskSonucu, benchmarklar: List[str],
+                toplam_deger: Decimal, baz: str, uyarilar: Sequence[str] = ()) -> str:
+    sira = np.argsort(sonuc.agirliklar)[::-1]
+    beta_sutunu = {b: k for k, b in enumerate(benchmarklar)}
+
+    mesaj = f"📉 <b>Portföy Risk Raporu</b> ({sonuc.gun_sayisi} günlük getiri)\n"
+    mesaj += "┄" * 22 + "\n"
+    mesaj += f"📊 <b>Yıllık Volatilite:</b> {_yuzde(sonuc.portfoy_volatilite)}\n"
+    if benchmarklar:
+        mesaj += "β <b>Beta:</b> " + " | ".join(
+            f"{BENCHMARKLAR[b]} {sonuc.portfoy_beta[k]:.2f}" for k, b in enumerate(benchmarklar)) + "\n"
+    mesaj += f"🔻 <b>Maks. Düşüş:</b> {_yuzde(sonuc.portfoy_max_dusus)}\n\n"
+
+    mesaj += f"⚠️ <b>1 Günlük VaR / CVaR</b> (değer {toplam_deger:,.2f} {baz}):\n"
+    for ad, var, cvar in (("Tarihsel", sonuc.tarihsel_var, sonuc.tarihsel_cvar),
+                          ("Parametrik", sonuc.parametrik_var, sonuc.parametrik_cvar)):
+        for k, duzey in enumerate(GUVEN_DUZEYLERI):
+            tutar = toplam_deger * Decimal(str(round(float(var[k]), 8)))
+            mesaj += (f"   {ad} %{duzey * 100:.0f}: {_yuzde(var[k])} ({tutar:,.2f} {baz})"
+                      f" | CVaR {_yuzde(cvar[k])}\n")
+
+    mesaj += "\n<b>Varlıklar</b> (ağırlık · yıllık vol · beta · maks. düşüş):\n"
+    for i in sira[:10]:
+        sutun = beta_sutunu.get(beta_benchmark(semboller[i]))
+        beta = f"{sonuc.betalar[i, sutun]:.2f}" if sutun is not None else "-"
+        mesaj += (f"   <b>{semboller[i]}</b> {_yuzde(sonuc.agirliklar[i])} · {_yuzde(sonuc.volatilite[i])}"
+                  f" · β {beta} · {_yuzde(sonuc.max_dusus[i])}\n")
+    if len(sira) > 10:
+        mesaj += f"   … ve {len(sira) - 10} varlık daha\n"
+
+    korelasyon = _korelasyon_metni([semboller[i] for i in sira], sonuc.korelasyon[np.ix_(sira, sira)])
+    if korelasyon:
+        mesaj += "\n" + korelasyon + "\n"
+    if uyarilar:
+        mesaj += "\n" + "\n".join(f"⚠️ {u}" for u in uyarilar)
+    return mesaj.rstrip()
+
+
+async def portfoy_risk_raporu(user_id: int) -> str:
+    """/portfoy_risk: pozisyonlar + günlük geçmiş + kurlar → risk raporu metni."""
+    portfoy = await portfoy_getir(user_id)
+    if not portfoy:
+        return "📭 <b>Portföyünüz henüz boş.</b> Risk raporu için önce varlık ekleyin."
+
+    baz = await get_user_currency(user_id)
+    miktarlar = {p["sembol"]: Decimal(p["miktar"]) for p in portfoy}
+    seriler = await gunluk_gecmis.getir([*miktarlar, *BENCHMARKLAR], settings.RISK_LOOKBACK_DAYS)
+
+    # Kotasyon birimi ve alt birim çarpanı /portfoy ile aynı çözümden (kaynağın bildirdiği
+    # birim, yoksa borsa soneki): .L pence, .DE euro ... olarak değerlenir
+    birimler = {s: para_birimi_coz(s) for s in miktarlar}
+    kur_gerekli = any(pb is not None and pb != baz for pb, _ in birimler.values())
+    kurlar = await kur_matrisi.guncel() if kur_gerekli else Kurlar()
+
+    semboller, degerler, uyarilar = [], [], []
+    for sembol, miktar in miktarlar.items():
+        pb, carpan = birimler[sembol]
+        kur = kurlar.kur(pb, baz) if pb else None
+        if sembol not in seriler:
+            uyarilar.append(f"{sembol}: fiyat geçmişi bulunamadı, hesaba katılmadı.")
+        elif pb is None:
+            uyarilar.append(f"{sembol}: para birimi bilinmiyor, hesaba katılmadı.")
+        elif kur is None:
+            uyarilar.append(f"{sembol}: {pb}/{baz} kuru alınamadı, hesaba katılmadı.")
+        else:
+            semboller.append(sembol)
+            degerler.append(miktar * Decimal(str(seriler[sembol][1][-1])) * carpan * kur)
+    benchmarklar = [b for b in BENCHMARKLAR if b in seriler]
+    if not semboller:
+        return "❌ Risk raporu hazırlanamadı.\n" + "\n".join(f"⚠️ {u}" for u in uyarilar)
+
+    gunler, kapanislar = hizala([seriler[s] for s in semboller + benchmarklar])
+    if len(gunler) <= MIN_GETIRI:
+        return (f"❌ Risk raporu için ortak geçmiş yetersiz ({max(len(gunler) - 1, 0)} gün, "
+                f"en az {MIN_GETIRI} gerekli).")
+
+    n = len(semboller)
+    sonuc = risk_metrikleri(kapanislar[:, :n], np.array([float(d) for d in degerler]),
+                            kapanislar[:, n:], yillik_gozlem(gunler))
+    return rapor_metni(semboller, sonuc, benchmarklar, sum(degerler, Decimal("0")), baz, uyarilar)
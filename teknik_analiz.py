@@ -15,6 +15,9 @@ from cache_yonetici import taze_ticker
 # ═══════════════════════════════════════════════════════════════
 log = logging.getLogger("finans_botu")
 
+# Gün içi aralıklar mum_motoru.ARALIKLAR ile aynıdır (numpy/akış yalnızca kullanılınca yüklenir)
+GUN_ICI_ARALIKLAR = ("1m", "5m", "1h")
+
 # ═══════════════════════════════════════════════════════════════
 # PINE SCRIPT MATEMATİKSEL FONKSİYONLARI
 # ═══════════════════════════════════════════════════════════════
@@ -159,45 +162,41 @@ def _supertrend(h: pd.Series, l: pd.Series, c: pd.Series,
         upper  = hl2 + factor * atr   # basic upper band
         lower  = hl2 - factor * atr   # basic lower band
 
-        # Final bantlar — Pine'daki bant kıstırma (band clamping) mantığı
-        final_upper = pd.Series(np.nan, index=c.index)
-        final_lower = pd.Series(np.nan, index=c.index)
-        direction   = pd.Series(np.nan, index=c.index)
-        supertrend  = pd.Series(np.nan, index=c.index)
+        # Final bantlar — Pine'daki bant kıstırma (band clamping) mantığı.
+        # Özyinelemeli olduğu için döngü gerekir; .iloc yerine ham diziler üzerinde döner.
+        up, lo, cl = upper.to_numpy(dtype=float), lower.to_numpy(dtype=float), c.to_numpy(dtype=float)
+        n = len(cl)
+        final_upper = np.full(n, np.nan)
+        final_lower = np.full(n, np.nan)
+        direction   = np.full(n, np.nan)
+        supertrend  = np.full(n, np.nan)
 
-        for i in range(1, len(c)):
+        for i in range(1, n):
             # Upper band: bir önceki upper'dan yüksekse veya önceki kapanış altındaysa sıfırla
-            if upper.iloc[i] < final_upper.iloc[i-1] or c.iloc[i-1] > final_upper.iloc[i-1]:
-                final_upper.iloc[i] = upper.iloc[i]
+            if up[i] < final_upper[i-1] or cl[i-1] > final_upper[i-1]:
+                final_upper[i] = up[i]
             else:
-                final_upper.iloc[i] = final_upper.iloc[i-1]
+                final_upper[i] = final_upper[i-1]
 
             # Lower band: bir önceki lower'dan düşükse veya önceki kapanış üzerindeyse sıfırla
-            if lower.iloc[i] > final_lower.iloc[i-1] or c.iloc[i-1] < final_lower.iloc[i-1]:
-                final_lower.iloc[i] = lower.iloc[i]
+            if lo[i] > final_lower[i-1] or cl[i-1] < final_lower[i-1]:
+                final_lower[i] = lo[i]
             else:
-                final_lower.iloc[i] = final_lower.iloc[i-1]
+                final_lower[i] = final_lower[i-1]
 
             # Yön belirleme
-            prev_dir = direction.iloc[i-1] if not np.isnan(direction.iloc[i-1]) else 1
-            prev_st  = supertrend.iloc[i-1] if not np.isnan(supertrend.iloc[i-1]) else final_upper.iloc[i]
+            prev_st = supertrend[i-1] if not np.isnan(supertrend[i-1]) else final_upper[i]
 
-            if prev_st == final_upper.iloc[i-1]:
+            if prev_st == final_upper[i-1]:
                 # Önceki bar direnç bandındaydı
-                if c.iloc[i] > final_upper.iloc[i]:
-                    direction.iloc[i] = -1  # kırıldı → yükselen trend
-                else:
-                    direction.iloc[i] =  1
+                direction[i] = -1 if cl[i] > final_upper[i] else 1   # kırıldı → yükselen trend
             else:
                 # Önceki bar destek bandındaydı
-                if c.iloc[i] < final_lower.iloc[i]:
-                    direction.iloc[i] =  1  # kırıldı → düşen trend
-                else:
-                    direction.iloc[i] = -1
+                direction[i] = 1 if cl[i] < final_lower[i] else -1   # kırıldı → düşen trend
 
-            supertrend.iloc[i] = final_lower.iloc[i] if direction.iloc[i] == -1 else final_upper.iloc[i]
+            supertrend[i] = final_lower[i] if direction[i] == -1 else final_upper[i]
 
-        return supertrend, direction
+        return pd.Series(supertrend, index=c.index), pd.Series(direction, index=c.index)
     except Exception as e:
         log.debug(f"Supertrend hesaplama hatası: {e}")
         return pd.Series(np.nan, index=c.index), pd.Series(1, index=c.index)
@@ -263,33 +262,76 @@ def _alphatrend(h: pd.Series, l: pd.Series, c: pd.Series, v: pd.Series,
         upT   = l - atr * coeff
         downT = h + atr * coeff
 
-        at = pd.Series(0.0, index=c.index)
+        # Özyinelemeli bant: ham diziler üzerinde tek geçiş (.iloc maliyeti olmadan)
+        mf, up, dn = mfi.to_numpy(dtype=float), upT.to_numpy(dtype=float), downT.to_numpy(dtype=float)
+        at = np.zeros(len(c))
 
         for i in range(1, len(c)):
-            prev = at.iloc[i - 1]
-            if mfi.iloc[i] >= 50:
+            prev = at[i - 1]
+            if mf[i] >= 50:
                 # Yükselen koşul: upT < önceki AT ise önceki AT'yi koru
-                at.iloc[i] = upT.iloc[i] if upT.iloc[i] > prev else prev
+                at[i] = up[i] if up[i] > prev else prev
             else:
                 # Düşen koşul: downT > önceki AT ise önceki AT'yi koru
-                at.iloc[i] = downT.iloc[i] if downT.iloc[i] < prev else prev
+                at[i] = dn[i] if dn[i] < prev else prev
 
-        return at
+        return pd.Series(at, index=c.index)
     except Exception as e:
         log.debug(f"AlphaTrend hesaplama hatası: {e}")
         return pd.Series(0.0, index=c.index)  # Fallback
 
 
+# ═══════════════════════════════════════════════════════════════
+# BOLLINGER / ICHIMOKU (grafik_motoru overlay'leri de bunları kullanır)
+# ═══════════════════════════════════════════════════════════════
+
+def _bollinger(c: pd.Series, length: int = 20,
+               mult: float = 2.0) -> Tuple[pd.Series, pd.Series, pd.Series]:
+    """
+    Pine ta.bb(close, 20, 2) karşılığı (popülasyon std, ddof=0).
+
+    Returns:
+        (orta bant, üst bant, alt bant)
+    """
+    basis = c.rolling(length).mean()
+    std = c.rolling(length).std(ddof=0)
+    return basis, basis + mult * std, basis - mult * std
+
+
+def _ichimoku(h: pd.Series, l: pd.Series) -> Tuple[pd.Series, pd.Series, pd.Series, pd.Series]:
+    """
+    Ichimoku (9, 26, 52). Senkou A/B 26 bar ileri kaydırılmış olarak döner.
+
+    Returns:
+        (tenkan, kijun, senkou_a, senkou_b)
+    """
+    tenkan = (h.rolling(9).max()  + l.rolling(9).min())  / 2
+    kijun  = (h.rolling(26).max() + l.rolling(26).min()) / 2
+    sa     = ((tenkan + kijun) / 2).shift(26)
+    sb     = ((h.rolling(52).max() + l.rolling(52).min()) / 2).shift(26)
+    return tenkan, kijun, sa, sb
+
+
 # ═══════════════════════════════════════════════════════════════
 # ANA FONKSİYON
 # ═══════════════════════════════════════════════════════════════
 
-def teknik_analiz_yap(ticker_symbol: str) -> Dict[str, Any]:
+def _gun_ici_mumlar(ticker_symbol: str, interval: str) -> Optional[pd.DataFrame]:
+    """Canlı akıştan üretilmiş gün içi mumlar (mum_motoru). Veri yoksa sembol akışa alınır."""
+    from mum_motoru import mum_agregatoru
+    df = mum_agregatoru.mumlar_df(ticker_symbol, interval)
+    if len(df) < 60:
+        mum_agregatoru.talep_et(ticker_symbol)
+    return df
+
+
+def teknik_analiz_yap(ticker_symbol: str, interval: str = "1d") -> Dict[str, Any]:
     """
     Teknik analiz indikatörlerini hesapla ve döndür.
     
     Args:
         ticker_symbol: Hisse sembolü (örn: "THYAO.IS", "AAPL")
+        interval: "1d" (yfinance günlük) veya canlı akıştan "1m" / "5m" / "1h"
     
     Returns:
         Dict with all technical indicators and signals
@@ -301,9 +343,14 @@ def teknik_analiz_yap(ticker_symbol: str) -> Dict[str, Any]:
     """
     try:
         # Veri çekme
-        log.debug(f"Teknik analiz başlatılıyor: {ticker_symbol}")
-        hisse = taze_ticker(ticker_symbol)
-        df    = hisse.history(period="3y")   # 610 bar için 3 yıl yeterli
+        log.debug(f"Teknik analiz başlatılıyor: {ticker_symbol} ({interval})")
+        if interval == "1d":
+            hisse = taze_ticker(ticker_symbol)
+            df    = hisse.history(period="3y")   # 610 bar için 3 yıl yeterli
+        elif interval in GUN_ICI_ARALIKLAR:
+            df = _gun_ici_mumlar(ticker_symbol, interval)
+        else:
+            return {"Hata": f"Geçersiz zaman aralığı: {interval}"}
         
         if df.empty or len(df) < 60:
             log.warning(f"Yetersiz veri: {ticker_symbol} ({len(df)} bar)")
@@ -435,10 +482,7 @@ def teknik_analiz_yap(ticker_symbol: str) -> Dict[str, Any]:
 
         # ── 9. Bollinger Bantları ────────────────────────────────────────────
         try:
-            bb_basis = c.rolling(20).mean()
-            bb_std = c.rolling(20).std(ddof=0)
-            bb_upper = bb_basis + 2 * bb_std
-            bb_lower = bb_basis - 2 * bb_std
+            bb_basis, bb_upper, bb_lower = _bollinger(c)
             s["Bollinger Bantları"] = (f"Alt: {bb_lower.iloc[-1]:.2f} | "
                                        f"Orta: {bb_basis.iloc[-1]:.2f} | "
                                        f"Üst: {bb_upper.iloc[-1]:.2f}")
@@ -452,10 +496,7 @@ def teknik_analiz_yap(ticker_symbol: str) -> Dict[str, Any]:
 
         # ── 10. Ichimoku ─────────────────────────────────────────────────────
         try:
-            tenkan = (h.rolling(9).max()  + l.rolling(9).min())  / 2
-            kijun  = (h.rolling(26).max() + l.rolling(26).min()) / 2
-            sa     = ((tenkan + kijun) / 2).shift(26)
-            sb     = ((h.rolling(52).max() + l.rolling(52).min()) / 2).shift(26)
+            tenkan, kijun, sa, sb = _ichimoku(h, l)
             s["Ichimoku (Tenkan/Kijun)"] = f"{tenkan.iloc[-1]:.2f} / {kijun.iloc[-1]:.2f}"
             s["Ichimoku Bulut"] = "Yeşil (Yükselen)" if sa.iloc[-1] > sb.iloc[-1] else "Kırmızı (Düşen)"
         except Exception as e:
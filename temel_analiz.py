@@ -414,6 +414,29 @@ def pct_change(yeni: float, eski: float) -> float:
     return 0.0
 
 
+def beta_benchmark(ticker_symbol: str) -> str:
+    """Beta için piyasa endeksi: BIST hisseleri XU100, diğerleri S&P 500."""
+    return "XU100.IS" if ticker_symbol.upper().endswith(".IS") else "^GSPC"
+
+
+def beta_katsayilari(getiriler: np.ndarray, piyasa: np.ndarray) -> np.ndarray:
+    """
+    Vektörel beta: cov(varlık, piyasa) / var(piyasa), tüm sütunlar için tek matris çarpımıyla.
+
+    Args:
+        getiriler: (T × N) hizalı varlık getirileri
+        piyasa: (T × K) aynı günlerin piyasa getirileri
+
+    Returns:
+        (N × K) beta matrisi; varyansı sıfır olan piyasa sütunlarında 0.0
+    """
+    r = getiriler - getiriler.mean(axis=0)
+    m = piyasa - piyasa.mean(axis=0)
+    kov = r.T @ m / (len(r) - 1)
+    var = m.var(axis=0, ddof=1)
+    return np.divide(kov, var, out=np.zeros_like(kov), where=var > 0)
+
+
 def calc_beta(ticker_symbol: str, stock_returns: pd.Series, period: str = "1y") -> float:
     """
     Beta katsayısı hesaplama (piyasaya göre hassasiyet).
@@ -430,7 +453,7 @@ def calc_beta(ticker_symbol: str, stock_returns: pd.Series, period: str = "1y")
         if stock_returns is None or len(stock_returns) < 30:
             return 0.0
         
-        benchmark = "XU100.IS" if ticker_symbol.upper().endswith(".IS") else "^GSPC"
+        benchmark = beta_benchmark(ticker_symbol)
         m = taze_ticker(benchmark).history(period=period)["Close"].pct_change().dropna()
         
         if len(m) < 30:
@@ -442,11 +465,8 @@ def calc_beta(ticker_symbol: str, stock_returns: pd.Series, period: str = "1y")
             log.debug(f"Beta için yeterli ortak veri yok: {len(df)} bar")
             return 0.0
         
-        df.columns = ["Stock", "Market"]
-        cov = df.cov().iloc[0, 1]
-        var = df["Market"].var()
-        
-        beta = round(cov / var, 3) if var and var > 0 else 0.0
+        deger = beta_katsayilari(df.iloc[:, [0]].to_numpy(), df.iloc[:, [1]].to_numpy())[0, 0]
+        beta = round(float(deger), 3)
         log.debug(f"Beta ({period}) hesaplandı: {ticker_symbol} → {beta}")
         return beta
     
@@ -3,6 +3,8 @@ tests/test_alert_motoru.py — alert_motoru.py için unit testler.
 """
 import os
 import sys
+import time
+import asyncio
 import pytest
 from decimal import Decimal
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -10,7 +12,19 @@ from unittest.mock import AsyncMock, MagicMock, patch
 os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import alert_motoru
 from alert_motoru import _parse_decimal, _uyari_kontrol_et
+from alert_motoru import KriptoUyariAkisi, binance_sembolu, UYARI_GECIKMESI
+from uyari_indeksi import UyariIndeksi
+from gonderim_kuyrugu import GonderimKuyrugu
+
+
+@pytest.fixture(autouse=True)
+def kuyruk(monkeypatch):
+    """Her test için veritabanısız, boş bir gönderim kuyruğu."""
+    k = GonderimKuyrugu(kalici=False)
+    monkeypatch.setattr(alert_motoru, "gonderim_kuyrugu", k)
+    return k
 
 
 class TestParseDecimal:
@@ -38,7 +52,7 @@ class TestParseDecimal:
 
 
 @pytest.mark.asyncio
-async def test_uyari_fiyat_ust_tetiklendi():
+async def test_uyari_fiyat_ust_tetiklendi(kuyruk):
     """Fiyat üst uyarısı tetiklenme testi."""
     mock_bot = AsyncMock()
     mock_bot.send_message = AsyncMock()
@@ -51,18 +65,19 @@ async def test_uyari_fiyat_ust_tetiklendi():
         "hedef_deger": "50.00"
     }
 
-    with patch("alert_motoru.uyari_sil", new_callable=AsyncMock) as mock_sil:
+    with patch("gonderim_kuyrugu.uyari_sil", new_callable=AsyncMock) as mock_sil:
         await _uyari_kontrol_et(
-            mock_bot, uyari,
+            uyari,
             mevcut_fiyat=Decimal("55.00"),
             mevcut_rsi=None
         )
+        await kuyruk.bosalt(mock_bot)
         mock_bot.send_message.assert_called_once()
         mock_sil.assert_called_once_with(1)
 
 
 @pytest.mark.asyncio
-async def test_uyari_fiyat_ust_tetiklenmedi():
+async def test_uyari_fiyat_ust_tetiklenmedi(kuyruk):
     """Fiyat üst uyarısı tetiklenmeme testi (fiyat düşük)."""
     mock_bot = AsyncMock()
     mock_bot.send_message = AsyncMock()
@@ -75,18 +90,19 @@ async def test_uyari_fiyat_ust_tetiklenmedi():
         "hedef_deger": "50.00"
     }
 
-    with patch("alert_motoru.uyari_sil", new_callable=AsyncMock) as mock_sil:
+    with patch("gonderim_kuyrugu.uyari_sil", new_callable=AsyncMock) as mock_sil:
         await _uyari_kontrol_et(
-            mock_bot, uyari,
+            uyari,
             mevcut_fiyat=Decimal("45.00"),
             mevcut_rsi=None
         )
+        await kuyruk.bosalt(mock_bot)
         mock_bot.send_message.assert_not_called()
         mock_sil.assert_not_called()
 
 
 @pytest.mark.asyncio
-async def test_uyari_fiyat_alt_tetiklendi():
+async def test_uyari_fiyat_alt_tetiklendi(kuyruk):
     """Fiyat alt uyarısı tetiklenme testi."""
     mock_bot = AsyncMock()
     mock_bot.send_message = AsyncMock()
@@ -99,18 +115,19 @@ async def test_uyari_fiyat_alt_tetiklendi():
         "hedef_deger": "40.00"
     }
 
-    with patch("alert_motoru.uyari_sil", new_callable=AsyncMock) as mock_sil:
+    with patch("gonderim_kuyrugu.uyari_sil", new_callable=AsyncMock) as mock_sil:
         await _uyari_kontrol_et(
-            mock_bot, uyari,
+            uyari,
             mevcut_fiyat=Decimal("35.00"),
             mevcut_rsi=None
         )
+        await kuyruk.bosalt(mock_bot)
         mock_bot.send_message.assert_called_once()
         mock_sil.assert_called_once_with(2)
 
 
 @pytest.mark.asyncio
-async def test_uyari_rsi_ust_tetiklendi():
+async def test_uyari_rsi_ust_tetiklendi(kuyruk):
     """RSI üst uyarısı tetiklenme testi."""
     mock_bot = AsyncMock()
     mock_bot.send_message = AsyncMock()
@@ -123,18 +140,19 @@ async def test_uyari_rsi_ust_tetiklendi():
         "hedef_deger": "70"
     }
 
-    with patch("alert_motoru.uyari_sil", new_callable=AsyncMock) as mock_sil:
+    with patch("gonderim_kuyrugu.uyari_sil", new_callable=AsyncMock) as mock_sil:
         await _uyari_kontrol_et(
-            mock_bot, uyari,
+            uyari,
             mevcut_fiyat=Decimal("50.00"),
             mevcut_rsi=Decimal("75.00")
         )
+        await kuyruk.bosalt(mock_bot)
         mock_bot.send_message.assert_called_once()
         mock_sil.assert_called_once_with(3)
 
 
 @pytest.mark.asyncio
-async def test_uyari_rsi_alt_tetiklendi():
+async def test_uyari_rsi_alt_tetiklendi(kuyruk):
     """RSI alt uyarısı tetiklenme testi."""
     mock_bot = AsyncMock()
     mock_bot.send_message = AsyncMock()
@@ -147,18 +165,19 @@ async def test_uyari_rsi_alt_tetiklendi():
         "hedef_deger": "30"
     }
 
-    with patch("alert_motoru.uyari_sil", new_callable=AsyncMock) as mock_sil:
+    with patch("gonderim_kuyrugu.uyari_sil", new_callable=AsyncMock) as mock_sil:
         await _uyari_kontrol_et(
-            mock_bot, uyari,
+            uyari,
             mevcut_fiyat=Decimal("50.00"),
             mevcut_rsi=Decimal("25.00")
         )
+        await kuyruk.bosalt(mock_bot)
         mock_bot.send_message.assert_called_once()
         mock_sil.assert_called_once_with(4)
 
 
 @pytest.mark.asyncio
-async def test_uyari_hedef_none():
+async def test_uyari_hedef_none(kuyruk):
     """Hedef değer None ise uyarı tetiklenmemeli."""
     mock_bot = AsyncMock()
     mock_bot.send_message = AsyncMock()
@@ -171,11 +190,188 @@ async def test_uyari_hedef_none():
         "hedef_deger": None
     }
 
-    with patch("alert_motoru.uyari_sil", new_callable=AsyncMock) as mock_sil:
+    with patch("gonderim_kuyrugu.uyari_sil", new_callable=AsyncMock) as mock_sil:
         await _uyari_kontrol_et(
-            mock_bot, uyari,
+            uyari,
             mevcut_fiyat=Decimal("50.00"),
             mevcut_rsi=None
         )
+        await kuyruk.bosalt(mock_bot)
         mock_bot.send_message.assert_not_called()
         mock_sil.assert_not_called()
+
+
+# ─── Kripto uyarı akışı (akış merkezi) ───
+
+
+class SahteAbone:
+    def __init__(self, callback):
+        self.callback = callback
+        self.streamler = set()
+
+    async def ekle(self, *streamler):
+        self.streamler.update(streamler)
+
+    async def cikar(self, *streamler):
+        self.streamler.difference_update(streamler)
+
+    async def kapat(self):
+        self.streamler.clear()
+
+
+@pytest.mark.asyncio
+async def test_asama_gecikmeleri_histogramlara_yazilir(kuyruk):
+    """Gözlem → değerlendirme → gönderim aşamaları kaynak etiketiyle ölçülmeli."""
+    from prometheus_client import REGISTRY
+
+    def sayi(metrik):
+        return REGISTRY.get_sample_value(f"{metrik}_count", {"kaynak": "yoklama"}) or 0.0
+
+    def toplam(metrik):
+        return REGISTRY.get_sample_value(f"{metrik}_sum", {"kaynak": "yoklama"}) or 0.0
+
+    metrikler = ("alert_observe_to_eval_seconds", "alert_eval_to_send_seconds",
+                 "alert_observe_to_send_seconds")
+    once = {m: (sayi(m), toplam(m)) for m in metrikler}
+    uyari = {"id": 9, "user_id": 1, "sembol": "AAPL", "tip": "fiyat_ust", "hedef_deger": "100"}
+
+    with patch("gonderim_kuyrugu.uyari_sil", new_callable=AsyncMock):
+        await _uyari_kontrol_et(uyari, Decimal("101"), None, gozlem=time.time() - 2.0)
+        assert sayi("alert_observe_to_eval_seconds") == once["alert_observe_to_eval_seconds"][0] + 1
+        assert sayi("alert_eval_to_send_seconds") == once["alert_eval_to_send_seconds"][0]
+        await kuyruk.bosalt(AsyncMock())
+
+    for m in metrikler:
+        assert sayi(m) == once[m][0] + 1
+    assert toplam("alert_observe_to_eval_seconds") - once["alert_observe_to_eval_seconds"][1] >= 2.0
+    assert toplam("alert_observe_to_send_seconds") - once["alert_observe_to_send_seconds"][1] >= 2.0
+
+
+class SahteHub:
+    """BinanceStreamHub'ın akışın kullandığı arayüzü — ağ bağlantısı yok."""
+
+    def __init__(self):
+        self.bagli = True
+        self.son_mesaj = {}
+        self.aboneler = []
+
+    def abone(self, callback, kuyruk_boyutu=100):
+        a = SahteAbone(callback)
+        self.aboneler.append(a)
+        return a
+
+    def taze_mi(self, stream, bayat_sn):
+        son = self.son_mesaj.get(stream)
+        return self.bagli and son is not None and time.monotonic() - son < bayat_sn
+
+    async def tick(self, symbol, fiyat):
+        stream = f"{symbol.lower()}@ticker"
+        self.son_mesaj[stream] = time.monotonic()
+        for a in self.aboneler:
+            if stream in a.streamler:
+                await a.callback(stream, {"e": "24hrTicker", "s": symbol, "c": fiyat})
+
+
+@pytest.fixture
+def akis(monkeypatch):
+    indeks = UyariIndeksi()
+    indeks.yukle([
+        {"id": 1, "user_id": 10, "sembol": "BTC-USD", "tip": "fiyat_ust", "hedef_deger": "70000"},
+        {"id": 2, "user_id": 11, "sembol": "BTC-USD", "tip": "fiyat_alt", "hedef_deger": "60000"},
+        {"id": 3, "user_id": 12, "sembol": "THYAO.IS", "tip": "fiyat_ust", "hedef_deger": "1"},
+    ])
+    monkeypatch.setattr(alert_motoru, "uyari_indeksi", indeks)
+    bot = AsyncMock()
+    ws = SahteHub()
+    return KriptoUyariAkisi(hub=ws, debounce=60, bayat_sn=0.2), bot, ws
+
+
+def test_binance_sembolu():
+    assert binance_sembolu("BTC-USD") == "BTCUSDT"
+    assert binance_sembolu("ETH-TRY") == "ETHTRY"
+    assert binance_sembolu("THYAO.IS") is None
+    assert binance_sembolu("AAPL") is None
+
+
+def _gecikme_sayisi():
+    return next(s.value for m in UYARI_GECIKMESI.collect()
+                for s in m.samples if s.name.endswith("_count"))
+
+
+@pytest.mark.asyncio
+async def test_tick_uyariyi_aninda_tetikler(akis, kuyruk):
+    """Eşiği geçen tick, polling beklemeden Telegram'a gönderilmeli ve gecikme ölçülmeli."""
+    akisi, bot, ws = akis
+    await akisi._abonelikleri_guncelle(akisi._istenen_harita())
+    assert akisi.abone.streamler == {"btcusdt@ticker"}   # BIST sembolü akışa abone edilmez
+
+    once = _gecikme_sayisi()
+    with patch("gonderim_kuyrugu.uyari_sil", new_callable=AsyncMock) as mock_sil:
+        t0 = time.monotonic()
+        await ws.tick("BTCUSDT", "71000.5")
+        await asyncio.gather(*akisi._gorevler)
+        await kuyruk.bosalt(bot)
+        assert time.monotonic() - t0 < 1.0
+        bot.send_message.assert_called_once()
+        assert bot.send_message.call_args.args[0] == 10
+        mock_sil.assert_called_once_with(1)
+    assert _gecikme_sayisi() == once + 1
+    await akisi._abonelikleri_guncelle({})
+
+
+@pytest.mark.asyncio
+async def test_debounce_ayni_uyariyi_tekrarlamaz(akis, kuyruk):
+    """Gönderim bekler/başarısız olurken aynı uyarı her tick'te yeniden kuyruğa eklenmemeli."""
+    akisi, bot, ws = akis
+    await akisi._abonelikleri_guncelle(akisi._istenen_harita())
+
+    for fiyat in ("71000", "71500", "72000"):
+        await ws.tick("BTCUSDT", fiyat)
+    await asyncio.gather(*akisi._gorevler)
+    assert len(kuyruk) == 1
+
+    # Debounce süresi dolsa bile kuyruktaki uyarı ikinci kez eklenmez
+    akisi._son_deneme.clear()
+    await ws.tick("BTCUSDT", "73000")
+    await asyncio.gather(*akisi._gorevler)
+    assert len(kuyruk) == 1
+    await akisi._abonelikleri_guncelle({})
+
+
+@pytest.mark.asyncio
+async def test_akis_koparsa_pollinge_duser(akis):
+    """Bağlantı düşer veya tick bayatlarsa sembol polling döngüsüne geri dönmeli."""
+    akisi, bot, ws = akis
+    await akisi._abonelikleri_guncelle(akisi._istenen_harita())
+    assert akisi.canli_mi("BTC-USD") is False      # henüz tick yok
+
+    await ws.tick("BTCUSDT", "65000")
+    assert akisi.canli_mi("BTC-USD") is True
+    assert akisi.canli_mi("THYAO.IS") is False      # akışta değil → her zaman polling
+
+    ws.bagli = False
+    assert akisi.canli_mi("BTC-USD") is False
+    ws.bagli = True
+    await asyncio.sleep(0.25)                        # bayat_sn=0.2
+    assert akisi.canli_mi("BTC-USD") is False
+    await akisi._abonelikleri_guncelle({})
+
+
+@pytest.mark.asyncio
+async def test_sembol_degisince_yalnizca_fark_abone_edilir(akis, monkeypatch):
+    """Yeni kripto uyarısı eklenince mevcut stream'ler bırakılmadan yalnızca yeni stream eklenmeli."""
+    akisi, bot, ws = akis
+    await akisi._abonelikleri_guncelle(akisi._istenen_harita())
+    cagrilar = []
+    monkeypatch.setattr(akisi.abone, "ekle", AsyncMock(side_effect=lambda *s: cagrilar.append(("+",) + s)))
+    monkeypatch.setattr(akisi.abone, "cikar", AsyncMock(side_effect=lambda *s: cagrilar.append(("-",) + s)))
+
+    alert_motoru.uyari_indeksi.ekle(
+        {"id": 4, "user_id": 13, "sembol": "ETH-USD", "tip": "fiyat_ust", "hedef_deger": "5000"})
+    await akisi._abonelikleri_guncelle(akisi._istenen_harita())
+    assert cagrilar == [("+", "ethusdt@ticker")]
+
+    alert_motoru.uyari_indeksi.sil(1)
+    alert_motoru.uyari_indeksi.sil(2)
+    await akisi._abonelikleri_guncelle(akisi._istenen_harita())
+    assert cagrilar[-1] == ("-", "btcusdt@ticker")
@@ -0,0 +1,117 @@
+"""
+tests/test_backtest_motoru.py — Vektörel backtest motoru ve strateji kayıt defteri.
+"""
+import os
+import sys
+import pytest
+import numpy as np
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backtest_motoru
+from backtest_motoru import (
+    BacktestHatasi, STRATEJILER, backtest_calistir, strateji, strateji_getir,
+)
+
+
+def _mumlar(n=400, tohum=7):
+    """Rastgele yürüyüş OHLCV: (n × 6) fiyat_gecmisi düzeni, günlük zaman ekseni."""
+    rng = np.random.default_rng(tohum)
+    kapanis = 100 * np.cumprod(1 + rng.normal(0.0004, 0.02, n))
+    acilis = np.concatenate(([100.0], kapanis[:-1])) * (1 + rng.normal(0, 0.004, n))
+    yuksek = np.maximum(acilis, kapanis) * (1 + np.abs(rng.normal(0, 0.008, n)))
+    dusuk = np.minimum(acilis, kapanis) * (1 - np.abs(rng.normal(0, 0.008, n)))
+    hacim = rng.integers(1_000, 50_000, n).astype(float)
+    zaman = np.arange(n) * 86400.0
+    return np.column_stack((zaman, acilis, yuksek, dusuk, kapanis, hacim))
+
+
+def _dongu_referansi(mumlar, hedef, maliyet, sermaye=10000.0):
+    """Eski tarz satır döngüsü: sinyal ertesi açılışta dolar, değişen tutar kadar maliyet."""
+    o, c = mumlar[:, 1], mumlar[:, 4]
+    nakit, adet, poz = sermaye, 0.0, 0.0
+    ozkaynak = []
+    for i in range(len(c)):
+        yeni = hedef[i - 1] if i else 0.0
+        if yeni != poz:
+            deger = nakit + adet * o[i]
+            deger *= 1 - maliyet * abs(yeni - poz)
+            adet, nakit, poz = yeni * deger / o[i], deger - yeni * deger, yeni
+        ozkaynak.append(nakit + adet * c[i])
+    return np.array(ozkaynak)
+
+
+def test_vektorel_ozkaynak_dongu_ile_ayni():
+    """SMA_CROSS özkaynak eğrisi satır satır işlem simülasyonuyla aynı olmalı."""
+    mumlar = _mumlar()
+    sonuc = backtest_calistir(mumlar, "SMA_CROSS", {"hizli": 10, "yavas": 30}, komisyon=0.001, kayma=0.0005)
+    hedef = STRATEJILER["SMA_CROSS"].fonksiyon(mumlar, hizli=10, yavas=30)
+    assert np.allclose(sonuc.ozkaynak, _dongu_referansi(mumlar, hedef, 0.0015))
+    assert sonuc.islem_sayisi == int((np.diff(sonuc.pozisyon, prepend=0) == 1).sum())
+    assert sonuc.toplam_getiri == pytest.approx(sonuc.ozkaynak[-1] / 10000 - 1)
+
+
+def test_surekli_uzun_al_tut_ve_metrikler():
+    """Hep uzun kalan strateji: ertesi açılıştan al-tut, tek işlem, bilinen düşüş ve CAGR."""
+    mumlar = _mumlar(n=366)
+
+    @strateji("TEST_HEP_UZUN", "Her zaman uzun")
+    def _hep_uzun(m):
+        return np.ones(len(m))
+
+    try:
+        s = backtest_calistir(mumlar, "test_hep_uzun", komisyon=0.001, kayma=0.0)
+        o, c = mumlar[:, 1], mumlar[:, 4]
+        assert s.toplam_getiri == pytest.approx(c[-1] / o[1] * 0.999 - 1)
+        assert s.islem_sayisi == 1 and s.islem_getirileri[0] == pytest.approx(c[-1] / o[1] - 1 - 0.002)
+        assert s.cagr == pytest.approx((1 + s.toplam_getiri) ** (365.25 / 365) - 1)
+        egri = np.concatenate(([10000.0], s.ozkaynak))
+        assert s.max_dusus == pytest.approx(min(egri[k] / egri[:k + 1].max() - 1 for k in range(len(egri))))
+    finally:
+        STRATEJILER.pop("TEST_HEP_UZUN")
+
+
+def test_ileriye_bakis_yok_ve_kayitli_stratejiler():
+    """Gelecek barları değiştirmek geçmiş özkaynağı değiştirmemeli; Supertrend/AlphaTrend çalışmalı."""
+    mumlar = _mumlar(n=300)
+    bozuk = mumlar.copy()
+    bozuk[200:, 1:5] *= 1.5
+    for ad in ("SMA_CROSS", "SUPERTREND", "ALPHATREND"):
+        a = backtest_calistir(mumlar, ad, aciga_satis=True)
+        b = backtest_calistir(bozuk, ad, aciga_satis=True)
+        assert np.allclose(a.ozkaynak[:200], b.ozkaynak[:200]), ad
+        assert a.islem_sayisi > 0 and 0.0 <= a.kazanma_orani <= 1.0
+        assert set(np.unique(a.pozisyon)) <= {-1.0, 0.0, 1.0}
+    uzun = backtest_calistir(mumlar, "SUPERTREND")
+    assert uzun.pozisyon.min() == 0.0
+
+
+def test_bilinmeyen_strateji_ve_parametre():
+    """Kayıtsız strateji ya da parametre anlaşılır hata vermeli; backtest_yap bunu sözlükle döndürmeli."""
+    with pytest.raises(BacktestHatasi):
+        strateji_getir("YOK")
+    with pytest.raises(BacktestHatasi, match="period"):
+        backtest_calistir(_mumlar(), "SUPERTREND", {"period": 5})
+    with pytest.raises(BacktestHatasi):
+        backtest_calistir(_mumlar()[:2], "SMA_CROSS")
+
+
+def test_backtest_yap_sozluk_raporu(monkeypatch):
+    """backtest_yap tek çekimle veri alıp eski anahtarlarla birlikte yeni metrikleri döndürmeli."""
+    import fiyat_gecmisi
+
+    cagrilar = []
+
+    def sahte_cek(semboller, baslangic):
+        cagrilar.append(semboller)
+        return {"THYAO.IS": _mumlar(n=260)}
+
+    monkeypatch.setattr(fiyat_gecmisi, "_yfinance_gunluk_cek", sahte_cek)
+    rapor = backtest_motoru.backtest_yap("THYAO.IS", "alphatrend", ap=10)
+    assert cagrilar == [["THYAO.IS"]]
+    assert rapor["Strateji"] == "ALPHATREND (coeff=1, ap=10)"
+    for anahtar in ("Kâr/Zarar (%)", "Al-Tut Getirisi (%)", "CAGR (%)", "Sharpe", "Maks. Düşüş (%)",
+                    "Kazanma Oranı (%)", "İşlem Sayısı", "Durum"):
+        assert anahtar in rapor
+    assert "Hata" in backtest_motoru.backtest_yap("THYAO.IS", "YOK")
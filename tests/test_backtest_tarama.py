@@ -0,0 +1,101 @@
+"""
+tests/test_backtest_tarama.py — Paralel parametre taraması, önbellek ve yürüyen ileri analiz.
+"""
+import os
+import sys
+import pytest
+import numpy as np
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backtest_tarama
+from backtest_motoru import BacktestHatasi, backtest_calistir
+from backtest_tarama import (
+    SonucOnbellegi, parametre_izgarasi, tara_topla, yuruyen_ileri, yuruyen_pencereler,
+)
+
+
+def _mumlar(n, tohum):
+    """Rastgele yürüyüş OHLCV: (n × 6) fiyat_gecmisi düzeni."""
+    rng = np.random.default_rng(tohum)
+    kapanis = 100 * np.cumprod(1 + rng.normal(0.0004, 0.02, n))
+    acilis = np.concatenate(([100.0], kapanis[:-1])) * (1 + rng.normal(0, 0.004, n))
+    yuksek = np.maximum(acilis, kapanis) * 1.01
+    dusuk = np.minimum(acilis, kapanis) * 0.99
+    return np.column_stack((np.arange(n) * 86400.0, acilis, yuksek, dusuk, kapanis, np.full(n, 1e4)))
+
+
+@pytest.fixture
+def taze_onbellek(monkeypatch):
+    monkeypatch.setattr(backtest_tarama, "onbellek", SonucOnbellegi())
+    monkeypatch.setattr(backtest_tarama.settings, "BACKTEST_WORKERS", 2)
+
+
+def test_izgara_ve_pencereler():
+    """Izgara kartezyen çarpım olmalı; yürüyen pencereler bitişik ve kayar olmalı."""
+    izgara = parametre_izgarasi(factor=[2.0, 3.0], atr_period=[7, 10, 14])
+    assert len(izgara) == 6 and {"factor": 3.0, "atr_period": 14} in izgara
+    assert yuruyen_pencereler(100, 40, 20) == [((0, 40), (40, 60)), ((20, 60), (60, 80)), ((40, 80), (80, 100))]
+    assert yuruyen_pencereler(50, 40, 20) == []
+
+
+@pytest.mark.asyncio
+async def test_paralel_tarama_dogrudan_calistirma_ile_ayni(taze_onbellek):
+    """Süreçlerde (paylaşımlı bellek) hesaplanan metrikler doğrudan backtest ile aynı; tekrar önbellekten."""
+    veriler = {"A": _mumlar(n=300, tohum=1), "B": _mumlar(n=250, tohum=2)}
+    izgara = parametre_izgarasi(factor=[2.0, 3.0], atr_period=[7, 10])
+
+    try:
+        sonuclar = await tara_topla(veriler, "SUPERTREND", izgara, komisyon=0.001, kayma=0.0, parca=1)
+        assert len(sonuclar) == 8 and not any(s.onbellekten for s in sonuclar)
+        for s in sonuclar:
+            dogrudan = backtest_calistir(veriler[s.sembol], "SUPERTREND", s.parametreler, komisyon=0.001, kayma=0.0)
+            assert s.metrikler[0]["sharpe"] == pytest.approx(dogrudan.sharpe)
+            assert s.metrikler[0]["islem_sayisi"] == dogrudan.islem_sayisi
+
+        tekrar = await tara_topla(veriler, "SUPERTREND", izgara, komisyon=0.001, kayma=0.0)
+        assert all(s.onbellekten for s in tekrar)
+        assert [s.metrikler for s in tekrar] == [s.metrikler for s in sonuclar]
+
+        # Veri değişirse (farklı özet) önbellek kullanılmaz
+        veriler["A"] = veriler["A"] * 1.01
+        yeni = await tara_topla(veriler, "SUPERTREND", izgara[:1], komisyon=0.001, kayma=0.0)
+        assert [s.onbellekten for s in yeni] == [False, True]
+    finally:
+        await backtest_tarama.kapat()
+
+
+@pytest.mark.asyncio
+async def test_yuruyen_ileri_egitimde_en_iyiyi_secer(taze_onbellek):
+    """Her adımda eğitim ölçütü en yüksek parametre seçilmeli; test metrikleri pencere backtest'i olmalı."""
+    veriler = {"A": _mumlar(n=320, tohum=5)}
+    izgara = parametre_izgarasi(hizli=[5, 10], yavas=[20, 40])
+    try:
+        sonuc = (await yuruyen_ileri(veriler, "SMA_CROSS", izgara, egitim=160, test=80, komisyon=0.0, kayma=0.0))["A"]
+        tum = await tara_topla(veriler, "SMA_CROSS", izgara, komisyon=0.0, kayma=0.0,
+                               pencereler=[(0, 160), (160, 240), (80, 240), (240, 320)])
+    finally:
+        await backtest_tarama.kapat()
+
+    assert [(a.egitim, a.test) for a in sonuc.adimlar] == [((0, 160), (160, 240)), ((80, 240), (240, 320))]
+    assert all(s.onbellekten for s in tum)            # Aynı pencereler yürüyen analizde hesaplandı
+    for k, adim in enumerate(sonuc.adimlar):
+        en_iyi = max(tum, key=lambda s: s.metrikler[2 * k]["sharpe"])
+        assert adim.parametreler == en_iyi.parametreler
+        assert adim.test_metrikleri == en_iyi.metrikler[2 * k + 1]
+    assert sonuc.test_getirisi == pytest.approx(
+        np.prod([1 + a.test_metrikleri["toplam_getiri"] for a in sonuc.adimlar]) - 1)
+
+
+@pytest.mark.asyncio
+async def test_gecersiz_girdi_is_baslamadan_hata():
+    """Bilinmeyen parametre, kısa pencere ve ölçüt süreç havuzu açılmadan reddedilmeli."""
+    veriler = {"A": _mumlar(n=100, tohum=3)}
+    with pytest.raises(BacktestHatasi):
+        await tara_topla(veriler, "SUPERTREND", [{"periyot": 3}])
+    with pytest.raises(BacktestHatasi):
+        await tara_topla(veriler, "SUPERTREND", [{}], pencereler=[(0, 200)])
+    with pytest.raises(BacktestHatasi):
+        await yuruyen_ileri(veriler, "SMA_CROSS", [{}], egitim=60, test=30, olcut="kar")
+    assert backtest_tarama._havuz is None
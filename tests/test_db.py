@@ -6,6 +6,7 @@ import os
 import sys
 import pytest
 import asyncio
+import sqlite3
 import tempfile
 
 os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
@@ -189,3 +190,182 @@ async def test_portfoy_decimal_hassasiyet(tmp_path):
     assert portfoy[0]['maliyet'] == "0.00001"
     
     await m.close_db()
+
+
+# ═══════════════════════════════════════════════════════════════
+# ŞEMA GÖÇLERİ VE SORGU PLANLARI
+# ═══════════════════════════════════════════════════════════════
+
+@pytest.mark.asyncio
+async def test_goclar_bir_kez_ve_sirayla_uygulanir(tmp_path):
+    """Her göç tek satırla kaydedilmeli; db_init tekrarı hiçbir şey yapmamalı."""
+    m = await _fresh_db(str(tmp_path / "test.db"))
+    db = await m.DBPool.get_db()
+    son = m.GOCLER[-1][0]
+    assert [no for no, _, _ in m.GOCLER] == list(range(1, son + 1))
+
+    async with db.execute("SELECT surum FROM schema_version ORDER BY surum") as c:
+        assert [r[0] for r in await c.fetchall()] == list(range(1, son + 1))
+    await m.db_init()
+    assert await m.goclari_uygula() == son
+    async with db.execute("SELECT COUNT(*) FROM schema_version") as c:
+        assert (await c.fetchone())[0] == son
+    await m.close_db()
+
+
+@pytest.mark.asyncio
+async def test_goc_oncesi_veritabani_yukseltilir(tmp_path):
+    """schema_version'sız eski veritabanı verisini koruyarak son sürüme yükseltilmeli."""
+    import sqlite3
+    yol = tmp_path / "eski.db"
+    with sqlite3.connect(yol) as c:
+        c.execute("CREATE TABLE uyarilar (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, "
+                  "sembol TEXT, tip TEXT, hedef_deger TEXT, tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        c.execute("INSERT INTO uyarilar (user_id, sembol, tip, hedef_deger) VALUES (1, 'AAPL', 'fiyat_ust', '200')")
+
+    m = await _fresh_db(str(yol))
+    assert [u["sembol"] for u in await m.kullanici_uyarilari_getir(1)] == ["AAPL"]
+    db = await m.DBPool.get_db()
+    async with db.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'uyarilar'") as c:
+        assert {"ix_uyarilar_kullanici", "ix_uyarilar_sembol"} <= {r[0] for r in await c.fetchall()}
+    await m.close_db()
+
+
+@pytest.mark.asyncio
+async def test_basarisiz_goc_geri_alinir(tmp_path, monkeypatch):
+    """Göç yarıda hata verirse ne şema değişikliği ne de sürüm kaydı kalmalı."""
+    m = await _fresh_db(str(tmp_path / "test.db"))
+    son = m.GOCLER[-1][0]
+    monkeypatch.setattr(m, "GOCLER", m.GOCLER + [
+        (son + 1, "bozuk", ("CREATE TABLE yeni_tablo (x INTEGER)", "BU SQL DEĞİL")),
+    ])
+    with pytest.raises(Exception):
+        await m.goclari_uygula()
+    db = await m.DBPool.get_db()
+    async with db.execute("SELECT name FROM sqlite_master WHERE name = 'yeni_tablo'") as c:
+        assert await c.fetchone() is None
+    assert await m._sema_surumu(db) == son
+    await m.close_db()
+
+
+@pytest.mark.asyncio
+async def test_sicak_sorgular_indeks_kullanir(tmp_path):
+    """Kullanıcı/sembol başına sorgular tam tablo taraması (SCAN) yapmamalı."""
+    m = await _fresh_db(str(tmp_path / "test.db"))
+    db = await m.DBPool.get_db()
+    for i in range(50):
+        await m.uyari_ekle(i % 5, f"S{i}", "fiyat_ust", "1")
+        await m.portfoy_ekle(i % 5, f"S{i}", "1", "1")
+        await m.favori_ekle(i % 5, f"S{i}")
+
+    ifadeler = []
+    await m.DBPool.okuyucu()             # Okuyucu havuzu açılsın: okumalar oraya gider
+    baglantilar = [db, *m.DBPool._okuyucular]
+    for b in baglantilar:
+        await b.set_trace_callback(ifadeler.append)
+    await m.kullanici_uyarilari_getir(3)
+    await m.portfoy_getir(3)
+    await m.portfoy_islemi_uygula(3, "S8", "satis", "1", "2")     # pozisyon + lotlar okunur
+    await m.portfoy_sil(3, "S3")
+    await m.favorileri_getir(3)
+    await m.kosul_uyarilarini_getir()
+    await m.uyari_sil(1, user_id=0)
+    await m.kullanici_dil_getir(3)
+    for b in baglantilar:
+        await b.set_trace_callback(None)
+
+    sorgular = [s for s in ifadeler if s.lstrip().upper().startswith(("SELECT", "DELETE", "UPDATE"))]
+    assert len(sorgular) == 12
+    # Sembol başına uyarı araması (parçalı indeks yenileme / yönetim sorguları)
+    sorgular.append("SELECT * FROM uyarilar WHERE sembol = 'S3'")
+
+    for sql in sorgular:
+        async with db.execute(f"EXPLAIN QUERY PLAN {sql}") as c:
+            plan = [r["detail"] for r in await c.fetchall()]
+        assert all("USING" in adim for adim in plan if adim.startswith(("SCAN", "SEARCH"))), (sql, plan)
+        # Sıralama da indeksten gelmeli (geçici B-tree yok)
+        assert not any("TEMP B-TREE" in adim for adim in plan), (sql, plan)
+    await m.close_db()
+
+
+@pytest.mark.asyncio
+async def test_eszamanli_yazmalar_grup_commit(tmp_path):
+    """500 eşzamanlı yazma çok daha az commit ile uygulanmalı; dönüşten sonra okunabilmeli."""
+    m = await _fresh_db(str(tmp_path / "test.db"))
+    onceki = m.yazma_kuyrugu.grup_sayisi
+    await asyncio.gather(*(m.favori_ekle(i % 10, f"S{i}") for i in range(500)))
+    assert m.yazma_kuyrugu.grup_sayisi - onceki <= 50
+    assert len(await m.favorileri_getir(3)) == 50
+
+    # Read-your-writes: beklenen yazma hemen ardından okunur
+    uyari_id = await m.uyari_ekle(7, "AAPL", "fiyat_ust", "100")
+    assert [u["id"] for u in await m.kullanici_uyarilari_getir(7)] == [uyari_id]
+    await m.close_db()
+
+
+@pytest.mark.asyncio
+async def test_hatali_yazma_grubu_bozmaz(tmp_path):
+    """Aynı gruptaki hatalı ifade yalnızca kendi çağıranına hata döndürmeli."""
+    m = await _fresh_db(str(tmp_path / "test.db"))
+    await m.kullanici_kaydet(1, "a")
+    sonuclar = await asyncio.gather(
+        m.favori_ekle(1, "AAPL"),
+        m._yaz("INSERT INTO kullanicilar (user_id, username) VALUES (?, ?)", (1, "tekrar")),
+        m.favori_ekle(1, "MSFT"),
+        return_exceptions=True,
+    )
+    assert isinstance(sonuclar[1], sqlite3.IntegrityError)
+    assert not isinstance(sonuclar[0], Exception) and not isinstance(sonuclar[2], Exception)
+    assert sorted(await m.favorileri_getir(1)) == ["AAPL", "MSFT"]
+    await m.close_db()
+
+
+@pytest.mark.asyncio
+async def test_kapanista_bekleyen_yazmalar_uygulanir(tmp_path):
+    """close_db kuyruktaki yazmaları commit etmeden bağlantıyı kapatmamalı."""
+    yol = str(tmp_path / "test.db")
+    m = await _fresh_db(yol)
+    m.yazma_kuyrugu.pencere_ms = 200
+    gorevler = [asyncio.create_task(m.favori_ekle(1, f"S{i}")) for i in range(20)]
+    await asyncio.sleep(0)
+    await m.close_db()
+    m.yazma_kuyrugu.pencere_ms = None
+    await asyncio.gather(*gorevler)
+    with sqlite3.connect(yol) as c:
+        assert c.execute("SELECT COUNT(*) FROM favoriler").fetchone()[0] == 20
+
+
+@pytest.mark.asyncio
+async def test_okumalar_salt_okunur_havuza_gider(tmp_path, monkeypatch):
+    """Okumalar yazıcıdan ayrı, query_only bağlantılara dağıtılmalı; PRAGMA ayarları uygulanmalı."""
+    monkeypatch.setattr("db.settings.DB_READ_POOL_SIZE", 3)
+    m = await _fresh_db(str(tmp_path / "test.db"))
+    yazici = await m.DBPool.get_db()
+    okuyucular = {id(await m.DBPool.okuyucu()) for _ in range(6)}
+    assert len(okuyucular) == 3 and id(yazici) not in okuyucular
+
+    okuyucu = await m.DBPool.okuyucu()
+    with pytest.raises(sqlite3.OperationalError):
+        await okuyucu.execute("INSERT INTO favoriler (user_id, sembol) VALUES (1, 'X')")
+    for b, senkron in ((yazici, 1), (okuyucu, 1)):
+        async with b.execute("PRAGMA synchronous") as c:
+            assert (await c.fetchone())[0] == senkron        # 1 = NORMAL
+        async with b.execute("PRAGMA temp_store") as c:
+            assert (await c.fetchone())[0] == 2              # 2 = MEMORY
+        async with b.execute("PRAGMA journal_mode") as c:
+            assert (await c.fetchone())[0] == "wal"
+
+    # Yazma commit edildikten sonra döner: her okuyucu hemen görür
+    for i in range(6):
+        await m.favori_ekle(1, f"S{i}")
+        assert len(await m.favorileri_getir(1)) == i + 1
+    await m.close_db()
+    assert m.DBPool._okuyucular == []
+
+
+@pytest.mark.asyncio
+async def test_havuz_kapaliyken_okumalar_yazicida(tmp_path, monkeypatch):
+    monkeypatch.setattr("db.settings.DB_READ_POOL_SIZE", 0)
+    m = await _fresh_db(str(tmp_path / "test.db"))
+    assert await m.DBPool.okuyucu() is await m.DBPool.get_db()
+    await m.close_db()
@@ -0,0 +1,26 @@
+"""
+tests/test_db_benchmark.py — Yazma yükü altında okuma gecikmesi kıyaslaması testleri.
+"""
+import os
+import sys
+import pytest
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from db_benchmark import kiyasla, rapor
+
+
+@pytest.mark.asyncio
+async def test_havuz_kiyaslamasi():
+    """Her havuz boyutu okuma ve yazma yapmalı; ayarlar ölçümden sonra geri yüklenmeli."""
+    eski = (settings.DB_PATH, settings.DB_READ_POOL_SIZE)
+    sonuclar = await kiyasla((0, 2), sure=0.3, yazici=2, okuyucu=4, kullanici=50, mum=10)
+
+    assert [s.havuz for s in sonuclar] == [0, 2]
+    for s in sonuclar:
+        assert s.okuma > 0 and s.yazma > 0
+        assert 0 < s.p50_ms <= s.p95_ms <= s.p99_ms <= s.maks_ms
+    assert (settings.DB_PATH, settings.DB_READ_POOL_SIZE) == eski
+    assert "p99 ms" in rapor(sonuclar)
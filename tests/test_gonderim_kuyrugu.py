@@ -0,0 +1,245 @@
+"""
+tests/test_gonderim_kuyrugu.py — Telegram gönderim kuyruğu testleri.
+Telegram yerine gönderim zamanlarını kaydeden sahte bot kullanılır.
+"""
+import os
+import sys
+import time
+import asyncio
+from collections import defaultdict
+import pytest
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+
+import gonderim_kuyrugu as gk
+from gonderim_kuyrugu import (
+    GonderimKuyrugu, TokenKovasi, ONCELIK_UYARI, ONCELIK_NORMAL, ONCELIK_OZET,
+    GONDERIM_GECIKMESI,
+)
+
+
+class SahteBot:
+    """send_message çağrılarını (zaman, chat, metin) olarak kaydeder; istenirse hata fırlatır."""
+
+    def __init__(self, hatalar=None):
+        self.gonderilen = []
+        self.hatalar = hatalar or {}   # metin → [fırlatılacak istisnalar]
+
+    async def send_message(self, chat_id, metin, parse_mode=None):
+        kuyruk = self.hatalar.get(metin)
+        if kuyruk:
+            raise kuyruk.pop(0)
+        await asyncio.sleep(0.001)
+        self.gonderilen.append((time.monotonic(), chat_id, metin))
+
+
+def test_token_kovasi():
+    k = TokenKovasi(hiz=2.0, kapasite=1.0)
+    t = time.monotonic()
+    assert k.bekleme(t) == 0
+    k.al(t)
+    assert k.bekleme(t) == pytest.approx(0.5)
+    assert k.bekleme(t + 0.5) == 0
+    k.kilit = t + 3
+    assert k.bekleme(t + 1) == pytest.approx(2.0)
+
+
+@pytest.mark.asyncio
+async def test_global_ve_sohbet_hiz_siniri():
+    """Sohbet başına ardışık mesajlar ≥ 1/sohbet_hiz arayla, toplam hız global sınırın altında olmalı."""
+    kuyruk = GonderimKuyrugu(global_hiz=40, sohbet_hiz=10, kalici=False)
+    for i in range(8):
+        for chat in range(10):
+            await kuyruk.ekle(chat, f"{chat}-{i}")
+    bot = SahteBot()
+    t0 = time.monotonic()
+    await kuyruk.bosalt(bot)
+    sure = time.monotonic() - t0
+
+    assert len(bot.gonderilen) == 80
+    # 40 jetonluk ilk patlama + kalan 40 mesaj 40/sn → en az ~1 sn
+    assert sure >= 0.9
+    zamanlar = defaultdict(list)
+    for t, chat, metin in bot.gonderilen:
+        zamanlar[chat].append(t)
+    for chat, ts in zamanlar.items():
+        assert [m for _, c, m in bot.gonderilen if c == chat] == [f"{chat}-{i}" for i in range(8)]
+        assert min(b - a for a, b in zip(ts, ts[1:])) >= 0.09
+    # Herhangi bir 1 sn'lik pencerede global kapasite + hızı aşmamalı
+    tum = sorted(t for t, _, _ in bot.gonderilen)
+    for i, t in enumerate(tum):
+        assert sum(1 for u in tum[i:] if u - t < 1.0) <= 80
+
+
+@pytest.mark.asyncio
+async def test_uyarilar_ozetlerden_once():
+    kuyruk = GonderimKuyrugu(global_hiz=100, sohbet_hiz=100, eszamanli=1, kalici=False)
+    for i in range(3):
+        await kuyruk.ekle(1, f"ozet-{i}", oncelik=ONCELIK_OZET)
+    await kuyruk.ekle(1, "normal", oncelik=ONCELIK_NORMAL)
+    await kuyruk.ekle(1, "uyari", oncelik=ONCELIK_UYARI)
+    bot = SahteBot()
+    await kuyruk.bosalt(bot)
+    assert [m for _, _, m in bot.gonderilen] == ["uyari", "normal", "ozet-0", "ozet-1", "ozet-2"]
+
+
+@pytest.mark.asyncio
+async def test_retry_after_sohbeti_bekletir_digerlerini_degil():
+    """429 alan sohbet retry_after kadar beklemeli; diğer sohbet engellenmemeli, mesaj kaybolmamalı."""
+    kuyruk = GonderimKuyrugu(global_hiz=100, sohbet_hiz=100, kalici=False)
+    hata = TelegramRetryAfter(method=None, message="Too Many Requests", retry_after=1)
+    bot = SahteBot(hatalar={"a": [hata]})
+    t0 = time.monotonic()
+    await kuyruk.ekle(1, "a")
+    await kuyruk.ekle(2, "b")
+    await kuyruk.bosalt(bot)
+
+    zaman = {m: t - t0 for t, _, m in bot.gonderilen}
+    assert set(zaman) == {"a", "b"}
+    assert zaman["a"] >= 1.0
+    assert zaman["b"] < 0.5
+
+
+@pytest.mark.asyncio
+async def test_kalici_hata_mesaji_atar_gecici_hata_yeniden_dener(monkeypatch):
+    silinen = []
+
+    async def uyari_sil(uyari_id, user_id=None):
+        silinen.append(uyari_id)
+    monkeypatch.setattr(gk, "uyari_sil", uyari_sil)
+
+    kuyruk = GonderimKuyrugu(global_hiz=100, sohbet_hiz=100, kalici=False)
+    bot = SahteBot(hatalar={
+        "engelli": [TelegramForbiddenError(method=None, message="bot was blocked by the user")],
+        "gecici": [ConnectionError("ağ")],
+    })
+    await kuyruk.ekle(1, "engelli", uyari_id=10)
+    await kuyruk.ekle(2, "gecici", uyari_id=20)
+    await kuyruk.bosalt(bot)
+
+    assert [m for _, _, m in bot.gonderilen] == ["gecici"]   # 2 sn geri çekilmeden sonra
+    assert sorted(silinen) == [10, 20]                         # engelleyen kullanıcının uyarısı da silinir
+
+
+@pytest.mark.asyncio
+async def test_yeniden_baslatmada_kuyruk_korunur(tmp_path):
+    """Kuyruktaki mesajlar SQLite'tan geri yüklenmeli; gönderilince satır ve uyarı silinmeli."""
+    import db as db_module
+
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    uyari_id = await db_module.uyari_ekle(42, "AAPL", "fiyat_ust", "100")
+
+    ilk = GonderimKuyrugu(kalici=True)
+    assert await ilk.ekle(42, "uyarı!", oncelik=ONCELIK_UYARI, uyari_id=uyari_id)
+    assert not await ilk.ekle(42, "uyarı!", oncelik=ONCELIK_UYARI, uyari_id=uyari_id)   # çift ekleme yok
+    await ilk.ekle(42, "özet", oncelik=ONCELIK_OZET)
+    # ... süreç burada ölür
+
+    ikinci = GonderimKuyrugu(kalici=True)
+    await ikinci.yukle()
+    assert len(ikinci) == 2
+    assert not await ikinci.ekle(42, "uyarı!", uyari_id=uyari_id)
+
+    once = next(s.value for m in GONDERIM_GECIKMESI.collect() for s in m.samples if s.name.endswith("_count"))
+    bot = SahteBot()
+    await ikinci.bosalt(bot)
+    assert [m for _, _, m in bot.gonderilen] == ["uyarı!", "özet"]
+    assert await db_module.gonderimleri_getir() == []
+    assert await db_module.kullanici_uyarilari_getir(42) == []
+    sonra = next(s.value for m in GONDERIM_GECIKMESI.collect() for s in m.samples if s.name.endswith("_count"))
+    assert sonra == once + 2
+
+    await db_module.close_db()
+
+
+@pytest.mark.asyncio
+async def test_diger_sureclerin_yazdigi_mesajlar_gonderilir(tmp_path, monkeypatch):
+    """gonderici=False kuyruk (uyarı işçisi) yalnızca tabloya yazar; bot süreci tabloyu tarayıp gönderir."""
+    import db as db_module
+
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    monkeypatch.setattr(gk.settings, "TELEGRAM_OUTBOX_POLL_SECONDS", 0.05)
+
+    isci = GonderimKuyrugu(kalici=True, gonderici=False)
+    bot_kuyrugu = GonderimKuyrugu(global_hiz=100, sohbet_hiz=100, kalici=True)
+    bot = SahteBot()
+    gorev = asyncio.create_task(bot_kuyrugu.calistir(bot))
+    try:
+        await bot_kuyrugu.ekle(1, "yerel")
+        assert await isci.ekle(2, "işçiden")
+        assert len(isci) == 0
+        for _ in range(100):
+            if len(bot.gonderilen) == 2:
+                break
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.2)     # Aynı satır ikinci kez taranıp gönderilmemeli
+    finally:
+        gorev.cancel()
+        await asyncio.gather(gorev, return_exceptions=True)
+
+    assert sorted(m for _, _, m in bot.gonderilen) == ["işçiden", "yerel"]
+    assert await db_module.gonderimleri_getir() == []
+    await db_module.close_db()
+
+
+@pytest.mark.asyncio
+async def test_uyari_ve_satir_ayni_islemde_silinir(tmp_path):
+    """Gönderim bitince satır ile uyarı arasında, devralan sürecin bildirimi yeniden ekleyebileceği an olmamalı."""
+    import db as db_module
+
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    uyari_id = await db_module.uyari_ekle(42, "AAPL", "fiyat_ust", "100")
+
+    kuyruk = GonderimKuyrugu(global_hiz=100, sohbet_hiz=100, kalici=True)
+    assert await kuyruk.ekle(42, "uyarı!", oncelik=ONCELIK_UYARI, uyari_id=uyari_id)
+
+    # Her yazma grubu işlendikten hemen sonra parçayı taze indeksle devralan bir süreç
+    # aynı uyarıyı tetikler (gonderim_ekle'nin EXISTS kontrolünden geçmeye çalışır)
+    devralan = []
+    gercek_yaz, gercek_islem = db_module._yaz, db_module._yaz_islem
+    izle = {"acik": True}
+
+    async def isci_tetikler():
+        if izle["acik"]:
+            izle["acik"] = False
+            try:
+                devralan.append(await db_module.gonderim_ekle(
+                    42, "uyarı!", "HTML", ONCELIK_UYARI, uyari_id, time.time()))
+            finally:
+                izle["acik"] = True
+
+    async def yaz(*args, **kwargs):
+        sonuc = await gercek_yaz(*args, **kwargs)
+        await isci_tetikler()
+        return sonuc
+
+    async def yaz_islem(*args, **kwargs):
+        sonuc = await gercek_islem(*args, **kwargs)
+        await isci_tetikler()
+        return sonuc
+
+    db_module._yaz, db_module._yaz_islem = yaz, yaz_islem
+    try:
+        bot = SahteBot()
+        await kuyruk.bosalt(bot)
+        db_module._yaz, db_module._yaz_islem = gercek_yaz, gercek_islem
+
+        assert [m for _, _, m in bot.gonderilen] == ["uyarı!"]
+        assert devralan and all(d is None for d in devralan)
+        assert await db_module.gonderimleri_getir() == []
+        assert await db_module.kullanici_uyarilari_getir(42) == []
+    finally:
+        db_module._yaz, db_module._yaz_islem = gercek_yaz, gercek_islem
+        await db_module.close_db()
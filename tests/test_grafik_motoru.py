@@ -0,0 +1,298 @@
+"""
+tests/test_grafik_motoru.py — Yerel mum grafiği çizimi ve PNG cache testleri.
+Ağ erişimi yok: OHLCV verisi sentetik üretilir.
+"""
+import os
+import sys
+import asyncio
+import threading
+import importlib
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grafik_motoru as gm
+from config import settings
+
+
+def _ohlcv(n: int = 250, son: str = "2025-01-31") -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    idx = pd.bdate_range(end=son, periods=n)
+    c = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        "Open": c + rng.normal(0, 0.3, n), "High": c + 1.0, "Low": c - 1.0,
+        "Close": c, "Volume": rng.integers(100_000, 1_000_000, n),
+    }, index=idx)
+
+
+@pytest.fixture
+def cache_klasoru(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHART_CACHE_DIR", str(tmp_path / "chart_cache"))
+    return tmp_path / "chart_cache"
+
+
+@pytest.fixture
+def sahte_cizim(monkeypatch, cache_klasoru):
+    """Süreç havuzu yerine thread havuzu + sayaçlı sahte çizim."""
+    cagri = []
+    kilit = threading.Lock()
+
+    def _ciz_png(df, overlaylar, baslik, bar_sayisi):
+        with kilit:
+            cagri.append((df.index[-1], overlaylar))
+        threading.Event().wait(0.05)
+        return b"\x89PNG sahte"
+
+    havuz = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(gm, "_ciz_png", _ciz_png)
+    monkeypatch.setattr(gm, "_havuz_al", lambda: havuz)
+    yield cagri
+    havuz.shutdown()
+
+
+def test_tum_overlaylerle_png_cizilir():
+    """Supertrend/AlphaTrend/Bollinger/Ichimoku birlikte geçerli bir PNG üretmeli."""
+    png = gm._ciz_png(_ohlcv(), gm.OVERLAYLER, "TEST")
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    assert len(png) > 10_000
+
+
+def test_overlay_normalize():
+    assert gm.overlay_normalize(None) == gm.VARSAYILAN_OVERLAYLER
+    assert gm.overlay_normalize(["Ichimoku", "yok", " bollinger "]) == {"ichimoku", "bollinger"}
+
+
+def test_cache_anahtari_sira_bagimsiz():
+    """Overlay sırası anahtarı değiştirmemeli; yeni bar ve farklı overlay değiştirmeli."""
+    a = gm.cache_anahtari("AAPL", "1d", "2025-01-31", ["bollinger", "supertrend"])
+    assert a == gm.cache_anahtari("aapl", "1d", "2025-01-31", ["supertrend", "bollinger"])
+    assert a != gm.cache_anahtari("AAPL", "1d", "2025-02-03", ["bollinger", "supertrend"])
+    assert a != gm.cache_anahtari("AAPL", "1d", "2025-01-31", ["bollinger"])
+    assert a != gm.cache_anahtari("AAPL", "1h", "2025-01-31", ["bollinger", "supertrend"])
+
+
+def test_yerel_anahtari_zaman_dilimi(monkeypatch):
+    """Yerel anahtar CHART_CACHE_TTL dilimi içinde sabit kalmalı, sonra değişmeli."""
+    monkeypatch.setattr(settings, "CHART_CACHE_TTL", 300)
+    a = gm.yerel_anahtari("AAPL", ["bollinger"], simdi=600.0)
+    assert a == gm.yerel_anahtari("AAPL", ["bollinger"], simdi=899.9)
+    assert a != gm.yerel_anahtari("AAPL", ["bollinger"], simdi=900.0)
+
+
+@pytest.mark.asyncio
+async def test_cache_isabetinde_veri_cekilmez(sahte_cizim, monkeypatch, cache_klasoru):
+    """Aynı zaman dilimindeki ikinci istek veri çekmeden cache'teki PNG'yi döndürmeli."""
+    monkeypatch.setattr(settings, "CHART_CACHE_TTL", 300)
+    saat = {"t": 600.0}
+    monkeypatch.setattr(gm, "time", SimpleNamespace(time=lambda: saat["t"],
+                                                    perf_counter=gm.time.perf_counter))
+    cekim = []
+
+    def _ohlcv_cek(sembol, periyot=gm.VERI_PERIYODU):
+        cekim.append(sembol)
+        return _ohlcv()
+    monkeypatch.setattr(gm, "_ohlcv_cek", _ohlcv_cek)
+
+    yol1 = await gm.grafik_ciz("AAPL")
+    saat["t"] = 899.0
+    yol2 = await gm.grafik_ciz("AAPL")
+    assert yol1 == yol2 and os.path.exists(yol1)
+    assert len(sahte_cizim) == 1 and cekim == ["AAPL"]
+
+    # Seans içinde fiyat hareket eder: TTL dolunca yeni anahtar → yeniden çekim ve çizim
+    saat["t"] = 900.0
+    yol3 = await gm.grafik_ciz("AAPL")
+    assert yol3 != yol1
+    assert len(sahte_cizim) == 2 and len(cekim) == 2
+
+
+@pytest.mark.asyncio
+async def test_eszamanli_ayni_istek_tek_cizim(sahte_cizim, monkeypatch):
+    """Aynı grafik için eşzamanlı istekler tek veri çekimini ve tek çizimi paylaşmalı."""
+    cekim = []
+
+    def _ohlcv_cek(sembol, periyot=gm.VERI_PERIYODU):
+        cekim.append(sembol)
+        return _ohlcv()
+    monkeypatch.setattr(gm, "_ohlcv_cek", _ohlcv_cek)
+
+    yollar = await asyncio.gather(*[gm.grafik_ciz("THYAO.IS", ["ichimoku"]) for _ in range(10)])
+    assert len(set(yollar)) == 1
+    assert len(sahte_cizim) == 1
+    assert cekim == ["THYAO.IS"]
+    assert sahte_cizim[0][1] == ("ichimoku",)
+
+
+@pytest.mark.asyncio
+async def test_yetersiz_veri_none(sahte_cizim, monkeypatch):
+    monkeypatch.setattr(gm, "_ohlcv_cek", lambda sembol, periyot=gm.VERI_PERIYODU: _ohlcv(n=20))
+    assert await gm.grafik_ciz("YENI") is None
+    assert sahte_cizim == []
+
+
+@pytest.mark.asyncio
+async def test_surec_havuzunda_cizim(monkeypatch, cache_klasoru):
+    """Gerçek süreç havuzu ile çizim yapılıp PNG cache'e yazılmalı."""
+    monkeypatch.setattr(gm, "_ohlcv_cek", lambda sembol, periyot=gm.VERI_PERIYODU: _ohlcv())
+    try:
+        yol = await gm.grafik_ciz("BTC-USD", gm.OVERLAYLER)
+        assert yol is not None
+        with open(yol, "rb") as f:
+            assert f.read(4) == b"\x89PNG"
+    finally:
+        await gm.kapat()
+
+
+# ─── Telegram file_id cache ───
+
+def test_tv_anahtari_dakika_dilimi():
+    """Aynı dakikadaki TradingView istekleri aynı anahtarı paylaşmalı."""
+    assert gm.tv_anahtari("AAPL", simdi=600.0) == gm.tv_anahtari("AAPL", simdi=659.9)
+    assert gm.tv_anahtari("AAPL", simdi=600.0) != gm.tv_anahtari("AAPL", simdi=660.0)
+
+
+def test_file_id_lru_siniri(monkeypatch):
+    monkeypatch.setattr(gm, "_file_idler", gm.OrderedDict())
+    monkeypatch.setattr(gm, "FILE_ID_MAX", 2)
+    gm.file_id_kaydet("a", "F_a")
+    gm.file_id_kaydet("b", "F_b")
+    assert gm.file_id_al("a") == "F_a"   # a en yeni kullanılan olur
+    gm.file_id_kaydet("c", "F_c")
+    assert gm.file_id_al("b") is None
+    assert gm.file_id_al("a") == "F_a" and gm.file_id_al("c") == "F_c"
+
+
+class SahteMesaj:
+    """answer_photo çağrılarını kaydeden sahte aiogram Message."""
+    yukleme = 0   # Telegram'ın verdiği file_id'ler F1, F2, ... (yükleme başına)
+
+    def __init__(self, reddet=()):
+        self.gonderilen = []
+        self.reddet = set(reddet)
+
+    async def answer_photo(self, photo, caption=None):
+        from aiogram.exceptions import TelegramBadRequest
+        if isinstance(photo, str) and photo in self.reddet:
+            raise TelegramBadRequest(method=None, message="wrong file identifier")
+        self.gonderilen.append(photo)
+        if not isinstance(photo, str):
+            SahteMesaj.yukleme += 1
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=f"F{SahteMesaj.yukleme}")])
+
+
+@pytest.fixture
+def main_modulu(tmp_path, monkeypatch, cache_klasoru):
+    monkeypatch.chdir(tmp_path)   # main.py'nin logs/ klasörü repoyu kirletmesin
+    main = importlib.import_module("main")
+    monkeypatch.setattr(gm, "_file_idler", gm.OrderedDict())
+    SahteMesaj.yukleme = 0
+    return main
+
+
+@pytest.mark.asyncio
+async def test_ikinci_gonderim_file_id_ile(main_modulu, monkeypatch):
+    """İlk gönderim dosyayı yükler; sonraki kullanıcılar file_id ile alır (sıfır yükleme)."""
+    monkeypatch.setattr(main_modulu.settings, "CHART_MOTORU", "yerel")
+    monkeypatch.setattr(settings, "CHART_CACHE_TTL", 10**9)
+    anahtar = gm.yerel_anahtari("AAPL", gm.VARSAYILAN_OVERLAYLER)
+    yol = gm.cache_yolu(anahtar)
+    os.makedirs(os.path.dirname(yol), exist_ok=True)
+    with open(yol, "wb") as f:
+        f.write(b"\x89PNG")
+
+    async def grafik_ciz(sembol, overlaylar=None):
+        return yol
+    monkeypatch.setattr(gm, "grafik_ciz", grafik_ciz)
+
+    kullanicilar = [SahteMesaj() for _ in range(3)]
+    for m in kullanicilar:
+        assert await main_modulu._grafik_gonder(m, "AAPL")
+
+    assert not isinstance(kullanicilar[0].gonderilen[0], str)   # FSInputFile
+    assert kullanicilar[1].gonderilen == ["F1"]
+    assert kullanicilar[2].gonderilen == ["F1"]
+
+    # Telegram file_id'yi reddederse dosya yeniden yüklenip yeni file_id saklanmalı
+    m = SahteMesaj(reddet={"F1"})
+    assert await main_modulu._grafik_gonder(m, "AAPL")
+    assert not isinstance(m.gonderilen[0], str)
+    assert gm.file_id_al(anahtar) == "F2"
+    assert SahteMesaj.yukleme == 2
+
+
+@pytest.mark.asyncio
+async def test_tv_eszamanli_istekler_gecici_dosya(main_modulu, monkeypatch, cache_klasoru):
+    """Eşzamanlı TradingView istekleri ayrı geçici dosyalara yazmalı, artık dosya kalmamalı."""
+    monkeypatch.setattr(main_modulu.settings, "CHART_MOTORU", "tradingview")
+    yazilan = []
+
+    async def tv_grafik_cek(sembol, output_path, sira_bildir=None):
+        yazilan.append(output_path)
+        await asyncio.sleep(0.01)
+        with open(output_path, "wb") as f:
+            f.write(sembol.encode())
+        return True
+    monkeypatch.setattr(main_modulu, "tv_grafik_cek", tv_grafik_cek)
+
+    mesajlar = [SahteMesaj() for _ in range(2)]
+    await asyncio.gather(*[main_modulu._grafik_gonder(m, s) for m, s in zip(mesajlar, ["AAPL", "MSFT"])])
+
+    assert len(set(yazilan)) == 2
+    kalan = sorted(os.listdir(cache_klasoru))
+    assert not any(ad.startswith("istek_") for ad in kalan)
+    assert len(kalan) == 2
+
+
+@pytest.mark.asyncio
+async def test_tv_cekimleri_cache_sinirina_uyar(main_modulu, monkeypatch, cache_klasoru):
+    """TradingView çekimleri de CHART_CACHE_MAX'a tabi olmalı; son çekim silinmemeli."""
+    monkeypatch.setattr(main_modulu.settings, "CHART_MOTORU", "tradingview")
+    monkeypatch.setattr(settings, "CHART_CACHE_MAX", 3)
+
+    async def tv_grafik_cek(sembol, output_path, sira_bildir=None):
+        with open(output_path, "wb") as f:
+            f.write(sembol.encode())
+        return True
+    monkeypatch.setattr(main_modulu, "tv_grafik_cek", tv_grafik_cek)
+
+    for sembol in ("AAPL", "MSFT", "NVDA", "AMZN", "TSLA", "META"):
+        anahtar, yol, kaynak = await main_modulu._grafik_hazirla(gm, sembol)
+        assert kaynak == "TradingView" and os.path.exists(yol)
+        assert len(os.listdir(cache_klasoru)) <= 3
+    assert len(os.listdir(cache_klasoru)) == 3
+
+
+@pytest.mark.asyncio
+async def test_eszamanli_ayni_grafik_tek_yukleme(main_modulu, monkeypatch, cache_klasoru):
+    """Aynı grafik için eşzamanlı istekler tek TradingView çekimi ve tek yükleme yapmalı."""
+    monkeypatch.setattr(main_modulu.settings, "CHART_MOTORU", "tradingview")
+    cekim = []
+    anahtar_al = []
+    gercek_file_id_al = gm.file_id_al
+
+    def file_id_al(anahtar):
+        anahtar_al.append(anahtar)
+        return gercek_file_id_al(anahtar)
+    monkeypatch.setattr(gm, "file_id_al", file_id_al)
+
+    async def tv_grafik_cek(sembol, output_path, sira_bildir=None):
+        cekim.append(sembol)
+        await asyncio.sleep(0.05)
+        with open(output_path, "wb") as f:
+            f.write(b"\x89PNG")
+        return True
+    monkeypatch.setattr(main_modulu, "tv_grafik_cek", tv_grafik_cek)
+
+    mesajlar = [SahteMesaj() for _ in range(5)]
+    assert all(await asyncio.gather(*[main_modulu._grafik_gonder(m, "AAPL") for m in mesajlar]))
+
+    assert cekim == ["AAPL"]
+    assert SahteMesaj.yukleme == 1
+    assert sum(1 for m in mesajlar if m.gonderilen == ["F1"]) == 4
+    assert len(anahtar_al) == 5   # istek başına tek file_id araması
@@ -0,0 +1,210 @@
+"""
+tests/test_kosul_motoru.py — Koşul dili ayrıştırıcısı ve toplu vektörel değerlendirme testleri.
+"""
+import os
+import sys
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import AsyncMock, patch
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import alert_motoru
+from kosul_motoru import (
+    KosulHatasi, Plan, derle, saga_hizala, toplu_degerlendir, _ema, _rsi, _sma, _supertrend,
+)
+from gonderim_kuyrugu import GonderimKuyrugu
+
+
+def _veri(kapanis, yuksek=None, dusuk=None):
+    kapanis = np.atleast_2d(np.asarray(kapanis, dtype=float))
+    return {
+        "kapanis": kapanis, "acilis": kapanis,
+        "yuksek": kapanis + 1 if yuksek is None else yuksek,
+        "dusuk": kapanis - 1 if dusuk is None else dusuk,
+        "hacim": np.ones_like(kapanis),
+    }
+
+
+def _tek(metin, kapanis):
+    return bool(Plan([derle(metin)]).degerlendir(_veri(kapanis))[derle(metin).metin][0])
+
+
+# ═══════════════════════════════════════════════════════════════
+# AYRIŞTIRICI
+# ═══════════════════════════════════════════════════════════════
+
+def test_ayristirici_esanlamlilar_ve_turkce_karakterler():
+    """Türkçe karakterli, İngilizce ve ASCII yazımlar aynı ağaca derlenmeli."""
+    a = derle("kapanış yukari_keser sma(50) ve rsi(14) < 70")
+    b = derle("close crosses_above sma(close, 50) and rsi(close, 14) < 70")
+    c = derle("KAPANIS  yukari_keser SMA(50)   ve RSI(14) < 70")
+    assert a.kok == b.kok == c.kok
+    assert a.geriye_bakis >= 50
+    assert derle("supertrend(10, 3) yukari_keser 0").geriye_bakis == 32   # üstel → 3n bar + kesişim
+    assert derle("hacim > 3 * sma(hacim, 20) veya degil kapanis > onceki(kapanis, 1)")
+
+
+@pytest.mark.parametrize("metin", [
+    "", "kapanis", "sma(50)", "kapanis > ", "kapanis >> 3", "foo(3) > 1",
+    "sma(kapanis, 0) > 1", "sma(kapanis, 501) > 1", "kapanis > 1 + (kapanis > 2)",
+    "kapanis; rm -rf", "1 ve 2", "x" * 201,
+    " veya ".join(["kapanis > 1"] * 20),
+])
+def test_gecersiz_kosullar_reddedilir(metin):
+    with pytest.raises(KosulHatasi):
+        derle(metin)
+
+
+def test_plan_ortak_alt_ifadeleri_birlestirir():
+    """1000 uyarı / 3 farklı koşul: düğüm sayısı uyarı sayısından bağımsız olmalı."""
+    metinler = ["kapanis > sma(50)", "kapanis < sma(50) ve rsi(14) < 30", "rsi(14) > 70"]
+    plan = Plan(derle(metinler[i % 3]) for i in range(1000))
+    assert len(plan.kosullar) == 3
+    sma = ("fn", "sma", ("seri", "kapanis"), 50)
+    assert plan.dugumler.count(sma) == 1
+    assert len(plan.dugumler) <= 12
+    # Çocuklar her zaman ebeveynlerinden önce
+    sira = {d: i for i, d in enumerate(plan.dugumler)}
+    assert sira[sma] < sira[("kiyas", ">", ("seri", "kapanis"), sma)]
+
+
+# ═══════════════════════════════════════════════════════════════
+# VEKTÖREL ÇEKİRDEKLER — pandas / skaler referanslarla
+# ═══════════════════════════════════════════════════════════════
+
+@pytest.fixture
+def matris():
+    rng = np.random.default_rng(7)
+    m = 100 + np.cumsum(rng.normal(0, 1, (3, 120)), axis=1)
+    m[2, :40] = np.nan          # Geçmişi kısa sembol (sağa hizalı, baş NaN)
+    return m
+
+
+def test_sma_ema_rsi_pandas_ile_ayni(matris):
+    for i, satir in enumerate(matris):
+        s = pd.Series(satir).dropna()
+        bas = len(satir) - len(s)
+        np.testing.assert_allclose(_sma(matris, 20)[i, bas:], s.rolling(20).mean(), equal_nan=True)
+        np.testing.assert_allclose(_ema(matris, 12)[i, bas:], s.ewm(span=12, adjust=False).mean())
+        fark = s.diff()
+        yukari = fark.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+        asagi = (-fark.clip(upper=0)).ewm(alpha=1 / 14, adjust=False).mean()
+        np.testing.assert_allclose(_rsi(matris, 14)[i, bas:], 100 - 100 / (1 + yukari / asagi),
+                                   equal_nan=True)
+        assert np.isnan(_sma(matris, 20)[i, :bas]).all()
+
+
+def _pine_supertrend(h, l, c, n, carpan):
+    """Pine ta.supertrend'in satır satır skaler karşılığı (yön: 1 yükselen, -1 düşen)."""
+    tr = [h[0] - l[0]] + [max(h[t] - l[t], abs(h[t] - c[t - 1]), abs(l[t] - c[t - 1]))
+                          for t in range(1, len(c))]
+    atr = pd.Series(tr).ewm(alpha=1 / n, adjust=False).mean().to_numpy()
+    yonler, son_ust, son_alt, st_ust = [], 0.0, 0.0, False
+    for t in range(len(c)):
+        orta = (h[t] + l[t]) / 2
+        ust, alt = orta + carpan * atr[t], orta - carpan * atr[t]
+        onceki_c = c[t - 1] if t else np.nan
+        alt = alt if (alt > son_alt or onceki_c < son_alt) else son_alt
+        ust = ust if (ust < son_ust or onceki_c > son_ust) else son_ust
+        if t == 0:
+            yon = 1
+        elif st_ust:
+            yon = -1 if c[t] > ust else 1
+        else:
+            yon = 1 if c[t] < alt else -1
+        yonler.append(np.nan if t == 0 else -yon)
+        son_ust, son_alt, st_ust = ust, alt, yon == 1
+    return np.array(yonler)
+
+
+def test_supertrend_pine_referansi(matris):
+    h, l = matris + 1.5, matris - 1.5
+    yon = _supertrend(h, l, matris, 10, 3.0)
+    for i in range(2):
+        np.testing.assert_array_equal(yon[i], _pine_supertrend(h[i], l[i], matris[i], 10, 3.0))
+    # Geçmişi kısa satır: kendi başlangıcından itibaren aynı sonuç
+    np.testing.assert_array_equal(yon[2, 40:], _pine_supertrend(h[2, 40:], l[2, 40:], matris[2, 40:], 10, 3.0))
+    assert np.isnan(yon[2, :41]).all()
+    assert set(np.unique(yon[0, 1:])) <= {1.0, -1.0}
+
+
+def test_saga_hizala():
+    nan = np.nan
+    k = np.array([[1, 2, nan, 3], [nan, 5, 6, nan]])
+    h = saga_hizala({"kapanis": k, "hacim": k * 10})
+    np.testing.assert_array_equal(h["kapanis"], [[nan, 1, 2, 3], [nan, nan, 5, 6]])
+    np.testing.assert_array_equal(h["hacim"], [[nan, 10, 20, 30], [nan, nan, 50, 60]])
+
+
+# ═══════════════════════════════════════════════════════════════
+# DEĞERLENDİRME SEMANTİĞİ
+# ═══════════════════════════════════════════════════════════════
+
+def test_kesisim_yalnizca_son_barda():
+    assert _tek("kapanis yukari_keser 10", [8, 9, 11]) is True
+    assert _tek("kapanis yukari_keser 10", [8, 11, 12]) is False      # daha önce kesti
+    assert _tek("kapanis asagi_keser 10", [12, 11, 9]) is True
+    assert _tek("kapanis > onceki(kapanis, 1) ve degisim(kapanis, 1) > 5", [100, 100, 106]) is True
+
+
+def test_eksik_veri_tetiklemez():
+    """Yetersiz geçmiş NaN olarak kalmalı; 'degil' veya karşılaştırma onu doğruya çevirmemeli."""
+    kapanis = [1.0, 2.0, 3.0]
+    assert _tek("kapanis > sma(kapanis, 50)", kapanis) is False
+    assert _tek("degil kapanis > sma(kapanis, 50)", kapanis) is False
+    assert _tek("kapanis > sma(kapanis, 50) veya kapanis > 2", kapanis) is True
+    assert _tek("kapanis > sma(kapanis, 50) ve kapanis > 2", kapanis) is False
+    assert _tek("kapanis yukari_keser 0", [1.0]) is False
+
+
+def test_toplu_degerlendir_tek_veri_istegi():
+    """Semboller tek istekte çekilmeli; hatalı koşul diğerlerini engellememeli."""
+    istekler = []
+
+    def sahte_veri(semboller, bar_sayisi):
+        istekler.append((list(semboller), bar_sayisi))
+        return _veri([[1, 2, 3, 4, 5], [5, 4, 3, 2, 1]])
+
+    uyarilar = [
+        {"id": 1, "user_id": 1, "sembol": "A", "hedef_deger": "kapanis > sma(3)"},
+        {"id": 2, "user_id": 2, "sembol": "B", "hedef_deger": "kapanis > sma(3)"},
+        {"id": 3, "user_id": 3, "sembol": "B", "hedef_deger": "kapanis < onceki(kapanis, 1)"},
+        {"id": 4, "user_id": 4, "sembol": "A", "hedef_deger": "bozuk >"},
+    ]
+    tetiklenen = toplu_degerlendir(uyarilar, veri_getir=sahte_veri)
+    assert [(u["id"], f) for u, f in tetiklenen] == [(1, 5.0), (3, 1.0)]
+    assert istekler == [(["A", "B"], 4)]
+
+
+@pytest.mark.asyncio
+async def test_kosul_dongusu_tetiklenen_uyariyi_kuyruga_ekler(monkeypatch):
+    """Döngü sırası gelen koşul uyarılarını değerlendirip HTML-güvenli mesajı göndermeli."""
+    kuyruk = GonderimKuyrugu(kalici=False)
+    monkeypatch.setattr(alert_motoru, "gonderim_kuyrugu", kuyruk)
+    monkeypatch.setattr(alert_motoru, "_sonraki_kosul", {})
+
+    async def kosullar():
+        return [{"id": 7, "user_id": 42, "sembol": "AAPL", "tip": "kosul",
+                 "hedef_deger": "kapanis < 4 ve kapanis > 1"}]
+    monkeypatch.setattr(alert_motoru, "kosul_uyarilarini_getir", kosullar)
+    import kosul_motoru
+    gercek = kosul_motoru.toplu_degerlendir
+    monkeypatch.setattr(kosul_motoru, "toplu_degerlendir",
+                        lambda u: gercek(u, veri_getir=lambda s, n: _veri([[1, 2, 3]])))
+
+    async def uyku(sn):
+        raise asyncio.CancelledError
+    monkeypatch.setattr(alert_motoru.asyncio, "sleep", uyku)
+    await alert_motoru.kosul_uyari_dongusu()
+    monkeypatch.undo()
+
+    bot = AsyncMock()
+    with patch("gonderim_kuyrugu.uyari_sil", new_callable=AsyncMock) as mock_sil:
+        await kuyruk.bosalt(bot)
+    mesaj = bot.send_message.call_args.args[1]
+    assert "AAPL" in mesaj and "kapanis &lt; 4" in mesaj and "Güncel: 3.00" in mesaj
+    mock_sil.assert_called_once_with(7)
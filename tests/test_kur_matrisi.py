@@ -0,0 +1,184 @@
+"""
+tests/test_kur_matrisi.py — Çapraz kur matrisi ve çoklu para birimli portföy değerlemesi.
+"""
+import os
+import sys
+import asyncio
+import pytest
+from decimal import Decimal as D
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kur_matrisi
+from kur_matrisi import KurMatrisi, Kurlar, matris_olustur, para_birimi_coz
+
+PARITELER = {
+    "USDTRY=X": 32.0, "EURUSD=X": 1.10, "GBPUSD=X": 1.25, "USDJPY=X": 150.0,
+    "USDCAD=X": 1.35, "EURTRY=X": 35.0,
+}
+
+
+def test_ucgenleme_ve_ters_kurlar():
+    """Eksik çaprazlar aracı paritelerden, terslerden türetilmeli; doğrudan kotasyon tercih edilmeli."""
+    kurlar = Kurlar(matris_olustur(PARITELER))
+    assert kurlar.kur("TRY", "USD") == D(str(1 / 32.0))
+    assert kurlar.kur("GBP", "JPY") == D(str(1.25 * 150.0))
+    assert abs(kurlar.kur("CAD", "TRY") - D(32) / D("1.35")) < D("1e-9")
+    assert kurlar.kur("EUR", "TRY") == D("35.0")          # EURUSD × USDTRY (35.2) değil
+    assert kurlar.kur("TRY", "TRY") == 1
+    assert kurlar.kur("USD", "XYZ") is None
+
+
+def test_para_birimi_cozumleme():
+    assert para_birimi_coz("THYAO.IS") == ("TRY", 1)
+    assert para_birimi_coz("BTC-USD") == ("USD", 1)
+    assert para_birimi_coz("EURJPY=X") == ("JPY", 1)
+    assert para_birimi_coz("VOD.L", "GBp") == ("GBP", D("0.01"))
+    assert para_birimi_coz("SAP.DE", "EUR") == ("EUR", 1)
+
+
+def test_sonekten_birim_ve_kaynak_hafizasi(monkeypatch):
+    """Kaynak birim bildirmezse borsa soneki kullanılmalı; tanınmayan sonek USD sayılmamalı."""
+    monkeypatch.setattr(kur_matrisi, "_kaynak_birimleri", {})
+    assert para_birimi_coz("SAP.DE") == ("EUR", 1)
+    assert para_birimi_coz("VOD.L") == ("GBP", D("0.01"))
+    assert para_birimi_coz("7203.T") == ("JPY", 1)
+    assert para_birimi_coz("AAPL") == ("USD", 1)
+    assert para_birimi_coz("BRK-B") == ("USD", 1)
+    assert para_birimi_coz("ABC.ZZ") == (None, 1)
+    # Kaynağın bildirdiği birim hatırlanır (Londra'da USD ile işlem gören ETF)
+    assert para_birimi_coz("IWDA.L", "USD") == ("USD", 1)
+    assert para_birimi_coz("iwda.l") == ("USD", 1)
+
+
+@pytest.mark.asyncio
+async def test_eszamanli_yenileme_tek_cekim_ve_ttl(monkeypatch):
+    """Eşzamanlı çağrılar tek çekimi paylaşmalı; TTL dolunca yeniden çekilmeli."""
+    cekimler = []
+
+    async def cekici():
+        cekimler.append(1)
+        await asyncio.sleep(0.01)
+        return PARITELER
+
+    matris = KurMatrisi(cekici=cekici, ttl=60)
+    sonuclar = await asyncio.gather(*(matris.guncel() for _ in range(20)))
+    assert len(cekimler) == matris.cekim == 1
+    assert all(s is sonuclar[0] for s in sonuclar)
+
+    simdi = kur_matrisi.time.time()
+    monkeypatch.setattr(kur_matrisi.time, "time", lambda: simdi + 61)
+    await matris.guncel()
+    assert len(cekimler) == 2
+
+
+@pytest.mark.asyncio
+async def test_50_varlikli_portfoy_tek_kur_cekimi(tmp_path, monkeypatch):
+    """50 farklı birimli varlık kullanıcının biriminde toplanmalı; yenileme başına en fazla bir kur çekimi."""
+    import db as db_module
+    import portfoy_motoru
+    from ux import user_prefs
+
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    monkeypatch.setattr(user_prefs, "tercih_onbellegi", user_prefs.TercihOnbellegi())
+
+    birimler = ["TRY", "USD", "EUR", "GBp", "JPY"]
+    fiyatlar = {f"S{i}": {"fiyat": 100.0, "para_birimi": birimler[i % 5]} for i in range(50)}
+    for sembol in fiyatlar:
+        await portfoy_motoru.portfoy_varlik_ekle(9, sembol, "2", "100")
+    await user_prefs.set_user_pref(9, "currency", "EUR")
+
+    cekimler = []
+
+    async def cekici():
+        cekimler.append(1)
+        return PARITELER
+
+    async def fiyat(sembol):
+        return fiyatlar[sembol]
+
+    monkeypatch.setattr(portfoy_motoru, "kur_matrisi", KurMatrisi(cekici=cekici, ttl=60))
+    monkeypatch.setattr(portfoy_motoru, "get_fiyat_hiyerarsik", fiyat)
+    try:
+        ozet = await portfoy_motoru.portfoy_ozeti_hazirla(9)
+        await portfoy_motoru.portfoy_ozeti_hazirla(9)
+    finally:
+        await db_module.close_db()
+    assert len(cekimler) == 1
+
+    kurlar = Kurlar(matris_olustur(PARITELER))
+    # Her birimden 10 varlık × 2 adet × 100; pence varlıkları sterlinin yüzde biri
+    beklenen = sum(
+        10 * 200 * carpan * kurlar.kur(pb, "EUR")
+        for pb, carpan in (("TRY", 1), ("USD", 1), ("EUR", 1), ("GBP", D("0.01")), ("JPY", 1))
+    )
+    assert f"Toplam Değer:</b> {beklenen:.2f} EUR" in ozet
+    assert ozet.count("Değer:") == 41          # 40 çevrilen satır + toplam (EUR satırları çevrilmez)
+
+
+@pytest.mark.asyncio
+async def test_tek_birimli_portfoyde_kur_cekilmez(tmp_path, monkeypatch):
+    """Tüm varlıklar kullanıcının biriminde ise kur matrisi hiç çekilmemeli."""
+    import db as db_module
+    import portfoy_motoru
+    from ux import user_prefs
+
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    monkeypatch.setattr(user_prefs, "tercih_onbellegi", user_prefs.TercihOnbellegi())
+
+    async def cekici():
+        raise AssertionError("kur çekilmemeliydi")
+
+    async def fiyat(sembol):
+        return {"fiyat": 50.0, "para_birimi": "TRY"}
+
+    monkeypatch.setattr(portfoy_motoru, "kur_matrisi", KurMatrisi(cekici=cekici))
+    monkeypatch.setattr(portfoy_motoru, "get_fiyat_hiyerarsik", fiyat)
+    try:
+        await portfoy_motoru.portfoy_varlik_ekle(4, "THYAO.IS", "10", "40")
+        ozet = await portfoy_motoru.portfoy_ozeti_hazirla(4)
+    finally:
+        await db_module.close_db()
+    assert "Toplam Değer:</b> 500.00 TRY" in ozet
+    assert "Açık K/Z:</b> +100.00 TRY" in ozet
+
+
+@pytest.mark.asyncio
+async def test_alt_birimli_maliyet_ve_gerceklesen(tmp_path, monkeypatch):
+    """Pence ile girilen maliyet ve gerçekleşen K/Z de sterline çevrilmeli (sahte -%99 zarar yok)."""
+    import db as db_module
+    import portfoy_motoru
+    from ux import user_prefs
+
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    monkeypatch.setattr(user_prefs, "tercih_onbellegi", user_prefs.TercihOnbellegi())
+
+    async def cekici():
+        raise AssertionError("kur çekilmemeliydi")
+
+    async def fiyat(sembol):
+        return {"fiyat": 7000.0, "para_birimi": "GBp"}
+
+    monkeypatch.setattr(portfoy_motoru, "kur_matrisi", KurMatrisi(cekici=cekici))
+    monkeypatch.setattr(portfoy_motoru, "get_fiyat_hiyerarsik", fiyat)
+    try:
+        await user_prefs.set_user_pref(5, "currency", "GBP")
+        await portfoy_motoru.portfoy_varlik_ekle(5, "VOD.L", "100", "7000")
+        await portfoy_motoru.portfoy_islem_kaydet(5, "VOD.L", "satis", "50", "7100")
+        ozet = await portfoy_motoru.portfoy_ozeti_hazirla(5)
+    finally:
+        await db_module.close_db()
+    assert "Ort. Maliyet: 70.00 | Güncel: 70.00 GBP" in ozet
+    assert "Toplam Değer:</b> 3500.00 GBP" in ozet
+    assert "Açık K/Z:</b> +0.00 GBP" in ozet
+    assert "Gerçekleşen K/Z:</b> +50.00 GBP" in ozet
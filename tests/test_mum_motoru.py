@@ -0,0 +1,194 @@
+"""
+tests/test_mum_motoru.py — Tick → mum birleştirici ve gün içi teknik analiz testleri.
+Ağ erişimi yok: tick'ler sentetik üretilir.
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mum_motoru
+from mum_motoru import HalkaTampon, MumAgregatoru, MumAkisi
+
+T0 = 1_700_000_100.0   # 5 dakikalık sınıra hizalı
+
+
+def _tickler(n=5000, tohum=5):
+    rng = np.random.default_rng(tohum)
+    zaman = T0 + np.cumsum(rng.exponential(2.0, n))
+    fiyat = 100 + np.cumsum(rng.normal(0, 0.05, n))
+    miktar = rng.uniform(0.01, 2.0, n)
+    return zaman, fiyat, miktar
+
+
+def test_halka_tampon_sarar():
+    t = HalkaTampon(3)
+    for i in range(5):
+        t.ekle([i, i, i, i, i, i])
+    assert len(t) == 3
+    assert t.dizi()[:, 0].tolist() == [2, 3, 4]
+    assert t.son_zaman() == 4
+
+
+@pytest.mark.parametrize("aralik,kural", [("1m", "1min"), ("5m", "5min"), ("1h", "1h")])
+def test_pandas_resample_ile_ayni(aralik, kural):
+    """Birleştirilen mumlar tick'lerin pandas resample OHLCV'si ile birebir aynı olmalı."""
+    zaman, fiyat, miktar = _tickler()
+    agr = MumAgregatoru(kapasite=10_000)
+    for z, f, q in zip(zaman, fiyat, miktar):
+        agr.tick("BTC-USD", f, q, z)
+
+    df = agr.mumlar_df("BTC-USD", aralik)
+    seri = pd.DataFrame({"p": fiyat, "q": miktar},
+                        index=pd.to_datetime(zaman, unit="s", utc=True))
+    beklenen = seri["p"].resample(kural).ohlc()
+    beklenen["Volume"] = seri["q"].resample(kural).sum()
+    beklenen = beklenen.dropna()
+
+    assert list(df.index) == list(beklenen.index)
+    np.testing.assert_allclose(df[["Open", "High", "Low", "Close"]].values,
+                               beklenen[["open", "high", "low", "close"]].values)
+    np.testing.assert_allclose(df["Volume"].values, beklenen["Volume"].values)
+    # Açık mum hariç tümü DB'ye yazılmak üzere kuyrukta
+    assert len([k for k in agr.kapananlari_al() if k[1] == aralik]) == len(df) - 1
+
+
+def test_gec_tick_ve_sure_dolumu():
+    agr = MumAgregatoru(kapasite=10, araliklar={"1m": 60})
+    agr.tick("ETH-USD", 10.0, 1.0, T0 + 5)
+    agr.tick("ETH-USD", 11.0, 1.0, T0 + 65)    # ilk mum kapanır
+    agr.tick("ETH-USD", 9.0, 1.0, T0 + 30)     # kapanmış mumun gecikmiş tick'i
+    assert agr.gec_tick == 1
+    assert agr.mumlar("ETH-USD", "1m")[:, 4].tolist() == [10.0, 11.0]
+
+    # İşlem gelmese de süresi dolan mum kapanır; aynı dakikaya gecikmiş tick yeni mum açmaz
+    assert agr.suresi_dolanlari_kapat(simdi=T0 + 120) == 1
+    agr.tick("ETH-USD", 12.0, 1.0, T0 + 90)
+    assert agr.gec_tick == 2
+    assert len(agr.mumlar("ETH-USD", "1m")) == 2
+
+
+def test_gun_ici_teknik_analiz_http_yok(monkeypatch):
+    """interval='5m' ile teknik analiz yfinance'e hiç gitmeden akış mumlarını kullanmalı."""
+    import teknik_analiz
+
+    def _http_yok(*a, **k):
+        raise AssertionError("gün içi analiz HTTP çağrısı yapmamalı")
+    monkeypatch.setattr(teknik_analiz, "taze_ticker", _http_yok)
+
+    agr = MumAgregatoru(kapasite=1000)
+    monkeypatch.setattr(mum_motoru, "mum_agregatoru", agr)
+    sonuc = teknik_analiz.teknik_analiz_yap("BTC-USD", interval="5m")
+    assert "Hata" in sonuc
+    assert agr.talepler() == {"BTC-USD"}        # sembol akışa alınmak üzere istendi
+
+    zaman, fiyat, miktar = _tickler(n=40_000)
+    for z, f, q in zip(zaman, fiyat, miktar):
+        agr.tick("BTC-USD", f, q, z)
+    sonuc = teknik_analiz.teknik_analiz_yap("BTC-USD", interval="5m")
+    assert "Hata" not in sonuc
+    assert sonuc["Güncel Fiyat"] == round(float(fiyat[-1]), 2)
+    assert "RSI (14)" in sonuc
+
+    assert "Hata" in teknik_analiz.teknik_analiz_yap("BTC-USD", interval="3m")
+
+
+class SahteAbone:
+    def __init__(self):
+        self.streamler = set()
+
+    async def ekle(self, *s):
+        self.streamler.update(s)
+
+    async def cikar(self, *s):
+        self.streamler.difference_update(s)
+
+    async def kapat(self):
+        self.streamler.clear()
+
+
+class SahteHub:
+    def abone(self, callback, kuyruk_boyutu=100, birlestir=True):
+        assert birlestir is False    # mumlar için her işlem gerekir
+        self.a = SahteAbone()
+        return self.a
+
+
+@pytest.mark.asyncio
+async def test_akis_kaydeder_ve_yeniden_baslangicta_isitir(tmp_path, monkeypatch):
+    """Kapanan mumlar DB'ye yazılmalı; yeni süreçte tampon DB'den ısıtılmalı."""
+    import db as db_module
+    from uyari_indeksi import UyariIndeksi
+    import uyari_indeksi as ui_modulu
+
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    monkeypatch.setattr(ui_modulu, "uyari_indeksi", UyariIndeksi())
+
+    agr = MumAgregatoru(kapasite=100, araliklar={"1m": 60})
+    akis = MumAkisi(agr, hub=SahteHub(), yazma_sn=0)
+    agr.talep_et("btc-usd")
+    agr.talep_et("THYAO.IS")                     # akışta yok → abone edilmez
+    await akis._abonelikleri_guncelle(akis._istenen_harita())
+    assert akis.abone.streamler == {"btcusdt@aggTrade"}
+
+    for i, fiyat in enumerate(["100", "101", "99", "102"]):
+        await akis._mesaj("btcusdt@aggTrade", {"s": "BTCUSDT", "p": fiyat, "q": "0.5",
+                                                "T": (T0 + i * 60) * 1000})
+    await akis.yaz()
+    kayitli = await db_module.mumlari_getir("BTC-USD", "1m", 10)
+    assert [r[4] for r in kayitli] == [100.0, 101.0, 99.0, 102.0]   # son mum süre dolunca kapandı
+
+    yeni = MumAgregatoru(kapasite=100, araliklar={"1m": 60})
+    yeni_akis = MumAkisi(yeni, hub=SahteHub(), yazma_sn=0)
+    yeni.talep_et("BTC-USD")
+    await yeni_akis._abonelikleri_guncelle(yeni_akis._istenen_harita())
+    assert yeni.mumlar("BTC-USD", "1m")[:, 4].tolist() == [100.0, 101.0, 99.0, 102.0]
+
+    await db_module.close_db()
+
+
+@pytest.mark.asyncio
+async def test_eski_gun_ici_mumlar_budanir(tmp_path, monkeypatch):
+    """Yazımda kapasiteden eski gün içi mumlar silinmeli; '1d' geçmiş satırlarına dokunulmamalı."""
+    import db as db_module
+    from uyari_indeksi import UyariIndeksi
+    import uyari_indeksi as ui_modulu
+
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    monkeypatch.setattr(ui_modulu, "uyari_indeksi", UyariIndeksi())
+
+    try:
+        gunluk = [("BTC-USD", "1d", int(T0) - g * 86400, 1.0, 1.0, 1.0, 1.0, 1.0) for g in range(10)]
+        await db_module.mumlari_kaydet(gunluk)
+
+        agr = MumAgregatoru(kapasite=5, araliklar={"1m": 60, "5m": 300})
+        akis = MumAkisi(agr, hub=SahteHub(), yazma_sn=0)
+        agr.talep_et("BTC-USD")
+        await akis._abonelikleri_guncelle(akis._istenen_harita())
+        for i in range(30):
+            await akis._mesaj("btcusdt@aggTrade", {"s": "BTCUSDT", "p": str(100 + i), "q": "1",
+                                                    "T": (T0 + i * 60) * 1000})
+            if i % 10 == 9:
+                await akis.yaz()
+        await akis.yaz()
+
+        db = await db_module.DBPool.get_db()
+        async with db.execute("SELECT aralik, COUNT(*), MIN(zaman) FROM mumlar GROUP BY aralik") as c:
+            sayilar = {r[0]: (r[1], r[2]) for r in await c.fetchall()}
+        assert sayilar["1m"] == (5, int(T0) + 25 * 60)
+        assert sayilar["5m"] == (5, int(T0) + 300)
+        assert sayilar["1d"][0] == 10
+        # Isıtma yine tam kapasite görür
+        assert [r[4] for r in await db_module.mumlari_getir("BTC-USD", "1m", 5)] == [125.0, 126.0, 127.0, 128.0, 129.0]
+    finally:
+        await db_module.close_db()
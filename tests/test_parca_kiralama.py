@@ -0,0 +1,194 @@
+"""
+tests/test_parca_kiralama.py — Parçalı uyarı değerlendirmesi ve SQLite kira testleri.
+Son test gerçek alt süreçler (uyari_isci.py) başlatır: bir işçi öldürülür, kalanlar
+parçalarını devralır; her uyarı için tam olarak bir bildirim yazılmalıdır.
+"""
+import os
+import sys
+import time
+import signal
+import sqlite3
+import asyncio
+import subprocess
+from collections import Counter, defaultdict
+import pytest
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from parca_kiralama import ParcaKiralayici, parca_no
+
+
+async def _veritabani(tmp_path):
+    import db as db_module
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    return db_module
+
+
+def test_parca_no_kararli():
+    """Parça numarası hash tohumundan bağımsız olmalı (süreçler aynı bölmeyi görmeli)."""
+    assert parca_no("THYAO.IS", 16) == parca_no("thyao.is", 16)
+    kod = "from parca_kiralama import parca_no; print(parca_no('THYAO.IS', 16))"
+    cikti = subprocess.run([sys.executable, "-c", kod], cwd=REPO, capture_output=True, text=True,
+                           env={**os.environ, "PYTHONHASHSEED": "123"}).stdout.strip()
+    assert int(cikti) == parca_no("THYAO.IS", 16)
+    dagilim = Counter(parca_no(f"S{i}", 8) for i in range(800))
+    assert set(dagilim) == set(range(8)) and min(dagilim.values()) > 60
+
+
+@pytest.mark.asyncio
+async def test_adil_pay_ve_devralma(tmp_path):
+    """İkinci süreç katılınca parçalar paylaşılmalı; sinyali kesilen sürecin parçaları devralınmalı."""
+    db_module = await _veritabani(tmp_path)
+    a = ParcaKiralayici("a", parca_sayisi=8, sure=0.6)
+    b = ParcaKiralayici("b", parca_sayisi=8, sure=0.6)
+
+    await a.yenile()
+    assert a.parcalar == set(range(8))
+    await b.yenile()                     # hepsi dolu → henüz alamaz
+    assert b.parcalar == set()
+    await a.yenile()                     # iki canlı süreç → a fazlasını bırakır
+    await b.yenile()
+    assert len(a.parcalar) == len(b.parcalar) == 4
+    assert a.parcalar | b.parcalar == set(range(8))
+    assert all(a.sahibi_miyim(f"S{i}") != b.sahibi_miyim(f"S{i}") for i in range(50))
+
+    # a ölür (heartbeat yok): yerelde kendini hemen sahipsiz sayar, DB kirası biraz sonra dolar
+    await asyncio.sleep(0.45)
+    assert not any(a.sahibi_miyim(f"S{i}") for i in range(50))
+    await b.yenile()
+    assert b.parcalar != set(range(8))   # a'nın kirası henüz dolmadı
+    await asyncio.sleep(0.3)
+    await b.yenile()
+    assert b.parcalar == set(range(8))
+
+    await b.birak()
+    assert await db_module.kiralari_getir(time.time()) == {}
+    await db_module.close_db()
+
+
+@pytest.mark.asyncio
+async def test_uyari_basina_tek_bildirim_satiri(tmp_path):
+    """gonderim_ekle: aynı uyarı ikinci kez, silinmiş uyarı hiç kuyruğa girmemeli."""
+    db_module = await _veritabani(tmp_path)
+    uyari_id = await db_module.uyari_ekle(1, "AAPL", "fiyat_ust", "100")
+
+    assert await db_module.gonderim_ekle(1, "x", None, 0, uyari_id, time.time()) is not None
+    assert await db_module.gonderim_ekle(1, "x", None, 0, uyari_id, time.time()) is None
+    await db_module.uyari_sil(uyari_id)
+    assert await db_module.gonderim_ekle(1, "x", None, 0, uyari_id + 1, time.time()) is None
+    assert await db_module.gonderim_ekle(1, "özet", None, 9, None, time.time()) is not None
+    assert len(await db_module.gonderimleri_getir()) == 2
+    await db_module.close_db()
+
+
+ISCI = """
+import os, sys, asyncio
+sys.path.insert(0, {repo!r})
+import alert_motoru, uyari_isci
+
+async def fiyat(sembol):
+    with open(os.environ["TEST_FIYAT"]) as f:
+        deger = f.read().strip()
+    if deger != "1":
+        with open(os.environ["TEST_YOKLAMA"], "a") as f:
+            f.write(f"{{os.getpid()}} {{sembol}}\\n")
+    return {{"fiyat": deger}}
+
+alert_motoru.get_fiyat_hiyerarsik = fiyat
+alert_motoru.SEMBOL_ARASI_BEKLEME = 0
+asyncio.run(uyari_isci.main())
+"""
+
+
+def _bekle(kosul, zaman_asimi, mesaj):
+    sinir = time.monotonic() + zaman_asimi
+    while time.monotonic() < sinir:
+        sonuc = kosul()
+        if sonuc:
+            return sonuc
+        time.sleep(0.2)
+    pytest.fail(mesaj)
+
+
+def test_cok_surecli_degerlendirme_tek_bildirim(tmp_path):
+    """
+    3 işçi 8 parçayı paylaşır; biri SIGKILL ile öldürülür, ardından tüm uyarılar tetiklenir.
+    Beklenen: 48 uyarının her biri için tam bir bildirim satırı, bir sembol aynı anda tek
+    süreçte yoklanır, kalan işçiler SIGTERM'de kiralarını bırakır.
+    """
+    yol = tmp_path / "test.db"
+    fiyat = tmp_path / "fiyat.txt"
+    yoklama = tmp_path / "yoklama.txt"
+    fiyat.write_text("1")
+    yoklama.write_text("")
+
+    async def hazirla():
+        db_module = await _veritabani(tmp_path)
+        for i in range(24):
+            await db_module.uyari_ekle(i, f"T{i}.L", "fiyat_ust", "50")
+            await db_module.uyari_ekle(100 + i, f"T{i}.L", "fiyat_ust", "60")
+        await db_module.close_db()
+    asyncio.run(hazirla())
+    uyari_idleri = {r[0] for r in sqlite3.connect(yol).execute("SELECT id FROM uyarilar")}
+    assert len(uyari_idleri) == 48
+
+    ortam = {
+        **os.environ, "DB_PATH": str(yol), "TEST_FIYAT": str(fiyat), "TEST_YOKLAMA": str(yoklama),
+        "ALERT_SHARDING_ENABLED": "true", "ALERT_SHARD_COUNT": "8", "ALERT_LEASE_SECONDS": "1.5",
+        "ALERT_CHECK_INTERVAL": "1", "ALERT_INDEX_REFRESH_SECONDS": "1",
+        "ALERT_STREAM_ENABLED": "false", "LOG_LEVEL": "WARNING",
+    }
+    isciler = [subprocess.Popen([sys.executable, "-c", ISCI.format(repo=REPO)], cwd=tmp_path, env=ortam)
+               for _ in range(3)]
+
+    def kiralar():
+        with sqlite3.connect(yol) as c:
+            return dict(c.execute("SELECT parca, sahip FROM uyari_kiralari WHERE bitis > ?", (time.time(),)))
+
+    try:
+        # Dengeye oturana kadar bekle: 8 parça 3 sürece 3/3/2
+        _bekle(lambda: len(kiralar()) == 8 and sorted(Counter(kiralar().values()).values()) == [2, 3, 3],
+               40, "İşçiler parçaları paylaşamadı")
+        olen = isciler[0]
+        olen.send_signal(signal.SIGKILL)
+        olen.wait()
+        fiyat.write_text("100")
+
+        def bildirimler():
+            with sqlite3.connect(yol) as c:
+                return [r[0] for r in c.execute("SELECT uyari_id FROM gonderim_kuyrugu")]
+        _bekle(lambda: len(bildirimler()) >= 48, 40, "Uyarıların bildirimi yazılmadı")
+        time.sleep(2)     # Geç kalan çift bildirim olursa görünsün
+
+        assert sorted(bildirimler()) == sorted(uyari_idleri)
+        sahipler = set(kiralar().values())
+        assert len(kiralar()) == 8 and len(sahipler) == 2
+        assert not any(s.endswith(f":{olen.pid}") for s in sahipler)
+
+        # Bir sembolü aynı anda tek süreç yoklar: yük altında yeniden dengelemede parça
+        # bir kez el değiştirebilir (A→B), ama A,B,A gibi iç içe yoklama olmamalı
+        yoklayanlar = defaultdict(list)
+        for satir in yoklama.read_text().splitlines():
+            pid, sembol = satir.split()
+            if not yoklayanlar[sembol] or yoklayanlar[sembol][-1] != int(pid):
+                yoklayanlar[sembol].append(int(pid))
+        assert set(yoklayanlar) == {f"T{i}.L" for i in range(24)}
+        assert all(len(p) == len(set(p)) for p in yoklayanlar.values()), dict(yoklayanlar)
+        assert sum(len(p) == 1 for p in yoklayanlar.values()) >= 20
+        assert olen.pid not in {pid for p in yoklayanlar.values() for pid in p}
+    finally:
+        for isci in isciler[1:]:
+            isci.send_signal(signal.SIGTERM)
+        for isci in isciler:
+            try:
+                isci.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                isci.kill()
+
+    assert all(isci.returncode == 0 for isci in isciler[1:])
+    assert kiralar() == {}
@@ -0,0 +1,159 @@
+"""
+tests/test_piyasa_takvimi.py — Borsa seans takvimi ve yoklama planı testleri.
+"""
+import os
+import sys
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from piyasa_takvimi import acik_mi, piyasa_bul, yoklama_zamani
+
+
+def _an(iso: str) -> datetime:
+    return datetime.fromisoformat(iso)
+
+
+def test_piyasa_bul():
+    assert piyasa_bul("THYAO.IS").ad == "BIST"
+    assert piyasa_bul("^XU100").ad == "BIST"
+    assert piyasa_bul("AAPL").ad == "NYSE"
+    assert piyasa_bul("^GSPC").ad == "NYSE"
+    assert piyasa_bul("USDTRY=X").ad == "FOREX"
+    assert piyasa_bul("GC=F").ad == "VADELI"
+    assert piyasa_bul("BTC-USD").ad == "KRIPTO"
+    assert piyasa_bul("VOD.L") is None
+    assert acik_mi("VOD.L", _an("2025-03-08T03:00+00:00"))   # bilinmeyen → hep açık
+
+
+@pytest.mark.parametrize("sembol,an,beklenen", [
+    ("THYAO.IS", "2025-03-03T11:00+03:00", True),     # Pazartesi seans içi
+    ("THYAO.IS", "2025-03-03T03:00+03:00", False),    # gece
+    ("THYAO.IS", "2025-03-08T11:00+03:00", False),    # Cumartesi
+    ("THYAO.IS", "2025-04-23T11:00+03:00", False),    # 23 Nisan
+    ("THYAO.IS", "2025-10-28T12:00+03:00", True),     # arife, yarım gün
+    ("THYAO.IS", "2025-10-28T13:00+03:00", False),
+    ("AAPL", "2025-03-10T13:29+00:00", False),        # yaz saati sonrası ilk gün: 09:30 EDT = 13:30 UTC
+    ("AAPL", "2025-03-10T13:31+00:00", True),
+    ("AAPL", "2025-03-07T14:31+00:00", True),         # kış saati: 09:30 EST = 14:30 UTC
+    ("AAPL", "2025-07-03T14:00-04:00", False),        # erken kapanış 13:00
+    ("AAPL", "2025-07-04T11:00-04:00", False),        # bağımsızlık günü
+    ("EURUSD=X", "2025-03-08T12:00-05:00", False),    # Cumartesi
+    ("EURUSD=X", "2025-03-09T18:00-04:00", True),     # Pazar akşamı açılış sonrası
+    ("EURUSD=X", "2025-03-12T03:00-04:00", True),     # hafta ortası gece
+    ("GC=F", "2025-03-11T17:30-04:00", False),        # günlük bakım arası
+    ("GC=F", "2025-03-11T19:00-04:00", True),
+    ("BTC-USD", "2025-03-08T03:00+00:00", True),
+])
+def test_acik_mi(sembol, an, beklenen):
+    assert acik_mi(sembol, _an(an)) is beklenen
+
+
+def _hafta_simule(sembol, bas, gun=7):
+    """Zamanlayıcıyı bir hafta boyunca çalıştırıp yoklama anlarını döndürür."""
+    t = bas.timestamp()
+    son = t + gun * 86400
+    anlar = []
+    while t < son:
+        anlar.append(t)
+        t = yoklama_zamani(sembol, t)
+    return anlar
+
+
+@pytest.mark.parametrize("sembol", ["THYAO.IS", "AAPL"])
+def test_hafta_boyu_yoklama_azalir_tetik_kacmaz(sembol):
+    """Sabit 5 dk yoklamaya göre %60+ az çağrı; seans içinde hiçbir boşluk ALERT_CHECK_INTERVAL'ı aşmaz."""
+    piyasa = piyasa_bul(sembol)
+    bas = datetime(2025, 3, 2, tzinfo=piyasa.bolge)           # Pazar 00:00 (yerel)
+    anlar = _hafta_simule(sembol, bas)
+    eski = 7 * 86400 / settings.ALERT_CHECK_INTERVAL
+    assert len(anlar) <= 0.4 * eski, f"{len(anlar)} / {eski:.0f}"
+
+    seanslar = list(piyasa.seanslar(bas.date(), 7))
+    assert len(seanslar) == 5
+    gecikme = settings.ALERT_POST_CLOSE_DELAY
+    for acilis, kapanis in seanslar:
+        a, k = acilis.timestamp(), kapanis.timestamp()
+        icerde = [t for t in anlar if a <= t < k]
+        assert icerde[0] == a                                     # tam açılışta yoklanır
+        # Açılış penceresinde sık yoklama
+        assert icerde[1] - icerde[0] == settings.ALERT_OPEN_BOOST_INTERVAL
+        bosluklar = [y - x for x, y in zip(icerde, icerde[1:])]
+        assert max(bosluklar) <= settings.ALERT_CHECK_INTERVAL
+        assert k - icerde[-1] <= settings.ALERT_CHECK_INTERVAL
+        # Kapanıştan sonra tam bir son yoklama
+        sonra = [t for t in anlar if k <= t < k + 3600]
+        assert sonra == [k + gecikme]
+
+
+def test_kripto_her_zaman_normal_aralik():
+    t = _an("2025-03-08T03:00+00:00").timestamp()
+    assert yoklama_zamani("BTC-USD", t) == t + settings.ALERT_CHECK_INTERVAL
+
+
+def test_kapaliyken_sonraki_acilisa_atlar():
+    """Cuma kapanış sonrası yoklanan BIST sembolü Pazartesi 10:00'a kadar yoklanmamalı."""
+    t = _an("2025-03-07T20:00+03:00").timestamp()
+    assert yoklama_zamani("THYAO.IS", t) == _an("2025-03-10T10:00+03:00").timestamp()
+    # Tatilleri atlar: 22 Nisan akşamı → 24 Nisan açılış
+    t = _an("2025-04-22T19:00+03:00").timestamp()
+    assert yoklama_zamani("THYAO.IS", t) == _an("2025-04-24T10:00+03:00").timestamp()
+
+
+def test_tatil_takvimi_bitince_uyarir(monkeypatch):
+    """Tatil listesinin kapsamadığı yılda piyasa başına bir kez uyarı loglanmalı."""
+    import piyasa_takvimi
+    uyarilar = []
+    monkeypatch.setattr(piyasa_takvimi, "_takvim_uyarilari", set())
+    monkeypatch.setattr(piyasa_takvimi.log, "warning", uyarilar.append)
+
+    yoklama_zamani("THYAO.IS", _an("2026-03-09T12:00+03:00").timestamp())
+    assert uyarilar == []
+    son = piyasa_takvimi.PIYASALAR["BIST"].takvim_sonu
+    for saat in ("11:00", "12:00", "15:00"):
+        yoklama_zamani("THYAO.IS", _an(f"{son + 1}-03-09T{saat}+03:00").timestamp())
+    yoklama_zamani("AAPL", _an(f"{son + 1}-03-09T12:00-05:00").timestamp())
+    yoklama_zamani("BTC-USD", _an(f"{son + 1}-03-09T12:00+00:00").timestamp())
+    assert len(uyarilar) == 2
+    assert "BIST" in uyarilar[0] and "NYSE" in uyarilar[1]
+
+
+@pytest.mark.asyncio
+async def test_dongu_kapali_piyasayi_yoklamaz(monkeypatch):
+    """Uyarı döngüsü sırası gelmemiş (piyasası kapalı) sembolü atlamalı, diğerini planlamalı."""
+    import alert_motoru
+    from uyari_indeksi import UyariIndeksi
+
+    indeks = UyariIndeksi()
+    indeks.yukle([
+        {"id": 1, "user_id": 1, "sembol": "THYAO.IS", "tip": "fiyat_ust", "hedef_deger": "1000"},
+        {"id": 2, "user_id": 1, "sembol": "AAPL", "tip": "fiyat_ust", "hedef_deger": "1000"},
+    ])
+    simdi = _an("2025-03-10T15:00+00:00").timestamp()          # BIST kapalı, NYSE açık
+    monkeypatch.setattr(alert_motoru, "uyari_indeksi", indeks)
+    monkeypatch.setattr(alert_motoru, "time", SimpleNamespace(time=lambda: simdi))
+    monkeypatch.setattr(alert_motoru, "_sonraki_yoklama",
+                        {"THYAO.IS": yoklama_zamani("THYAO.IS", simdi)})
+    yoklanan = []
+
+    async def fiyat(sembol):
+        yoklanan.append(sembol)
+        return {"fiyat": "1"}
+    monkeypatch.setattr(alert_motoru, "get_fiyat_hiyerarsik", fiyat)
+
+    gorev = asyncio.create_task(alert_motoru.uyari_kontrol_dongusu())
+    for _ in range(200):
+        if "AAPL" in alert_motoru._sonraki_yoklama:
+            break
+        await asyncio.sleep(0.01)
+    gorev.cancel()
+    await asyncio.gather(gorev, return_exceptions=True)
+
+    assert yoklanan == ["AAPL"]
+    assert alert_motoru._sonraki_yoklama["AAPL"] == yoklama_zamani("AAPL", simdi)
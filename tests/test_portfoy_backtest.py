@@ -0,0 +1,120 @@
+"""
+tests/test_portfoy_backtest.py — Çok sembollü portföy backtest'i, ortak takvim ve ağırlık kuralları.
+"""
+import os
+import sys
+import time
+import pytest
+import numpy as np
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest_motoru import BacktestHatasi
+from fiyat_gecmisi import GUN
+from portfoy_backtest import (
+    bist_evreni, dengeleme_satirlari, evren_takvimi, portfoy_backtest, portfoy_ozkaynagi,
+)
+
+
+def _mum(gunler, kapanis):
+    kapanis = np.asarray(kapanis, dtype=float)
+    return np.column_stack((np.asarray(gunler, dtype=float) * GUN, kapanis, kapanis, kapanis, kapanis,
+                            np.ones(len(kapanis))))
+
+
+def _evren(n_sembol, n_gun, tohum=0):
+    rng = np.random.default_rng(tohum)
+    gunler = np.arange(n_gun)
+    return {f"S{j}": _mum(gunler, 100 * np.cumprod(1 + rng.normal(0.0003, 0.02, n_gun))) for j in range(n_sembol)}
+
+
+def _adet_referansi(kapanis, satirlar, agirliklar, maliyet, sermaye=10000.0):
+    """Adet bazlı döngü: dengelemede hedef adetlere geçilir, devir tutarı kadar maliyet ödenir."""
+    adet = np.zeros(kapanis.shape[1])
+    nakit, ozkaynak = sermaye, []
+    fiyat = np.nan_to_num(kapanis)
+    for t in range(len(kapanis)):
+        deger = nakit + adet @ fiyat[t]
+        if t in satirlar:
+            w = agirliklar[list(satirlar).index(t)]
+            mevcut = adet * fiyat[t] / deger
+            deger *= 1 - maliyet * np.abs(w - mevcut).sum()
+            adet = np.divide(w * deger, fiyat[t], out=np.zeros_like(w), where=fiyat[t] > 0)
+            nakit = deger - adet @ fiyat[t]
+        ozkaynak.append(nakit + adet @ fiyat[t])
+    return np.array(ozkaynak)
+
+
+def test_ozkaynak_adet_simulasyonu_ile_ayni():
+    """Kayan ağırlıklar, nakit payı ve devir maliyeti adet bazlı döngüyle aynı sonucu vermeli."""
+    rng = np.random.default_rng(3)
+    kapanis = 50 * np.cumprod(1 + rng.normal(0, 0.02, (120, 4)), axis=0)
+    kapanis[:30, 3] = np.nan                                  # Sonradan listelenen varlık
+    satirlar = np.array([0, 20, 45, 80, 100])
+    agirliklar = rng.dirichlet(np.ones(4), len(satirlar)) * 0.9
+    agirliklar[:2, 3] = 0.0
+    ozkaynak, devir = portfoy_ozkaynagi(kapanis, satirlar, agirliklar, 0.002)
+    assert np.allclose(ozkaynak, _adet_referansi(kapanis, satirlar, agirliklar, 0.002))
+    assert devir[0] == pytest.approx(agirliklar[0].sum())
+
+
+def test_ortak_takvim_tatil_halka_arz_ve_hafta_sonu():
+    """Tatil günü önceki kapanışla dolmalı, halka arzdan önce ağırlık verilmemeli, kripto hafta sonu atılmalı."""
+    # 1970-01-05 Pazartesi = gün 4; gün 9-10 hafta sonu
+    is_gunleri = [4, 5, 6, 7, 8, 11, 12, 13, 14, 15]
+    bist = _mum(is_gunleri, np.arange(10) + 10.0)
+    abd = _mum([g for g in is_gunleri if g != 6], np.arange(9) + 20.0)          # Gün 6 ABD tatili
+    ipo = _mum(is_gunleri[5:], np.arange(5) + 30.0)
+    kripto = _mum(range(4, 16), np.arange(12) + 1.0)
+    mumlar = {"BIST.IS": bist, "ABD": abd, "IPO.IS": ipo, "BTC-USD": kripto}
+
+    gunler, kapanis, satirlar = evren_takvimi(mumlar)
+    assert list(gunler // GUN) == is_gunleri
+    assert kapanis[2, 1] == kapanis[1, 1] == 21.0                   # Tatil: önceki kapanış
+    assert np.isnan(kapanis[:5, 2]).all() and kapanis[5, 2] == 30.0
+    assert list(satirlar[3]) == [0, 1, 2, 3, 4, -1, -1, 5, 6, 7, 8, 9]
+
+    s = portfoy_backtest(mumlar, "ESIT", siklik=5, komisyon=0.0, kayma=0.0)
+    assert list(s.dengeleme_satirlari) == [0, 5]
+    assert s.agirliklar[0].tolist() == pytest.approx([1 / 3, 1 / 3, 0.0, 1 / 3])
+    assert s.agirliklar[1].tolist() == pytest.approx([0.25] * 4)
+
+
+def test_momentum_ilk_k_ve_sinyal_agirlikli():
+    """MOMENTUM en yüksek getirili k varlığı seçmeli; SINYAL yalnızca uzun sinyalli varlıklara ağırlık vermeli."""
+    gunler = np.arange(60)
+    egimler = [0.001, 0.004, -0.002, 0.003]
+    mumlar = {f"S{j}": _mum(gunler, 100 * np.exp(e * gunler)) for j, e in enumerate(egimler)}
+    s = portfoy_backtest(mumlar, "MOMENTUM", {"k": 2, "pencere": 20}, siklik=20, komisyon=0.0, kayma=0.0)
+    assert s.agirliklar[0].sum() == 0.0                             # Pencere dolmadan nakit
+    assert s.agirliklar[1].tolist() == pytest.approx([0.0, 0.5, 0.0, 0.5])
+
+    yukari = 100 * np.exp(0.01 * gunler)
+    asagi = 100 * np.exp(-0.01 * gunler)
+    mumlar = {"YUKARI": _mum(gunler, yukari), "ASAGI": _mum(gunler, asagi)}
+    s = portfoy_backtest(mumlar, "SINYAL", siklik=10, strateji="SMA_CROSS",
+                         strateji_parametreleri={"hizli": 3, "yavas": 8}, komisyon=0.0, kayma=0.0)
+    assert s.agirliklar[-1].tolist() == [1.0, 0.0]
+    assert s.toplam_getiri > 0
+
+
+def test_aylik_dengeleme_ve_hatalar():
+    """Aylık dengeleme her ayın ilk işlem günü olmalı; bilinmeyen kural/parametre hata vermeli."""
+    gunler = np.arange(0, 95) * GUN                                  # 1970-01-01 → 04-05
+    assert list(dengeleme_satirlari(gunler, "aylik")) == [0, 31, 59, 90]
+    with pytest.raises(BacktestHatasi):
+        portfoy_backtest(_evren(2, 30), "YOK")
+    with pytest.raises(BacktestHatasi):
+        portfoy_backtest(_evren(2, 30), "MOMENTUM", {"ust": 3})
+    assert len(bist_evreni()) > 500 and all(s.endswith(".IS") for s in bist_evreni())
+
+
+def test_bist_olcekli_evren_saniyeler_icinde():
+    """600 sembol × 10 yıl, aylık momentum dengelemesi bir saniyenin altında hesaplanmalı."""
+    mumlar = _evren(600, 2520, tohum=9)
+    t0 = time.perf_counter()
+    s = portfoy_backtest(mumlar, "MOMENTUM", {"k": 20})
+    sure = time.perf_counter() - t0
+    assert len(s.ozkaynak) == 2520 and s.agirliklar.shape[1] == 600
+    assert sure < 1.0, f"{sure:.2f} sn"
@@ -0,0 +1,150 @@
+"""
+tests/test_portfoy_defteri.py — Lot bazlı portföy defteri: FIFO / ortalama maliyet, artımlı pozisyonlar.
+"""
+import os
+import sys
+import random
+import sqlite3
+import pytest
+from decimal import Decimal as D
+from unittest.mock import AsyncMock, patch
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from portfoy_defteri import DefterHatasi, Lot, Pozisyon, defteri_oynat, islem_uygula, lot_farki, metin
+
+
+def test_fifo_ve_ortalama_maliyet():
+    poz, lotlar = defteri_oynat([
+        ("alis", D(100), D(10)),
+        ("alis", D(100), D(20)),
+        ("satis", D(150), D(25)),
+    ])
+    assert poz.miktar == 50 and poz.ort_maliyet == 15
+    # FIFO: 100 × 10 + 50 × 20 = 2000 maliyet düşülür; ortalama: 150 × 15 = 2250
+    assert poz.gerceklesen_fifo == 150 * 25 - 2000
+    assert poz.gerceklesen_ort == 150 * (25 - 15)
+    assert poz.fifo_maliyet == 50 * 20
+    assert [(l.kalan, l.birim_maliyet) for l in lotlar] == [(50, 20)]
+
+
+def test_bolunme_ve_temettu():
+    poz, lotlar = defteri_oynat([
+        ("alis", D(10), D(100)),
+        ("bolunme", D(0), D(2)),
+        ("temettu", D(0), D("0.5")),
+        ("satis", D(20), D(60)),
+    ])
+    assert poz.miktar == 0 and poz.ort_maliyet == 0 and poz.fifo_maliyet == 0 and lotlar == []
+    assert poz.temettu == 10                       # 20 hisse × 0.5
+    assert poz.gerceklesen_fifo == poz.gerceklesen_ort == 20 * 60 - 1000
+
+
+@pytest.mark.parametrize("islemler", [
+    [("satis", D(1), D(1))],
+    [("alis", D(5), D(1)), ("satis", D(6), D(1))],
+    [("temettu", D(0), D(1))],
+    [("alis", D(5), D(1)), ("bolunme", D(0), D(0))],
+    [("alis", D(0), D(1))],
+    [("hediye", D(1), D(1))],
+])
+def test_gecersiz_islemler(islemler):
+    with pytest.raises(DefterHatasi):
+        defteri_oynat(islemler)
+
+
+def test_lot_farki_yalnizca_degisenleri_yazar():
+    lotlar = [Lot(1, D(5), D(10)), Lot(2, D(5), D(12)), Lot(3, D(5), D(14))]
+    poz = Pozisyon(miktar=D(15), fifo_maliyet=D(180), ort_maliyet=D(12))
+    _, yeni = islem_uygula(poz, lotlar, "satis", D(7), D(20))
+    assert lot_farki(lotlar, yeni) == ([], [Lot(2, D(3), D(12))], [1])
+    assert metin(D("1E+6")) == "1000000" and metin(D("0.0000100")) == "0.00001" and metin(D("-0")) == "0"
+
+
+# ═══════════════════════════════════════════════════════════════
+# VERİTABANI — ARTIMLI POZİSYONLAR
+# ═══════════════════════════════════════════════════════════════
+
+async def _veritabani(yol):
+    import db as db_module
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(yol)
+    await db_module.db_init()
+    return db_module
+
+
+@pytest.mark.asyncio
+async def test_artimli_pozisyon_defterin_yeniden_oynatimiyla_ayni(tmp_path):
+    """Rastgele 300 işlemden sonra pozisyon ve lotlar defteri baştan oynatmakla birebir aynı olmalı."""
+    m = await _veritabani(tmp_path / "test.db")
+    rng = random.Random(3)
+    for _ in range(300):
+        sembol = rng.choice(["AAPL", "THYAO.IS"])
+        poz = Pozisyon.satirdan(await m.pozisyon_getir(1, sembol))
+        tur = rng.choice(["alis", "alis", "satis", "temettu", "bolunme"] if poz.miktar else ["alis"])
+        fiyat = D(rng.randint(1, 5000)) / 100
+        miktar = D(rng.randint(1, 100))
+        if tur == "satis":
+            miktar = min(miktar, poz.miktar)
+        elif tur == "bolunme":
+            fiyat = D(rng.choice(["2", "3", "0.5"]))
+        await m.portfoy_islemi_uygula(1, sembol, tur, miktar, fiyat)
+
+    for sembol in ("AAPL", "THYAO.IS"):
+        islemler = [(r["tur"], D(r["miktar"]), D(r["fiyat"])) for r in await m.portfoy_islemleri_getir(1, sembol)]
+        poz, lotlar = defteri_oynat(islemler)
+        assert Pozisyon.satirdan(await m.pozisyon_getir(1, sembol)).satira() == poz.satira()
+        assert [(D(r["kalan"]), D(r["birim_maliyet"])) for r in await m.lotlari_getir(1, sembol)] == \
+            [(l.kalan, l.birim_maliyet) for l in lotlar]
+
+    with pytest.raises(DefterHatasi):
+        await m.portfoy_islemi_uygula(1, "MSFT", "satis", "1", "1")
+    assert await m.pozisyon_getir(1, "MSFT") is None and await m.portfoy_islemleri_getir(1, "MSFT") == []
+    await m.close_db()
+
+
+@pytest.mark.asyncio
+async def test_eski_portfoy_satirlari_deftere_tasinir(tmp_path):
+    """v4 göçü: aynı sembolün eski satırları tek pozisyonda birleşmeli, bozuk satır atlanmalı."""
+    yol = tmp_path / "eski.db"
+    with sqlite3.connect(yol) as c:
+        c.execute("CREATE TABLE portfoy (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, sembol TEXT, "
+                  "miktar TEXT, maliyet TEXT, tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        c.executemany("INSERT INTO portfoy (user_id, sembol, miktar, maliyet) VALUES (?, ?, ?, ?)", [
+            (7, "THYAO", "100", "45.50"), (7, "THYAO", "50", "60"), (7, "AAPL", "abc", "1"), (8, "AAPL", "2", "150"),
+        ])
+
+    m = await _veritabani(yol)
+    portfoy = await m.portfoy_getir(7)
+    assert [(p["sembol"], p["miktar"], p["maliyet"], p["fifo_maliyet"]) for p in portfoy] == \
+        [("THYAO", "150", "50.33333333333333333333333333", "7550")]
+    assert len(await m.lotlari_getir(7, "THYAO")) == 2
+    assert [p["sembol"] for p in await m.portfoy_getir(8)] == ["AAPL"]
+    await m.close_db()
+
+
+@pytest.mark.asyncio
+async def test_ozet_pozisyon_ve_gerceklesen_kz(tmp_path):
+    """Özet yalnızca açık pozisyonları listelemeli, gerçekleşen K/Z ve temettüyü göstermeli."""
+    import portfoy_motoru
+    m = await _veritabani(tmp_path / "test.db")
+    assert "✅" in await portfoy_motoru.portfoy_varlik_ekle(5, "THYAO", "100", "10")
+    assert "✅" in await portfoy_motoru.portfoy_varlik_ekle(5, "AAPL", "10", "100")
+    assert "✅" in await portfoy_motoru.portfoy_islem_kaydet(5, "AAPL", "satis", "10", "120")
+    assert "✅" in await portfoy_motoru.portfoy_islem_kaydet(5, "THYAO", "temettu", None, "0.5")
+    assert "fazla" in await portfoy_motoru.portfoy_islem_kaydet(5, "THYAO", "satis", "101", "1")
+
+    from kur_matrisi import KurMatrisi
+    kurlar = KurMatrisi(cekici=AsyncMock(return_value={"USDTRY=X": 30.0}))
+    with patch("portfoy_motoru.get_fiyat_hiyerarsik", new_callable=AsyncMock,
+               return_value={"fiyat": "12", "para_birimi": "TRY"}) as mock_fiyat, \
+            patch("portfoy_motoru.kur_matrisi", kurlar):
+        ozet = await portfoy_motoru.portfoy_ozeti_hazirla(5)
+    mock_fiyat.assert_called_once_with("THYAO")
+    assert "THYAO" in ozet and "AAPL" not in ozet
+    assert "+200.00 TRY" in ozet               # Açık K/Z: 100 × (12 − 10)
+    # AAPL'ın gerçekleşen K/Z'si (200 USD) TRY'ye çevrilir
+    assert "Gerçekleşen K/Z:</b> +6000.00 TRY" in ozet and "Temettü:</b> 50.00 TRY" in ozet
+    await m.close_db()
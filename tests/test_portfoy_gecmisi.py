@@ -0,0 +1,160 @@
+"""
+tests/test_portfoy_gecmisi.py — Gün sonu portföy anlıkları ve zaman ağırlıklı getiri.
+"""
+import os
+import sys
+import time
+import pytest
+import numpy as np
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fiyat_gecmisi import GUN, GunlukGecmis
+from kur_matrisi import Kurlar
+from portfoy_gecmisi import zaman_agirlikli_getiri
+
+
+async def _temiz_db(tmp_path, monkeypatch):
+    import db as db_module
+    from ux import user_prefs
+
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    monkeypatch.setattr(user_prefs, "tercih_onbellegi", user_prefs.TercihOnbellegi())
+    return db_module
+
+
+def test_twr_akislari_ayiklar():
+    """Para yatırmak getiri sayılmamalı; alt dönem getirileri zincirlenmeli."""
+    deger = np.array([1000.0, 1100.0, 2200.0, 1980.0])
+    akis = np.array([0.0, 0.0, 1000.0, 0.0])
+    twr = zaman_agirlikli_getiri(deger, akis)
+    r2 = (2200 - 1100 - 1000) / (1100 + 500)
+    beklenen = np.cumprod([1.0, 1.1, 1 + r2, 0.9]) - 1
+    assert np.allclose(twr, beklenen)
+    # Boş başlangıç (payda 0) getiri üretmez
+    assert zaman_agirlikli_getiri(np.array([0.0, 500.0]), np.array([0.0, 500.0]))[-1] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_gunsonu_tek_cekim_coklu_para_birimi(tmp_path, monkeypatch):
+    """Tüm kullanıcılar tek kapanış çekimi ve tek kur matrisiyle, kendi para birimlerinde değerlenmeli."""
+    import portfoy_gecmisi
+    from ux.user_prefs import set_user_pref
+
+    db_module = await _temiz_db(tmp_path, monkeypatch)
+    bugun = int(time.time() // GUN)
+    gunler = np.array([(bugun - 1) * GUN, bugun * GUN], dtype=np.int64)
+    kapanis = {"THYAO.IS": [300.0, 310.0], "AAPL": [200.0, 210.0]}
+    cagrilar = []
+
+    async def cekici(semboller, baslangic):
+        cagrilar.append(sorted(semboller))
+        return {s: np.column_stack((gunler, *[np.array(kapanis[s])] * 4, np.ones(2))) for s in semboller}
+
+    kur_cagrisi = []
+
+    class SahteKur:
+        async def guncel(self):
+            kur_cagrisi.append(1)
+            return Kurlar({"USD": {"TRY": 30.0}, "TRY": {"USD": 1 / 30.0}})
+
+    monkeypatch.setattr(portfoy_gecmisi, "gunluk_gecmis", GunlukGecmis(cekici=cekici, ttl=60))
+    monkeypatch.setattr(portfoy_gecmisi, "kur_matrisi", SahteKur())
+    try:
+        dun = (bugun - 1) * GUN + 3600
+        await db_module.portfoy_islemi_uygula(1, "THYAO.IS", "alis", "10", "290", dun)
+        await db_module.portfoy_islemi_uygula(1, "AAPL", "alis", "1", "190", bugun * GUN + 3600)
+        await db_module.portfoy_islemi_uygula(2, "AAPL", "alis", "2", "180", dun)
+        await set_user_pref(2, "currency", "USD")
+
+        yazilan = await portfoy_gecmisi.gunsonu_anlik_al(bugun * GUN + 22 * 3600, onceki_zaman=bugun * GUN)
+        assert yazilan == 2
+        assert cagrilar == [["AAPL", "THYAO.IS"]] and len(kur_cagrisi) == 1
+
+        a = await db_module.portfoy_anliklari_getir(1)
+        assert a == [(bugun, pytest.approx(10 * 310 + 210 * 30), pytest.approx(2900 + 190 * 30),
+                      pytest.approx(190 * 30), "TRY")]
+        b = await db_module.portfoy_anliklari_getir(2)
+        assert b == [(bugun, pytest.approx(420.0), pytest.approx(360.0), 0.0, "USD")]
+    finally:
+        await db_module.close_db()
+
+
+@pytest.mark.asyncio
+async def test_anlik_saatinden_sonraki_islem_sonraki_akista(tmp_path, monkeypatch):
+    """Anlık saatinden sonra girilen işlem kaybolmamalı; sonraki anlıkta akış sayılmalı (getiri değil)."""
+    import portfoy_gecmisi
+    from ux.user_prefs import set_user_pref
+
+    db_module = await _temiz_db(tmp_path, monkeypatch)
+    bugun = int(time.time() // GUN)
+    dun = bugun - 1
+    gunler = np.array([dun * GUN, bugun * GUN], dtype=np.int64)
+    kapanis = {"THYAO.IS": 100.0, "VOD.L": 7000.0}
+
+    async def cekici(semboller, baslangic):
+        return {s: np.column_stack((gunler, *[np.full(2, kapanis[s])] * 4, np.ones(2))) for s in semboller}
+
+    class SahteKur:
+        async def guncel(self):
+            raise AssertionError("kur çekilmemeliydi")
+
+    monkeypatch.setattr(portfoy_gecmisi, "gunluk_gecmis", GunlukGecmis(cekici=cekici, ttl=60))
+    monkeypatch.setattr(portfoy_gecmisi, "kur_matrisi", SahteKur())
+    try:
+        await set_user_pref(2, "currency", "GBP")
+        await db_module.portfoy_islemi_uygula(1, "THYAO.IS", "alis", "10", "100", dun * GUN + 3600)
+        await db_module.portfoy_islemi_uygula(2, "VOD.L", "alis", "100", "7000", dun * GUN + 3600)
+        assert await portfoy_gecmisi.gunsonu_anlik_al(dun * GUN + 22 * 3600) == 2
+
+        # Anlıktan sonra, gece yarısından önce (23:00) ve ertesi gün girilen alışlar
+        await db_module.portfoy_islemi_uygula(1, "THYAO.IS", "alis", "5", "100", dun * GUN + 23 * 3600)
+        await db_module.portfoy_islemi_uygula(2, "VOD.L", "alis", "50", "7000", bugun * GUN + 3600)
+        assert await portfoy_gecmisi.gunsonu_anlik_al(bugun * GUN + 22 * 3600) == 2
+
+        a = await db_module.portfoy_anliklari_getir(1)
+        assert a[1] == (bugun, pytest.approx(1500.0), pytest.approx(1500.0), pytest.approx(500.0), "TRY")
+        assert portfoy_gecmisi.zaman_agirlikli_getiri(
+            np.array([r[1] for r in a]), np.array([r[3] for r in a]))[-1] == pytest.approx(0.0)
+        # Pence ile girilen maliyet ve akış da sterline çevrilir
+        b = await db_module.portfoy_anliklari_getir(2)
+        assert b[1] == (bugun, pytest.approx(10500.0), pytest.approx(10500.0), pytest.approx(3500.0), "GBP")
+    finally:
+        await db_module.close_db()
+
+
+@pytest.mark.asyncio
+async def test_rapor_anliklardan_okur(tmp_path, monkeypatch):
+    """Rapor yalnızca anlıkları okumalı; tek anlıkta grafik üretilmemeli, para birimi değişimi kesmeli."""
+    import portfoy_gecmisi
+
+    db_module = await _temiz_db(tmp_path, monkeypatch)
+    bugun = int(time.time() // GUN)
+    grafikler = []
+
+    async def sahte_grafik(gunler, deger, maliyet, twr, baslik):
+        grafikler.append((list(gunler), list(twr)))
+        return b"PNG"
+
+    monkeypatch.setattr(portfoy_gecmisi.grafik_motoru, "performans_grafigi", sahte_grafik)
+    try:
+        await db_module.portfoy_anliklari_kaydet([(5, bugun - 3, 50.0, 40.0, 0.0, "USD")])
+        metin, png = await portfoy_gecmisi.portfoy_gecmisi_raporu(5)
+        assert png is None and "yeterli" in metin
+
+        await db_module.portfoy_anliklari_kaydet([
+            (5, bugun - 2, 1000.0, 900.0, 0.0, "TRY"),
+            (5, bugun - 1, 1100.0, 900.0, 0.0, "TRY"),
+            (5, bugun, 1210.0, 900.0, 0.0, "TRY"),
+        ])
+        metin, png = await portfoy_gecmisi.portfoy_gecmisi_raporu(5)
+        assert png == b"PNG"
+        assert grafikler[0][0] == [bugun - 2, bugun - 1, bugun]
+        assert grafikler[0][1][-1] == pytest.approx(0.21)
+        assert "%+21.00" in metin and "TRY" in metin
+    finally:
+        await db_module.close_db()
@@ -0,0 +1,187 @@
+"""
+tests/test_portfoy_risk.py — Vektörel portföy risk analitiği ve günlük geçmiş deposu.
+"""
+import os
+import sys
+import time
+import pytest
+import numpy as np
+import pandas as pd
+from decimal import Decimal
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fiyat_gecmisi import GUN, GunlukGecmis
+from portfoy_risk import hizala, risk_metrikleri
+
+
+def _is_gunleri(adet: int) -> np.ndarray:
+    """Bugünden geriye `adet` hafta içi gün (UTC gece yarısı, eskiden yeniye)."""
+    bugun = int(time.time() // GUN * GUN)
+    gunler = [g for g in range(bugun - 2 * adet * GUN, bugun + GUN, GUN) if (g // GUN + 3) % 7 < 5]
+    return np.array(gunler[-adet:], dtype=np.int64)
+
+
+def _sentetik(semboller, gun=260, tohum=1):
+    """Ortak piyasa faktörlü rastgele yürüyüşler → {sembol: (n × 6) OHLCV dizisi}."""
+    rng = np.random.default_rng(tohum)
+    gunler = _is_gunleri(gun)
+    piyasa = rng.normal(0, 0.01, gun)
+    sonuc = {}
+    for k, s in enumerate(semboller):
+        getiri = 0.5 * (k % 3) * piyasa + rng.normal(0.0003, 0.015, gun)
+        kapanis = 100 * np.cumprod(1 + getiri)
+        sonuc[s] = np.column_stack((gunler, kapanis, kapanis, kapanis, kapanis, np.ones(gun)))
+    return sonuc
+
+
+def test_metrikler_sembol_bazli_hesapla_ayni():
+    """Matris hesabı; pandas ile tek tek hesaplanan vol, beta (calc_beta yöntemi), korelasyon ve VaR ile aynı olmalı."""
+    veri = _sentetik(["A", "B", "C", "XU100.IS"], gun=200)
+    kapanis = np.column_stack([veri[s][:, 4] for s in ("A", "B", "C")])
+    piyasa = veri["XU100.IS"][:, [4]]
+    w = np.array([3.0, 1.0, 1.0])
+    sonuc = risk_metrikleri(kapanis, w, piyasa)
+
+    df = pd.DataFrame(kapanis, columns=list("ABC")).pct_change().dropna()
+    m = pd.Series(piyasa[:, 0]).pct_change().dropna()
+    for i, s in enumerate("ABC"):
+        assert sonuc.volatilite[i] == pytest.approx(df[s].std() * np.sqrt(252))
+        ikili = pd.concat([df[s], m], axis=1)
+        assert sonuc.betalar[i, 0] == pytest.approx(ikili.cov().iloc[0, 1] / m.var())
+        egri = kapanis[:, i]
+        assert sonuc.max_dusus[i] == pytest.approx(min(egri[k] / egri[:k + 1].max() - 1 for k in range(len(egri))))
+    assert np.allclose(sonuc.korelasyon, df.corr().to_numpy())
+
+    rp = df.to_numpy() @ (w / w.sum())
+    assert sonuc.portfoy_volatilite == pytest.approx(rp.std(ddof=1) * np.sqrt(252))
+    q = np.quantile(rp, 0.05)
+    assert sonuc.tarihsel_var[0] == pytest.approx(-q)
+    assert sonuc.tarihsel_cvar[0] == pytest.approx(-rp[rp <= q].mean())
+    assert sonuc.parametrik_var[1] == pytest.approx(-(rp.mean() - 2.3263478740408408 * rp.std(ddof=1)))
+    assert (sonuc.tarihsel_cvar >= sonuc.tarihsel_var).all() and (sonuc.parametrik_cvar > sonuc.parametrik_var).all()
+
+
+def test_hizalama_hafta_sonu_ve_eksik_gunler():
+    """Kripto hafta sonu barları satır eklememeli; eksik gün önceki kapanışla dolmalı; baş kırpılmalı."""
+    cuma, cumartesi, pazartesi, sali = 1 * GUN, 2 * GUN, 4 * GUN, 5 * GUN      # 1970-01-02 Cuma
+    hisse = (np.array([cuma, sali]), np.array([10.0, 11.0]))
+    hisse2 = (np.array([pazartesi, sali]), np.array([5.0, 6.0]))
+    kripto = (np.array([cuma, cumartesi, pazartesi, sali]), np.array([1.0, 2.0, 3.0, 4.0]))
+    gunler, matris = hizala([hisse, hisse2, kripto])
+    assert list(gunler) == [pazartesi, sali]
+    assert matris.tolist() == [[10.0, 5.0, 3.0], [11.0, 6.0, 4.0]]
+
+
+@pytest.mark.asyncio
+async def test_gecmis_tek_cekim_ve_db_kaliciligi(tmp_path):
+    """Eksik semboller tek çekimle gelmeli, DB'ye yazılmalı; yeni depo DB'den çekimsiz okumalı."""
+    import db as db_module
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+
+    veri = _sentetik(["A", "B"], gun=30)
+    cagrilar = []
+
+    async def cekici(semboller, baslangic):
+        cagrilar.append(sorted(semboller))
+        return {s: veri[s] for s in semboller if s in veri}
+
+    try:
+        depo = GunlukGecmis(cekici=cekici, ttl=60)
+        seriler = await depo.getir(["A", "B", "YOK"], 60)
+        assert cagrilar == [["A", "B", "YOK"]]
+        assert set(seriler) == {"A", "B"} and np.array_equal(seriler["A"][1], veri["A"][:, 4])
+        await depo.getir(["A", "B", "YOK"], 60)
+        assert len(cagrilar) == 1                       # Sıcak; verisiz sembol de tekrar sorulmaz
+
+        yeni = GunlukGecmis(cekici=cekici, ttl=60)
+        seriler = await yeni.getir(["A", "B"], 45)
+        assert len(cagrilar) == 1 and np.array_equal(seriler["B"][0], veri["B"][:, 0])
+    finally:
+        await db_module.close_db()
+
+
+@pytest.mark.asyncio
+async def test_100_varlik_sicak_rapor_milisaniyeler(tmp_path, monkeypatch):
+    """100 pozisyonlu portföyün raporu geçmiş sıcakken milisaniyeler içinde hazırlanmalı."""
+    import db as db_module
+    import portfoy_risk
+    from ux import user_prefs
+
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    monkeypatch.setattr(user_prefs, "tercih_onbellegi", user_prefs.TercihOnbellegi())
+
+    semboller = [f"H{i}.IS" for i in range(100)]
+    veri = _sentetik(semboller + ["XU100.IS", "^GSPC"], gun=252)
+
+    async def cekici(istenen, baslangic):
+        return {s: veri[s] for s in istenen}
+
+    depo = GunlukGecmis(cekici=cekici, ttl=600)
+    monkeypatch.setattr(portfoy_risk, "gunluk_gecmis", depo)
+    try:
+        for s in semboller:
+            await db_module.portfoy_ekle(7, s, "10", "100")
+        await portfoy_risk.portfoy_risk_raporu(7)                  # Isıtma (çekim + DB yazımı)
+        assert depo.cekim == 1
+
+        t0 = time.perf_counter()
+        seriler = await depo.getir(semboller + ["XU100.IS", "^GSPC"], 365)
+        gunler, kapanis = hizala([seriler[s] for s in semboller + ["XU100.IS", "^GSPC"]])
+        sonuc = risk_metrikleri(kapanis[:, :100], np.ones(100), kapanis[:, 100:])
+        sure = time.perf_counter() - t0
+        rapor = await portfoy_risk.portfoy_risk_raporu(7)
+    finally:
+        await db_module.close_db()
+
+    assert depo.cekim == 1
+    assert sonuc.korelasyon.shape == (100, 100) and sonuc.betalar.shape == (100, 2)
+    assert sure < 0.05, f"Sıcak hesap {sure * 1000:.1f} ms"
+    assert "Yıllık Volatilite" in rapor and "BIST 100" in rapor and "S&amp;P 500" in rapor
+    assert "En yüksek korelasyonlar" in rapor and "… ve 90 varlık daha" in rapor
+
+
+@pytest.mark.asyncio
+async def test_yabanci_borsa_birimleri_ozetle_ayni(tmp_path, monkeypatch):
+    """.L (pence) ve .DE varlıkları /portfoy ile aynı birim ve çarpanla değerlenmeli."""
+    import db as db_module
+    import kur_matrisi
+    import portfoy_risk
+    from ux import user_prefs
+
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    monkeypatch.setattr(user_prefs, "tercih_onbellegi", user_prefs.TercihOnbellegi())
+    monkeypatch.setattr(kur_matrisi, "_kaynak_birimleri", {})
+
+    veri = _sentetik(["VOD.L", "SAP.DE", "ABC.ZZ", "XU100.IS", "^GSPC"], gun=120)
+
+    async def cekici(istenen, baslangic):
+        return {s: veri[s] for s in istenen}
+
+    async def kur_cekici():
+        return {"EURGBP=X": 0.85}
+
+    monkeypatch.setattr(portfoy_risk, "gunluk_gecmis", GunlukGecmis(cekici=cekici, ttl=600))
+    monkeypatch.setattr(portfoy_risk, "kur_matrisi", kur_matrisi.KurMatrisi(cekici=kur_cekici))
+    try:
+        await user_prefs.set_user_pref(3, "currency", "GBP")
+        for s in ("VOD.L", "SAP.DE", "ABC.ZZ"):
+            await db_module.portfoy_ekle(3, s, "10", "100")
+        rapor = await portfoy_risk.portfoy_risk_raporu(3)
+    finally:
+        await db_module.close_db()
+
+    son = {s: Decimal(str(float(veri[s][-1, 4]))) for s in ("VOD.L", "SAP.DE")}
+    toplam = 10 * son["VOD.L"] * Decimal("0.01") + 10 * son["SAP.DE"] * Decimal("0.85")
+    assert f"(değer {toplam:,.2f} GBP)" in rapor
+    assert "ABC.ZZ: para birimi bilinmiyor" in rapor
@@ -0,0 +1,73 @@
+"""
+tests/test_startup.py — main.py soğuk başlangıç (import) bütçesi.
+✅ YENİ - `python -X importtime` çıktısıyla başlangıç regresyonlarını yakalar.
+
+Bütçe, aiogram (kaçınılmaz framework maliyeti) düşüldükten sonra main.py'nin
+kendi import ağacına uygulanır; makine hızından bağımsız kalması için
+STARTUP_IMPORT_BUDGET_MS ile ezilebilir.
+"""
+import os
+import re
+import sys
+import subprocess
+
+PROJE_KOKU = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# main import edildiğinde ASLA yüklenmemesi gereken ağır modüller
+AGIR_MODULLER = (
+    "pandas", "numpy", "yfinance", "matplotlib",
+    "selenium", "undetected_chromedriver",
+    "anthropic", "groq", "google.generativeai",
+)
+
+BUTCE_MS = int(os.environ.get("STARTUP_IMPORT_BUDGET_MS", "600"))
+
+_SATIR = re.compile(r"^import time:\s+\d+\s+\|\s+(\d+)\s+\|\s+(\S+)$")
+
+
+def _importtime_calistir(tmp_path) -> tuple:
+    """`import main`'i ayrı bir süreçte -X importtime ile çalıştırır."""
+    kod = (
+        "import sys, main; "
+        f"print(','.join(m for m in {AGIR_MODULLER!r} if m in sys.modules))"
+    )
+    env = dict(os.environ)
+    env["PYTHONPATH"] = PROJE_KOKU
+    env["BOT_TOKEN"] = "1234567890:TEST_TOKEN_FOR_STARTUP_BUDGET_ABCDEFGHIJKLMNOP"
+    env.pop("ANTHROPIC_API_KEY", None)
+    env.pop("GROQ_API_KEY", None)
+    env.pop("GEMINI_API_KEY", None)
+    # cwd=tmp_path: main.py'nin oluşturduğu logs/ klasörü repoyu kirletmesin
+    sonuc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", kod],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert sonuc.returncode == 0, sonuc.stderr[-2000:]
+
+    kumulatif = {}
+    for satir in sonuc.stderr.splitlines():
+        m = _SATIR.match(satir)
+        # Her modül bir kez import edilir → isim tekil anahtar
+        if m:
+            kumulatif[m.group(2)] = int(m.group(1))
+    return sonuc.stdout.strip(), kumulatif
+
+
+def test_agir_moduller_yuklenmiyor(tmp_path):
+    """pandas/yfinance/selenium/AI SDK'ları başlangıçta import edilmemeli."""
+    yuklenenler, _ = _importtime_calistir(tmp_path)
+    assert yuklenenler == "", f"Başlangıçta yüklenen ağır modüller: {yuklenenler}"
+
+
+def test_baslangic_import_butcesi(tmp_path):
+    """main.py'nin kendi import süresi (aiogram hariç) bütçeyi aşmamalı."""
+    _, kumulatif = _importtime_calistir(tmp_path)
+    assert "main" in kumulatif
+
+    # Tekrarlı çalıştırmada .pyc hazır olur; ilk ölçüm derleme maliyetini içerebilir
+    _, kumulatif = _importtime_calistir(tmp_path)
+    kendi_ms = (kumulatif["main"] - kumulatif.get("aiogram", 0)) / 1000
+    assert kendi_ms <= BUTCE_MS, (
+        f"Başlangıç import süresi {kendi_ms:.0f} ms > bütçe {BUTCE_MS} ms. "
+        "Ağır bir modül main.py'ye tepe seviyede import edilmiş olabilir."
+    )
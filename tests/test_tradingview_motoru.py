@@ -0,0 +1,282 @@
+"""
+tests/test_tradingview_motoru.py — TradingView tarayıcı havuzu testleri.
+Gerçek Chrome yerine sahte driver fabrikası kullanılır.
+"""
+import os
+import sys
+import time
+import asyncio
+import pytest
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tradingview_motoru as tvm
+
+
+class SahteDriver:
+    """Selenium WebDriver'ın havuzun kullandığı kadarını taklit eder."""
+    aktif = 0
+    en_fazla_aktif = 0
+
+    def __init__(self, no: int):
+        self.no = no
+        self.sembol = None
+        self.kapandi = False
+        self.current_url = "https://www.tradingview.com/chart/"
+
+    def get(self, url):
+        self.current_url = url
+
+    def execute_script(self, script, *args):
+        """Hazır olma sondalarına 'her şey yüklendi' yanıtı verir."""
+        if script is tvm._JS_LEGEND_METNI:
+            return f"{self.sembol} | Sahte Şirket"
+        if script is tvm._JS_SERI_DEGERLERI:
+            return [f"{self.sembol or 'VARSAYILAN'}:{i}" for i in range(4)]
+        return True
+
+    def execute_async_script(self, script, *args):
+        return True
+
+    def save_screenshot(self, path):
+        SahteDriver.aktif += 1
+        SahteDriver.en_fazla_aktif = max(SahteDriver.en_fazla_aktif, SahteDriver.aktif)
+        try:
+            time.sleep(0.05)
+            with open(path, "w") as f:
+                f.write(self.sembol or "")
+        finally:
+            SahteDriver.aktif -= 1
+
+    def quit(self):
+        self.kapandi = True
+
+
+@pytest.fixture
+def sahte_tv(monkeypatch):
+    """Tarayıcıya dokunan yardımcıları sahteleriyle değiştirir."""
+    SahteDriver.aktif = 0
+    SahteDriver.en_fazla_aktif = 0
+
+    def _sembol_degistir(driver, tv_symbol):
+        driver.sembol = tv_symbol
+        return True
+
+    monkeypatch.setattr(tvm, "_sembol_degistir", _sembol_degistir)
+    monkeypatch.setattr(tvm, "_ui_gizle", lambda driver: None)
+    monkeypatch.setattr(tvm, "_oturum_acik_mi", lambda driver: True)
+    monkeypatch.setattr(tvm, "_cookie_dosyasi_oku", lambda: [])
+    monkeypatch.setattr(tvm, "BEKLEME_ARALIGI", 0.01)
+    olusturulan = []
+
+    def fabrika(no):
+        d = SahteDriver(no)
+        olusturulan.append(d)
+        return d
+
+    return fabrika, olusturulan
+
+
+async def _cek_hepsi(monkeypatch, havuz, semboller, tmp_path):
+    monkeypatch.setattr(tvm, "tv_havuzu", havuz)
+    yollar = [str(tmp_path / f"{i}.png") for i in range(len(semboller))]
+    sonuclar = await asyncio.gather(*[
+        tvm.tv_grafik_cek(s, y) for s, y in zip(semboller, yollar)
+    ])
+    return sonuclar, yollar
+
+
+@pytest.mark.asyncio
+async def test_eszamanli_istekler_karismaz(sahte_tv, monkeypatch, tmp_path):
+    """Her ekran görüntüsü kendi isteğinin sembolünü içermeli."""
+    fabrika, _ = sahte_tv
+    havuz = tvm.TVBrowserPool(boyut=2, geri_donusum=100, surucu_fabrikasi=fabrika)
+    semboller = ["THYAO.IS", "AAPL", "BTC-USD", "ASELS.IS", "MSFT", "ETH-USD"]
+
+    sonuclar, yollar = await _cek_hepsi(monkeypatch, havuz, semboller, tmp_path)
+
+    assert all(sonuclar)
+    for sembol, yol in zip(semboller, yollar):
+        with open(yol) as f:
+            assert f.read() == tvm._tv_sembol_formatla(sembol)
+    # Havuz boyutundan fazla eşzamanlı çekim olmamalı
+    assert SahteDriver.en_fazla_aktif <= 2
+    await havuz.kapat()
+
+
+@pytest.mark.asyncio
+async def test_kuyruk_sirasi_bildirilir(sahte_tv):
+    """Havuz doluyken bekleyen isteklere sıra numarası bildirilmeli."""
+    fabrika, _ = sahte_tv
+    havuz = tvm.TVBrowserPool(boyut=1, geri_donusum=100, surucu_fabrikasi=fabrika)
+    await havuz.baslat(isit=False)
+    siralar = []
+
+    async def bekleyen_istek():
+        async def bildir(sira):
+            siralar.append(sira)
+        async with havuz.checkout(bildir):
+            pass
+
+    async with havuz.checkout():
+        g1 = asyncio.create_task(bekleyen_istek())
+        await asyncio.sleep(0)
+        g2 = asyncio.create_task(bekleyen_istek())
+        await asyncio.sleep(0)
+        assert havuz.bekleyen == 2
+
+    await asyncio.gather(g1, g2)
+    assert siralar == [1, 2]
+    assert havuz.bekleyen == 0
+
+
+@pytest.mark.asyncio
+async def test_k_cekimden_sonra_geri_donusum(sahte_tv, monkeypatch, tmp_path):
+    """Slot K çekimden sonra kapatılıp yeni driver ile ısıtılmalı."""
+    fabrika, olusturulan = sahte_tv
+    havuz = tvm.TVBrowserPool(boyut=1, geri_donusum=2, surucu_fabrikasi=fabrika)
+    monkeypatch.setattr(tvm, "tv_havuzu", havuz)
+
+    for i in range(3):
+        assert await tvm.tv_grafik_cek("AAPL", str(tmp_path / f"{i}.png"))
+
+    assert len(olusturulan) == 2
+    assert olusturulan[0].kapandi is True
+    await havuz.kapat()
+
+
+@pytest.mark.asyncio
+async def test_verim_havuz_boyutuyla_olceklenir(sahte_tv, monkeypatch, tmp_path):
+    """4 slotlu havuz 4 grafiği tek slottan belirgin şekilde hızlı çekmeli."""
+    fabrika, _ = sahte_tv
+    semboller = ["AAPL", "MSFT", "NVDA", "TSLA"]
+
+    t0 = time.perf_counter()
+    tekli = tvm.TVBrowserPool(boyut=1, geri_donusum=100, surucu_fabrikasi=fabrika)
+    await _cek_hepsi(monkeypatch, tekli, semboller, tmp_path)
+    sure_tekli = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    dortlu = tvm.TVBrowserPool(boyut=4, geri_donusum=100, surucu_fabrikasi=fabrika)
+    await _cek_hepsi(monkeypatch, dortlu, semboller, tmp_path)
+    sure_dortlu = time.perf_counter() - t0
+
+    assert sure_dortlu < sure_tekli / 2
+    await tekli.kapat()
+    await dortlu.kapat()
+
+
+@pytest.mark.asyncio
+async def test_iptal_edilen_cekim_bitmeden_slot_verilmez(sahte_tv, monkeypatch, tmp_path):
+    """Bekleyen çağıran iptal edilse de executor bitmeden slot başka isteğe verilmemeli."""
+    fabrika, _ = sahte_tv
+    havuz = tvm.TVBrowserPool(boyut=1, geri_donusum=100, surucu_fabrikasi=fabrika)
+    monkeypatch.setattr(tvm, "tv_havuzu", havuz)
+    await havuz.baslat(isit=False)
+    basladi = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    gercek = tvm._grafik_cek_slot
+
+    def yavas_cekim(slot, tv_symbol, output_path):
+        loop.call_soon_threadsafe(basladi.set)
+        time.sleep(0.2)
+        return gercek(slot, tv_symbol, output_path)
+
+    monkeypatch.setattr(tvm, "_grafik_cek_slot", yavas_cekim)
+    ilk = asyncio.create_task(tvm.tv_grafik_cek("AAPL", str(tmp_path / "a.png")))
+    await basladi.wait()
+    ilk.cancel()
+    await asyncio.sleep(0.05)
+
+    # İş sürerken slot kuyrukta olmamalı; ikinci istek ancak iş bitince alır
+    assert havuz._bos.empty()
+    t0 = time.perf_counter()
+    async with havuz.checkout() as slot:
+        assert time.perf_counter() - t0 >= 0.05
+        assert slot.is_ is None
+    assert (tmp_path / "a.png").exists()
+    await havuz.kapat()
+
+
+@pytest.mark.asyncio
+async def test_kapandiktan_sonra_iade_driveri_kapatir(sahte_tv):
+    """Havuz kapatıldıktan sonra iade edilen slotun driver'ı kapatılmalı."""
+    fabrika, olusturulan = sahte_tv
+    havuz = tvm.TVBrowserPool(boyut=1, geri_donusum=100, surucu_fabrikasi=fabrika)
+    await havuz.baslat(isit=False)
+
+    async with havuz.checkout() as slot:
+        await havuz.kapat()
+        slot.driver = fabrika(slot.no)
+    await asyncio.sleep(0.05)
+
+    assert olusturulan[-1].kapandi is True
+    assert slot.driver is None
+
+
+# ─── Hazır olma koşulları ───
+
+class SondaDriver:
+    """execute_script yanıtları sırayla verilen sahte driver."""
+
+    def __init__(self, legend=None, degerler=None):
+        self.legend = list(legend or [])
+        self.degerler = list(degerler or [])
+
+    def execute_script(self, script, *args):
+        if script is tvm._JS_LEGEND_METNI:
+            return self.legend.pop(0) if len(self.legend) > 1 else self.legend[0]
+        if script is tvm._JS_SERI_DEGERLERI:
+            return self.degerler.pop(0) if len(self.degerler) > 1 else self.degerler[0]
+        return None
+
+
+def test_legend_eslesince_beklemeden_devam(monkeypatch):
+    """Legend yeni sembolü gösterdiği anda bekleme bitmeli (sabit süre yok)."""
+    monkeypatch.setattr(tvm, "BEKLEME_ARALIGI", 0.01)
+    driver = SondaDriver(legend=["AAPL · 1D", "AAPL · 1D", "THYAO · 1D · BIST"])
+
+    t0 = time.perf_counter()
+    assert tvm._bekle(driver, tvm._legend_eslesiyor("BIST:THYAO"), 5, "sembol") is True
+    assert time.perf_counter() - t0 < 1
+
+
+def test_bekle_zaman_asiminda_false_doner(monkeypatch):
+    """Koşul hiç sağlanmazsa adımın kendi zaman aşımında False dönmeli."""
+    monkeypatch.setattr(tvm, "BEKLEME_ARALIGI", 0.01)
+    driver = SondaDriver(legend=["AAPL · 1D"])
+
+    t0 = time.perf_counter()
+    assert tvm._bekle(driver, tvm._legend_eslesiyor("MSFT"), 0.1, "sembol") is False
+    assert time.perf_counter() - t0 < 1
+
+
+def test_legend_kod_tam_kelime_eslesir(monkeypatch):
+    """'THY' beklenirken 'THYAO' başlığı eşleşme sayılmamalı."""
+    monkeypatch.setattr(tvm, "BEKLEME_ARALIGI", 0.01)
+    kosul = tvm._legend_eslesiyor("BIST:THY")
+
+    assert kosul(SondaDriver(legend=["THYAO 312.50 ▲ +0.5% | THYAO · 1D · BIST"])) is False
+    assert kosul(SondaDriver(legend=["THY · 1D · BIST"])) is True
+    assert tvm._legend_eslesiyor("GC1!")(SondaDriver(legend=["GC1! · 1D · COMEX"])) is True
+
+
+def test_seri_degerleri_dolunca_devam(monkeypatch):
+    """OHLC değerleri yer tutucudan gerçek değere geçince bekleme bitmeli."""
+    monkeypatch.setattr(tvm, "BEKLEME_ARALIGI", 0.01)
+    driver = SondaDriver(degerler=[[], ["∅"] * 4, ["1", "2", "0.5", "1.5"]])
+
+    assert tvm._seri_yuklendi_bekle(driver, timeout=2) is True
+    assert driver.degerler == [["1", "2", "0.5", "1.5"]]
+
+
+def test_eski_serinin_degerleri_yuklendi_sayilmaz(monkeypatch):
+    """Sembol değişiminden önceki değerler kaldıkça seri yüklenmiş sayılmamalı."""
+    monkeypatch.setattr(tvm, "BEKLEME_ARALIGI", 0.01)
+    eski = ["10", "11", "9", "10.5"]
+
+    assert tvm._seri_yuklendi_bekle(SondaDriver(degerler=[eski]), onceki=eski,
+                                     timeout=0.2) is False
+    driver = SondaDriver(degerler=[eski, eski, ["300", "310", "295", "305"]])
+    assert tvm._seri_yuklendi_bekle(driver, onceki=eski, timeout=2) is True
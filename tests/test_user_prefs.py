@@ -0,0 +1,103 @@
+"""
+tests/test_user_prefs.py — Kullanıcı tercihleri: LRU önbellek + kullanici_tercihleri kalıcılığı.
+"""
+import os
+import sys
+import time
+import pytest
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db as db_module
+from ux import user_prefs
+from ux.user_prefs import TercihOnbellegi
+
+
+@pytest.fixture
+async def veritabani(tmp_path, monkeypatch):
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    monkeypatch.setattr(user_prefs, "tercih_onbellegi", TercihOnbellegi(boyut=3))
+    yield db_module
+    await db_module.close_db()
+
+
+@pytest.mark.asyncio
+async def test_tercihler_restartta_korunur(veritabani):
+    """Yazılan tercih ve dil önbellek sıfırlansa da (restart) DB'den aynen gelmeli."""
+    assert (await user_prefs.get_user_prefs(1))["currency"] == "TRY"
+    assert await user_prefs.set_user_pref(1, "currency", "USD")
+    assert await user_prefs.set_user_lang(1, "en")
+    assert not await user_prefs.set_user_lang(1, "xx")
+    assert not await user_prefs.set_user_pref(1, "bilinmeyen", 1)
+
+    # Dönen sözlük kopyadır: değiştirmek önbelleği bozmaz
+    (await user_prefs.get_user_prefs(1))["currency"] = "EUR"
+
+    user_prefs.tercih_onbellegi.temizle()
+    prefs = await user_prefs.get_user_prefs(1)
+    assert prefs["currency"] == "USD" and prefs["language"] == "en"
+    assert await veritabani.kullanici_dil_getir(1) == "en"
+
+
+@pytest.mark.asyncio
+async def test_onbellek_isabeti_db_okumaz_ve_sinirlidir(veritabani, monkeypatch):
+    okumalar = []
+    gercek = veritabani.tercih_getir
+
+    async def sayan(user_id):
+        okumalar.append(user_id)
+        return await gercek(user_id)
+    monkeypatch.setattr(veritabani, "tercih_getir", sayan)
+
+    await user_prefs.set_user_lang(1, "en")
+    for _ in range(5):
+        assert await user_prefs.get_user_lang(1) == "en"
+        await user_prefs.get_user_prefs(1)
+    assert okumalar == [1]
+
+    onbellek = user_prefs.tercih_onbellegi
+    for uid in (2, 3, 4):
+        await user_prefs.get_user_lang(uid)
+    assert len(onbellek) == 3 and 1 not in onbellek          # En eski kullanılan düştü
+    assert await user_prefs.get_user_lang(1) == "en"        # DB'den geri gelir
+    assert okumalar == [1, 2, 3, 4, 1]
+
+
+@pytest.mark.asyncio
+async def test_baslangicta_son_aktifler_yuklenir(veritabani):
+    simdi = time.time()
+    for uid, gun_once in ((1, 1), (2, 2), (3, 45), (4, 3), (5, 4)):
+        await veritabani.tercih_kaydet(uid, "en", '{"currency": "USD"}', simdi - gun_once * 86400)
+
+    onbellek = user_prefs.tercih_onbellegi
+    assert await user_prefs.preload_user_prefs() == 3          # Sınır: önbellek boyutu
+    assert {1, 2, 4} == {u for u in (1, 2, 3, 4, 5) if u in onbellek}
+    assert onbellek.iskalama == 0
+    assert (await user_prefs.get_user_prefs(2))["currency"] == "USD"
+    assert onbellek.iskalama == 0
+
+
+@pytest.mark.asyncio
+async def test_yeni_kullanici_satiri_olusur_son_gorulme_seyrek_yazilir(veritabani, monkeypatch):
+    yazmalar = []
+    gercek = veritabani.son_gorulme_guncelle
+
+    async def sayan(user_id, son_gorulme):
+        yazmalar.append(user_id)
+        await gercek(user_id, son_gorulme)
+    monkeypatch.setattr(veritabani, "son_gorulme_guncelle", sayan)
+
+    assert await user_prefs.get_user_lang(9) == "tr"
+    assert (await veritabani.tercih_getir(9))["lang"] == "tr"   # İlk görülmede satır açılır
+    for _ in range(10):
+        await user_prefs.get_user_lang(9)
+    assert yazmalar == []
+
+    sonra = time.time() + 7200
+    monkeypatch.setattr(user_prefs.time, "time", lambda: sonra)
+    await user_prefs.get_user_lang(9)
+    assert yazmalar == [9]
@@ -0,0 +1,46 @@
+"""
+tests/test_uyari_benchmark.py — Uyarı hattı tekrar oynatma kıyaslaması testleri.
+"""
+import os
+import sys
+import pytest
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from uyari_benchmark import kiyasla, rapor, sentetik_serit, uyarilari_uret
+
+
+def test_gecis_anlari_seritle_tutarli():
+    """Her uyarının geçiş anı, şeritte eşiğin ilk aşıldığı tick olmalı."""
+    serit = sentetik_serit(sembol_sayisi=3, sure=20, tick_araligi=0.5, tohum=3)
+    uyarilar = uyarilari_uret(serit, sembol_basina=30, tohum=3)
+    assert len(uyarilar) == 90 and len({u.id for u in uyarilar}) == 90
+
+    for u in uyarilar:
+        fiyatlar = [(t, p) for t, s, p in serit if s == u.sembol]
+        gecen = [t for t, p in fiyatlar if (p >= u.hedef if u.tip == "fiyat_ust" else p <= u.hedef)]
+        assert u.gecis == (gecen[0] if gecen else None)
+        assert u.gecis != fiyatlar[0][0]          # Eşikler ilk fiyatın doğru tarafında
+    # Hem geçilen hem geçilmeyen uyarılar olmalı
+    assert 0 < sum(u.gecis is None for u in uyarilar) < len(uyarilar)
+
+
+@pytest.mark.asyncio
+async def test_akis_ve_yoklama_kiyaslamasi():
+    """Akış motoru her geçişi saniye altında bildirmeli; hiçbir motor hatalı bildirim yapmamalı."""
+    serit = sentetik_serit(sembol_sayisi=4, sure=2, tick_araligi=0.1, oynaklik=0.01, tohum=5)
+    uyarilar = uyarilari_uret(serit, sembol_basina=10, tohum=5)
+
+    yoklama, akis = await kiyasla(serit, uyarilar, aralik=1, bekleme=0, ek_sure=1.2)
+
+    assert yoklama.motor == "yoklama" and akis.motor == "akis"
+    for s in (yoklama, akis):
+        assert s.hatali == 0
+        assert s.teslim + s.kacirilan == s.gecilen > 0
+        assert s.bellek_mb > 0 and s.cpu_sn > 0
+        assert s.asamalar["degerlendirme_gonderim"] is not None
+    assert akis.kacirilan == 0
+    assert akis.gecikme_maks < 1.0
+    assert akis.gozlem > yoklama.gozlem
+    assert "kaçırılan" in rapor([yoklama, akis])
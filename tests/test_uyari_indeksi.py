@@ -0,0 +1,151 @@
+"""
+tests/test_uyari_indeksi.py — Bellek içi uyarı indeksi testleri.
+"""
+import os
+import sys
+import time
+import random
+import pytest
+from decimal import Decimal
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from uyari_indeksi import UyariIndeksi, TIPLER
+
+
+def _kaba_kuvvet(uyarilar, sembol, fiyat, rsi):
+    """Referans: her uyarıyı tek tek karşılaştırır."""
+    sonuc = set()
+    for u in uyarilar:
+        if u["sembol"] != sembol:
+            continue
+        hedef = Decimal(u["hedef_deger"])
+        deger = fiyat if u["tip"].startswith("fiyat") else rsi
+        if deger is None:
+            continue
+        if u["tip"].endswith("ust") and deger >= hedef:
+            sonuc.add(u["id"])
+        elif u["tip"].endswith("alt") and deger <= hedef:
+            sonuc.add(u["id"])
+    return sonuc
+
+
+def _rastgele_uyarilar(n, semboller=("THYAO", "AAPL", "BTC-USD"), tohum=7):
+    rnd = random.Random(tohum)
+    return [{
+        "id": i, "user_id": rnd.randint(1, 50), "sembol": rnd.choice(semboller),
+        "tip": rnd.choice(TIPLER), "hedef_deger": f"{rnd.uniform(0, 200):.2f}",
+    } for i in range(1, n + 1)]
+
+
+def test_kaba_kuvvetle_ayni_sonuc():
+    """Bisect sonuçları tüm uyarıları tek tek taramakla birebir aynı olmalı."""
+    uyarilar = _rastgele_uyarilar(3000)
+    indeks = UyariIndeksi()
+    indeks.yukle(uyarilar)
+
+    rnd = random.Random(1)
+    for _ in range(200):
+        sembol = rnd.choice(["THYAO", "AAPL", "BTC-USD", "YOK"])
+        fiyat = Decimal(f"{rnd.uniform(0, 200):.2f}")
+        rsi = Decimal(f"{rnd.uniform(0, 100):.2f}") if rnd.random() < 0.5 else None
+        bulunan = {u["id"] for u in indeks.tetiklenenler(sembol, fiyat, rsi)}
+        assert bulunan == _kaba_kuvvet(uyarilar, sembol, fiyat, rsi)
+
+
+def test_esik_sinirinda_tetiklenir():
+    """Eşik değerine tam eşit fiyat hem üst hem alt uyarıyı tetiklemeli (>= / <=)."""
+    indeks = UyariIndeksi()
+    indeks.yukle([
+        {"id": 1, "user_id": 1, "sembol": "thyao", "tip": "fiyat_ust", "hedef_deger": "50,00"},
+        {"id": 2, "user_id": 1, "sembol": "THYAO", "tip": "fiyat_alt", "hedef_deger": "50"},
+        {"id": 3, "user_id": 1, "sembol": "THYAO", "tip": "fiyat_ust", "hedef_deger": "50.01"},
+    ])
+    assert {u["id"] for u in indeks.tetiklenenler("THYAO", Decimal("50"))} == {1, 2}
+
+
+def test_ekle_sil_senkron():
+    indeks = UyariIndeksi()
+    indeks.yukle([])
+    indeks.ekle({"id": 10, "user_id": 5, "sembol": "AAPL", "tip": "fiyat_ust", "hedef_deger": "100"})
+    indeks.ekle({"id": 11, "user_id": 5, "sembol": "AAPL", "tip": "fiyat_ust", "hedef_deger": "100"})
+    assert len(indeks.tetiklenenler("AAPL", Decimal("150"))) == 2
+
+    # Başka kullanıcının uyarısı silinemez
+    assert indeks.sil(10, user_id=99) is False
+    assert indeks.sil(10, user_id=5) is True
+    assert [u["id"] for u in indeks.tetiklenenler("AAPL", Decimal("150"))] == [11]
+
+    assert indeks.sil(11) is True
+    assert indeks.semboller() == []
+    assert len(indeks) == 0
+
+
+def test_gecersiz_kayitlar_atlanir():
+    indeks = UyariIndeksi()
+    indeks.yukle([
+        {"id": 1, "user_id": 1, "sembol": "A", "tip": "bilinmeyen", "hedef_deger": "1"},
+        {"id": 2, "user_id": 1, "sembol": "A", "tip": "fiyat_ust", "hedef_deger": None},
+        {"id": 3, "user_id": 1, "sembol": "A", "tip": "rsi_alt", "hedef_deger": "30"},
+    ])
+    assert len(indeks) == 1
+    assert indeks.rsi_var_mi("A") is True
+
+
+def test_100k_uyari_tick_maliyeti():
+    """100k uyarıda bir tick değerlendirmesi milisaniyenin altında kalmalı."""
+    rnd = random.Random(3)
+    # Gerçekçi dağılım: üst eşikler fiyatın üstünde, alt eşikler altında bekler
+    uyarilar = []
+    for i in range(1, 100_001):
+        tip = rnd.choice(TIPLER)
+        aralik = (100.5, 200) if tip.endswith("ust") else (0, 99.5)
+        if tip.startswith("rsi"):
+            aralik = (70, 100) if tip.endswith("ust") else (0, 30)
+        uyarilar.append({"id": i, "user_id": 1, "sembol": "THYAO", "tip": tip,
+                         "hedef_deger": f"{rnd.uniform(*aralik):.2f}"})
+    indeks = UyariIndeksi()
+    indeks.yukle(uyarilar)
+
+    # Fiyat 100.60'a çıkınca yalnızca 100.50–100.60 arasındaki birkaç üst uyarı kesişir
+    tetiklenen = indeks.tetiklenenler("THYAO", Decimal("100.60"), Decimal("50"))
+    assert tetiklenen == [u for u in tetiklenen if u["tip"] == "fiyat_ust"]
+    assert 0 < len(tetiklenen) < 100
+
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        indeks.tetiklenenler("THYAO", Decimal("100.60"), Decimal("50"))
+    ortalama_ms = (time.perf_counter() - t0)  # toplam saniye / 1000 tick × 1000 → ms
+    assert ortalama_ms < 1.0, f"Tick başına {ortalama_ms:.3f} ms"
+
+
+@pytest.mark.asyncio
+async def test_db_yazmalari_indeksi_gunceller(tmp_path):
+    """db.uyari_ekle / uyari_sil / uyari_indeksini_yukle indeksi senkron tutmalı."""
+    import db as db_module
+    from uyari_indeksi import uyari_indeksi
+
+    await db_module.DBPool.close()
+    db_module.DBPool._db = None
+    db_module.settings.DB_PATH = str(tmp_path / "test.db")
+    await db_module.db_init()
+    await db_module.uyari_indeksini_yukle()
+    assert len(uyari_indeksi) == 0
+
+    uid = await db_module.uyari_ekle(7, "thyao", "fiyat_ust", "50")
+    assert uyari_indeksi.getir(uid)["sembol"] == "THYAO"
+    assert [u["id"] for u in uyari_indeksi.tetiklenenler("THYAO", Decimal("60"))] == [uid]
+
+    await db_module.uyari_sil(uid, user_id=8)   # yetkisiz → DB'de de indekste de kalır
+    assert uyari_indeksi.getir(uid) is not None
+    await db_module.uyari_sil(uid, user_id=7)
+    assert uyari_indeksi.getir(uid) is None
+
+    # Yeniden yükleme DB'deki durumu birebir yansıtmalı
+    await db_module.uyari_ekle(7, "AAPL", "rsi_alt", "30")
+    uyari_indeksi.yukle([])
+    await db_module.uyari_indeksini_yukle()
+    assert uyari_indeksi.semboller() == ["AAPL"]
+
+    await db_module.close_db()
@@ -0,0 +1,235 @@
+"""
+tests/test_websocket_motoru.py — Akış merkezi (BinanceStreamHub) testleri.
+Binance yerine yerel bir aiohttp WebSocket sunucusu kullanılır.
+"""
+import os
+import sys
+import json
+import asyncio
+import pytest
+from aiohttp import web
+
+os.environ["BOT_TOKEN"] = "1234567890:TEST_TOKEN"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_motoru import BinanceStreamHub, binance_sembolu, ticker_stream
+
+
+class SahteBinance:
+    """SUBSCRIBE/UNSUBSCRIBE isteklerini kaydeden, istenince combined mesaj yayınlayan sunucu."""
+
+    def __init__(self):
+        self.baglantilar = []      # açık ws'ler
+        self.istekler = []         # (bağlantı sırası, metod, params)
+        self.abonelikler = {}      # ws → set(stream)
+        self.baglanti_sayisi = 0
+
+    async def handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        no = self.baglanti_sayisi
+        self.baglanti_sayisi += 1
+        self.baglantilar.append(ws)
+        self.abonelikler[ws] = set()
+        try:
+            async for msg in ws:
+                istek = json.loads(msg.data)
+                self.istekler.append((no, istek["method"], istek["params"]))
+                if istek["method"] == "SUBSCRIBE":
+                    self.abonelikler[ws].update(istek["params"])
+                else:
+                    self.abonelikler[ws].difference_update(istek["params"])
+                await ws.send_str(json.dumps({"result": None, "id": istek["id"]}))
+        finally:
+            self.baglantilar.remove(ws)
+            self.abonelikler.pop(ws, None)
+        return ws
+
+    async def yayinla(self, stream, veri):
+        for ws, streamler in list(self.abonelikler.items()):
+            if stream in streamler:
+                await ws.send_str(json.dumps({"stream": stream, "data": veri}))
+
+    async def hepsini_kopar(self):
+        for ws in list(self.baglantilar):
+            await ws.close()
+
+
+async def _bekle(kosul, sure=3.0):
+    sinir = asyncio.get_running_loop().time() + sure
+    while not kosul():
+        if asyncio.get_running_loop().time() > sinir:
+            raise AssertionError("koşul zamanında sağlanmadı")
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def sunucu():
+    sahte = SahteBinance()
+    app = web.Application()
+    app.router.add_get("/stream", sahte.handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    sahte.url = f"ws://127.0.0.1:{port}/stream"
+    yield sahte
+    await runner.cleanup()
+
+
+def _hub(sunucu, **kw):
+    kw.setdefault("backoff_taban", 0.05)
+    kw.setdefault("backoff_tavan", 0.2)
+    return BinanceStreamHub(sunucu.url, mesaj_araligi=0, **kw)
+
+
+@pytest.mark.asyncio
+async def test_dinamik_abonelik_tek_baglanti(sunucu):
+    """Sembol ekleme/çıkarma aynı bağlantı üzerinden SUBSCRIBE/UNSUBSCRIBE ile yapılmalı."""
+    hub = _hub(sunucu)
+    gelen = []
+
+    async def cb(stream, veri):
+        gelen.append((stream, veri["c"]))
+
+    abone = hub.abone(cb)
+    try:
+        await abone.ekle(ticker_stream("BTCUSDT"))
+        await _bekle(lambda: hub.parcalar[0].bagli and sunucu.abonelikler)
+        await abone.ekle(ticker_stream("ETHUSDT"), ticker_stream("BTCUSDT"))
+        await _bekle(lambda: any("ethusdt@ticker" in s for s in sunucu.abonelikler.values()))
+
+        await sunucu.yayinla("ethusdt@ticker", {"s": "ETHUSDT", "c": "3000"})
+        await _bekle(lambda: gelen)
+        assert gelen == [("ethusdt@ticker", "3000")]
+        assert hub.taze_mi("ethusdt@ticker", 5) and not hub.taze_mi("btcusdt@ticker", 5)
+
+        await abone.cikar("btcusdt@ticker")
+        await _bekle(lambda: ("btcusdt@ticker" not in next(iter(sunucu.abonelikler.values()))))
+        assert sunucu.baglanti_sayisi == 1
+        assert sunucu.istekler[-1][1:] == ("UNSUBSCRIBE", ["btcusdt@ticker"])
+        assert hub.stream_sayisi == 1
+    finally:
+        await abone.kapat()
+        await hub.kapat()
+
+
+@pytest.mark.asyncio
+async def test_akis_limiti_asilinca_yeni_baglanti(sunucu):
+    """Bağlantı başına stream limiti aşılınca ikinci bir bağlantı (parça) açılmalı."""
+    hub = _hub(sunucu, akis_limiti=2)
+
+    async def cb(stream, veri):
+        pass
+
+    abone = hub.abone(cb)
+    try:
+        await abone.ekle(*[ticker_stream(s) for s in ("AUSDT", "BUSDT", "CUSDT")])
+        await _bekle(lambda: sum(len(s) for s in sunucu.abonelikler.values()) == 3)
+        assert len(hub.parcalar) == 2
+        assert sorted(len(s) for s in sunucu.abonelikler.values()) == [1, 2]
+    finally:
+        await abone.kapat()
+        await hub.kapat()
+
+
+@pytest.mark.asyncio
+async def test_bosalan_parca_baglantisi_kapanir(sunucu):
+    """Son stream'i çıkarılan parçanın bağlantısı kapatılmalı, diğer parça etkilenmemeli."""
+    hub = _hub(sunucu, akis_limiti=2)
+
+    async def cb(stream, veri):
+        pass
+
+    abone = hub.abone(cb)
+    try:
+        await abone.ekle(*[ticker_stream(s) for s in ("AUSDT", "BUSDT", "CUSDT")])
+        await _bekle(lambda: len(sunucu.baglantilar) == 2
+                     and sum(len(s) for s in sunucu.abonelikler.values()) == 3)
+
+        await abone.cikar("cusdt@ticker")
+        await _bekle(lambda: len(sunucu.baglantilar) == 1)
+        assert len(hub.parcalar) == 1
+        assert hub.parcalar[0].streamler == {"ausdt@ticker", "busdt@ticker"}
+
+        # Yeniden eklenen stream yeni numaralı bir parçada açılır
+        await abone.ekle("dusdt@ticker")
+        await _bekle(lambda: len(sunucu.baglantilar) == 2)
+        assert [p.no for p in hub.parcalar] == [0, 2]
+    finally:
+        await abone.kapat()
+        await hub.kapat()
+
+
+def test_yalnizca_kripto_kotasyonlari_eslenir():
+    """Tireli hisse sembolleri (BRK-B) var olmayan bir stream'e eşlenmemeli."""
+    assert binance_sembolu("BTC-USD") == "BTCUSDT"
+    assert binance_sembolu("ETH-BTC") == "ETHBTC"
+    assert binance_sembolu("BRK-B") is None
+    assert binance_sembolu("BF-B") is None
+
+
+@pytest.mark.asyncio
+async def test_yavas_tuketici_hizliyi_bekletmez(sunucu):
+    """Yavaş callback akışı durdurmamalı: ara değerleri birleştirir, hızlı abone son değeri hemen alır."""
+    hub = _hub(sunucu)
+    hizli, yavas = [], []
+    devam = asyncio.Event()
+
+    async def hizli_cb(stream, veri):
+        hizli.append(veri["c"])
+
+    async def yavas_cb(stream, veri):
+        yavas.append(veri["c"])
+        await devam.wait()
+
+    a1, a2 = hub.abone(hizli_cb), hub.abone(yavas_cb)
+    try:
+        await a1.ekle("btcusdt@ticker")
+        await a2.ekle("btcusdt@ticker")
+        await _bekle(lambda: sunucu.abonelikler and hub.parcalar[0].bagli)
+
+        for i in range(50):
+            await sunucu.yayinla("btcusdt@ticker", {"s": "BTCUSDT", "c": str(i)})
+        # Yavaş abone ilk mesajda takılıyken hızlı abone son değere ulaşmalı
+        await _bekle(lambda: hizli and hizli[-1] == "49")
+        assert len(yavas) == 1                      # hâlâ ilk callback içinde
+        assert hizli == sorted(hizli, key=int)     # sıra korunur
+
+        devam.set()
+        await _bekle(lambda: yavas and yavas[-1] == "49")
+        assert len(yavas) < 50                      # ara değerler atlandı
+        assert a2.birlestirilen == 50 - len(yavas)
+    finally:
+        devam.set()
+        await a1.kapat()
+        await a2.kapat()
+        await hub.kapat()
+
+
+@pytest.mark.asyncio
+async def test_kopunca_yeniden_baglanip_abone_olur(sunucu):
+    """Sunucu bağlantıyı kapatırsa geri çekilmeyle yeniden bağlanıp stream'lere yeniden abone olmalı."""
+    hub = _hub(sunucu)
+    gelen = []
+
+    async def cb(stream, veri):
+        gelen.append(veri["c"])
+
+    abone = hub.abone(cb)
+    try:
+        await abone.ekle("btcusdt@ticker", "ethusdt@ticker")
+        await _bekle(lambda: sunucu.abonelikler and hub.parcalar[0].bagli)
+
+        await sunucu.hepsini_kopar()
+        await _bekle(lambda: sunucu.baglanti_sayisi == 2 and hub.parcalar[0].bagli
+                     and any(len(s) == 2 for s in sunucu.abonelikler.values()))
+        assert hub.parcalar[0].baglanti_sayisi == 2
+        assert sunucu.istekler[-1] == (1, "SUBSCRIBE", ["btcusdt@ticker", "ethusdt@ticker"])
+
+        await sunucu.yayinla("btcusdt@ticker", {"s": "BTCUSDT", "c": "1"})
+        await _bekle(lambda: gelen == ["1"])
+    finally:
+        await abone.kapat()
+        await hub.kapat()
@@ -18,23 +18,30 @@ AKIŞ (Google Cloud SSH terminali için optimize):
   3. Botu başlatın:
      - nohup xvfb-run -a --server-args="-screen 0 1920x1080x24" python3 main.py > bot_log.txt 2>&1 &
 
-  Bot her grafik isteğinde bu cookie'leri Chrome'a enjekte eder.
+  Bot açılışta tarayıcı havuzunu ısıtırken bu cookie'leri her Chrome'a enjekte eder.
   ══════════════════════════════════════════════════════════════
 
 ✅ Cookie Enjeksiyonu: Kendi PC'nizden cookie al, sunucuya yapıştır.
 ✅ Otomatik Sembol Değiştirme: TradingView üzerinde sembol açar.
 ✅ Temiz Görüntü: UI elemanlarını gizleyerek sadece grafiği yakalar.
-✅ async close() — main.py shutdown ile uyumlu.
+✅ Tarayıcı Havuzu: N izole Chrome, checkout/checkin, K çekimde geri dönüşüm, sıra bildirimi.
+✅ Olay tabanlı bekleme: sabit sleep yerine canvas / legend / seri-yüklendi koşulları (adım başına zaman aşımı + süre metriği).
+✅ async kapat() — main.py shutdown ile uyumlu.
 ✅ Session doğrulama — Oturum açık mı kontrolü.
 """
 import os
+import re
 import time
 import asyncio
 import logging
-from typing import Optional, List, Dict
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, Awaitable, Callable
 
+from prometheus_client import Histogram
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support.ui import WebDriverWait
 import undetected_chromedriver as uc
 
 from config import settings
@@ -49,9 +56,18 @@ PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "selenium
 COOKIE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tv_cookies.txt")
 DEFAULT_CHART_URL = "https://www.tradingview.com/chart/"
 
-CHART_LOAD_WAIT = 8
-SYMBOL_CHANGE_WAIT = 8
-UI_HIDE_WAIT = 1
+# Adım başına üst sınırlar (saniye) — koşul sağlanınca beklemeden devam edilir
+SAYFA_HAZIR_TIMEOUT = 15     # document.readyState == complete
+GRAFIK_HAZIR_TIMEOUT = 20    # grafik canvas'ı DOM'da ve boyutlu
+ARAMA_HAZIR_TIMEOUT = 5      # sembol arama kutusu yazılan sembolü gösteriyor
+SEMBOL_HAZIR_TIMEOUT = 15    # legend / başlık yeni sembolü gösteriyor
+SERI_HAZIR_TIMEOUT = 8       # legend'in OHLC değerleri yeni serinin verisiyle doldu
+BEKLEME_ARALIGI = 0.1        # koşul yoklama aralığı
+
+TV_ADIM_SURESI = Histogram(
+    'tv_capture_step_seconds', 'TradingView çekim adımı bekleme süresi', ['adim', 'sonuc']
+)
+TV_CEKIM_SURESI = Histogram('tv_capture_seconds', 'TradingView toplam grafik çekim süresi')
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -157,7 +173,7 @@ def _cookie_enjekte(driver, cookies: List[Dict]) -> bool:
     try:
         # Önce TradingView domain'ine git (cookie domain eşleşmesi için zorunlu)
         driver.get("https://www.tradingview.com/")
-        time.sleep(3)
+        _bekle(driver, _sayfa_hazir, SAYFA_HAZIR_TIMEOUT, "sayfa")
 
         driver.delete_all_cookies()
 
@@ -178,74 +194,392 @@ def _cookie_enjekte(driver, cookies: List[Dict]) -> bool:
 
 
 # ═══════════════════════════════════════════════════════════════
-# TARAYICI YÖNETİMİ (Singleton)
+# TARAYICI HAVUZU (Browser Pool)
 # ═══════════════════════════════════════════════════════════════
+# Her slot kendi profil klasörüne sahip izole bir Chrome örneğidir.
+# Bir WebDriver oturumu aynı anda tek bir istek tarafından sürülebildiği için
+# (sekme değişimi de oturum genelindedir) eşzamanlı grafikler ayrı slotlarda çekilir:
+# bir kullanıcının sembol değişikliği başka birinin ekran görüntüsüne karışmaz.
+
+def _chrome_olustur(slot_no: int, headless: bool = True):
+    """Slot'a özel profil klasörüyle yeni bir Chrome WebDriver oluşturur."""
+    profil = os.path.join(PROFILE_DIR, f"slot_{slot_no}")
+    os.makedirs(profil, exist_ok=True)
+
+    options = uc.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+
+    options.add_argument(f"--user-data-dir={profil}")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+
+    driver = uc.Chrome(options=options, version_main=None)
+    driver.set_page_load_timeout(60)
+    # Örtük bekleme kapalı: tüm beklemeler açık koşullarla (_bekle) yapılır,
+    # aksi halde her boş find_elements çağrısı sessizce saniyeler yer.
+    driver.implicitly_wait(0)
+    log.info(f"✅ Selenium WebDriver başlatıldı (slot={slot_no}, headless={headless}).")
+    return driver
+
+
+class TVSlot:
+    """Havuzdaki tek bir tarayıcı: kendi driver'ı, kendi oturumu ve çekim sayacı."""
+
+    def __init__(self, no: int, fabrika: Callable[[int], Any] = None):
+        self.no = no
+        self.fabrika = fabrika or _chrome_olustur
+        self.driver = None
+        self.hazir = False      # Cookie enjekte edildi + grafik açık + oturum doğrulandı
+        self.bozuk = False      # Hata aldı → iadede geri dönüştürülür
+        self.cekim_sayisi = 0
+        self.is_ = None         # Driver'ı süren executor işi (iade bitişine ertelenir)
+
+    def kapat(self):
+        try:
+            if self.driver:
+                self.driver.quit()
+        except Exception:
+            pass
+        self.driver = None
+        self.hazir = False
 
-class TVBrowser:
-    """Singleton Chrome WebDriver yöneticisi."""
-    _driver = None
-    _cookies_injected = False
 
-    @classmethod
-    def get_driver(cls, headless: bool = True):
-        """Chrome WebDriver döndürür (yoksa oluşturur)."""
-        if cls._driver is not None:
-            try:
-                _ = cls._driver.current_url
-                return cls._driver
-            except Exception:
-                log.warning("⚠️ WebDriver yanıt vermiyor, yeniden oluşturuluyor...")
-                cls._force_quit()
+def _slot_isit(slot: TVSlot) -> bool:
+    """(Executor) Driver oluşturur, cookie enjekte eder ve grafik sayfasını açar."""
+    try:
+        if slot.driver is None:
+            slot.driver = slot.fabrika(slot.no)
+        driver = slot.driver
 
-        os.makedirs(PROFILE_DIR, exist_ok=True)
+        cookies = _cookie_dosyasi_oku()
+        if cookies:
+            _cookie_enjekte(driver, cookies)
+        else:
+            log.warning("⚠️ Cookie bulunamadı, oturumsuz devam ediliyor.")
 
-        options = uc.ChromeOptions()
-        if headless:
-            options.add_argument("--headless=new")
+        driver.get(settings.TRADINGVIEW_CHART_URL or DEFAULT_CHART_URL)
+        _bekle(driver, _grafik_hazir, GRAFIK_HAZIR_TIMEOUT, "grafik")
+        _seri_yuklendi_bekle(driver)
 
-        options.add_argument(f"--user-data-dir={PROFILE_DIR}")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1920,1080")
-        options.add_argument("--disable-extensions")
-        options.add_argument("--disable-blink-features=AutomationControlled")
+        if not _oturum_acik_mi(driver):
+            log.warning(
+                "⚠️ TradingView oturumu açık değil!\n"
+                "   Cookie'leri güncelleyin:\n"
+                "   1. PC'nizde Chrome → TradingView giriş yapın\n"
+                "   2. F12 → Console → copy(document.cookie)\n"
+                f"   3. nano {COOKIE_FILE} → yapıştırın → kaydedin\n"
+                "   4. Botu yeniden başlatın"
+            )
+            slot.hazir = False
+            return False
 
-        try:
-            cls._driver = uc.Chrome(options=options, version_main=None)
-            cls._driver.set_page_load_timeout(60)
-            cls._driver.implicitly_wait(5)
-            cls._cookies_injected = False
-            log.info(f"✅ Selenium WebDriver başlatıldı (headless={headless}).")
-            return cls._driver
-        except Exception as e:
-            log.error(f"❌ WebDriver başlatılamadı: {e}")
-            cls._driver = None
-            return None
+        _ui_gizle(driver)
+        slot.hazir = True
+        return True
+    except Exception as e:
+        log.error(f"❌ Slot {slot.no} ısıtılamadı: {e}")
+        slot.kapat()
+        return False
 
-    @classmethod
-    def _force_quit(cls):
-        try:
-            if cls._driver:
-                cls._driver.quit()
-        except Exception:
-            pass
-        cls._driver = None
-        cls._cookies_injected = False
 
-    @classmethod
-    async def close(cls):
-        """Driver'ı asenkron olarak kapat (main.py shutdown uyumlu)."""
-        if cls._driver:
-            try:
+class TVBrowserPool:
+    """
+    TradingView tarayıcı havuzu — checkout/checkin API'si.
+
+        async with tv_havuzu.checkout(sira_bildir) as slot:
+            ...  # slot.driver yalnızca bu isteğe aittir
+
+    - Başlangıçta N slot önceden ısıtılır (cookie + grafik sayfası).
+    - K çekimden sonra (veya hata alınca) slot arka planda yeniden oluşturulur.
+    - Boş slot yoksa istek FIFO kuyrukta bekler; sira_bildir(n) ile sıra bildirilir.
+    """
+
+    def __init__(self, boyut: int = 2, geri_donusum: int = 50, surucu_fabrikasi=None):
+        self.boyut = max(1, boyut)
+        self.geri_donusum = max(1, geri_donusum)
+        self._fabrika = surucu_fabrikasi or _chrome_olustur
+        self._slotlar: List[TVSlot] = []
+        self._bos: Optional[asyncio.Queue] = None
+        self._kilit: Optional[asyncio.Lock] = None
+        self._bekleyen = 0
+        self._gorevler: set = set()
+
+    @property
+    def bekleyen(self) -> int:
+        """Kuyrukta slot bekleyen istek sayısı."""
+        return self._bekleyen
+
+    async def baslat(self, isit: bool = True):
+        """Slotları oluşturur; isit=True ise hepsini paralel olarak ısıtır."""
+        if self._kilit is None:
+            self._kilit = asyncio.Lock()
+        async with self._kilit:
+            if self._bos is not None:
+                return
+            self._bos = asyncio.Queue()
+            self._slotlar = [TVSlot(i, self._fabrika) for i in range(self.boyut)]
+            if isit:
                 loop = asyncio.get_running_loop()
-                await loop.run_in_executor(None, cls._driver.quit)
-                log.info("🔌 WebDriver kapatıldı.")
-            except Exception as e:
-                log.warning(f"WebDriver kapatma hatası: {e}")
+                await asyncio.gather(*[
+                    loop.run_in_executor(None, _slot_isit, slot)
+                    for slot in self._slotlar
+                ], return_exceptions=True)
+            for slot in self._slotlar:
+                self._bos.put_nowait(slot)
+            hazir = sum(1 for s in self._slotlar if s.hazir)
+            log.info(f"🧰 TradingView havuzu hazır: {hazir}/{self.boyut} slot ısıtıldı.")
+
+    @asynccontextmanager
+    async def checkout(self, sira_bildir: Optional[Callable[[int], Awaitable[Any]]] = None):
+        """Boş bir slot alır (yoksa kuyrukta bekler), iş bitince iade eder."""
+        await self.baslat(isit=False)
+        if self._bos.empty():
+            self._bekleyen += 1
+            try:
+                if sira_bildir:
+                    try:
+                        await sira_bildir(self._bekleyen)
+                    except Exception as e:
+                        log.debug(f"Sıra bildirimi gönderilemedi: {e}")
+                slot = await self._bos.get()
             finally:
-                cls._driver = None
-                cls._cookies_injected = False
+                self._bekleyen -= 1
+        else:
+            slot = self._bos.get_nowait()
+
+        try:
+            yield slot
+        finally:
+            is_, slot.is_ = slot.is_, None
+            if is_ is not None and not is_.done():
+                # Çağıran iptal edildi ama executor driver'ı hâlâ sürüyor:
+                # slot, iş bitmeden başka bir isteğe verilmez.
+                is_.add_done_callback(lambda f: self._is_bitti(slot, f))
+            else:
+                self._checkin(slot)
+
+    async def calistir(self, slot: TVSlot, fn: Callable[..., Any], *args):
+        """
+        fn(slot, *args)'ı executor'da çalıştırır. Çağıran iptal edilirse iş
+        arka planda tamamlanır; slot ancak o zaman iade edilir.
+        """
+        loop = asyncio.get_running_loop()
+        slot.is_ = loop.run_in_executor(None, fn, slot, *args)
+        try:
+            return await asyncio.shield(slot.is_)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            slot.bozuk = True
+            raise
+
+    def _is_bitti(self, slot: TVSlot, is_: asyncio.Future):
+        """Ertelenmiş iade: sahibi iptal edilmiş executor işi bittiğinde çağrılır."""
+        if is_.cancelled() or is_.exception() is not None:
+            slot.bozuk = True
+        self._checkin(slot)
+
+    def _checkin(self, slot: TVSlot):
+        """Slotu iade eder; sağlıksızsa veya K çekimi aştıysa arka planda yeniler."""
+        if self._bos is None or slot not in self._slotlar:
+            # Havuz bu arada kapatıldı: slot sahipsiz kalmasın, driver kapatılır
+            asyncio.get_running_loop().run_in_executor(None, slot.kapat)
+            return
+        if slot.bozuk or slot.cekim_sayisi >= self.geri_donusum:
+            neden = "hata" if slot.bozuk else f"{slot.cekim_sayisi} çekim"
+            log.info(f"♻️ TradingView slot {slot.no} geri dönüştürülüyor ({neden}).")
+            gorev = asyncio.create_task(self._geri_donustur(slot))
+            self._gorevler.add(gorev)
+            gorev.add_done_callback(self._gorevler.discard)
+        else:
+            self._bos.put_nowait(slot)
+
+    async def _geri_donustur(self, slot: TVSlot):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, slot.kapat)
+            slot.bozuk = False
+            slot.cekim_sayisi = 0
+            await loop.run_in_executor(None, _slot_isit, slot)
+        except Exception as e:
+            log.warning(f"Slot {slot.no} yeniden ısıtılamadı (ilk istekte denenecek): {e}")
+        finally:
+            if self._bos is not None:
+                self._bos.put_nowait(slot)
+
+    async def kapat(self):
+        """Tüm slotları kapatır (main.py shutdown uyumlu)."""
+        for gorev in list(self._gorevler):
+            gorev.cancel()
+        if not self._slotlar:
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(None, slot.kapat) for slot in self._slotlar
+        ], return_exceptions=True)
+        self._slotlar = []
+        self._bos = None
+        log.info("🔌 TradingView tarayıcı havuzu kapatıldı.")
+
+
+# Global havuz örneği
+tv_havuzu = TVBrowserPool(
+    boyut=settings.TV_POOL_SIZE,
+    geri_donusum=settings.TV_RECYCLE_AFTER,
+)
+
+
+async def tv_havuzu_isit():
+    """Cookie dosyası varsa havuzu bot açılışında önceden ısıtır."""
+    if not os.path.exists(COOKIE_FILE):
+        log.info("ℹ️ TradingView cookie dosyası yok, havuz ilk istekte oluşturulacak.")
+        return
+    await tv_havuzu.baslat(isit=True)
+
+# ═══════════════════════════════════════════════════════════════
+# HAZIR OLMA KOŞULLARI (Readiness)
+# ═══════════════════════════════════════════════════════════════
+# Sabit time.sleep yerine sayfanın gerçekten hazır olduğunu gösteren koşullar
+# yoklanır: hızlı yüklenen grafik beklemeden çekilir, yavaş olana ise adım
+# başına zaman aşımı kadar süre tanınır. Her adımın süresi metriğe yazılır.
+
+_JS_SAYFA_HAZIR = "return document.readyState === 'complete';"
+
+_JS_GRAFIK_HAZIR = """
+    if (document.readyState !== 'complete') return false;
+    var c = document.querySelector(
+        '.chart-markup-table canvas, .chart-container canvas, canvas[data-name="pane-canvas"]');
+    return !!c && c.width > 0 && c.height > 0;
+"""
+
+_JS_LEGEND_METNI = """
+    var parcalar = [document.title || ''];
+    document.querySelectorAll('[data-name="legend-source-title"]').forEach(function(el) { parcalar.push(el.textContent || ''); });
+    var btn = document.querySelector('#header-toolbar-symbol-search');
+    if (btn) parcalar.push(btn.textContent || '');
+    return parcalar.join(' | ');
+"""
+
+# Seri verisi WebSocket üzerinden geldiği için ağ trafiği (Resource Timing)
+# yükleme sinyali olamaz; legend'deki OHLC değerlerinin dolması kullanılır.
+_JS_SERI_DEGERLERI = """
+    var d = [];
+    document.querySelectorAll(
+        '[data-name="legend-series-item"] [class*="valueValue"]'
+    ).forEach(function(el) { d.push((el.textContent || '').trim()); });
+    return d;
+"""
+
+# Veri gelmeden legend'de görünen yer tutucular
+_BOS_DEGERLER = {"", "∅", "—", "-", "N/A"}
+
+_JS_ARAMA_DEGERI = """
+    var i = document.querySelector('input[data-role="search"]');
+    return i ? (i.value || '') : null;
+"""
+
+_JS_IKI_KARE = """
+    var bitti = arguments[arguments.length - 1];
+    requestAnimationFrame(function() { requestAnimationFrame(function() { bitti(true); }); });
+"""
+
+
+def _bekle(driver, kosul: Callable[[Any], Any], timeout: float, adim: str) -> bool:
+    """
+    kosul(driver) doğru dönene kadar en fazla timeout saniye yoklar.
+    Zaman aşımında False döner (çekim yine de denenir); süre metriğe yazılır.
+    """
+    t0 = time.perf_counter()
+    sonuc = "ok"
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=BEKLEME_ARALIGI).until(kosul)
+        return True
+    except TimeoutException:
+        sonuc = "timeout"
+        log.warning(f"⏱️ TradingView '{adim}' adımı {timeout}s içinde hazır olmadı.")
+        return False
+    finally:
+        gecen = time.perf_counter() - t0
+        TV_ADIM_SURESI.labels(adim=adim, sonuc=sonuc).observe(gecen)
+        log.debug(f"TradingView '{adim}' adımı: {gecen:.2f}s ({sonuc})")
+
+
+def _sayfa_hazir(driver) -> bool:
+    return bool(driver.execute_script(_JS_SAYFA_HAZIR))
+
+
+def _grafik_hazir(driver) -> bool:
+    """Grafik canvas'ı çizilmiş mi?"""
+    return bool(driver.execute_script(_JS_GRAFIK_HAZIR))
+
+
+def _sembol_kodu(tv_symbol: str) -> str:
+    """'BIST:THYAO' → 'THYAO' (legend/başlıkta borsa öneki görünmeyebilir)."""
+    return tv_symbol.split(":")[-1].upper()
+
+
+def _legend_eslesiyor(tv_symbol: str) -> Callable[[Any], bool]:
+    """
+    Legend veya sayfa başlığı istenen sembolü gösterdiğinde doğru dönen koşul.
+    Kod tam kelime olarak aranır: 'THY' beklenirken 'THYAO' eşleşmez.
+    """
+    kod = _sembol_kodu(tv_symbol)
+
+    def _kosul(driver) -> bool:
+        metin = (driver.execute_script(_JS_LEGEND_METNI) or "").upper()
+        return kod in re.split(r"[^A-Z0-9!._&]+", metin)
+    return _kosul
+
+
+def _arama_degeri_eslesiyor(tv_symbol: str) -> Callable[[Any], bool]:
+    """Sembol arama kutusu yazılan sembolü içerdiğinde doğru dönen koşul."""
+    kod = _sembol_kodu(tv_symbol)
+
+    def _kosul(driver) -> bool:
+        deger = driver.execute_script(_JS_ARAMA_DEGERI)
+        return deger is not None and kod in deger.upper()
+    return _kosul
+
+
+def _seri_degerleri(driver) -> tuple:
+    """Legend'deki OHLC değer metinleri (okunamazsa boş)."""
+    try:
+        return tuple(driver.execute_script(_JS_SERI_DEGERLERI) or ())
+    except Exception:
+        return ()
+
+
+def _seri_yuklendi_bekle(driver, onceki: tuple = (), timeout: float = None) -> bool:
+    """
+    Seri verisi yüklendi mi? Legend'in OHLC değerleri dolu olmalı ve sembol
+    değişiminden önceki değerlerden (onceki) farklı olmalı — aynı sekmede
+    kalan eski serinin değerleri "yüklendi" sayılmaz.
+    """
+    timeout = SERI_HAZIR_TIMEOUT if timeout is None else timeout
+    onceki = tuple(onceki)
+
+    def _kosul(drv) -> bool:
+        degerler = _seri_degerleri(drv)
+        if not degerler or any(d.upper() in _BOS_DEGERLER for d in degerler):
+            return False
+        return degerler != onceki
+
+    return _bekle(driver, _kosul, timeout, "veri")
+
+
+def _yeniden_cizim_bekle(driver):
+    """UI gizlendikten sonra tarayıcının en az bir kare çizmesini bekler."""
+    t0 = time.perf_counter()
+    try:
+        driver.execute_async_script(_JS_IKI_KARE)
+    except Exception as e:
+        log.debug(f"Yeniden çizim beklenemedi: {e}")
+    TV_ADIM_SURESI.labels(adim="cizim", sonuc="ok").observe(time.perf_counter() - t0)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -290,83 +624,59 @@ def _oturum_acik_mi(driver) -> bool:
 # GRAFİK ÇEKME (ANA FONKSİYON)
 # ═══════════════════════════════════════════════════════════════
 
-async def tv_grafik_cek(sembol: str, output_path: str) -> bool:
-    """TradingView üzerinden grafik ekran görüntüsü alır."""
-    loop = asyncio.get_running_loop()
+def _grafik_cek_slot(slot: TVSlot, tv_symbol: str, output_path: str) -> bool:
+    """(Executor) Checkout edilmiş slotta sembolü değiştirip ekran görüntüsü alır."""
+    if not slot.hazir and not _slot_isit(slot):
+        slot.bozuk = True
+        return False
 
+    t0 = time.perf_counter()
+    driver = slot.driver
+    # Sekme zaten bu sembolü gösteriyorsa mevcut değerler de geçerlidir
     try:
-        driver = await loop.run_in_executor(
-            None, lambda: TVBrowser.get_driver(headless=True)
-        )
-        if not driver:
-            log.error("❌ WebDriver oluşturulamadı.")
-            return False
-
-        # Cookie enjeksiyonu (sadece ilk seferde)
-        if not TVBrowser._cookies_injected:
-            cookies = _cookie_dosyasi_oku()
-            if cookies:
-                injected = await loop.run_in_executor(
-                    None, lambda: _cookie_enjekte(driver, cookies)
-                )
-                if injected:
-                    TVBrowser._cookies_injected = True
-                    log.info("🍪 Cookie'ler başarıyla enjekte edildi.")
-            else:
-                log.warning("⚠️ Cookie bulunamadı, oturumsuz devam ediliyor.")
-
-        tv_symbol = _tv_sembol_formatla(sembol)
-        chart_url = settings.TRADINGVIEW_CHART_URL or DEFAULT_CHART_URL
-
-        log.info(f"📊 Grafik açılıyor: {tv_symbol}")
-
-        await loop.run_in_executor(None, lambda: driver.get(chart_url))
-        await asyncio.sleep(CHART_LOAD_WAIT)
-
-        # Oturum kontrolü
-        oturum_ok = await loop.run_in_executor(
-            None, lambda: _oturum_acik_mi(driver)
-        )
-        if not oturum_ok:
-            log.warning(
-                "⚠️ TradingView oturumu açık değil!\n"
-                "   Cookie'leri güncelleyin:\n"
-                "   1. PC'nizde Chrome → TradingView giriş yapın\n"
-                "   2. F12 → Console → copy(document.cookie)\n"
-                f"   3. nano {COOKIE_FILE} → yapıştırın → kaydedin\n"
-                "   4. Botu yeniden başlatın"
-            )
-            TVBrowser._cookies_injected = False
-            return False
-
-        # Sembol değiştir
-        success = await loop.run_in_executor(
-            None, lambda: _sembol_degistir(driver, tv_symbol)
-        )
-        if not success:
-            log.warning(f"⚠️ Sembol değiştirilemedi: {tv_symbol}")
-
-        await asyncio.sleep(SYMBOL_CHANGE_WAIT)
-
-        # UI gizle
-        await loop.run_in_executor(None, lambda: _ui_gizle(driver))
-        await asyncio.sleep(UI_HIDE_WAIT)
-
-        # Screenshot al
-        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
-        await loop.run_in_executor(
-            None, lambda: driver.save_screenshot(output_path)
-        )
+        ayni_sembol = _legend_eslesiyor(tv_symbol)(driver)
+    except Exception:
+        ayni_sembol = False
+    onceki = () if ayni_sembol else _seri_degerleri(driver)
+    success = _sembol_degistir(driver, tv_symbol)
+    if not success:
+        log.warning(f"⚠️ Sembol değiştirilemedi: {tv_symbol}")
+
+    # Legend yeni sembole geçti mi, ardından seri verisi indi mi?
+    _bekle(driver, _legend_eslesiyor(tv_symbol), SEMBOL_HAZIR_TIMEOUT, "sembol")
+    _seri_yuklendi_bekle(driver, onceki)
+
+    # Sembol araması sonrası açılan paneller tekrar gizlenir
+    _ui_gizle(driver)
+    _yeniden_cizim_bekle(driver)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    driver.save_screenshot(output_path)
+    slot.cekim_sayisi += 1
+    TV_CEKIM_SURESI.observe(time.perf_counter() - t0)
+    return True
+
+
+async def tv_grafik_cek(sembol: str, output_path: str,
+                        sira_bildir: Optional[Callable[[int], Awaitable[Any]]] = None) -> bool:
+    """
+    TradingView üzerinden grafik ekran görüntüsü alır.
+    sira_bildir: Havuz doluysa kuyruk sırasıyla çağrılır (kullanıcıya geri bildirim için).
+    """
+    tv_symbol = _tv_sembol_formatla(sembol)
 
-        log.info(f"✅ Grafik kaydedildi: {output_path}")
-        return True
+    try:
+        async with tv_havuzu.checkout(sira_bildir) as slot:
+            log.info(f"📊 Grafik açılıyor: {tv_symbol} (slot {slot.no})")
+            ok = await tv_havuzu.calistir(slot, _grafik_cek_slot, tv_symbol, output_path)
+            if ok:
+                log.info(f"✅ Grafik kaydedildi: {output_path}")
+            return ok
 
     except Exception as e:
         log.error(f"❌ Grafik çekme hatası ({sembol}): {e}")
-        TVBrowser._force_quit()
         return False
 
-
 # ═══════════════════════════════════════════════════════════════
 # SEMBOL DEĞİŞTİRME
 # ═══════════════════════════════════════════════════════════════
@@ -376,12 +686,12 @@ def _sembol_degistir(driver, tv_symbol: str) -> bool:
     try:
         body = driver.find_element(By.TAG_NAME, "body")
         body.send_keys(Keys.ESCAPE)
-        time.sleep(0.5)
 
+        # Grafik üzerinde yazmak arama kutusunu açar; ENTER, kutu sembolü
+        # gösterdiği anda gönderilir (öneri listesi henüz dolmamış olabilir)
         body.send_keys(tv_symbol)
-        time.sleep(2)
+        _bekle(driver, _arama_degeri_eslesiyor(tv_symbol), ARAMA_HAZIR_TIMEOUT, "arama")
         body.send_keys(Keys.ENTER)
-        time.sleep(1)
 
         log.info(f"🔄 Sembol gönderildi: {tv_symbol}")
         return True
@@ -398,14 +708,16 @@ def _sembol_degistir(driver, tv_symbol: str) -> bool:
                 try:
                     btn = driver.find_element(By.CSS_SELECTOR, sel)
                     btn.click()
-                    time.sleep(1)
-                    search_input = driver.find_element(
+                    search_input = WebDriverWait(
+                        driver, ARAMA_HAZIR_TIMEOUT, poll_frequency=BEKLEME_ARALIGI
+                    ).until(lambda d: d.find_element(
                         By.CSS_SELECTOR,
                         'input[data-role="search"], input[type="text"]'
-                    )
+                    ))
                     search_input.clear()
                     search_input.send_keys(tv_symbol)
-                    time.sleep(2)
+                    _bekle(driver, _arama_degeri_eslesiyor(tv_symbol),
+                           ARAMA_HAZIR_TIMEOUT, "arama")
                     search_input.send_keys(Keys.ENTER)
                     log.info(f"🔄 Arama butonu ile gönderildi: {tv_symbol}")
                     return True
@@ -2,11 +2,11 @@
 from .inline_menus import build_analiz_menu, build_close_button
 from .i18n import get_text, MESSAGES
 from .pagination import paginate, format_paged_list, Page
-from .user_prefs import get_user_prefs, set_user_pref
+from .user_prefs import get_user_prefs, set_user_pref, get_user_lang, set_user_lang, get_user_currency
 
 __all__ = [
     "build_analiz_menu", "build_close_button",
     "get_text", "MESSAGES",
     "paginate", "format_paged_list", "Page",
-    "get_user_prefs", "set_user_pref",
+    "get_user_prefs", "set_user_pref", "get_user_lang", "set_user_lang", "get_user_currency",
 ]
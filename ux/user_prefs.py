@@ -1,7 +1,25 @@
-"""Kullanıcı tercihleri yönetimi — Basit versiyon."""
+"""
+Kullanıcı tercihleri yönetimi — kullanici_tercihleri tablosu önünde sınırlı LRU önbellek.
+
+Dil ve tercihler kullanıcı başına tek satırdır; bir kez okunan satır bellekte tutulur, bu
+yüzden mesaj başına kullanıcı bağlamı (dil, tercihler) için DB okuması yapılmaz:
+
+    ✅ Write-through: set_user_pref / set_user_lang önbelleği günceller ve satırı yazar;
+       dönüşte değişiklik commit edilmiştir (restart'ta kaybolmaz).
+    ✅ Sınırlı: en fazla USER_PREFS_CACHE_SIZE satır, en eski kullanılan düşer.
+    ✅ Başlangıçta son USER_PREFS_PRELOAD_DAYS günde görülen kullanıcılar tek sorguyla yüklenir.
+    ✅ son_gorulme yalnızca AKTIFLIK_YAZMA_ARALIGI'nda bir yazılır (mesaj başına yazma yok).
+"""
+import json
+import time
 import logging
+from collections import OrderedDict
 from typing import Optional, Dict, Any
 
+import db
+from config import settings
+from ux.i18n import MESSAGES
+
 log = logging.getLogger("finans_botu")
 
 # Varsayılan tercihler
@@ -14,34 +32,144 @@ DEFAULT_PREFS: Dict[str, Any] = {
 
 PREF_KEYS = list(DEFAULT_PREFS.keys())
 
-# Basit in-memory cache (bot restart'ında sıfırlanır)
-_user_prefs_cache: Dict[int, Dict[str, Any]] = {}
+AKTIFLIK_YAZMA_ARALIGI = 3600.0      # son_gorulme'nin DB'ye en sık yazılma aralığı (sn)
 
-async def get_user_prefs(user_id: int) -> Dict[str, Any]:
-    """Kullanıcı tercihlerini getir, yoksa varsayılan döndür."""
-    if user_id in _user_prefs_cache:
-        return _user_prefs_cache[user_id]
-    
-    # Şimdilik varsayılan döndür (ileri versiyonda DB'den okunabilir)
+
+def _satirdan(satir: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """DB satırı → önbellek kaydı (dil 'language' anahtarında)."""
     prefs = DEFAULT_PREFS.copy()
-    _user_prefs_cache[user_id] = prefs
-    return prefs
+    if satir is None:
+        return {"prefs": prefs, "son_gorulme": 0.0, "kayitli": False}
+    try:
+        kayitli = json.loads(satir["tercihler"] or "{}")
+    except ValueError:
+        log.warning(f"Bozuk tercih satırı (user {satir['user_id']}), varsayılanlar kullanılıyor.")
+        kayitli = {}
+    prefs.update({k: v for k, v in kayitli.items() if k in PREF_KEYS and k != "language"})
+    prefs["language"] = satir["lang"]
+    return {"prefs": prefs, "son_gorulme": satir["son_gorulme"] or 0.0, "kayitli": True}
+
+
+class TercihOnbellegi:
+    """kullanici_tercihleri satırları için LRU önbellek (OrderedDict, son kullanılan sonda)."""
+
+    def __init__(self, boyut: Optional[int] = None):
+        self._boyut = boyut
+        self._satirlar: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.isabet = 0
+        self.iskalama = 0
+
+    @property
+    def boyut(self) -> int:
+        return self._boyut or settings.USER_PREFS_CACHE_SIZE
+
+    def __len__(self) -> int:
+        return len(self._satirlar)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._satirlar
+
+    def _koy(self, user_id: int, kayit: Dict[str, Any]):
+        self._satirlar[user_id] = kayit
+        self._satirlar.move_to_end(user_id)
+        while len(self._satirlar) > self.boyut:
+            self._satirlar.popitem(last=False)
+
+    async def getir(self, user_id: int) -> Dict[str, Any]:
+        kayit = self._satirlar.get(user_id)
+        if kayit is not None:
+            self.isabet += 1
+            self._satirlar.move_to_end(user_id)
+            return kayit
+        self.iskalama += 1
+        kayit = _satirdan(await db.tercih_getir(user_id))
+        # Beklerken başka bir çağrı yazmış olabilir: önbellekteki daha yenidir
+        if user_id in self._satirlar:
+            return self._satirlar[user_id]
+        self._koy(user_id, kayit)
+        return kayit
+
+    async def yaz(self, user_id: int, **degisiklikler: Any):
+        """Tercihleri günceller; satır yazılınca döner."""
+        kayit = await self.getir(user_id)
+        kayit["prefs"].update(degisiklikler)
+        kayit["son_gorulme"] = time.time()
+        kayit["kayitli"] = True
+        prefs = kayit["prefs"]
+        tercihler = {k: v for k, v in prefs.items() if k != "language"}
+        # Satırın bu anki hâli yazılır; eşzamanlı iki güncellemede sonraki her ikisini de içerir
+        await db.tercih_kaydet(user_id, prefs["language"], json.dumps(tercihler), kayit["son_gorulme"])
+
+    async def gorundu(self, user_id: int) -> Dict[str, Any]:
+        """Kullanıcı etkinliği: son_gorulme bellekte güncellenir, DB'ye seyrek yazılır."""
+        kayit = await self.getir(user_id)
+        simdi = time.time()
+        if simdi - kayit["son_gorulme"] < AKTIFLIK_YAZMA_ARALIGI:
+            return kayit
+        kayit["son_gorulme"] = simdi
+        if kayit["kayitli"]:
+            await db.son_gorulme_guncelle(user_id, simdi)
+        else:
+            await self.yaz(user_id)
+        return kayit
+
+    async def yukle(self, gun: Optional[float] = None) -> int:
+        """Son `gun` günde görülen kullanıcıları tek sorguyla önbelleğe alır."""
+        gun = settings.USER_PREFS_PRELOAD_DAYS if gun is None else gun
+        satirlar = await db.aktif_tercihleri_getir(time.time() - gun * 86400, self.boyut)
+        # En yeni en sonda kalsın (LRU sırası)
+        for satir in reversed(satirlar):
+            if satir["user_id"] not in self._satirlar:
+                self._koy(satir["user_id"], _satirdan(satir))
+        return len(satirlar)
+
+    def temizle(self):
+        self._satirlar.clear()
+
+
+tercih_onbellegi = TercihOnbellegi()
+
+
+async def get_user_prefs(user_id: int) -> Dict[str, Any]:
+    """Kullanıcı tercihlerini getir (kopya), yoksa varsayılan döndür."""
+    return dict((await tercih_onbellegi.getir(user_id))["prefs"])
+
 
 async def set_user_pref(user_id: int, key: str, value: Any) -> bool:
     """Tek bir tercih değerini güncelle."""
     if key not in PREF_KEYS:
         log.warning(f"Invalid pref key: {key}")
         return False
-    
-    if user_id not in _user_prefs_cache:
-        _user_prefs_cache[user_id] = DEFAULT_PREFS.copy()
-    
-    _user_prefs_cache[user_id][key] = value
+    if key == "language" and value not in MESSAGES:
+        log.warning(f"Invalid language: {value}")
+        return False
+
+    await tercih_onbellegi.yaz(user_id, **{key: value})
     log.debug(f"User {user_id} pref updated: {key}={value}")
     return True
 
+
+async def get_user_lang(user_id: int) -> str:
+    """Kullanıcının dili (önbellekten); etkinliği de işaretler."""
+    return (await tercih_onbellegi.gorundu(user_id))["prefs"]["language"]
+
+
+async def set_user_lang(user_id: int, lang: str) -> bool:
+    return await set_user_pref(user_id, "language", lang)
+
+
+async def get_user_currency(user_id: int) -> str:
+    """Kullanıcının değerleme para birimi (portföy toplamları bu birimde gösterilir)."""
+    return str((await get_user_prefs(user_id)).get("currency") or DEFAULT_PREFS["currency"]).upper()
+
+
+async def preload_user_prefs() -> int:
+    """Başlangıçta yakın zamanda etkin kullanıcıların tercihlerini yükler."""
+    sayi = await tercih_onbellegi.yukle()
+    log.info(f"👤 {sayi} kullanıcının tercihleri önbelleğe yüklendi.")
+    return sayi
+
+
 async def ensure_prefs_table():
-    """DB tablosu oluştur — basit versiyonda no-op."""
-    # İleri versiyonda DB migration eklenebilir
-    log.debug("ensure_prefs_table: no-op (simple mode)")
-    pass
+    """kullanici_tercihleri tablosunun var olduğundan emin olur (eksik şema göçlerini uygular)."""
+    await db.goclari_uygula()
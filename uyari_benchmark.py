@@ -0,0 +1,424 @@
+"""
+uyari_benchmark.py — Uyarı hattı için tekrar oynatma (replay) kıyaslaması.
+
+Kaydedilmiş ya da sentetik bir fiyat şeridini (tape) uyarı motorundan geçirir ve
+değişikliklerin rakamla değerlendirilebilmesi için ölçer. Motorlar:
+
+    yoklama  uyari_kontrol_dongusu — semboller ALERT_CHECK_INTERVAL'da bir yoklanır
+    akis     KriptoUyariAkisi + yoklama yedeği — her tick uyarı indeksinde kontrol edilir
+             (üretimdeki düzen: akışı bayatlayan / kripto olmayan semboller yoklanır)
+
+Her motor için:
+    tespit gecikmesi  fiyatın eşiği şeritte geçtiği an → mesajın gönderildiği an (p50/p95/p99/maks)
+    kaçırılan         şeritte geçildiği halde bildirilmeyen uyarılar (yoklamalar arasında dönen fiyat)
+    hatalı            şeritte hiç geçilmediği halde bildirilen uyarılar (0 olmalı)
+    verim             teslim edilen uyarı / sn, işlenen fiyat gözlemi, CPU süresi
+    bellek            tracemalloc tepe değeri
+    aşamalar          alert_observe_to_eval / eval_to_send histogramlarının ortalamaları
+
+Geçici bir SQLite veritabanı, gerçek uyarı indeksi ve gönderim kuyruğu kullanılır; yalnızca
+fiyat kaynağı şerittir ve Telegram yerine gönderim anlarını kaydeden bir alıcı vardır.
+Motor aralıkları gerçek saniyedir; --hiz > 1 şeridi motora göre hızlı oynatır.
+
+Kullanım:
+    python uyari_benchmark.py                                    # sentetik: 20 sembol × 50 uyarı, 60 sn
+    python uyari_benchmark.py --serit kayit.csv --hiz 10         # kayıt: zaman,sembol,fiyat (sn)
+    python uyari_benchmark.py --aralik 300 --sure 900 --json sonuc.json
+"""
+import os
+import csv
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from bisect import bisect_left
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from prometheus_client import REGISTRY
+
+import alert_motoru
+import db as db_module
+from config import settings
+from gonderim_kuyrugu import GonderimKuyrugu
+from websocket_motoru import binance_sembolu, ticker_stream
+
+log = logging.getLogger("finans_botu")
+
+MOTORLAR = ("yoklama", "akis")
+_ASAMALAR = {
+    "gozlem_degerlendirme": "alert_observe_to_eval_seconds",
+    "degerlendirme_gonderim": "alert_eval_to_send_seconds",
+}
+
+
+# ═══════════════════════════════════════════════════════════════
+# FİYAT ŞERİDİ
+# ═══════════════════════════════════════════════════════════════
+
+Serit = List[Tuple[float, str, float]]     # (şerit saniyesi, sembol, fiyat), zamana göre sıralı
+
+
+def sentetik_serit(sembol_sayisi: int = 20, sure: float = 60.0, tick_araligi: float = 0.5,
+                   oynaklik: float = 0.002, tohum: int = 42) -> Serit:
+    """Geometrik rastgele yürüyüş; semboller kripto biçiminde (akış motoru da işleyebilsin)."""
+    rng = random.Random(tohum)
+    serit: Serit = []
+    for i in range(sembol_sayisi):
+        sembol = f"B{i}-USD"
+        fiyat = rng.uniform(10, 1000)
+        t = rng.uniform(0, tick_araligi)
+        while t < sure:
+            serit.append((t, sembol, round(fiyat, 6)))
+            fiyat *= math.exp(rng.gauss(0, oynaklik))
+            t += tick_araligi
+    serit.sort()
+    return serit
+
+
+def serit_oku(yol: str) -> Serit:
+    """CSV kaydı: zaman,sembol,fiyat başlıklı; zaman saniye (epoch ya da göreli)."""
+    with open(yol, newline="") as f:
+        serit = [(float(r["zaman"]), r["sembol"].upper(), float(r["fiyat"])) for r in csv.DictReader(f)]
+    if not serit:
+        raise ValueError(f"Şerit boş: {yol}")
+    serit.sort()
+    bas = serit[0][0]
+    return [(t - bas, s, p) for t, s, p in serit]
+
+
+@dataclass
+class BenchUyari:
+    id: int
+    sembol: str
+    tip: str
+    hedef: float
+    gecis: Optional[float]      # Şerit saniyesi; hiç geçilmiyorsa None
+
+
+def uyarilari_uret(serit: Serit, sembol_basina: int = 50, genlik: float = 1.5,
+                   tohum: int = 42) -> List[BenchUyari]:
+    """
+    Her sembol için ilk fiyatın iki yanına fiyat_ust / fiyat_alt eşikleri dağıtır. Eşikler
+    gözlenen aralığın `genlik` katına yayılır: bir kısmı hiç geçilmez (hatalı bildirim kontrolü).
+    Doğru geçiş anı, önek maks/min dizilerinde bisect ile bulunur.
+    """
+    rng = random.Random(tohum)
+    seriler: Dict[str, Tuple[List[float], List[float]]] = {}
+    for t, s, p in serit:
+        zamanlar, fiyatlar = seriler.setdefault(s, ([], []))
+        zamanlar.append(t)
+        fiyatlar.append(p)
+
+    uyarilar: List[BenchUyari] = []
+    for sembol in sorted(seriler):
+        zamanlar, fiyatlar = seriler[sembol]
+        ilk = fiyatlar[0]
+        onek_maks, onek_min = [], []
+        for p in fiyatlar:
+            onek_maks.append(max(p, onek_maks[-1]) if onek_maks else p)
+            onek_min.append(-min(p, -onek_min[-1]) if onek_min else -p)   # artan olsun diye negatif
+        yukari = max(onek_maks[-1] - ilk, ilk * 1e-4) * genlik
+        asagi = max(ilk - (-onek_min[-1]), ilk * 1e-4) * genlik
+        for k in range(sembol_basina):
+            if k % 2 == 0:
+                hedef = ilk + rng.uniform(0.02, 1.0) * yukari
+                i = bisect_left(onek_maks, hedef)
+                tip = "fiyat_ust"
+            else:
+                hedef = ilk - rng.uniform(0.02, 1.0) * asagi
+                i = bisect_left(onek_min, -hedef)
+                tip = "fiyat_alt"
+            gecis = zamanlar[i] if i < len(zamanlar) else None
+            uyarilar.append(BenchUyari(len(uyarilar) + 1, sembol, tip, round(hedef, 6), gecis))
+    return uyarilar
+
+
+class SeritOynatici:
+    """Şeridi gerçek zamanda (hiz katıyla) oynatır; son fiyatlar yoklama motorunun kaynağıdır."""
+
+    def __init__(self, serit: Serit, hiz: float = 1.0, hub: Optional["SeritHub"] = None):
+        self.serit = serit
+        self.hiz = hiz
+        self.hub = hub
+        self.son: Dict[str, float] = {}
+        self.baslangic = 0.0
+        self.gozlem = 0               # Motorun işlediği fiyat gözlemi (yoklama + tick)
+
+    def duvar(self, t: float) -> float:
+        return self.baslangic + t / self.hiz
+
+    async def fiyat(self, sembol: str) -> Dict[str, Any]:
+        """get_fiyat_hiyerarsik yerine geçer."""
+        self.gozlem += 1
+        fiyat = self.son.get(sembol.upper())
+        return {} if fiyat is None else {"fiyat": fiyat, "zaman": time.time()}
+
+    async def oynat(self):
+        for t, sembol, fiyat in self.serit:
+            bekle = self.duvar(t) - time.time()
+            if bekle > 0:
+                await asyncio.sleep(bekle)
+            self.son[sembol] = fiyat
+            if self.hub is not None:
+                b = binance_sembolu(sembol)
+                if b:
+                    self.gozlem += await self.hub.yayinla(b, fiyat)
+
+
+class SeritHub:
+    """BinanceStreamHub'ın KriptoUyariAkisi'nin kullandığı arayüzü; ağ yok, tick'ler şeritten."""
+
+    class _Abone:
+        def __init__(self, callback):
+            self.callback = callback
+            self.streamler = set()
+
+        async def ekle(self, *streamler):
+            self.streamler.update(streamler)
+
+        async def cikar(self, *streamler):
+            self.streamler.difference_update(streamler)
+
+        async def kapat(self):
+            self.streamler.clear()
+
+    def __init__(self):
+        self.aboneler: List[SeritHub._Abone] = []
+        self.son_mesaj: Dict[str, float] = {}
+
+    def abone(self, callback, kuyruk_boyutu: int = 100):
+        a = self._Abone(callback)
+        self.aboneler.append(a)
+        return a
+
+    def taze_mi(self, stream: str, bayat_sn: float) -> bool:
+        son = self.son_mesaj.get(stream)
+        return son is not None and time.monotonic() - son < bayat_sn
+
+    async def yayinla(self, binance_sym: str, fiyat: float) -> int:
+        stream = ticker_stream(binance_sym)
+        self.son_mesaj[stream] = time.monotonic()
+        teslim = 0
+        for a in self.aboneler:
+            if stream in a.streamler:
+                await a.callback(stream, {"e": "24hrTicker", "s": binance_sym, "c": str(fiyat)})
+                teslim += 1
+        return teslim
+
+
+class _Alici:
+    """Telegram yerine: her mesajın gönderim anını sohbet (= uyarı) id'siyle kaydeder."""
+
+    def __init__(self):
+        self.gonderimler: Dict[int, float] = {}
+
+    async def send_message(self, chat_id: int, metin: str, parse_mode: Optional[str] = None):
+        self.gonderimler.setdefault(chat_id, time.time())
+
+
+# ═══════════════════════════════════════════════════════════════
+# ÖLÇÜM
+# ═══════════════════════════════════════════════════════════════
+
+@dataclass
+class Sonuc:
+    motor: str
+    uyari: int
+    gecilen: int
+    teslim: int
+    kacirilan: int
+    hatali: int
+    gecikme_p50: Optional[float]
+    gecikme_p95: Optional[float]
+    gecikme_p99: Optional[float]
+    gecikme_maks: Optional[float]
+    uyari_sn: float
+    gozlem: int
+    cpu_sn: float
+    bellek_mb: float
+    asamalar: Dict[str, Optional[float]]
+
+
+def _yuzdelik(degerler: Sequence[float], oran: float) -> Optional[float]:
+    if not degerler:
+        return None
+    s = sorted(degerler)
+    return s[min(len(s) - 1, max(0, math.ceil(oran * len(s)) - 1))]
+
+
+def _histogram_ozeti(kaynak: str) -> Dict[str, Tuple[float, float]]:
+    ozet = {}
+    for ad, metrik in _ASAMALAR.items():
+        toplam = REGISTRY.get_sample_value(f"{metrik}_sum", {"kaynak": kaynak}) or 0.0
+        sayi = REGISTRY.get_sample_value(f"{metrik}_count", {"kaynak": kaynak}) or 0.0
+        ozet[ad] = (toplam, sayi)
+    return ozet
+
+
+async def _veritabani_hazirla(yol: str, uyarilar: Sequence[BenchUyari]):
+    await db_module.DBPool.close()
+    settings.DB_PATH = yol
+    await db_module.db_init()
+    db = await db_module.DBPool.get_db()
+    # user_id = uyarı id: alıcı her mesajı sohbetinden uyarıya eşler
+    await db.executemany(
+        "INSERT INTO uyarilar (id, user_id, sembol, tip, hedef_deger) VALUES (?, ?, ?, ?, ?)",
+        [(u.id, u.id, u.sembol, u.tip, repr(u.hedef)) for u in uyarilar],
+    )
+    await db.commit()
+    await db_module.uyari_indeksini_yukle()
+
+
+async def motor_calistir(motor: str, serit: Serit, uyarilar: Sequence[BenchUyari], *,
+                         hiz: float = 1.0, aralik: float = 30.0, bekleme: Optional[float] = None,
+                         telegram_hizi: float = 0.0, ek_sure: float = 5.0) -> Sonuc:
+    """Tek motoru şerit boyunca (+ ek_sure) çalıştırır ve sonuçları ölçer."""
+    if motor not in MOTORLAR:
+        raise ValueError(f"Bilinmeyen motor: {motor}")
+    eski = (settings.ALERT_CHECK_INTERVAL, settings.DB_PATH, alert_motoru.SEMBOL_ARASI_BEKLEME,
+            alert_motoru.get_fiyat_hiyerarsik, alert_motoru.gonderim_kuyrugu, alert_motoru.kripto_akisi)
+    kaynak_hist = "akis" if motor == "akis" else "yoklama"
+    gorevler: List[asyncio.Task] = []
+
+    with tempfile.TemporaryDirectory() as klasor:
+        try:
+            await _veritabani_hazirla(os.path.join(klasor, "benchmark.db"), uyarilar)
+            settings.ALERT_CHECK_INTERVAL = aralik
+            if bekleme is not None:
+                alert_motoru.SEMBOL_ARASI_BEKLEME = bekleme
+            alert_motoru._sonraki_yoklama.clear()
+
+            hiz_sn = telegram_hizi or 1e9
+            kuyruk = GonderimKuyrugu(global_hiz=hiz_sn, sohbet_hiz=hiz_sn, kalici=False)
+            alert_motoru.gonderim_kuyrugu = kuyruk
+            alici = _Alici()
+
+            hub = SeritHub() if motor == "akis" else None
+            oynatici = SeritOynatici(serit, hiz, hub)
+            alert_motoru.get_fiyat_hiyerarsik = oynatici.fiyat
+            alert_motoru.kripto_akisi = None
+
+            once = _histogram_ozeti(kaynak_hist)
+            tracemalloc.start()
+            cpu0 = time.process_time()
+            oynatici.baslangic = time.time()
+
+            gorevler.append(asyncio.create_task(kuyruk.calistir(alici)))
+            if hub is not None:
+                akis = alert_motoru.KriptoUyariAkisi(hub=hub, yenileme_sn=1.0)
+                alert_motoru.kripto_akisi = akis
+                gorevler.append(asyncio.create_task(akis.calistir()))
+                await asyncio.sleep(0)   # İlk abonelik şerit başlamadan kurulsun
+            gorevler.append(asyncio.create_task(alert_motoru.uyari_kontrol_dongusu()))
+
+            await oynatici.oynat()
+            await asyncio.sleep(ek_sure)
+            sure = time.time() - oynatici.baslangic
+            cpu = time.process_time() - cpu0
+            _, tepe = tracemalloc.get_traced_memory()
+        finally:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            for g in gorevler:
+                g.cancel()
+            await asyncio.gather(*gorevler, return_exceptions=True)
+            await db_module.DBPool.close()
+            (settings.ALERT_CHECK_INTERVAL, settings.DB_PATH, alert_motoru.SEMBOL_ARASI_BEKLEME,
+             alert_motoru.get_fiyat_hiyerarsik, alert_motoru.gonderim_kuyrugu, alert_motoru.kripto_akisi) = eski
+            alert_motoru._sonraki_yoklama.clear()
+
+    sonra = _histogram_ozeti(kaynak_hist)
+    asamalar = {}
+    for ad, (toplam, sayi) in sonra.items():
+        d_toplam, d_sayi = toplam - once[ad][0], sayi - once[ad][1]
+        asamalar[ad] = d_toplam / d_sayi if d_sayi else None
+
+    gecikmeler = []
+    hatali = 0
+    for u in uyarilar:
+        gonderim = alici.gonderimler.get(u.id)
+        if gonderim is None:
+            continue
+        if u.gecis is None:
+            hatali += 1
+        else:
+            gecikmeler.append(max(0.0, gonderim - oynatici.duvar(u.gecis)))
+    gecilen = sum(u.gecis is not None for u in uyarilar)
+    teslim = len(alici.gonderimler)
+    return Sonuc(
+        motor=motor, uyari=len(uyarilar), gecilen=gecilen, teslim=teslim,
+        kacirilan=gecilen - len(gecikmeler), hatali=hatali,
+        gecikme_p50=_yuzdelik(gecikmeler, 0.50), gecikme_p95=_yuzdelik(gecikmeler, 0.95),
+        gecikme_p99=_yuzdelik(gecikmeler, 0.99), gecikme_maks=max(gecikmeler, default=None),
+        uyari_sn=teslim / sure if sure > 0 else 0.0, gozlem=oynatici.gozlem,
+        cpu_sn=cpu, bellek_mb=tepe / 2 ** 20, asamalar=asamalar,
+    )
+
+
+async def kiyasla(serit: Serit, uyarilar: Sequence[BenchUyari], motorlar: Sequence[str] = MOTORLAR,
+                  **secenekler) -> List[Sonuc]:
+    """Motorları aynı şerit ve uyarılarla sırayla çalıştırır."""
+    return [await motor_calistir(m, serit, uyarilar, **secenekler) for m in motorlar]
+
+
+def rapor(sonuclar: Sequence[Sonuc]) -> str:
+    def sn(x):
+        return "-" if x is None else f"{x:.3f}"
+
+    basliklar = ("motor", "uyarı", "geçilen", "teslim", "kaçırılan", "hatalı", "p50 sn", "p95 sn",
+                 "p99 sn", "maks sn", "uyarı/sn", "gözlem", "cpu sn", "bellek MB", "gözlem→değ", "değ→gönd")
+    satirlar = [basliklar]
+    for s in sonuclar:
+        satirlar.append((
+            s.motor, str(s.uyari), str(s.gecilen), str(s.teslim), str(s.kacirilan), str(s.hatali),
+            sn(s.gecikme_p50), sn(s.gecikme_p95), sn(s.gecikme_p99), sn(s.gecikme_maks),
+            f"{s.uyari_sn:.1f}", str(s.gozlem), f"{s.cpu_sn:.2f}", f"{s.bellek_mb:.1f}",
+            sn(s.asamalar.get("gozlem_degerlendirme")), sn(s.asamalar.get("degerlendirme_gonderim")),
+        ))
+    genislik = [max(len(r[i]) for r in satirlar) for i in range(len(basliklar))]
+    return "\n".join("  ".join(h.rjust(g) for h, g in zip(r, genislik)) for r in satirlar)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    p = argparse.ArgumentParser(description="Uyarı hattı tekrar oynatma kıyaslaması")
+    p.add_argument("--serit", help="Kayıtlı şerit CSV'si (zaman,sembol,fiyat); verilmezse sentetik")
+    p.add_argument("--sembol", type=int, default=20, help="Sentetik şeritteki sembol sayısı")
+    p.add_argument("--sure", type=float, default=60.0, help="Sentetik şerit süresi (şerit saniyesi)")
+    p.add_argument("--tick", type=float, default=0.5, help="Sentetik şeritte sembol başına tick aralığı")
+    p.add_argument("--uyari", type=int, default=50, help="Sembol başına uyarı sayısı")
+    p.add_argument("--hiz", type=float, default=1.0, help="Oynatma hızı (şerit sn / gerçek sn)")
+    p.add_argument("--aralik", type=float, default=30.0, help="ALERT_CHECK_INTERVAL (gerçek sn)")
+    p.add_argument("--bekleme", type=float, default=None,
+                   help=f"Semboller arası bekleme (varsayılan {alert_motoru.SEMBOL_ARASI_BEKLEME})")
+    p.add_argument("--telegram-hizi", type=float, default=0.0, help="Gönderim hız sınırı (mesaj/sn, 0: sınırsız)")
+    p.add_argument("--ek-sure", type=float, default=5.0, help="Şerit bittikten sonra bekleme (sn)")
+    p.add_argument("--motor", choices=MOTORLAR, action="append", help="Yalnızca bu motor(lar)")
+    p.add_argument("--tohum", type=int, default=42)
+    p.add_argument("--json", help="Sonuçları bu dosyaya JSON olarak yaz")
+    args = p.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    serit = serit_oku(args.serit) if args.serit else sentetik_serit(
+        args.sembol, args.sure, args.tick, tohum=args.tohum)
+    uyarilar = uyarilari_uret(serit, args.uyari, tohum=args.tohum)
+    print(f"Şerit: {len(serit)} tick, {len({s for _, s, _ in serit})} sembol, "
+          f"{serit[-1][0]:.0f} sn; {len(uyarilar)} uyarı; aralık {args.aralik} sn, hız ×{args.hiz}")
+
+    sonuclar = asyncio.run(kiyasla(
+        serit, uyarilar, args.motor or MOTORLAR, hiz=args.hiz, aralik=args.aralik,
+        bekleme=args.bekleme, telegram_hizi=args.telegram_hizi, ek_sure=args.ek_sure,
+    ))
+    print(rapor(sonuclar))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(s) for s in sonuclar], f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+uyari_indeksi.py — Aktif uyarıların bellek içi indeksi.
+
+Her sembol için uyarı tipine göre sıralı eşik dizileri tutulur:
+
+    fiyat_ust / rsi_ust → değer >= eşik olanlar tetiklenir → dizinin baş kısmı
+    fiyat_alt / rsi_alt → değer <= eşik olanlar tetiklenir → dizinin son kısmı
+
+Yeni bir fiyat geldiğinde bisect ile kesişen uyarılar O(log n + k) sürede bulunur;
+her döngüde tüm tabloyu okuyup hedef_deger metnini yeniden parse etmeye gerek kalmaz.
+
+✅ db.py yazma fonksiyonları (uyari_ekle / uyari_sil) indeksi senkron tutar.
+✅ Veritabanı tek doğruluk kaynağıdır: db.uyari_indeksini_yukle() ile baştan kurulur.
+"""
+import logging
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+log = logging.getLogger("finans_botu")
+
+UST_TIPLER = ("fiyat_ust", "rsi_ust")
+ALT_TIPLER = ("fiyat_alt", "rsi_alt")
+TIPLER = UST_TIPLER + ALT_TIPLER
+
+
+def _parse_decimal(val: Any) -> Optional[Decimal]:
+    if val is None: return None
+    try:
+        if isinstance(val, str):
+            temiz = ''.join(c for c in val if c.isdigit() or c in '.,-')
+            if ',' in temiz and '.' in temiz:
+                if temiz.find('.') < temiz.find(','):
+                    temiz = temiz.replace('.', '').replace(',', '.')
+                else:
+                    temiz = temiz.replace(',', '')
+            elif ',' in temiz:
+                temiz = temiz.replace(',', '.')
+            return Decimal(temiz) if temiz else None
+        return Decimal(str(val))
+    except Exception as e:
+        log.debug(f"Decimal parse hatası ('{val}'): {e}")
+        return None
+
+
+class _EsikDizisi:
+    """Tek (sembol, tip) için sıralı eşikler ve paralel uyarı id'leri."""
+    __slots__ = ("esikler", "idler")
+
+    def __init__(self):
+        self.esikler: List[Decimal] = []
+        self.idler: List[int] = []
+
+    def ekle(self, esik: Decimal, uyari_id: int):
+        i = bisect_right(self.esikler, esik)
+        self.esikler.insert(i, esik)
+        self.idler.insert(i, uyari_id)
+
+    def sil(self, esik: Decimal, uyari_id: int) -> bool:
+        i = bisect_left(self.esikler, esik)
+        while i < len(self.esikler) and self.esikler[i] == esik:
+            if self.idler[i] == uyari_id:
+                del self.esikler[i]
+                del self.idler[i]
+                return True
+            i += 1
+        return False
+
+    def __len__(self):
+        return len(self.esikler)
+
+
+class UyariIndeksi:
+    """
+    Sembol → tip → _EsikDizisi. Uyarı kayıtları (hedef önceden parse edilmiş) id ile tutulur.
+
+        indeks.yukle(db_satirlari)
+        indeks.tetiklenenler("THYAO", fiyat=Decimal("312.5"))  → [uyari, ...]
+    """
+
+    def __init__(self):
+        self._uyarilar: Dict[int, Dict[str, Any]] = {}
+        self._semboller: Dict[str, Dict[str, _EsikDizisi]] = {}
+        self.hazir = False
+
+    def __len__(self):
+        return len(self._uyarilar)
+
+    # ── Yazma ─────────────────────────────────────────────────────
+
+    def yukle(self, uyarilar: Iterable[Dict[str, Any]]):
+        """İndeksi verilen satırlarla baştan kurar (toplu sıralama, tek tek insort yok)."""
+        kayitlar: Dict[int, Dict[str, Any]] = {}
+        gruplar: Dict[Tuple[str, str], List[Tuple[Decimal, int]]] = {}
+        for satir in uyarilar:
+            kayit = self._kayit(satir)
+            if kayit is None:
+                continue
+            kayitlar[kayit["id"]] = kayit
+            gruplar.setdefault((kayit["sembol"], kayit["tip"]), []).append((kayit["hedef"], kayit["id"]))
+
+        semboller: Dict[str, Dict[str, _EsikDizisi]] = {}
+        for (sembol, tip), ciftler in gruplar.items():
+            ciftler.sort()
+            dizi = _EsikDizisi()
+            dizi.esikler = [e for e, _ in ciftler]
+            dizi.idler = [i for _, i in ciftler]
+            semboller.setdefault(sembol, {})[tip] = dizi
+
+        self._uyarilar, self._semboller = kayitlar, semboller
+        self.hazir = True
+        log.info(f"🗂️ Uyarı indeksi yüklendi: {len(kayitlar)} uyarı, {len(semboller)} sembol.")
+
+    def ekle(self, satir: Dict[str, Any]) -> bool:
+        """Tek uyarı ekler (db.uyari_ekle sonrası). Geçersiz tip/hedef ise False."""
+        kayit = self._kayit(satir)
+        if kayit is None:
+            return False
+        if kayit["id"] in self._uyarilar:
+            self.sil(kayit["id"])
+        self._uyarilar[kayit["id"]] = kayit
+        self._semboller.setdefault(kayit["sembol"], {}).setdefault(
+            kayit["tip"], _EsikDizisi()
+        ).ekle(kayit["hedef"], kayit["id"])
+        return True
+
+    def sil(self, uyari_id: int, user_id: Optional[int] = None) -> bool:
+        """Uyarıyı indeksten çıkarır; user_id verilmişse sahiplik kontrol edilir."""
+        kayit = self._uyarilar.get(uyari_id)
+        if kayit is None or (user_id is not None and kayit["user_id"] != user_id):
+            return False
+        del self._uyarilar[uyari_id]
+        tipler = self._semboller.get(kayit["sembol"], {})
+        dizi = tipler.get(kayit["tip"])
+        if dizi is not None:
+            dizi.sil(kayit["hedef"], uyari_id)
+            if not dizi:
+                del tipler[kayit["tip"]]
+                if not tipler:
+                    del self._semboller[kayit["sembol"]]
+        return True
+
+    @staticmethod
+    def _kayit(satir: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        tip = satir.get("tip")
+        hedef = _parse_decimal(satir.get("hedef_deger"))
+        if tip not in TIPLER or hedef is None or satir.get("id") is None:
+            return None
+        kayit = dict(satir)
+        kayit["sembol"] = str(kayit["sembol"]).upper()
+        kayit["hedef"] = hedef
+        return kayit
+
+    # ── Okuma ─────────────────────────────────────────────────────
+
+    def semboller(self) -> List[str]:
+        """Aktif uyarısı olan semboller."""
+        return list(self._semboller)
+
+    def rsi_var_mi(self, sembol: str) -> bool:
+        tipler = self._semboller.get(sembol.upper(), {})
+        return "rsi_ust" in tipler or "rsi_alt" in tipler
+
+    def getir(self, uyari_id: int) -> Optional[Dict[str, Any]]:
+        return self._uyarilar.get(uyari_id)
+
+    def tetiklenenler(self, sembol: str, fiyat: Optional[Decimal] = None,
+                      rsi: Optional[Decimal] = None) -> List[Dict[str, Any]]:
+        """Verilen fiyat/RSI ile eşiği geçilmiş uyarıları döndürür (O(log n + k))."""
+        tipler = self._semboller.get(sembol.upper())
+        if not tipler:
+            return []
+        idler: List[int] = []
+        for deger, ust, alt in ((fiyat, "fiyat_ust", "fiyat_alt"), (rsi, "rsi_ust", "rsi_alt")):
+            if deger is None:
+                continue
+            dizi = tipler.get(ust)
+            if dizi:
+                # deger >= esik → esik <= deger → baştan bisect_right'a kadar
+                idler.extend(dizi.idler[:bisect_right(dizi.esikler, deger)])
+            dizi = tipler.get(alt)
+            if dizi:
+                # deger <= esik → esik >= deger → bisect_left'ten sona kadar
+                idler.extend(dizi.idler[bisect_left(dizi.esikler, deger):])
+        return [self._uyarilar[i] for i in idler]
+
+
+# Global indeks örneği (db.py yazmaları ve alert_motoru okumaları bunu kullanır)
+uyari_indeksi = UyariIndeksi()
@@ -0,0 +1,65 @@
+"""
+uyari_isci.py — Ek uyarı değerlendirme süreci (parçalı yatay ölçekleme).
+
+Bot süreciyle aynı veritabanını kullanır ve uyarı parçalarından adil payını kiralar.
+Telegram'a kendisi mesaj göndermez: tetiklenen uyarılar gonderim_kuyrugu tablosuna
+yazılır, bot sürecinin gönderim kuyruğu tabloyu tarayıp gönderir (tek gönderici,
+tek hız sınırı).
+
+Kullanım (bot sürecinde de ALERT_SHARDING_ENABLED=true olmalı):
+    ALERT_SHARDING_ENABLED=true python uyari_isci.py
+"""
+import asyncio
+import logging
+import signal
+
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+from config import settings
+
+log = logging.getLogger("finans_botu")
+
+
+async def isci_calistir(sahip=None):
+    """Kiralama, polling döngüsü ve (açıksa) kripto akışını çalıştırır; iptal edilene kadar sürer."""
+    import alert_motoru
+    from db import db_init, close_db
+    from gonderim_kuyrugu import gonderim_kuyrugu
+
+    if not settings.ALERT_SHARDING_ENABLED:
+        log.warning("⚠️ ALERT_SHARDING_ENABLED kapalı; işçi süreci için açılıyor.")
+        settings.ALERT_SHARDING_ENABLED = True
+    await db_init()
+    gonderim_kuyrugu.gonderici = False
+
+    # Kiralayıcı döngüden önce kurulmalı: ilk turda tüm semboller değerlendirilmesin
+    gorevler = [asyncio.create_task(alert_motoru.uyari_parcalama_baslat(sahip))]
+    gorevler.append(asyncio.create_task(alert_motoru.uyari_kontrol_dongusu()))
+    gorevler.append(asyncio.create_task(alert_motoru.kosul_uyari_dongusu()))
+    gorevler.append(asyncio.create_task(alert_motoru.kripto_uyari_akisi_baslat()))
+    try:
+        await asyncio.gather(*gorevler)
+    finally:
+        for gorev in gorevler:
+            gorev.cancel()
+        await asyncio.gather(*gorevler, return_exceptions=True)
+        await alert_motoru.akis_merkezi.kapat()
+        await close_db()
+        log.info("✅ Uyarı işçisi kapatıldı.")
+
+
+async def main():
+    gorev = asyncio.create_task(isci_calistir())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, gorev.cancel)
+    await asyncio.gather(gorev, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=getattr(logging, settings.LOG_LEVEL),
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    asyncio.run(main())
@@ -108,7 +108,9 @@ async def _fetch_yfinance(sembol: str) -> Optional[Dict[str, Any]]:
             return {
                 "fiyat": float(fiyat),
                 "degisim": float(degisim) if degisim else 0.0,
-                "kaynak": "yFinance"
+                "kaynak": "yFinance",
+                "para_birimi": info.get("currency"),
+                "zaman": time.time(),       # Gözlem anı (önbellekten dönünce de korunur)
             }
         else:
             log.warning(f"⚠️ yFinance {sembol} için fiyat bulamadı.")
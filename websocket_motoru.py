@@ -1,60 +1,363 @@
 """
 websocket_motoru.py — Gerçek zamanlı veri akışı (WebSocket).
 ✅ YENİ ÖZELLİK - Binance WebSocket üzerinden kripto fiyat takibi.
+✅ Akış merkezi (stream hub): tek bağlantı üzerinden SUBSCRIBE/UNSUBSCRIBE ile
+   dinamik abonelik — sembol eklemek için soket yeniden kurulmaz.
+
+MİMARİ:
+  ══════════════════════════════════════════════════════════════
+  BinanceStreamHub
+    ├── _Parca (bağlantı #0)  ≤ akis_limiti stream   ── wss://.../stream
+    ├── _Parca (bağlantı #1)  ≤ akis_limiti stream      (limit aşılınca yeni parça)
+    └── Abone'ler: her birinin kendi sınırlı kuyruğu + işçi görevi
+          - Receive döngüsü callback'i ASLA beklemez, sadece kuyruğa koyar.
+          - Kuyrukta aynı stream için bekleyen değer varsa yenisiyle değiştirilir
+            (latest-value coalescing); kuyruk doluysa en eski değer düşürülür.
+          - Her mesajın gerektiği tüketiciler (ör. mum birleştirici) birlestir=False
+            ile sıralı FIFO kuyruk kullanır.
+  Kopan bağlantı üstel geri çekilme (+jitter) ile yeniden kurulur ve
+  parçadaki tüm stream'lere yeniden abone olunur. Son stream'i çıkarılan
+  parçanın bağlantısı kapatılır.
+  ══════════════════════════════════════════════════════════════
 """
 import json
+import time
+import random
 import asyncio
 import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
 import aiohttp
-from typing import Dict, Callable, List
+
+from security.input_validator import _KRIPTO_QUOTE_CURRENCIES
 
 log = logging.getLogger("finans_botu")
 
-class BinanceWS:
-    """Binance WebSocket istemcisi."""
-    def __init__(self):
-        self.url = "wss://stream.binance.com:9443/ws"
-        self.callbacks: Dict[str, List[Callable]] = {}
-        self.is_running = False
-
-    async def connect(self, symbols: List[str]):
-        """Belirtilen semboller için WebSocket bağlantısı kurar."""
-        if not symbols: return
-        
-        streams = "/".join([f"{s.lower().replace('-', '')}@ticker" for s in symbols])
-        full_url = f"{self.url}/{streams}"
-        
-        self.is_running = True
-        while self.is_running:
+BINANCE_WS_URL = "wss://stream.binance.com:9443/stream"
+AKIS_LIMITI = 1024            # Binance: bağlantı başına en fazla stream
+ABONELIK_PARTI = 200          # Tek SUBSCRIBE mesajındaki en fazla stream
+MESAJ_ARALIGI = 0.25          # Binance: bağlantı başına ≤ 5 gelen mesaj/sn
+
+Callback = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+
+def binance_sembolu(sembol: str) -> Optional[str]:
+    """
+    'BTC-USD' → 'BTCUSDT'. Kripto olmayan semboller için None.
+    Yalnızca bilinen kripto kotasyonları eşlenir: 'BRK-B' gibi tireli hisseler
+    var olmayan bir stream'e değil, polling'e gider.
+    """
+    s = sembol.upper()
+    if s.endswith(".IS") or "-" not in s:
+        return None
+    base, _, quote = s.rpartition("-")
+    if not base.isalnum() or quote not in _KRIPTO_QUOTE_CURRENCIES:
+        return None
+    return base + ("USDT" if quote == "USD" else quote)
+
+
+def ticker_stream(binance_sembolu: str) -> str:
+    """'BTCUSDT' → 'btcusdt@ticker'"""
+    return f"{binance_sembolu.lower()}@ticker"
+
+
+def islem_stream(binance_sembolu: str) -> str:
+    """'BTCUSDT' → 'btcusdt@aggTrade' (birleştirilmiş tekil işlemler)"""
+    return f"{binance_sembolu.lower()}@aggTrade"
+
+
+# ═══════════════════════════════════════════════════════════════
+# ABONE — sınırlı, birleştirici (coalescing) kuyruk + işçi görevi
+# ═══════════════════════════════════════════════════════════════
+
+class Abone:
+    """
+    Bir tüketici. Mesajlar stream başına en son değer olacak şekilde birleştirilir:
+    yavaş bir callback akışı durdurmaz, yalnızca ara değerleri kaçırır.
+    birlestir=False ise tüm mesajlar sırayla iletilir (yalnızca taşmada en eskiler atılır).
+    """
+
+    def __init__(self, hub: "BinanceStreamHub", callback: Callback, kuyruk_boyutu: int = 100,
+                 birlestir: bool = True):
+        self.hub = hub
+        self.callback = callback
+        self.kuyruk_boyutu = max(1, kuyruk_boyutu)
+        self.birlestir = birlestir
+        self.streamler: Set[str] = set()
+        self._bekleyen: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sira: deque = deque()   # birlestir=False: (stream, veri) FIFO
+        self._olay = asyncio.Event()
+        self._isci: Optional[asyncio.Task] = None
+        self.birlestirilen = 0   # Yerine yenisi konan (atlanan) ara değerler
+        self.dusurulen = 0       # Kuyruk dolu olduğu için atılan değerler
+
+    def _koy(self, stream: str, veri: Dict[str, Any]):
+        """(Receive döngüsü) Beklemeden kuyruğa koyar."""
+        if not self.birlestir:
+            if len(self._sira) >= self.kuyruk_boyutu:
+                self._sira.popleft()
+                self.dusurulen += 1
+            self._sira.append((stream, veri))
+        elif stream in self._bekleyen:
+            self._bekleyen[stream] = veri
+            self.birlestirilen += 1
+        else:
+            if len(self._bekleyen) >= self.kuyruk_boyutu:
+                self._bekleyen.popitem(last=False)
+                self.dusurulen += 1
+            self._bekleyen[stream] = veri
+        self._olay.set()
+
+    async def _calis(self):
+        while True:
+            await self._olay.wait()
+            while self._sira or self._bekleyen:
+                if self._sira:
+                    stream, veri = self._sira.popleft()
+                else:
+                    stream, veri = self._bekleyen.popitem(last=False)
+                try:
+                    await self.callback(stream, veri)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.error(f"Akış callback hatası ({stream}): {e}")
+            self._olay.clear()
+
+    def _baslat(self):
+        if self._isci is None:
+            self._isci = asyncio.create_task(self._calis())
+
+    async def ekle(self, *streamler: str):
+        """Bu aboneyi stream'lere bağlar (gerekirse hub tek SUBSCRIBE mesajı gönderir)."""
+        yeni = [s for s in dict.fromkeys(streamler) if s not in self.streamler]
+        if yeni:
+            self.streamler.update(yeni)
+            await self.hub._streamler_ekle(yeni, self)
+
+    async def cikar(self, *streamler: str):
+        """Abonelikten çıkar (son abone ayrılınca hub UNSUBSCRIBE gönderir)."""
+        eski = [s for s in dict.fromkeys(streamler) if s in self.streamler]
+        if eski:
+            for s in eski:
+                self.streamler.discard(s)
+                self._bekleyen.pop(s, None)
+            if self._sira:
+                self._sira = deque(m for m in self._sira if m[0] not in eski)
+            await self.hub._streamler_cikar(eski, self)
+
+    async def kapat(self):
+        await self.cikar(*self.streamler)
+        if self._isci is not None:
+            self._isci.cancel()
+            try:
+                await self._isci
+            except asyncio.CancelledError:
+                pass
+            self._isci = None
+
+
+# ═══════════════════════════════════════════════════════════════
+# PARÇA — tek WebSocket bağlantısı
+# ═══════════════════════════════════════════════════════════════
+
+class _Parca:
+    """Bir WebSocket bağlantısı ve ona atanmış stream'ler."""
+
+    def __init__(self, hub: "BinanceStreamHub", no: int):
+        self.hub = hub
+        self.no = no
+        self.streamler: Set[str] = set()
+        self.ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self.bagli = False
+        self.baglanti_sayisi = 0
+        self._gorev: Optional[asyncio.Task] = None
+        self._istek_id = 0
+        self._gonder_kilidi = asyncio.Lock()
+
+    def baslat(self):
+        if self._gorev is None:
+            self._gorev = asyncio.create_task(self._dongu())
+
+    async def _istek(self, metod: str, streamler: List[str]):
+        """SUBSCRIBE/UNSUBSCRIBE — partiler halinde, mesaj hızı sınırına uyarak."""
+        if not self.bagli or self.ws is None or not streamler:
+            return   # Bağlantı kurulunca tüm streamler zaten yeniden abone edilir
+        async with self._gonder_kilidi:
+            for i in range(0, len(streamler), ABONELIK_PARTI):
+                self._istek_id += 1
+                await self.ws.send_str(json.dumps({
+                    "method": metod,
+                    "params": streamler[i:i + ABONELIK_PARTI],
+                    "id": self._istek_id,
+                }))
+                await asyncio.sleep(self.hub.mesaj_araligi)
+
+    async def ekle(self, streamler: List[str]):
+        self.streamler.update(streamler)
+        self.baslat()
+        await self._istek("SUBSCRIBE", streamler)
+
+    async def cikar(self, streamler: List[str]):
+        self.streamler.difference_update(streamler)
+        await self._istek("UNSUBSCRIBE", streamler)
+
+    async def _dongu(self):
+        bekleme = self.hub.backoff_taban
+        while True:
             try:
                 async with aiohttp.ClientSession() as session:
-                    async with session.ws_connect(full_url) as ws:
-                        log.info(f"WebSocket bağlantısı kuruldu: {symbols}")
+                    async with session.ws_connect(self.hub.url, heartbeat=30) as ws:
+                        self.ws = ws
+                        self.bagli = True
+                        self.baglanti_sayisi += 1
+                        bekleme = self.hub.backoff_taban
+                        log.info(f"📡 Akış bağlantısı #{self.no} kuruldu ({len(self.streamler)} stream).")
+                        # Yeniden bağlanmada parçadaki tüm stream'lere tekrar abone ol
+                        await self._istek("SUBSCRIBE", sorted(self.streamler))
                         async for msg in ws:
                             if msg.type == aiohttp.WSMsgType.TEXT:
-                                data = json.loads(msg.data)
-                                await self._handle_message(data)
+                                self.hub._mesaj_isle(msg.data)
                             elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
                                 break
+                log.warning(f"Akış bağlantısı #{self.no} kapandı.")
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                log.error(f"WebSocket hatası: {e}. 10 saniye sonra tekrar denenecek...")
-                await asyncio.sleep(10)
-
-    async def _handle_message(self, data: dict):
-        """Gelen veriyi işler ve ilgili callback'leri tetikler."""
-        symbol = data.get('s') # Örn: BTCUSDT
-        price = data.get('c')  # Güncel fiyat
-        
-        if symbol in self.callbacks:
-            for cb in self.callbacks[symbol]:
-                await cb(symbol, price)
-
-    def add_callback(self, symbol: str, callback: Callable):
-        """Bir sembol için takip fonksiyonu ekler."""
-        s = symbol.upper().replace('-', '').replace('.IS', '')
-        if s not in self.callbacks:
-            self.callbacks[s] = []
-        self.callbacks[s].append(callback)
-
-# Global WebSocket örneği
-ws_client = BinanceWS()
+                log.error(f"Akış bağlantısı #{self.no} hatası: {e}")
+            finally:
+                self.bagli = False
+                self.ws = None
+
+            # Üstel geri çekilme + jitter (aynı anda kopan parçalar birlikte yüklenmesin)
+            gecikme = bekleme * (0.5 + random.random() / 2)
+            log.info(f"Akış #{self.no} {gecikme:.1f}s sonra yeniden bağlanacak.")
+            await asyncio.sleep(gecikme)
+            bekleme = min(bekleme * 2, self.hub.backoff_tavan)
+
+    async def kapat(self):
+        if self._gorev is not None:
+            self._gorev.cancel()
+            try:
+                await self._gorev
+            except asyncio.CancelledError:
+                pass
+            self._gorev = None
+
+
+# ═══════════════════════════════════════════════════════════════
+# AKIŞ MERKEZİ
+# ═══════════════════════════════════════════════════════════════
+
+class BinanceStreamHub:
+    """
+    Birleşik (combined) stream bağlantıları üzerinde dinamik abonelik.
+
+        abone = akis_merkezi.abone(callback)
+        await abone.ekle("btcusdt@ticker")
+        ...
+        await abone.cikar("btcusdt@ticker")
+    """
+
+    def __init__(self, url: str = BINANCE_WS_URL, akis_limiti: int = AKIS_LIMITI,
+                 backoff_taban: float = 1.0, backoff_tavan: float = 60.0,
+                 mesaj_araligi: float = MESAJ_ARALIGI):
+        self.url = url
+        self.akis_limiti = max(1, akis_limiti)
+        self.backoff_taban = backoff_taban
+        self.backoff_tavan = backoff_tavan
+        self.mesaj_araligi = mesaj_araligi
+        self.parcalar: List[_Parca] = []
+        self._parca_no = 0
+        self.son_mesaj: Dict[str, float] = {}           # stream → time.monotonic()
+        self._aboneler: Dict[str, Set[Abone]] = {}      # stream → aboneler
+        self._parca_haritasi: Dict[str, _Parca] = {}    # stream → parça
+
+    def abone(self, callback: Callback, kuyruk_boyutu: int = 100, birlestir: bool = True) -> Abone:
+        """Yeni bir tüketici oluşturur (stream'ler abone.ekle ile eklenir)."""
+        a = Abone(self, callback, kuyruk_boyutu, birlestir)
+        a._baslat()
+        return a
+
+    def taze_mi(self, stream: str, bayat_sn: float) -> bool:
+        """Stream'in bağlantısı açık ve son bayat_sn içinde mesaj gelmiş mi?"""
+        parca = self._parca_haritasi.get(stream)
+        son = self.son_mesaj.get(stream)
+        return (parca is not None and parca.bagli and son is not None
+                and time.monotonic() - son < bayat_sn)
+
+    @property
+    def stream_sayisi(self) -> int:
+        return len(self._parca_haritasi)
+
+    async def _streamler_ekle(self, streamler: List[str], abone: Abone):
+        """Yeni stream'leri doluluk sırasına göre parçalara dağıtır (limit aşılırsa yeni parça)."""
+        atamalar: Dict[_Parca, List[str]] = {}
+        for stream in streamler:
+            self._aboneler.setdefault(stream, set()).add(abone)
+            if stream in self._parca_haritasi:
+                continue
+            parca = next((p for p in self.parcalar
+                          if len(p.streamler) + len(atamalar.get(p, ())) < self.akis_limiti), None)
+            if parca is None:
+                parca = _Parca(self, self._parca_no)
+                self._parca_no += 1
+                self.parcalar.append(parca)
+            self._parca_haritasi[stream] = parca
+            atamalar.setdefault(parca, []).append(stream)
+        for parca, liste in atamalar.items():
+            await parca.ekle(liste)
+
+    async def _streamler_cikar(self, streamler: List[str], abone: Abone):
+        bosalan: Dict[_Parca, List[str]] = {}
+        for stream in streamler:
+            aboneler = self._aboneler.get(stream)
+            if aboneler is None:
+                continue
+            aboneler.discard(abone)
+            if aboneler:
+                continue
+            del self._aboneler[stream]
+            self.son_mesaj.pop(stream, None)
+            parca = self._parca_haritasi.pop(stream, None)
+            if parca is not None:
+                bosalan.setdefault(parca, []).append(stream)
+        for parca, liste in bosalan.items():
+            if parca.streamler.issubset(liste):
+                # Parçada stream kalmadı: boş bağlantı açık tutulmaz
+                parca.streamler.clear()
+                self.parcalar.remove(parca)
+                await parca.kapat()
+                log.info(f"📴 Akış bağlantısı #{parca.no} boşaldı, kapatıldı.")
+            else:
+                await parca.cikar(liste)
+
+    def _mesaj_isle(self, ham: str):
+        """Gelen çerçeveyi ilgili abonelerin kuyruklarına dağıtır (asla beklemez)."""
+        try:
+            mesaj = json.loads(ham)
+        except ValueError:
+            return
+        stream = mesaj.get("stream")
+        if stream is None:
+            if mesaj.get("error"):
+                log.warning(f"Akış isteği reddedildi: {mesaj}")
+            return   # {"result": null, "id": n} abonelik onayı
+        self.son_mesaj[stream] = time.monotonic()
+        veri = mesaj.get("data", {})
+        for abone in self._aboneler.get(stream, ()):
+            abone._koy(stream, veri)
+
+    async def kapat(self):
+        """Tüm bağlantıları kapatır (main.py shutdown uyumlu)."""
+        for parca in self.parcalar:
+            await parca.kapat()
+        self.parcalar = []
+        self._parca_haritasi.clear()
+        self._aboneler.clear()
+        log.info("🔌 Akış merkezi kapatıldı.")
+
+
+# Global akış merkezi örneği
+akis_merkezi = BinanceStreamHub()